@@ -7,11 +7,17 @@ import shutil
 import subprocess
 
 from distutils import dir_util
+from multiprocessing import pool
 
+from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import log
 from autotest_lib.client.cros import constants
 from autotest_lib.client.bin import utils, package
 
+# Number of loggables collected at the same time. 1 collects them one by one.
+_MAX_PARALLEL_LOGGABLES = global_config.global_config.get_config_value(
+        'CLIENT', 'sysinfo_max_parallel_loggables', type=int, default=4)
+
 _DEFAULT_COMMANDS_TO_LOG_PER_TEST = []
 _DEFAULT_COMMANDS_TO_LOG_PER_BOOT = [
     'lspci -vvn',
@@ -493,15 +499,36 @@ def _run_loggables_ignoring_errors(loggables, output_dir):
     """Runs the given loggables robustly.
 
     In the event of any one of the loggables raising an exception, we print a
-    traceback and continue on.
+    traceback and continue on. Loggables do not depend on each other, so up to
+    _MAX_PARALLEL_LOGGABLES of them run at the same time.
 
     @param loggables: An iterable of base_sysinfo.loggable objects.
     @param output_dir: Path to the output directory.
     """
-    for log in loggables:
-        try:
-            log.run(output_dir)
-        except Exception:
-            logging.exception(
-                    'Failed to collect loggable %r to %s. Continuing...',
-                    log, output_dir)
+    loggables = list(loggables)
+    parallelism = min(_MAX_PARALLEL_LOGGABLES, len(loggables))
+    if parallelism <= 1:
+        for log in loggables:
+            _run_loggable_ignoring_errors(log, output_dir)
+        return
+    workers = pool.ThreadPool(parallelism)
+    try:
+        workers.map(lambda log: _run_loggable_ignoring_errors(log, output_dir),
+                    loggables)
+    finally:
+        workers.close()
+        workers.join()
+
+
+def _run_loggable_ignoring_errors(log, output_dir):
+    """Runs a loggable, logging a traceback if it raises an exception.
+
+    @param log: A base_sysinfo.loggable object.
+    @param output_dir: Path to the output directory.
+    """
+    try:
+        log.run(output_dir)
+    except Exception:
+        logging.exception(
+                'Failed to collect loggable %r to %s. Continuing...',
+                log, output_dir)
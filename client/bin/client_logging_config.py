@@ -1,6 +1,29 @@
 import common
 import logging, os
 from autotest_lib.client.common_lib import logging_config, global_config
+from autotest_lib.client.common_lib import log_writer
+
+
+# Buffering of the status and debug logs. See log_writer.
+_LOG_FLUSH_INTERVAL_SECS = global_config.global_config.get_config_value(
+        'CLIENT', 'log_flush_interval_secs', type=float, default=0)
+_LOG_FSYNC_POLICY = global_config.global_config.get_config_value(
+        'CLIENT', 'log_fsync_policy', type=str,
+        default=log_writer.FSYNC_NEVER)
+_COMPRESS_DEBUG_LOGS = global_config.global_config.get_config_value(
+        'CLIENT', 'compress_debug_logs', type=bool, default=False)
+
+_log_writer = None
+
+
+def get_log_writer():
+    """Returns the BufferedLogWriter of the client status and debug logs."""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = log_writer.BufferedLogWriter(
+                flush_interval_secs=_LOG_FLUSH_INTERVAL_SECS,
+                fsync_policy=_LOG_FSYNC_POLICY)
+    return _log_writer
 
 class ClientLoggingConfig(logging_config.LoggingConfig):
     def add_debug_file_handlers(self, log_dir, log_name=None):
@@ -8,7 +31,19 @@ class ClientLoggingConfig(logging_config.LoggingConfig):
             log_name = global_config.global_config.get_config_value(
                     'CLIENT', 'default_logging_name',
                     type=str, default='client')
-        self._add_file_handlers_for_all_levels(log_dir, log_name)
+        writer = get_log_writer()
+        if not writer.buffered and not _COMPRESS_DEBUG_LOGS:
+            self._add_file_handlers_for_all_levels(log_dir, log_name)
+            return
+        # DEBUG logs are the bulk of the logs, the other levels are still
+        # written synchronously.
+        self.add_buffered_file_handler(
+                '%s.%s' % (log_name, logging.getLevelName(logging.DEBUG)),
+                writer, level=logging.DEBUG, log_dir=log_dir,
+                compress=_COMPRESS_DEBUG_LOGS)
+        for level in (logging.INFO, logging.WARNING, logging.ERROR):
+            file_name = '%s.%s' % (log_name, logging.getLevelName(level))
+            self.add_file_handler(file_name, level=level, log_dir=log_dir)
 
 
     def configure_logging(self, results_dir=None, verbose=False):
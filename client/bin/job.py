@@ -36,6 +36,7 @@ from autotest_lib.client.common_lib import base_job
 from autotest_lib.client.common_lib import packages
 from autotest_lib.client.common_lib import error
 from autotest_lib.client.common_lib import global_config
+from autotest_lib.client.common_lib import log_writer
 from autotest_lib.client.common_lib import logging_manager
 from autotest_lib.client.common_lib import packages
 from autotest_lib.client.cros import cros_logging
@@ -226,7 +227,8 @@ class base_client_job(base_job.base_job):
             # send the entry to stdout, if it's enabled
             logging.info(rendered_entry)
         self._logger = base_job.status_logger(
-            self, status_indenter(self), record_hook=client_job_record_hook)
+            self, status_indenter(self), record_hook=client_job_record_hook,
+            writer=client_logging_config.get_log_writer())
 
 
     def _post_record_init(self, control, options, drop_caches):
@@ -775,6 +777,7 @@ class base_client_job(base_job.base_job):
         utils.system("modprobe -r netconsole", ignore_status=True)
 
         # sync first, so that a sync during shutdown doesn't time out
+        log_writer.flush_all()
         utils.system("sync; sync", ignore_status=True)
 
         utils.system("(sleep 5; reboot) </dev/null >/dev/null 2>&1 &")
@@ -1248,6 +1251,7 @@ class job(base_client_job):
         self.harness.run_reboot()
 
         # sync first, so that a sync during shutdown doesn't time out
+        log_writer.flush_all()
         utils.system('sync; sync', ignore_status=True)
 
         utils.system('reboot </dev/null >/dev/null 2>&1 &')
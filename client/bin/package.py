@@ -13,6 +13,17 @@ from autotest_lib.client.common_lib import error
 # As more package methods are implemented, this list grows up
 KNOWN_PACKAGE_MANAGERS = ['rpm', 'dpkg']
 
+# Database file of each package manager, rewritten whenever packages are
+# installed or removed.
+_PACKAGE_DATABASES = {
+    'rpm': '/var/lib/rpm/Packages',
+    'dpkg': '/var/lib/dpkg/status',
+}
+
+# (state of the package databases, installed packages) of the last list_all
+# call, or None.
+_list_all_cache = None
+
 
 def _rpm_info(rpm_package):
     """\
@@ -155,9 +166,40 @@ def _dpkg_info(dpkg_package):
     return package_info
 
 
+def _get_database_state(support_info):
+    """Returns the state of the databases of the supported package managers.
+
+    @param support_info: Dictionary returned by os_support().
+
+    @return: A tuple of (package manager, inode, size, mtime) tuples, which
+             changes whenever a package is installed or removed, or None if a
+             database can not be found.
+    """
+    state = []
+    for package_manager in KNOWN_PACKAGE_MANAGERS:
+        if not support_info[package_manager]:
+            continue
+        try:
+            stat = os.stat(_PACKAGE_DATABASES[package_manager])
+        except OSError:
+            return None
+        state.append((package_manager, stat.st_ino, stat.st_size,
+                      stat.st_mtime))
+    return tuple(state)
+
+
 def list_all():
-    """Returns a list with the names of all currently installed packages."""
+    """Returns a list with the names of all currently installed packages.
+
+    The list is cached until the database of a package manager changes.
+    """
+    global _list_all_cache
     support_info = os_support()
+    state = _get_database_state(support_info)
+    if (state is not None and _list_all_cache is not None and
+        _list_all_cache[0] == state):
+        return list(_list_all_cache[1])
+
     installed_packages = []
 
     if support_info['rpm']:
@@ -170,6 +212,8 @@ def list_all():
             if parts[0] == "ii":  # only grab "installed" packages
                 installed_packages.append("%s-%s" % (parts[1], parts[2]))
 
+    if state is not None:
+        _list_all_cache = (state, list(installed_packages))
     return installed_packages
 
 
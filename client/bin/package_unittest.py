@@ -1,7 +1,7 @@
 #!/usr/bin/python
 
 
-import unittest, os
+import unittest, os, tempfile
 import common
 from autotest_lib.client.common_lib.test_utils import mock
 from autotest_lib.client.bin import package, os_dep, utils
@@ -168,5 +168,30 @@ class TestPackage(unittest.TestCase):
         self.assertEquals(support, exp_support)
 
 
+    def test_list_all_cached_until_database_changes(self):
+        self.god.stub_function(package, "os_support")
+        self.god.stub_function(utils, "system_output")
+        database = tempfile.NamedTemporaryFile()
+        self.god.stub_with(package, "_PACKAGE_DATABASES",
+                           {'rpm': database.name})
+        self.god.stub_with(package, "_list_all_cache", None)
+        support = {'rpm': True, 'dpkg': False, 'conversion': False}
+
+        # recording
+        package.os_support.expect_call().and_return(support)
+        utils.system_output.expect_call('rpm -qa').and_return('a-1\nb-1')
+        package.os_support.expect_call().and_return(support)
+        package.os_support.expect_call().and_return(support)
+        utils.system_output.expect_call('rpm -qa').and_return('a-1')
+
+        # run and test
+        self.assertEquals(package.list_all(), ['a-1', 'b-1'])
+        self.assertEquals(package.list_all(), ['a-1', 'b-1'])
+        database.write('changed')
+        database.flush()
+        self.assertEquals(package.list_all(), ['a-1'])
+        self.god.check_playback()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -3,7 +3,7 @@
 __author__ = """Copyright Andy Whitcroft 2006"""
 
 import sys, logging, os, pickle, traceback, gc, time
-from autotest_lib.client.common_lib import error, utils
+from autotest_lib.client.common_lib import error, log_writer, utils
 
 def fork_start(tmp, l):
     sys.stdout.flush()
@@ -39,6 +39,7 @@ def fork_start(tmp, l):
 
                 sys.stdout.flush()
                 sys.stderr.flush()
+                log_writer.flush_all()
         finally:
             # clear exception information to allow garbage collection of
             # objects referenced by the exception's traceback
@@ -49,6 +50,7 @@ def fork_start(tmp, l):
         try:
             sys.stdout.flush()
             sys.stderr.flush()
+            log_writer.flush_all()
         finally:
             os._exit(0)
 
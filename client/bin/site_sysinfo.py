@@ -4,6 +4,7 @@
 
 import logging
 import os
+import shutil
 
 from autotest_lib.client.common_lib import log
 from autotest_lib.client.common_lib import error, utils, global_config
@@ -127,11 +128,28 @@ class diffable_logdir(logdir):
 
         """
         # Dictionary used to store the initial status of files in src_dir.
-        for file_path in self._get_all_files(src_dir):
-            self._log_stats[file_path] = file_stat(file_path)
+        self._log_stats = self._get_file_stats(src_dir)
         self.file_stats_collected = True
 
 
+    def _get_file_stats(self, path):
+        """Take a snapshot of the status of files in given path.
+
+        @param path: root directory.
+        @return: a dictionary of file_stat of all files in given path
+            including subdirectories, keyed by full path.
+
+        """
+        stats = {}
+        for file_path in self._get_all_files(path):
+            try:
+                stats[file_path] = file_stat(file_path)
+            except OSError:
+                # The file was removed since the directory was listed.
+                continue
+        return stats
+
+
     def _get_all_files(self, path):
         """Iterate through files in given path including subdirectories.
 
@@ -141,7 +159,7 @@ class diffable_logdir(logdir):
 
         """
         if not os.path.exists(path):
-            yield []
+            return
         for root, dirs, files in os.walk(path):
             for f in files:
                 if f.startswith('autoserv'):
@@ -149,18 +167,24 @@ class diffable_logdir(logdir):
                 yield os.path.join(root, f)
 
 
-    def _copy_new_data_in_file(self, file_path, src_dir, dest_dir):
+    def _copy_new_data_in_file(self, file_path, src_dir, dest_dir,
+                               new_stat=None):
         """Copy all new data in a file to target directory.
 
+        Only the bytes appended since the initial status was collected are
+        read, unless the file was replaced or truncated.
+
         @param file_path: full path to the file to be copied.
         @param src_dir: source directory to do the diff.
         @param dest_dir: target directory to store new data of src_dir.
+        @param new_stat: current file_stat of the file, if already known.
 
         """
         bytes_to_skip = 0
-        if self._log_stats.has_key(file_path):
+        if file_path in self._log_stats:
             prev_stat = self._log_stats[file_path]
-            new_stat = os.stat(file_path)
+            if new_stat is None:
+                new_stat = file_stat(file_path)
             if new_stat.st_ino == prev_stat.st_ino:
                 bytes_to_skip = prev_stat.st_size
             if new_stat.st_size == bytes_to_skip:
@@ -179,7 +203,7 @@ class diffable_logdir(logdir):
                 if not os.path.exists(target_dir):
                     os.makedirs(target_dir)
                 with open(target_path, "w") as out_log:
-                    out_log.write(in_log.read())
+                    shutil.copyfileobj(in_log, out_log)
         except IOError as e:
             logging.error('Diff %s failed with error: %s', file_path, e)
 
@@ -200,8 +224,8 @@ class diffable_logdir(logdir):
         if not os.path.exists(dest_dir):
             os.makedirs(dest_dir)
 
-        for src_file in self._get_all_files(src_dir):
-            self._copy_new_data_in_file(src_file, src_dir, dest_dir)
+        for src_file, new_stat in self._get_file_stats(src_dir).iteritems():
+            self._copy_new_data_in_file(src_file, src_dir, dest_dir, new_stat)
 
 
     def run(self, log_dir, collect_init_status=True, collect_all=False):
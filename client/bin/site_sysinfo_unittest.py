@@ -95,5 +95,24 @@ class diffable_logdir_test(unittest.TestCase):
                 self.assertEqual(file_name, f.read())
 
 
+    def test_diffable_logdir_skips_unchanged_files(self):
+        """Test that files without new data are not copied."""
+        info = site_sysinfo.diffable_logdir(self.src_dir,
+                                            keep_file_hierarchy=False,
+                                            append_diff_in_name=False)
+        info.run(log_dir=None, collect_init_status=True)
+        self.append_text_to_file('new data', self.existing_files_path[1])
+        os.remove(self.existing_files_path[2])
+
+        info.run(self.dest_dir, collect_init_status=False)
+
+        copied = [os.path.join(root, f)
+                  for root, _, files in os.walk(self.dest_dir) for f in files]
+        target = self.existing_files_path[1].replace('src', 'dest')
+        self.assertEqual(copied, [target])
+        with open(target, 'r') as f:
+            self.assertEqual('new data', f.read())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -12,6 +12,7 @@ import time
 import traceback
 import weakref
 from autotest_lib.client.common_lib import autotemp, error, log
+from autotest_lib.client.common_lib import log_writer
 
 
 class job_directory(object):
@@ -604,7 +605,7 @@ class status_logger(object):
     @property subdir_filename: The filename to write subdir-level logs to.
     """
     def __init__(self, job, indenter, global_filename='status',
-                 subdir_filename='status', record_hook=None):
+                 subdir_filename='status', record_hook=None, writer=None):
         """Construct a logger instance.
 
         @param job: A reference to the job object this is logging for. Only a
@@ -619,12 +620,18 @@ class status_logger(object):
         @param record_hook: An optional function to be called before an entry
             is logged. The function should expect a single parameter, a
             copy of the status_log_entry object.
+        @param writer: An optional log_writer.BufferedLogWriter to append
+            entries to the log files with. By default every entry is appended
+            synchronously.
         """
         self._jobref = weakref.ref(job)
         self._indenter = indenter
         self.global_filename = global_filename
         self.subdir_filename = subdir_filename
         self._record_hook = record_hook
+        if writer is None:
+            writer = log_writer.BufferedLogWriter()
+        self._writer = writer
 
 
     def render_entry(self, log_entry):
@@ -669,13 +676,9 @@ class status_logger(object):
                                           self.subdir_filename))
 
         # write out to entry to the log files
-        log_text = self.render_entry(log_entry)
+        log_text = self.render_entry(log_entry) + '\n'
         for log_file in log_files:
-            fileobj = open(log_file, 'a')
-            try:
-                print >> fileobj, log_text
-            finally:
-                fileobj.close()
+            self._writer.write(log_file, log_text)
 
         # adjust the indentation if this was a START or END entry
         if log_entry.is_start():
@@ -684,6 +687,11 @@ class status_logger(object):
             self._indenter.decrement()
 
 
+    def flush(self):
+        """Append the entries still buffered by the writer to the log files."""
+        self._writer.flush()
+
+
 class base_job(object):
     """An abstract base class for the various autotest job classes.
 
@@ -10,7 +10,7 @@ import tempfile
 import unittest
 
 import common
-from autotest_lib.client.common_lib import base_job, error
+from autotest_lib.client.common_lib import base_job, error, log_writer
 
 
 class stub_job_directory(object):
@@ -1254,6 +1254,20 @@ class test_status_logger(unittest.TestCase):
         self.assertEqual(entries, recorded_entries)
 
 
+    def test_buffered_writer(self):
+        os.mkdir('sub')
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600)
+        self.logger = base_job.status_logger(self.job, self.indenter,
+                                             writer=writer)
+        self.logger.record_entry(self.make_dummy_entry('LINE1', subdir='sub'))
+        self.logger.record_entry(self.make_dummy_entry('LINE2'))
+        self.assertFalse(os.path.exists('status'))
+        self.logger.flush()
+        writer.close()
+        self.assertEqual('LINE1\nLINE2\n', open('status').read())
+        self.assertEqual('LINE1\n', open('sub/status').read())
+
+
     def tearDown(self):
         os.chdir(self.original_wd)
         shutil.rmtree(self.testdir, ignore_errors=True)
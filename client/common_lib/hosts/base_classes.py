@@ -131,6 +131,23 @@ class Host(object):
         return self.run(command, *args, **dargs).stdout.rstrip()
 
 
+    def run_batch(self, commands, timeout=3600):
+        """Run several independent commands, returning all their results.
+
+        Each command is run as by run() with ignore_status=True and no
+        output tee'ing. This default implementation runs them one at a time;
+        subclasses may ship them to the host in a single invocation.
+
+        @param commands: a sequence of command line strings.
+        @param timeout: time limit in seconds for the whole batch.
+
+        @return a list of utils.CmdResult objects, one per command, in order.
+        """
+        return [self.run(command, timeout=timeout, ignore_status=True,
+                         stdout_tee=None, stderr_tee=None)
+                for command in commands]
+
+
     def reboot(self):
         """Reboot the host.
         """
@@ -22,11 +22,31 @@ meant to test for specific conditions that may cause tests to fail.
 more failures identified by a `Verifier` object.
 """
 
+import Queue
 import collections
 import logging
+import sys
+from multiprocessing import pool
 
 import common
 from autotest_lib.client.common_lib import error
+from autotest_lib.client.common_lib import global_config
+
+
+# Default number of threads used by `RepairStrategy` to run independent
+# verifiers concurrently.  A value of 1 runs all verifiers sequentially.
+_VERIFY_PARALLELISM = global_config.global_config.get_config_value(
+        'AUTOSERV', 'verify_parallelism', type=int, default=1)
+
+# Seconds that concurrent verification waits for any running verifier
+# to finish before it gives up: running verifiers fail, and the ones not
+# started yet are left to the sequential walk.
+_VERIFY_THREAD_TIMEOUT = global_config.global_config.get_config_value(
+        'AUTOSERV', 'verify_thread_timeout_secs', type=int, default=300)
+
+# Outcome recorded for a verifier that passed during concurrent
+# evaluation; failures are recorded as the `sys.exc_info()` triple.
+_PREFETCH_PASSED = object()
 
 
 class AutoservVerifyError(error.AutoservError):
@@ -281,11 +301,21 @@ class Verifier(_DependencyNode):
     Subclasses should not use these attributes.
 
     @property _result           Cached result of verification.
+    @property concurrent_verify Whether `verify()` may run in a worker
+                                thread when `RepairStrategy` verifies
+                                concurrently.  Subclasses whose `verify()`
+                                relies on SIGALRM, e.g. through
+                                `retry.retry()`, must set this to False:
+                                signals are only delivered to the main
+                                thread.
     """
 
+    concurrent_verify = True
+
     def __init__(self, tag, dependencies):
         super(Verifier, self).__init__(tag, dependencies)
         self._result = None
+        self._prefetched_outcome = None
         self._verify_tag = 'verify.' + self.tag
 
 
@@ -326,7 +356,7 @@ class Verifier(_DependencyNode):
         self._verify_dependencies(host, silent)
         logging.info('Verifying this condition: %s', self.description)
         try:
-            self.verify(host)
+            self._call_verify(host)
             self._record(host, silent, 'GOOD', None, self._verify_tag)
         except Exception as e:
             logging.exception('Failed: %s', self.description)
@@ -337,6 +367,25 @@ class Verifier(_DependencyNode):
         self._result = True
 
 
+    def _call_verify(self, host):
+        """
+        Call `verify()`, or replay its outcome if already evaluated.
+
+        When `RepairStrategy` has evaluated this verifier concurrently
+        ahead of time, the saved outcome is consumed instead of calling
+        `verify()` again, so that logging and status records happen in
+        the usual sequential order.
+
+        @param host   The host to be tested for a problem.
+        """
+        outcome = self._prefetched_outcome
+        self._prefetched_outcome = None
+        if outcome is None:
+            self.verify(host)
+        elif outcome is not _PREFETCH_PASSED:
+            raise outcome[0], outcome[1], outcome[2]
+
+
     def verify(self, host):
         """
         Unconditionally perform a verification check.
@@ -525,6 +574,128 @@ class _RootVerifier(Verifier):
 
 
 
+def _prefetch_verify(host, verifier, started):
+    """
+    Worker function evaluating one verifier for `_prefetch_verifiers()`.
+
+    @param host       The host to be verified.
+    @param verifier   The `Verifier` to evaluate.
+    @param started    Set to which `verifier` is added before `verify()`
+                      is called.
+
+    @return A tuple of `verifier` and its outcome.
+    """
+    started.add(verifier)
+    # Every outcome must be returned: the pool never calls back for a
+    # worker that raised, and the caller would wait for it forever.
+    try:
+        verifier.verify(host)
+        return verifier, _PREFETCH_PASSED
+    except:
+        return verifier, sys.exc_info()
+
+
+def _prefetch_verifiers(host, root, parallelism, timeout=None):
+    """
+    Concurrently evaluate the verifiers of a DAG ahead of a walk.
+
+    Every verifier reachable from `root` without a cached result is
+    run in a pool of `parallelism` threads as soon as all of its
+    dependencies have passed.  Verifiers with a failed dependency are
+    not run, exactly as in a sequential walk.  Outcomes are stored in
+    each verifier, to be replayed by `Verifier._verify_host()`.
+
+    Only `verify()` runs concurrently; logging and status records are
+    left to the sequential walk that replays the outcomes, so that
+    `status.log` ordering is the same as without concurrency.
+
+    Verifiers that are not `concurrent_verify`, and everything that
+    depends on them, are left without an outcome; the sequential walk
+    runs them in the calling thread.  When no verifier has finished for
+    `timeout` seconds, the hung worker threads are abandoned rather than
+    waited for.  The verifiers they are running fail with a timeout
+    instead of being run again, since a second `verify()` would likely
+    hang too; verifiers not started yet are left to the sequential walk.
+
+    @param host         The host to be verified.
+    @param root         The root `Verifier` of the DAG.
+    @param parallelism  The number of threads to use.
+    @param timeout      Seconds to wait for the next verifier to finish.
+                        Defaults to the `verify_thread_timeout_secs`
+                        setting in the AUTOSERV section of the global
+                        config.
+    """
+    if timeout is None:
+        timeout = _VERIFY_THREAD_TIMEOUT
+    dependents = collections.defaultdict(list)
+    waiting = {}
+    stack = [root]
+    while stack:
+        v = stack.pop()
+        if v in waiting or v._result is not None:
+            continue
+        v._prefetched_outcome = None
+        deps = [d for d in v._dependency_list if d._result is None]
+        # A cached dependency failure means `v` can never run.
+        blocked = any(isinstance(d._result, Exception)
+                      for d in v._dependency_list)
+        waiting[v] = len(deps) + int(blocked)
+        for d in deps:
+            dependents[d].append(v)
+        stack.extend(deps)
+
+    done = Queue.Queue()
+    started = set()
+    finished = set()
+    workers = pool.ThreadPool(min(parallelism, len(waiting) or 1))
+    hung = False
+    try:
+        outstanding = 0
+        ready = [v for v, count in waiting.items() if not count]
+        while ready or outstanding:
+            for v in ready:
+                if not v.concurrent_verify:
+                    continue
+                workers.apply_async(_prefetch_verify, (host, v, started),
+                                    callback=done.put)
+                outstanding += 1
+            ready = []
+            if not outstanding:
+                break
+            try:
+                v, outcome = done.get(timeout=timeout)
+            except Queue.Empty:
+                logging.warning('No verifier finished within %d seconds; '
+                                'verifying the rest sequentially.', timeout)
+                hung = True
+                break
+            outstanding -= 1
+            finished.add(v)
+            v._prefetched_outcome = outcome
+            if outcome is not _PREFETCH_PASSED:
+                continue
+            for dependent in dependents[v]:
+                waiting[dependent] -= 1
+                if not waiting[dependent]:
+                    ready.append(dependent)
+    finally:
+        if hung:
+            # Joining would wait for the hung threads; pending tasks are
+            # dropped and late outcomes are never read from `done`.
+            workers.terminate()
+            try:
+                raise AutoservVerifyError(
+                        'Verification did not finish within %d seconds'
+                        % timeout)
+            except AutoservVerifyError:
+                timed_out = sys.exc_info()
+            for v in started - finished:
+                v._prefetched_outcome = timed_out
+        else:
+            workers.close()
+            workers.join()
+
+
 class RepairStrategy(object):
     """
     A class for organizing `Verifier` and `RepairAction` objects.
@@ -606,6 +777,17 @@ class RepairStrategy(object):
 
     `RepairStrategy` deps and triggers can only refer to verifiers,
     not to other repair actions.
+
+    # Concurrent Verification
+    With a `parallelism` greater than 1, `verify()` and the final
+    verification in `repair()` first run the `verify()` methods of
+    verifiers that share no dependency edges concurrently, in a pool of
+    that many threads.  A verifier still only runs after all of its
+    dependencies have passed.  The DAG is then walked as usual, replaying
+    the saved outcomes, so logging and `status.log` records are written
+    in the same order as in sequential mode.  Verifiers must then be
+    safe to run concurrently against the same host, and must declare
+    every ordering they rely on as a dependency.
     """
 
     # This name is reserved; clients may not use it.
@@ -633,7 +815,7 @@ class RepairStrategy(object):
         verifiers[tag] = constructor(tag, deps)
 
 
-    def __init__(self, verifier_data, repair_data):
+    def __init__(self, verifier_data, repair_data, parallelism=None):
         """
         Construct a `RepairStrategy` from simplified DAG data.
 
@@ -650,7 +832,14 @@ class RepairStrategy(object):
         @param repair_data    Iterable value with constructors for the
                               elements of the repair action list, and
                               their dependencies and triggers.
-        """
+        @param parallelism    Number of threads used to evaluate
+                              independent verifiers.  Defaults to the
+                              `verify_parallelism` setting in the
+                              AUTOSERV section of the global config.
+        """
+        if parallelism is None:
+            parallelism = _VERIFY_PARALLELISM
+        self._parallelism = parallelism
         # We use the `all_verifiers` list to guarantee that our root
         # verifier will execute its dependencies in the order provided
         # to us by our caller.
@@ -682,6 +871,18 @@ class RepairStrategy(object):
         @param silent   If true, don't log host status records.
         """
         self._verify_root._reverify()
+        self._verify_all(host, silent)
+
+
+    def _verify_all(self, host, silent):
+        """
+        Walk the verifier DAG, evaluating it concurrently if enabled.
+
+        @param host     The target to be verified.
+        @param silent   If true, don't log host status records.
+        """
+        if self._parallelism > 1:
+            _prefetch_verifiers(host, self._verify_root, self._parallelism)
         self._verify_root._verify_host(host, silent)
 
 
@@ -700,4 +901,4 @@ class RepairStrategy(object):
                 # all logging and exception handling was done at
                 # lower levels
                 pass
-        self._verify_root._verify_host(host, silent)
+        self._verify_all(host, silent)
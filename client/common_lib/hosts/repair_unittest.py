@@ -6,6 +6,8 @@
 
 import functools
 import logging
+import mock
+import threading
 import unittest
 
 import common
@@ -1294,5 +1296,218 @@ class RepairStrategyRepairTests(_RepairStrategyTestCase):
             # repair counts are now 2 for both verifiers
 
 
+class _BlockingVerifier(_StubVerifier):
+    """
+    `_StubVerifier` that waits for an event before verifying.
+
+    @property started   Event set when `verify()` is entered.
+    @property proceed   Event that `verify()` waits on.
+    """
+
+    def __init__(self, tag, deps, fail_count):
+        super(_BlockingVerifier, self).__init__(tag, deps, fail_count)
+        self.started = threading.Event()
+        self.proceed = threading.Event()
+
+
+    def verify(self, host):
+        self.started.set()
+        self.proceed.wait(5)
+        super(_BlockingVerifier, self).verify(host)
+
+
+class _ThreadRecordingVerifier(_StubVerifier):
+    """
+    `_StubVerifier` that records the threads `verify()` runs in.
+
+    @property threads       List of the threads that called `verify()`.
+    @property hang_in_pool  If true, `verify()` blocks for a while when
+                            called outside the main thread.
+    @property exception     If set, raised by `verify()` outside the main
+                            thread.
+    """
+
+    def __init__(self, tag, deps, fail_count):
+        super(_ThreadRecordingVerifier, self).__init__(tag, deps, fail_count)
+        self.threads = []
+        self.hang_in_pool = False
+        self.exception = None
+
+
+    def verify(self, host):
+        thread = threading.current_thread()
+        self.threads.append(thread)
+        if not isinstance(thread, threading._MainThread):
+            if self.hang_in_pool:
+                threading.Event().wait(5)
+            if self.exception:
+                raise self.exception
+        super(_ThreadRecordingVerifier, self).verify(host)
+
+
+class RepairStrategyParallelVerifyTests(_RepairStrategyTestCase):
+    """
+    Unit tests for `RepairStrategy.verify()` with concurrency enabled.
+
+    These tests assert that concurrent evaluation produces the same
+    results and the same `status.log` records as a sequential walk.
+    """
+
+    _DAG = (('bottom', 0, ()),
+            ('left', 0, ('bottom',)),
+            ('right', 0, ('bottom',)),
+            ('top', 0, ('left', 'right')),
+            ('alone', 0, ()))
+
+    def _run_verify(self, parallelism, failing_tags):
+        """
+        Verify `_DAG` once, returning the records and verify counts.
+
+        @param parallelism    As for the `RepairStrategy` constructor.
+        @param failing_tags   Tags of verifiers that should fail.
+        """
+        self.nodes = {}
+        self._fake_host.reset_log_records()
+        verify_data = self._make_verify_data(
+                *[(tag, int(tag in failing_tags), deps)
+                  for tag, _, deps in self._DAG])
+        strategy = hosts.RepairStrategy(verify_data, [],
+                                        parallelism=parallelism)
+        try:
+            strategy.verify(self._fake_host)
+            passed = True
+        except hosts.AutoservVerifyDependencyError:
+            passed = False
+        counts = {tag: node.verify_count
+                  for tag, node in self.nodes.items()}
+        return passed, self._fake_host.get_log_records(), counts
+
+
+    def test_matches_sequential(self):
+        """
+        Test that results and records match sequential verification.
+        """
+        for failing_tags in [(), ('bottom',), ('left',), ('right', 'alone'),
+                             ('top',)]:
+            sequential = self._run_verify(1, failing_tags)
+            parallel = self._run_verify(4, failing_tags)
+            self.assertEqual(sequential, parallel)
+
+
+    def test_independent_verifiers_overlap(self):
+        """
+        Test that verifiers without shared dependencies run concurrently.
+        """
+        construct = functools.partial(self._make_blocking, 0)
+        verify_data = [(construct, 'one', ()), (construct, 'two', ())]
+        strategy = hosts.RepairStrategy(verify_data, [], parallelism=2)
+        one = self.nodes['one']
+        two = self.nodes['two']
+
+        def release():
+            # Both must be running before either is allowed to finish.
+            if one.started.wait(5) and two.started.wait(5):
+                one.proceed.set()
+                two.proceed.set()
+
+        releaser = threading.Thread(target=release)
+        releaser.start()
+        strategy.verify(self._fake_host)
+        releaser.join()
+        self.assertTrue(one.proceed.is_set())
+        self.assertEqual(one.verify_count, 1)
+        self.assertEqual(two.verify_count, 1)
+
+
+    def _make_strategy(self, *input_data):
+        """
+        Make a concurrent `RepairStrategy` of `_ThreadRecordingVerifier`s.
+
+        @param input_data   Tuples of `(tag, deps)`.
+        """
+        construct = functools.partial(self._make_recording, 0)
+        return hosts.RepairStrategy(
+                [(construct, tag, deps) for tag, deps in input_data], [],
+                parallelism=2)
+
+
+    def test_non_concurrent_verifier(self):
+        """
+        Test that verifiers opting out of threads run in the main thread.
+        """
+        strategy = self._make_strategy(('solo', ()), ('after', ('solo',)),
+                                       ('other', ()))
+        self.nodes['solo'].concurrent_verify = False
+        strategy.verify(self._fake_host)
+        main = threading.current_thread()
+        self.assertEqual(self.nodes['solo'].threads, [main])
+        # Dependents can't be prefetched before their dependency ran.
+        self.assertEqual(self.nodes['after'].threads, [main])
+        self.assertNotEqual(self.nodes['other'].threads, [main])
+        self.assertEqual(len(self.nodes['other'].threads), 1)
+
+
+    def test_hung_verifier(self):
+        """
+        Test that a hung verifier fails instead of being run again.
+        """
+        strategy = self._make_strategy(('hung', ()), ('after', ('hung',)))
+        self.nodes['hung'].hang_in_pool = True
+        with mock.patch.object(repair, '_VERIFY_THREAD_TIMEOUT', 0.1):
+            self.assertRaises(hosts.AutoservVerifyDependencyError,
+                              strategy.verify, self._fake_host)
+        self.assertEqual(len(self.nodes['hung'].threads), 1)
+        self.assertNotEqual(self.nodes['hung'].threads[0],
+                            threading.current_thread())
+        self.assertEqual(self.nodes['after'].threads, [])
+        self.assertEqual(
+                [(record[0], record[2]) for record
+                 in self._fake_host.get_log_records()],
+                [('FAIL', 'verify.hung')])
+
+
+    def test_verifier_queued_behind_hung_verifier(self):
+        """
+        Test that a verifier not started before a timeout has no outcome.
+        """
+        strategy = self._make_strategy(('hung', ()), ('queued', ()))
+        for tag in ('hung', 'queued'):
+            self.nodes[tag].hang_in_pool = True
+        # The single thread takes one verifier, the other stays queued.
+        repair._prefetch_verifiers(self._fake_host, strategy._verify_root,
+                                   1, timeout=0.1)
+        outcomes = sorted(
+                (len(node.threads), node._prefetched_outcome is None)
+                for node in self.nodes.values())
+        self.assertEqual(outcomes, [(0, True), (1, False)])
+        [timed_out] = [node for node in self.nodes.values() if node.threads]
+        self.assertTrue(isinstance(timed_out._prefetched_outcome[1],
+                                   hosts.AutoservVerifyError))
+
+
+    def test_base_exception_is_replayed(self):
+        """
+        Test that a `BaseException` in a worker reaches the caller.
+        """
+        strategy = self._make_strategy(('interrupted', ()))
+        self.nodes['interrupted'].exception = KeyboardInterrupt()
+        self.assertRaises(KeyboardInterrupt, strategy.verify,
+                          self._fake_host)
+
+
+    def _make_recording(self, count, tag, deps):
+        """Make a `_ThreadRecordingVerifier` and remember it."""
+        verifier = _ThreadRecordingVerifier(tag, deps, count)
+        self.nodes[tag] = verifier
+        return verifier
+
+
+    def _make_blocking(self, count, tag, deps):
+        """Make a `_BlockingVerifier` and remember it in `self.nodes`."""
+        verifier = _BlockingVerifier(tag, deps, count)
+        self.nodes[tag] = verifier
+        return verifier
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,245 @@
+"""Buffered writer for job status and debug logs.
+
+Appending every log line synchronously, with an open and a close of the file
+for every status entry, slows down tests which log a lot, notably on DUTs
+with slow eMMC storage. A BufferedLogWriter keeps the text written to each
+file in memory and appends it in batches, from a background thread every
+flush_interval_secs or as soon as too many bytes are pending.
+
+Files can also be gzip compressed on the fly, in the background thread. Each
+batch is appended as a new gzip member, which zcat and the gzip module read
+as a single stream. Log files are only compressed by buffered writers, since
+a member per line would make them larger than plain text.
+
+Pending text is lost if the process dies before it is flushed. The fsync
+policy controls how much a crash of the machine can lose:
+    FSYNC_NEVER: Leave written text in the page cache.
+    FSYNC_ON_FLUSH: Sync files after every batch.
+    FSYNC_ALWAYS: Write and sync every text before write() returns.
+Processes leaving with os._exit, e.g., forked children, must call flush_all()
+first since atexit handlers do not run.
+"""
+
+import atexit
+import collections
+import gzip
+import logging
+import os
+import sys
+import threading
+import traceback
+import weakref
+
+
+FSYNC_NEVER = 'never'
+FSYNC_ON_FLUSH = 'flush'
+FSYNC_ALWAYS = 'always'
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_ON_FLUSH, FSYNC_ALWAYS)
+
+# Pending bytes above which write() flushes synchronously.
+DEFAULT_MAX_PENDING_BYTES = 1 << 20
+
+# All live writers, flushed by flush_all().
+_writers = weakref.WeakSet()
+
+
+def flush_all():
+    """Flush the pending text of every BufferedLogWriter of this process."""
+    for writer in list(_writers):
+        writer.flush()
+
+
+def close_all():
+    """Stop the background threads and flush the pending text of every
+    BufferedLogWriter of this process.
+    """
+    for writer in list(_writers):
+        writer.close()
+
+
+atexit.register(close_all)
+
+
+class BufferedLogWriter(object):
+    """Appends text to log files in batches.
+
+    @property buffered: True if written text may be kept pending in memory.
+    """
+    def __init__(self, flush_interval_secs=0, fsync_policy=FSYNC_NEVER,
+                 max_pending_bytes=DEFAULT_MAX_PENDING_BYTES):
+        """Construct a writer.
+
+        @param flush_interval_secs: Seconds between two flushes of the
+            background thread. 0 appends the text synchronously in every
+            write(), like a plain open/write/close.
+        @param fsync_policy: One of FSYNC_POLICIES.
+        @param max_pending_bytes: Pending bytes above which write() flushes
+            synchronously.
+
+        @raises ValueError: if fsync_policy is unknown.
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError('Unknown fsync policy %r, expected one of %s' %
+                             (fsync_policy, ', '.join(FSYNC_POLICIES)))
+        self._flush_interval_secs = flush_interval_secs
+        self._fsync_policy = fsync_policy
+        self._max_pending_bytes = max_pending_bytes
+        self._init_process_state()
+        _writers.add(self)
+
+
+    def _init_process_state(self):
+        """Initialize the state which is not shared with forked children."""
+        self._pid = os.getpid()
+        # Protects _pending and _pending_bytes.
+        self._lock = threading.Lock()
+        # Serializes appends to the files, so that batches keep their order.
+        self._flush_lock = threading.Lock()
+        # Maps (path, compress) to the list of pending texts, in the order
+        # the files were first written.
+        self._pending = collections.OrderedDict()
+        self._pending_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+
+    @property
+    def buffered(self):
+        return (self._flush_interval_secs > 0 and
+                self._fsync_policy != FSYNC_ALWAYS)
+
+
+    def write(self, path, text, compress=False):
+        """Append text to a file.
+
+        @param path: The path of the file, created if it does not exist.
+        @param text: The string to append. Unicode strings are UTF-8 encoded.
+        @param compress: True to gzip compress the text. All the writes to a
+            file should use the same value.
+        """
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        if self._pid != os.getpid():
+            # Forked child: the parent flushes the text pending at the fork,
+            # and the locks may have been held by its background thread.
+            self._init_process_state()
+        with self._lock:
+            self._pending.setdefault((path, compress), []).append(text)
+            self._pending_bytes += len(text)
+            flush_now = (not self.buffered or self._stop.is_set() or
+                         self._pending_bytes >= self._max_pending_bytes)
+            if not flush_now and self._thread is None:
+                self._thread = threading.Thread(target=self._flush_periodically,
+                                                name='log_writer')
+                self._thread.daemon = True
+                self._thread.start()
+        if flush_now:
+            self.flush()
+
+
+    def flush(self):
+        """Append all the pending text to the files.
+
+        @raises IOError, OSError: if a file can not be written.
+        """
+        if self._pid != os.getpid():
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = collections.OrderedDict()
+                self._pending_bytes = 0
+            for (path, compress), texts in pending.iteritems():
+                self._append(path, ''.join(texts), compress)
+
+
+    def close(self):
+        """Stop the background thread and flush the pending text.
+
+        Later writes are appended synchronously.
+        """
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self.flush()
+
+
+    def _append(self, path, text, compress):
+        """Append text to a file according to the fsync policy.
+
+        @param path: The path of the file.
+        @param text: The string to append.
+        @param compress: True to append text as a new gzip member.
+        """
+        with open(path, 'ab') as fileobj:
+            if compress:
+                compressor = gzip.GzipFile(fileobj=fileobj, mode='wb')
+                compressor.write(text)
+                compressor.close()
+            else:
+                fileobj.write(text)
+            if self._fsync_policy != FSYNC_NEVER:
+                fileobj.flush()
+                os.fsync(fileobj.fileno())
+
+
+    def _flush_periodically(self):
+        """Flush the pending text every flush_interval_secs until closed."""
+        while not self._stop.wait(self._flush_interval_secs):
+            try:
+                self.flush()
+            except Exception:
+                # Logging the failure could write to this writer again.
+                sys.stderr.write('Failed to flush logs:\n%s' %
+                                 traceback.format_exc())
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """A logging handler appending records to a file with a BufferedLogWriter.
+
+    It is a FileHandler which never opens its stream, so that code looking
+    for the file handlers of a logger, e.g., to change their formatter, also
+    finds it.
+    """
+    def __init__(self, filename, writer, compress=False):
+        """Construct a handler.
+
+        @param filename: The path of the log file. '.gz' is appended if
+            compress is True.
+        @param writer: The BufferedLogWriter appending the records.
+        @param compress: True to gzip compress the log file.
+
+        @raises ValueError: if compress is True and the writer is not
+            buffered.
+        """
+        if compress:
+            if not writer.buffered:
+                raise ValueError(
+                        'Compressing %s requires a writer with a flush '
+                        'interval and an fsync policy other than %r' %
+                        (filename, FSYNC_ALWAYS))
+            filename += '.gz'
+        logging.FileHandler.__init__(self, filename, delay=True)
+        self._writer = writer
+        self._compress = compress
+
+
+    def emit(self, record):
+        try:
+            self._writer.write(self.baseFilename, self.format(record) + '\n',
+                               self._compress)
+        except Exception:
+            self.handleError(record)
+
+
+    def flush(self):
+        self._writer.flush()
+
+
+    def close(self):
+        # FileHandler.close() only flushes an open stream, which this
+        # handler never has.
+        try:
+            self.flush()
+        finally:
+            logging.FileHandler.close(self)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+
+# pylint: disable=missing-docstring
+
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import common
+from autotest_lib.client.common_lib import log_writer
+
+
+class test_buffered_log_writer(unittest.TestCase):
+    def setUp(self):
+        self.testdir = tempfile.mkdtemp(suffix='unittest')
+        self.path = os.path.join(self.testdir, 'log')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.testdir, ignore_errors=True)
+
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+
+    def test_unbuffered_writes_synchronously(self):
+        writer = log_writer.BufferedLogWriter()
+        self.assertFalse(writer.buffered)
+        writer.write(self.path, 'LINE1\n')
+        self.assertEqual('LINE1\n', self.read())
+        writer.write(self.path, u'LINE2\n')
+        self.assertEqual('LINE1\nLINE2\n', self.read())
+
+
+    def test_buffered_writes_on_flush(self):
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600)
+        writer.write(self.path, 'LINE1\n')
+        writer.write(self.path, 'LINE2\n')
+        self.assertFalse(os.path.exists(self.path))
+        log_writer.flush_all()
+        self.assertEqual('LINE1\nLINE2\n', self.read())
+        writer.close()
+
+
+    def test_close_all(self):
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600)
+        writer.write(self.path, 'LINE1\n')
+        thread = writer._thread
+        self.assertTrue(thread.is_alive())
+        log_writer.close_all()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual('LINE1\n', self.read())
+        writer.write(self.path, 'LINE2\n')
+        self.assertEqual('LINE1\nLINE2\n', self.read())
+
+
+    def test_buffered_writes_when_too_many_bytes_pending(self):
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600,
+                                              max_pending_bytes=10)
+        writer.write(self.path, 'LINE1\n')
+        self.assertFalse(os.path.exists(self.path))
+        writer.write(self.path, 'LINE2\n')
+        self.assertEqual('LINE1\nLINE2\n', self.read())
+        writer.close()
+
+
+    def test_background_thread_flushes(self):
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=0.01)
+        writer.write(self.path, 'LINE1\n')
+        writer._thread.join(0.5)
+        writer.close()
+        self.assertEqual('LINE1\n', self.read())
+
+
+    def test_fsync_policy(self):
+        with mock.patch.object(log_writer.os, 'fsync') as fsync:
+            writer = log_writer.BufferedLogWriter(
+                    flush_interval_secs=3600,
+                    fsync_policy=log_writer.FSYNC_ALWAYS)
+            self.assertFalse(writer.buffered)
+            writer.write(self.path, 'LINE1\n')
+            self.assertEqual(1, fsync.call_count)
+        self.assertEqual('LINE1\n', self.read())
+        self.assertRaises(ValueError, log_writer.BufferedLogWriter,
+                          fsync_policy='sometimes')
+
+
+    def test_compressed_batches_read_as_one_stream(self):
+        writer = log_writer.BufferedLogWriter()
+        writer.write(self.path, 'LINE1\n', compress=True)
+        writer.write(self.path, 'LINE2\n', compress=True)
+        self.assertEqual('LINE1\nLINE2\n', gzip.open(self.path).read())
+
+
+    def test_file_handler(self):
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600)
+        handler = log_writer.BufferedFileHandler(self.path, writer,
+                                                 compress=True)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        logger = logging.getLogger('log_writer_unittest')
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            logger.debug('message')
+        finally:
+            logger.removeHandler(handler)
+        self.assertFalse(os.path.exists(self.path + '.gz'))
+        handler.close()
+        self.assertEqual('DEBUG message\n', gzip.open(self.path + '.gz').read())
+        writer.close()
+
+
+    def test_file_handler_rejects_unbuffered_compression(self):
+        for writer in (log_writer.BufferedLogWriter(),
+                       log_writer.BufferedLogWriter(
+                               flush_interval_secs=3600,
+                               fsync_policy=log_writer.FSYNC_ALWAYS)):
+            self.assertRaises(ValueError, log_writer.BufferedFileHandler,
+                              self.path, writer, compress=True)
+            handler = log_writer.BufferedFileHandler(self.path, writer)
+            self.assertEqual(self.path, handler.baseFilename)
+            handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
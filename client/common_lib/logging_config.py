@@ -2,6 +2,7 @@ import logging
 import os
 import sys
 import time
+from autotest_lib.client.common_lib import log_writer
 from autotest_lib.client.common_lib import utils
 
 # Set up a simple catchall configuration for use during import time.  Some code
@@ -120,6 +121,31 @@ class LoggingConfig(object):
         self.logger.addHandler(handler)
         return handler
 
+    def add_buffered_file_handler(self,
+                                  file_path,
+                                  writer,
+                                  level=logging.DEBUG,
+                                  log_dir=None,
+                                  compress=False):
+        """Add a handler appending records to a file with a log writer.
+
+        @param file_path: The path of the log file.
+        @param writer: The log_writer.BufferedLogWriter appending the records.
+        @param level: The minimum level of the records.
+        @param log_dir: An optional directory file_path is relative to.
+        @param compress: True to gzip compress the file, named file_path.gz.
+
+        @returns the handler.
+        """
+        if log_dir:
+            file_path = os.path.join(log_dir, file_path)
+        handler = log_writer.BufferedFileHandler(file_path, writer,
+                                                 compress=compress)
+        handler.setLevel(level)
+        handler.setFormatter(self.file_formatter)
+        self.logger.addHandler(handler)
+        return handler
+
     def _add_file_handlers_for_all_levels(self, log_dir, log_name):
         for level in (logging.DEBUG, logging.INFO, logging.WARNING,
                       logging.ERROR):
@@ -42,6 +42,8 @@ python logging in a very consistent way.
 
 import fcntl, logging, os, signal, sys, warnings
 
+from autotest_lib.client.common_lib import log_writer
+
 # primary public APIs
 
 def configure_logging(logging_config, **kwargs):
@@ -611,6 +613,7 @@ class _FdRedirectionStreamManager(_StreamManager):
                 # don't let exceptions in the child escape
                 try:
                     logging.exception('Logging subprocess died:')
+                    log_writer.flush_all()
                 finally:
                     os._exit(1)
 
@@ -625,6 +628,8 @@ class _FdRedirectionStreamManager(_StreamManager):
         for line in iter(input_file.readline, ''):
             logging.log(self._level, line.rstrip('\n'))
         logging.debug('Logging subprocess finished')
+        # os._exit skips the atexit handlers flushing the buffered logs.
+        log_writer.flush_all()
         os._exit(0)
 
 
@@ -1,7 +1,9 @@
 #!/usr/bin/python
 
-import logging, os, select, StringIO, subprocess, sys, unittest
+import logging, os, select, shutil, StringIO, subprocess, sys, tempfile
+import unittest
 import common
+from autotest_lib.client.common_lib import log_writer
 from autotest_lib.client.common_lib import logging_manager, logging_config
 
 
@@ -247,6 +249,27 @@ class LoggingManagerTest(unittest.TestCase):
                            'INFO: mytag : hello\nINFO: goodbye')
         self._compare_logs(self._config_object.log, 'hello\n')
 
+    def test_logging_subprocess_flushes_buffered_logs(self):
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        log_path = os.path.join(log_dir, 'log')
+        writer = log_writer.BufferedLogWriter(flush_interval_secs=3600)
+        handler = log_writer.BufferedFileHandler(log_path, writer)
+        handler.setFormatter(logging.Formatter(LOGGING_FORMAT))
+        logging.getLogger().addHandler(handler)
+        self.addCleanup(logging.getLogger().removeHandler, handler)
+
+        manager = self._setup_manager(
+                logging_manager.FdRedirectionLoggingManager)
+        manager.start_logging()
+        os.write(self._original_stdout.fileno(), 'output 1\n')
+        # Waits for the logging subprocess, which exits with os._exit.
+        manager.stop_logging()
+
+        with open(log_path) as log_file:
+            self.assertEquals(log_file.read(), 'INFO: output 1\n')
+        writer.close()
+
 
 class MonkeyPatchTestCase(unittest.TestCase):
     def setUp(self):
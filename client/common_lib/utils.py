@@ -13,6 +13,7 @@ inheritance with, just a collection of static methods.
 
 import StringIO
 import errno
+import fcntl
 import inspect
 import itertools
 import logging
@@ -251,6 +252,7 @@ class BgJob(object):
         @param final_read: Do not read only 1024 bytes from stream. Instead,
                            read and process all data until end of the stream.
 
+        @return: The data read, an empty string meaning end of the stream.
         """
         if self.unjoinable:
             raise error.InvalidBgJobCall('Cannot call process_output on '
@@ -263,7 +265,7 @@ class BgJob(object):
                 self.sp.stderr, self._stderr_file, self._stderr_tee)
 
         if not pipe:
-            return
+            return ''
 
         if final_read:
             # read in all the data we can from pipe and then stop
@@ -278,6 +280,7 @@ class BgJob(object):
             data = os.read(pipe.fileno(), 1024)
         buf.write(data)
         tee.write(data)
+        return data
 
     def cleanup(self):
         """Clean up after BgJob.
@@ -813,98 +816,219 @@ def join_bg_jobs(bg_jobs, timeout=None):
     return bg_jobs
 
 
-def _wait_for_commands(bg_jobs, start_time, timeout):
-    """Waits for background jobs by select polling their stdout/stderr.
-
-    @param bg_jobs: A list of background jobs to wait on.
-    @param start_time: Time used to calculate the timeout lifetime of a job.
-    @param timeout: The timeout of the list of bg_jobs.
+class _BgJobReactor(object):
+    """Event loop that drives a set of BgJobs until they exit.
 
-    @return: True if the return was due to a timeout, False otherwise.
+    Output pipes and string stdin are multiplexed through epoll (or poll on
+    platforms without it). A job is considered for exit as soon as all of its
+    output pipes hang up, so short commands are reaped without waiting for a
+    fixed select timeout. Jobs whose output is not piped (DEVNULL) or which
+    keep running after closing their pipes are polled with an exponential
+    backoff instead.
     """
 
-    # To check for processes which terminate without producing any output
-    # a 1 second timeout is used in select.
-    SELECT_TIMEOUT = 1
+    # Largest chunk handed to a single os.write() on a job's stdin.
+    _STDIN_CHUNK_SIZE = 64 * 1024
+    # Bounds of the backoff used while waiting on jobs without open pipes.
+    _MIN_POLL_INTERVAL = 0.01
+    _MAX_POLL_INTERVAL = 1.0
 
-    read_list = []
-    write_list = []
-    reverse_dict = {}
+    def __init__(self, bg_jobs, start_time):
+        """
+        @param bg_jobs: A list of BgJobs to drive.
+        @param start_time: Time used to compute the duration of each job.
+        """
+        self._bg_jobs = bg_jobs
+        self._start_time = start_time
+        if hasattr(select, 'epoll'):
+            self._poller = select.epoll()
+            self._read_mask = select.EPOLLIN | select.EPOLLPRI
+            self._write_mask = select.EPOLLOUT
+            self._timeout_scale = 1
+        else:
+            self._poller = select.poll()
+            self._read_mask = select.POLLIN | select.POLLPRI
+            self._write_mask = select.POLLOUT
+            self._timeout_scale = 1000
+        # fd -> (bg_job, is_stdout) for output pipes, fd -> bg_job for stdin.
+        self._readers = {}
+        self._writers = {}
+        # bg_job -> [memoryview of pending stdin, offset]
+        self._stdin_buffers = {}
+        # bg_job -> number of output pipes that have not hung up yet.
+        self._open_pipes = {}
+        self._poll_interval = self._MIN_POLL_INTERVAL
 
-    for bg_job in bg_jobs:
-        if bg_job.sp.stdout:
-            read_list.append(bg_job.sp.stdout)
-            reverse_dict[bg_job.sp.stdout] = (bg_job, True)
-        if bg_job.sp.stderr:
-            read_list.append(bg_job.sp.stderr)
-            reverse_dict[bg_job.sp.stderr] = (bg_job, False)
-        if bg_job.string_stdin is not None:
-            write_list.append(bg_job.sp.stdin)
-            reverse_dict[bg_job.sp.stdin] = bg_job
-
-    if timeout:
-        stop_time = start_time + timeout
-        time_left = stop_time - time.time()
-    else:
-        time_left = None # so that select never times out
-
-    while not timeout or time_left > 0:
-        # select will return when we may write to stdin, when there is
-        # stdout/stderr output we can read (including when it is
-        # EOF, that is the process has terminated) or when a non-fatal
-        # signal was sent to the process. In the last case the select returns
-        # EINTR, and we continue waiting for the job if the signal handler for
-        # the signal that interrupted the call allows us to.
-        try:
-            read_ready, write_ready, _ = select.select(read_list, write_list,
-                                                       [], SELECT_TIMEOUT)
-        except select.error as v:
-            if v[0] == errno.EINTR:
-                logging.warning(v)
-                continue
-            else:
-                raise
-        # os.read() has to be used instead of
-        # subproc.stdout.read() which will otherwise block
-        for file_obj in read_ready:
-            bg_job, is_stdout = reverse_dict[file_obj]
-            bg_job.process_output(is_stdout)
-
-        for file_obj in write_ready:
-            # we can write PIPE_BUF bytes without blocking
-            # POSIX requires PIPE_BUF is >= 512
-            bg_job = reverse_dict[file_obj]
-            file_obj.write(bg_job.string_stdin[:512])
-            bg_job.string_stdin = bg_job.string_stdin[512:]
-            # no more input data, close stdin, remove it from the select set
-            if not bg_job.string_stdin:
-                file_obj.close()
-                write_list.remove(file_obj)
-                del reverse_dict[file_obj]
-
-        all_jobs_finished = True
         for bg_job in bg_jobs:
+            self._open_pipes[bg_job] = 0
             if bg_job.result.exit_status is not None:
                 continue
+            for pipe, is_stdout in ((bg_job.sp.stdout, True),
+                                    (bg_job.sp.stderr, False)):
+                if pipe:
+                    self._register(self._readers, pipe.fileno(),
+                                   (bg_job, is_stdout), self._read_mask)
+                    self._open_pipes[bg_job] += 1
+            if bg_job.string_stdin is not None:
+                fd = bg_job.sp.stdin.fileno()
+                fcntl.fcntl(fd, fcntl.F_SETFL,
+                            fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+                string_stdin = bg_job.string_stdin
+                if isinstance(string_stdin, unicode):
+                    # memoryview only wraps byte strings.
+                    string_stdin = string_stdin.encode('utf-8')
+                self._stdin_buffers[bg_job] = [memoryview(string_stdin), 0]
+                self._register(self._writers, fd, bg_job, self._write_mask)
+
+
+    def _register(self, fd_map, fd, value, mask):
+        fd_map[fd] = value
+        self._poller.register(fd, mask)
+
+
+    def _unregister(self, fd_map, fd):
+        del fd_map[fd]
+        self._poller.unregister(fd)
+
+
+    def close(self):
+        """Release the underlying poller."""
+        if hasattr(self._poller, 'close'):
+            self._poller.close()
+
+
+    def _poll(self, timeout):
+        """Waits for events, returning an empty list on EINTR.
+
+        @param timeout: Seconds to wait, or None to block indefinitely.
+        """
+        if timeout is None:
+            timeout = -1
+        else:
+            timeout = max(timeout, 0) * self._timeout_scale
+        try:
+            return self._poller.poll(timeout)
+        except (IOError, select.error) as e:
+            if e.args[0] == errno.EINTR:
+                logging.warning(e)
+                return []
+            raise
 
-            bg_job.result.exit_status = bg_job.sp.poll()
-            if bg_job.result.exit_status is not None:
-                # process exited, remove its stdout/stdin from the select set
-                bg_job.result.duration = time.time() - start_time
-                if bg_job.sp.stdout:
-                    read_list.remove(bg_job.sp.stdout)
-                    del reverse_dict[bg_job.sp.stdout]
-                if bg_job.sp.stderr:
-                    read_list.remove(bg_job.sp.stderr)
-                    del reverse_dict[bg_job.sp.stderr]
-            else:
-                all_jobs_finished = False
 
-        if all_jobs_finished:
+    def _write_stdin(self, fd):
+        """Writes as much pending stdin as the pipe accepts without blocking.
+
+        A memoryview offset is advanced instead of re-slicing the string, so
+        large inputs are copied only once into the kernel.
+        """
+        bg_job = self._writers[fd]
+        pending = self._stdin_buffers[bg_job]
+        data, offset = pending
+        finished = False
+        try:
+            while offset < len(data):
+                offset += os.write(
+                        fd, data[offset:offset + self._STDIN_CHUNK_SIZE])
+            finished = True
+        except OSError as e:
+            if e.errno == errno.EPIPE:
+                # The process closed its stdin, there is no one to feed.
+                finished = True
+            elif e.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+        pending[1] = offset
+        if finished:
+            # no more input data, close stdin, remove it from the poll set
+            self._unregister(self._writers, fd)
+            del self._stdin_buffers[bg_job]
+            bg_job.string_stdin = None
+            bg_job.sp.stdin.close()
+
+
+    def _read_output(self, fd):
+        bg_job, is_stdout = self._readers[fd]
+        # os.read() has to be used instead of subproc.stdout.read() which
+        # will otherwise block
+        if not bg_job.process_output(is_stdout):
+            # EOF, the writing end hung up.
+            self._unregister(self._readers, fd)
+            self._open_pipes[bg_job] -= 1
+
+
+    def _reap(self, bg_job):
+        """Records the exit status of bg_job if it has exited.
+
+        @return: True if the job has exited.
+        """
+        bg_job.result.exit_status = bg_job.sp.poll()
+        if bg_job.result.exit_status is None:
             return False
+        bg_job.result.duration = time.time() - self._start_time
+        for fd_map in (self._readers, self._writers):
+            for fd, value in fd_map.items():
+                job = value[0] if fd_map is self._readers else value
+                if job is bg_job:
+                    self._unregister(fd_map, fd)
+        self._stdin_buffers.pop(bg_job, None)
+        return True
+
+
+    def run(self, timeout):
+        """Drives the jobs until they all exit or the timeout expires.
+
+        @param timeout: The timeout of the list of bg_jobs, or None.
 
+        @return: True if the return was due to a timeout, False otherwise.
+        """
         if timeout:
-            time_left = stop_time - time.time()
+            stop_time = self._start_time + timeout
+        running = [bg_job for bg_job in self._bg_jobs
+                   if bg_job.result.exit_status is None]
+
+        while True:
+            running = [bg_job for bg_job in running
+                       if not self._reap(bg_job)]
+            if not running:
+                return False
+
+            if all(self._open_pipes[bg_job] for bg_job in running):
+                # Exiting jobs wake us up by hanging up their pipes. The
+                # timeout only matters for jobs that exited while a child
+                # process still holds their pipes open.
+                wait = self._MAX_POLL_INTERVAL
+                self._poll_interval = self._MIN_POLL_INTERVAL
+            else:
+                wait = self._poll_interval
+                self._poll_interval = min(self._poll_interval * 2,
+                                          self._MAX_POLL_INTERVAL)
+            if timeout:
+                time_left = stop_time - time.time()
+                if time_left <= 0:
+                    return True
+                wait = min(wait, time_left)
+
+            for fd, _ in self._poll(wait):
+                if fd in self._readers:
+                    self._read_output(fd)
+                elif fd in self._writers:
+                    self._write_stdin(fd)
+
+
+def _wait_for_commands(bg_jobs, start_time, timeout):
+    """Waits for background jobs by polling their stdout/stderr.
+
+    @param bg_jobs: A list of background jobs to wait on.
+    @param start_time: Time used to calculate the timeout lifetime of a job.
+    @param timeout: The timeout of the list of bg_jobs.
+
+    @return: True if the return was due to a timeout, False otherwise.
+    """
+    reactor = _BgJobReactor(bg_jobs, start_time)
+    try:
+        if not reactor.run(timeout):
+            return False
+    finally:
+        reactor.close()
 
     # Kill all processes which did not complete prior to timeout
     for bg_job in bg_jobs:
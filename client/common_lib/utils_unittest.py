@@ -755,6 +755,13 @@ class test_run(unittest.TestCase):
                             cmd, stdout='hi!\n')
 
 
+    def test_stdin_unicode(self):
+        cmd = 'cat'
+        self.__check_result(utils.run(cmd, verbose=False,
+                                      stdin=u'hello \u00e9\n'),
+                            cmd, stdout='hello \xc3\xa9\n')
+
+
     def test_safe_args(self):
         # NOTE: The string in expected_quoted_cmd depends on the internal
         # implementation of shell quoting which is used by utils.run(),
@@ -769,24 +776,74 @@ class test_run(unittest.TestCase):
         self.assertRaises(TypeError, utils.run, 'echo', args='hello')
 
 
+    def test_stdin_string_large(self):
+        cmd = 'cat'
+        stdin = 'x' * (1024 * 1024 + 3)
+        self.__check_result(utils.run(cmd, verbose=False, stdin=stdin),
+                            cmd, stdout=stdin)
+
+
+    def test_stdin_closed_early(self):
+        cmd = 'head -c 1'
+        self.__check_result(utils.run(cmd, verbose=False, stdin='y' * 100000),
+                            cmd, stdout='y')
+
+
+    def test_devnull_exit_detected(self):
+        start = time.time()
+        result = utils.run('true', stdout_tee=utils.DEVNULL,
+                           stderr_tee=utils.DEVNULL, verbose=False)
+        self.assertEquals(result.exit_status, 0)
+        self.assertLess(time.time() - start, 0.5)
+
+
+    def test_background_child_holding_pipes(self):
+        cmd = 'sleep 30 & echo started'
+        start = time.time()
+        result = utils.run(cmd, verbose=False)
+        self.assertEquals(result.stdout, 'started\n')
+        self.assertLess(time.time() - start, 10)
+
+
+    def test_run_parallel(self):
+        utils.logging.debug.expect_any_call()
+        utils.logging.debug.expect_any_call()
+        results = utils.run_parallel(['echo a', 'echo b >&2; exit 3'],
+                                     ignore_status=True)
+        self.__check_result(results[0], 'echo a', stdout='a\n')
+        self.__check_result(results[1], 'echo b >&2; exit 3',
+                            exit_status=3, stderr='b\n')
+
+
     def test_wait_interrupt(self):
-        """Test that we actually select twice if the first one returns EINTR."""
+        """Test that we actually poll twice if the first one returns EINTR."""
         utils.logging.debug.expect_any_call()
 
         bg_job = utils.BgJob('echo "hello world"')
-        bg_job.result.exit_status = 0
-        self.god.stub_function(utils.select, 'select')
+        reactor = utils._BgJobReactor([bg_job], time.time())
 
-        utils.select.select.expect_any_call().and_raises(
-                select.error(errno.EINTR, 'Select interrupted'))
-        utils.logging.warning.expect_any_call()
+        class InterruptedPoller(object):
+            """Wraps a poller, failing its first poll with EINTR."""
+            def __init__(self, poller):
+                self.poller = poller
+                self.calls = 0
+
+            def poll(self, timeout):
+                self.calls += 1
+                if self.calls == 1:
+                    raise IOError(errno.EINTR, 'Poll interrupted')
+                return self.poller.poll(timeout)
+
+            def unregister(self, fd):
+                self.poller.unregister(fd)
 
-        utils.select.select.expect_any_call().and_return(
-                ([bg_job.sp.stdout, bg_job.sp.stderr], [], None))
+        poller = InterruptedPoller(reactor._poller)
+        reactor._poller = poller
         utils.logging.warning.expect_any_call()
 
-        self.assertFalse(
-                utils._wait_for_commands([bg_job], time.time(), None))
+        self.assertFalse(reactor.run(None))
+        self.assertGreater(poller.calls, 1)
+        self.assertEquals(bg_job.result.exit_status, 0)
 
 
 class test_compare_versions(unittest.TestCase):
@@ -8,6 +8,8 @@ import logging
 import numpy
 import operator
 
+from numpy.lib import stride_tricks
+
 # Only peaks with coefficient greater than 0.01 of the first peak should be
 # considered. Note that this correspond to -40dB in the spectrum.
 DEFAULT_MIN_PEAK_RATIO = 0.01
@@ -40,6 +42,34 @@ def normalize_signal(signal, saturate_value):
     return signal / float(saturate_value)
 
 
+class NormalizedSignal(object):
+    """A signal normalized with respect to the saturate value on access.
+
+    Unlike normalize_signal, the signal is not copied at once. Slicing a
+    NormalizedSignal returns a numpy array containing the normalized samples
+    in the slice, so that a long signal, e.g., from a memory-mapped file, can
+    be analyzed block by block.
+
+    """
+    def __init__(self, signal, saturate_value):
+        """Initializes a NormalizedSignal.
+
+        @param signal: A 1-D array-like object for one-channel PCM data.
+        @param saturate_value: The maximum value that the PCM data might be.
+
+        """
+        self._signal = signal
+        self._saturate_value = float(saturate_value)
+
+
+    def __len__(self):
+        return len(self._signal)
+
+
+    def __getitem__(self, key):
+        return numpy.asarray(self._signal[key]) / self._saturate_value
+
+
 def spectral_analysis(signal, rate, min_peak_ratio=DEFAULT_MIN_PEAK_RATIO,
                       peak_window_size_hz=PEAK_WINDOW_SIZE_HZ):
     """Gets the dominant frequencies by spectral analysis.
@@ -94,12 +124,87 @@ def spectral_analysis(signal, rate, min_peak_ratio=DEFAULT_MIN_PEAK_RATIO,
 
     # y_f is complex so consider its absolute value for magnitude.
     abs_y_f = numpy.abs(y_f)
+    return _find_spectral_peaks(abs_y_f, x_f, min_peak_ratio,
+                                peak_window_size_hz)
+
+
+# The number of samples in a block for the spectral analysis of long signals.
+# The frequency resolution is rate / STREAMING_SPECTRAL_BLOCK_SIZE.
+STREAMING_SPECTRAL_BLOCK_SIZE = 1 << 16
+
+def streaming_spectral_analysis(signal, rate,
+                                min_peak_ratio=DEFAULT_MIN_PEAK_RATIO,
+                                peak_window_size_hz=PEAK_WINDOW_SIZE_HZ,
+                                block_size=STREAMING_SPECTRAL_BLOCK_SIZE):
+    """Gets the dominant frequencies of a long signal by spectral analysis.
+
+    Unlike spectral_analysis, which transforms the whole signal at once, this
+    averages the spectra of half-overlapping blocks of the signal (Welch's
+    method), so that only one block of the signal is in memory at a time.
+    Signals no longer than a block are passed to spectral_analysis.
+
+    @param signal: A 1-D array-like object for one-channel PCM data, which
+                   returns a numpy array when sliced, e.g., a numpy.memmap or
+                   a NormalizedSignal. This should be normalized to [-1, 1].
+    @param rate: Sampling rate.
+    @param min_peak_ratio: Refer to spectral_analysis.
+    @param peak_window_size_hz: Refer to spectral_analysis.
+    @param block_size: The number of samples in a block.
+
+    @returns: Same as spectral_analysis.
+
+    """
+    length = len(signal)
+    if length <= block_size:
+        return spectral_analysis(signal[0:length], rate, min_peak_ratio,
+                                 peak_window_size_hz)
+
+    window = numpy.hanning(block_size)
+    sum_abs_y_f = numpy.zeros(block_size // 2 + 1)
+    sum_of_squares = 0.0
+    hop_size = block_size // 2
+    blocks = 0
+    for start in xrange(0, length - block_size + 1, hop_size):
+        block = numpy.asarray(signal[start:start + block_size], dtype=float)
+        sum_abs_y_f += numpy.abs(numpy.fft.rfft(block * window))
+        # Blocks overlap, so only the first half of each block is counted
+        # in the RMS. The samples after the last block are counted below.
+        sum_of_squares += numpy.dot(block[:hop_size], block[:hop_size])
+        blocks += 1
+    tail = numpy.asarray(signal[blocks * hop_size:length], dtype=float)
+    sum_of_squares += numpy.dot(tail, tail)
+
+    signal_rms = numpy.sqrt(sum_of_squares / length)
+    logging.debug('signal RMS = %s', signal_rms)
+    if signal_rms < MEANINGFUL_RMS_THRESHOLD:
+        logging.warning(
+                'RMS %s is too small to be meaningful. Set frequency to 0.',
+                signal_rms)
+        return [(0, 0)]
+
+    x_f = _rfft_freq(block_size, rate)
+    abs_y_f = 2.0 / block_size * sum_abs_y_f / blocks
+    return _find_spectral_peaks(abs_y_f, x_f, min_peak_ratio,
+                                peak_window_size_hz)
+
+
+def _find_spectral_peaks(abs_y_f, x_f, min_peak_ratio, peak_window_size_hz):
+    """Finds the dominant frequencies in a spectrum.
+
+    @param abs_y_f: A numpy array containing the magnitude of the spectrum.
+                    It is modified in place.
+    @param x_f: A numpy array containing the frequency at each index of
+                abs_y_f.
+    @param min_peak_ratio: Refer to spectral_analysis.
+    @param peak_window_size_hz: Refer to spectral_analysis.
+
+    @returns: Same as spectral_analysis.
+
+    """
     threshold = max(abs_y_f) * min_peak_ratio
 
     # Suppresses all coefficients that are below threshold.
-    for i in xrange(len(abs_y_f)):
-        if abs_y_f[i] < threshold:
-            abs_y_f[i] = 0
+    abs_y_f[abs_y_f < threshold] = 0
 
     # Gets the peak detection window size in indice.
     # x_f[1] is the frequency difference per index.
@@ -149,76 +254,71 @@ def peak_detection(array, window_size):
 
     """
     half_window_size = window_size / 2
-    length = len(array)
-
-    def mid_is_peak(array, mid, left, right):
-        """Checks if value at mid is the largest among left to right in array.
+    array = numpy.asarray(array)
 
-        @param array: A list of numbers.
-        @param mid: The mid index.
-        @param left: The left index.
-        @param rigth: The right index.
+    # Only consider value greater than 0.
+    is_peak = array != 0
+    if half_window_size > 0 and len(array):
+        is_peak &= array > _max_of_neighbors(array, half_window_size)
 
-        @returns: A tuple (is_peak, next_candidate)
-                  is_peak is True if array[index] is the maximum among numbers
-                  in array between index [left, right] inclusively.
-                  next_candidate is the index of next candidate for peak if
-                  is_peak is False. It is the index of maximum value in
-                  [mid + 1, right]. If is_peak is True, next_candidate is
-                  right + 1.
+    indices = numpy.flatnonzero(is_peak)
+    results = zip(indices.tolist(), array[indices].tolist())
 
-        """
-        value_mid = array[mid]
-        is_peak = True
-        next_peak_candidate_index = None
+    # Sort the peaks by values.
+    return sorted(results, key=lambda x: x[1], reverse=True)
 
-        # Check the left half window.
-        for index in xrange(left, mid):
-            if array[index] >= value_mid:
-                is_peak = False
-                break
 
-        # Mid is at the end of array.
-        if mid == right:
-            return is_peak, right + 1
+def _max_of_neighbors(array, half_window_size):
+    """Gets the maximum of the neighbors of each point of an array.
 
-        # Check the right half window and also record next candidate.
-        # Favor the larger index for next_peak_candidate_index.
-        for index in xrange(right, mid, -1):
-            if (next_peak_candidate_index is None or
-                array[index] > array[next_peak_candidate_index]):
-                next_peak_candidate_index = index
+    The neighbors of array[i] are array[i - half_window_size] to
+    array[i + half_window_size], excluding array[i] itself.
 
-        if array[next_peak_candidate_index] >= value_mid:
-            is_peak = False
+    @param array: A 1-D numpy array.
+    @param half_window_size: The number of neighbors on each side, at least 1.
 
-        if is_peak:
-            next_peak_candidate_index = right + 1
+    @returns: A numpy array containing the maximum of the neighbors of each
+              point, or -inf for points without neighbors.
 
-        return is_peak, next_peak_candidate_index
+    """
+    length = len(array)
+    # window_max[j] is the maximum of padded[j:j + half_window_size], so that
+    # window_max[i] covers the left neighbors of array[i] and
+    # window_max[i + half_window_size + 1] covers its right neighbors.
+    window_max = _sliding_max(numpy.concatenate(
+            ([-numpy.inf] * half_window_size, array,
+             [-numpy.inf] * half_window_size)), half_window_size)
+    return numpy.maximum(window_max[:length],
+                         window_max[half_window_size + 1:])
 
-    results = []
-    mid = 0
-    next_candidate_idx = None
-    while mid < length:
-        left = max(0, mid - half_window_size)
-        right = min(length - 1, mid + half_window_size)
 
-        # Only consider value greater than 0.
-        if array[mid] == 0:
-            mid = mid + 1
-            continue;
+def _sliding_max(array, window_size):
+    """Gets the maximum of each window of an array.
 
-        is_peak, next_candidate_idx = mid_is_peak(array, mid, left, right)
+    The array is cut into blocks of window_size points. Each window spans
+    the end of one block and the start of the next one, so its maximum is
+    the maximum of a suffix maximum and a prefix maximum of the blocks. This
+    takes linear time whatever the window size.
 
-        if is_peak:
-            results.append((mid, array[mid]))
+    @param array: A 1-D numpy array.
+    @param window_size: The number of points in a window, at least 1.
 
-        # Use the next candidate found in [mid + 1, right], or right + 1.
-        mid = next_candidate_idx
+    @returns: A numpy array containing the maximum of
+              array[j:j + window_size] at index j, for each window that fits
+              in the array.
 
-    # Sort the peaks by values.
-    return sorted(results, key=lambda x: x[1], reverse=True)
+    """
+    blocks = -(-len(array) // window_size)
+    padded = numpy.empty(blocks * window_size)
+    padded.fill(-numpy.inf)
+    padded[:len(array)] = array
+    padded = padded.reshape(blocks, window_size)
+    prefix_max = numpy.maximum.accumulate(padded, axis=1).ravel()
+    suffix_max = numpy.maximum.accumulate(
+            padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    windows = len(array) - window_size + 1
+    return numpy.maximum(suffix_max[:windows],
+                         prefix_max[window_size - 1:window_size - 1 + windows])
 
 
 # The default pattern mathing threshold. By experiment, this threshold
@@ -259,17 +359,29 @@ def anomaly_detection(signal, rate, freq,
         raise EmptyDataError('Signal data is empty')
 
     golden_y = _generate_golden_pattern(rate, freq, block_size)
-
-    results = []
-
-    for start in xrange(0, len(signal), block_size / 2):
-        end = start + block_size
-        test_signal = signal[start:end]
-        matched = _moving_pattern_matching(golden_y, test_signal, threshold)
-        if not matched:
-            results.append(start)
-
-    results = [float(x) / rate for x in results]
+    signal = numpy.ascontiguousarray(signal, dtype=float)
+
+    starts = numpy.arange(0, len(signal), block_size / 2)
+    full_blocks = numpy.count_nonzero(starts + block_size <= len(signal))
+    matched = numpy.ones(len(starts), dtype=bool)
+
+    # Matches all the full blocks at once, through a view of the signal with
+    # one row per block.
+    blocks = stride_tricks.as_strided(
+            signal, shape=(full_blocks, block_size),
+            strides=(signal.strides[0] * (block_size / 2), signal.strides[0]))
+    for first in xrange(0, full_blocks, _PATTERN_MATCHING_CHUNK_BLOCKS):
+        last = min(first + _PATTERN_MATCHING_CHUNK_BLOCKS, full_blocks)
+        matched[first:last] = _match_blocks(golden_y, blocks[first:last],
+                                            threshold)
+
+    # The blocks at the end of the signal are shorter.
+    for index in xrange(full_blocks, len(starts)):
+        start = starts[index]
+        matched[index] = _moving_pattern_matching(
+                golden_y, signal[start:start + block_size], threshold)
+
+    results = [float(x) / rate for x in starts[~matched].tolist()]
 
     return results
 
@@ -323,29 +435,66 @@ def _moving_pattern_matching(golden_signal, test_signal, threshold):
     if len(golden_signal) < len(test_signal):
         raise ValueError('Test signal is longer than golden signal')
 
-    block_length = len(test_signal)
+    test_blocks = numpy.asarray(test_signal, dtype=float).reshape(1, -1)
+    return _match_blocks(golden_signal, test_blocks, threshold)[0]
+
+
+# The number of test blocks matched against the golden pattern at a time. This
+# bounds the memory used to match long signals.
+_PATTERN_MATCHING_CHUNK_BLOCKS = 4096
+
+def _match_blocks(golden_signal, test_blocks, threshold):
+    """Checks if each test block is similar to any block of golden_signal.
+
+    The correlation indices of a test block with all the blocks of golden
+    signal are computed at once by a FFT based cross correlation.
+
+    @param golden_signal: A 1-D array for golden signal.
+    @param test_blocks: A 2-D numpy array containing one test block per row.
+                        The test blocks must not be longer than golden signal.
+    @param threshold: The threshold of correlation index to be judge as matched.
+
+    @returns: A 1-D boolean numpy array, True for matched test blocks.
+
+    @raises: GoldenSignalNormTooSmallError: if the norm of any block of golden
+             signal is too small.
+
+    """
+    golden_signal = numpy.asarray(golden_signal, dtype=float)
+    block_length = test_blocks.shape[1]
     number_of_movings = len(golden_signal) - block_length + 1
-    correlation_indices = []
-    for moving_index in xrange(number_of_movings):
-        # Cuts one block of golden signal from start index.
-        # The block length is the same as test signal.
-        start = moving_index
-        end = start + block_length
-        golden_signal_block = golden_signal[start:end]
-        try:
-            correlation_index = _get_correlation_index(
-                    golden_signal_block, test_signal)
-        except TestSignalNormTooSmallError:
-            logging.info('Caught one block of test signal that has no meaningful norm')
-            return False
-        correlation_indices.append(correlation_index)
-
-    # Checks if the maximum correlation index is high enough.
-    max_corr = max(correlation_indices)
-    if max_corr < threshold:
-        logging.debug('Got one unmatched block with max_corr: %s', max_corr)
-        return False
-    return True
+
+    # Norms of the golden signal blocks starting at each index.
+    golden_energy = numpy.concatenate(([0.0], numpy.cumsum(golden_signal ** 2)))
+    norm_golden = numpy.sqrt(numpy.maximum(
+            golden_energy[block_length:] - golden_energy[:number_of_movings],
+            0))
+    if numpy.any(norm_golden <= _MINIMUM_SIGNAL_NORM):
+        raise GoldenSignalNormTooSmallError(
+                'No meaningful data as norm is too small.')
+
+    norm_test = numpy.sqrt(numpy.sum(test_blocks ** 2, axis=1))
+    meaningful = norm_test > _MINIMUM_SIGNAL_NORM
+    if not numpy.all(meaningful):
+        logging.info('Caught %d blocks of test signal that have no meaningful '
+                     'norm', numpy.count_nonzero(~meaningful))
+
+    # The correlation of a test block with the golden signal block starting at
+    # index k is the k-th element of their circular cross correlation, which
+    # does not wrap around as long as the FFT is as long as golden signal.
+    fft_length = 1 << (len(golden_signal) - 1).bit_length()
+    correlation = numpy.fft.irfft(
+            numpy.fft.rfft(golden_signal, fft_length) *
+            numpy.conj(numpy.fft.rfft(test_blocks, fft_length, axis=1)),
+            fft_length, axis=1)[:, :number_of_movings]
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        max_corr = numpy.max(correlation / norm_golden, axis=1) / norm_test
+        matched = meaningful & (max_corr >= threshold)
+
+    for corr in max_corr[meaningful & ~matched]:
+        logging.debug('Got one unmatched block with max_corr: %s', corr)
+    return matched
 
 
 class GoldenSignalNormTooSmallError(Exception):
@@ -82,6 +82,15 @@ class SpectralAnalysisTest(unittest.TestCase):
         self.assertEqual(dummy_answer, improved_answer)
 
 
+    def testPeakDetectionLargeWindow(self):
+        """Windows spanning several blocks find the same peaks."""
+        array = numpy.random.randint(0, 50, 5000).astype(float)
+        for window_size in (2, 3, 1001, 4999, 12000):
+            self.assertEqual(
+                    self.dummy_peak_detection(array, window_size),
+                    audio_analysis.peak_detection(array, window_size))
+
+
     def testSpectralAnalysis(self):
         rate = 48000
         length_in_secs = 0.5
@@ -126,6 +135,25 @@ class SpectralAnalysisTest(unittest.TestCase):
                             'Dominant frequency is not correct')
 
 
+    def testStreamingSpectralAnalysisRealData(self):
+        """Checks the streaming spectral analysis on a memory-mapped file."""
+        file_path = os.path.join(
+                os.path.dirname(__file__), 'test_data', '1k_2k.raw')
+        data = audio_data.AudioRawData(None, 2, 'S32_LE')
+        data.read_file(file_path)
+        saturate_value = audio_data.get_maximum_value_from_sample_format(
+                'S32_LE')
+        golden_frequency = [1000, 2000]
+        for channel in [0, 1]:
+            normalized_signal = audio_analysis.NormalizedSignal(
+                    data.channel_data[channel], saturate_value)
+            spectral = audio_analysis.streaming_spectral_analysis(
+                    normalized_signal, 48000, 0.02, block_size=8192)
+            logging.debug('channel %s: %s', channel, spectral)
+            self.assertTrue(abs(spectral[0][0] - golden_frequency[channel]) < 5,
+                            'Dominant frequency is not correct')
+
+
     def testNotMeaningfulData(self):
         """Checks that sepectral analysis handles un-meaningful data."""
         rate = 48000
@@ -351,6 +379,43 @@ class AnomalyTest(unittest.TestCase):
             self.check_anomaly()
 
 
+    def dummy_anomaly_detection(self):
+        """Detects anomaly by correlating each block at every offset.
+
+        @returns: A list containing detected anomaly time in seconds.
+
+        """
+        golden_y = audio_analysis._generate_golden_pattern(
+                self.rate, self.freq, self.block_size)
+        results = []
+        for start in xrange(0, len(self.y), self.block_size / 2):
+            test_signal = self.y[start:start + self.block_size]
+            if (numpy.linalg.norm(test_signal) <=
+                audio_analysis._MINIMUM_SIGNAL_NORM):
+                results.append(start)
+                continue
+            max_corr = max(
+                    audio_analysis._get_correlation_index(
+                            golden_y[offset:offset + len(test_signal)],
+                            test_signal)
+                    for offset in xrange(
+                            len(golden_y) - len(test_signal) + 1))
+            if max_corr < audio_analysis.PATTERN_MATCHING_THRESHOLD:
+                results.append(start)
+        return [float(x) / self.rate for x in results]
+
+
+    def testSameAsCorrelatingEachOffset(self):
+        """Anomalies are the same as found by correlating every offset."""
+        self.y = self.y[:len(self.y) - 37]
+        self.y[3000:3300] = 0
+        self.y[6000:6100] = 0.7
+        self.y = self.y + numpy.random.standard_normal(len(self.y)) * 0.45
+        self.run_analysis()
+        self.assertTrue(self.results)
+        self.assertEqual(self.results, self.dummy_anomaly_detection())
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     unittest.main()
@@ -8,6 +8,7 @@
 import contextlib
 import copy
 import numpy as np
+import os
 import struct
 import StringIO
 
@@ -91,10 +92,40 @@ class AudioRawData(object):
         np_dtype = '%s%d' % (sample_format_dict['dtype_str'],
                              sample_format_dict['size_bytes'])
 
-        # Reads data from a string into 1-D array.
-        np_array = np.fromstring(binary, dtype=np_dtype)
+        # Reads data from a string into 1-D array. The array shares the
+        # memory of the string rather than copying it.
+        np_array = np.frombuffer(binary, dtype=np_dtype)
         n_frames = len(np_array) / self.channel
         # Reshape np_array into an array of shape (n_frames, channel).
         np_array = np_array.reshape(n_frames, self.channel)
         # Transpose np_arrya so it becomes of shape (channel, n_frames).
         self.channel_data = np_array.transpose()
+
+
+    def read_file(self, filename, offset=0, n_frames=None):
+        """Maps samples in a file into channel_data.
+
+        The file is memory-mapped rather than read, so that the samples are
+        only loaded when they are accessed. This allows to analyze recordings
+        which do not fit in memory block by block.
+
+        @param filename: The path of a file containing binary data.
+        @param offset: The offset in bytes of the first sample in the file.
+        @param n_frames: The number of frames to map. None to map all the
+                         frames until the end of the file.
+        """
+        sample_format_dict = SAMPLE_FORMATS[self.sample_format]
+        np_dtype = '%s%d' % (sample_format_dict['dtype_str'],
+                             sample_format_dict['size_bytes'])
+        frame_size = sample_format_dict['size_bytes'] * self.channel
+        max_frames = (os.path.getsize(filename) - offset) / frame_size
+        if n_frames is None or n_frames > max_frames:
+            n_frames = max_frames
+
+        if n_frames <= 0:
+            # numpy can not map an empty file.
+            np_array = np.zeros((0, self.channel), dtype=np_dtype)
+        else:
+            np_array = np.memmap(filename, dtype=np_dtype, mode='r',
+                                 offset=offset, shape=(n_frames, self.channel))
+        self.channel_data = np_array.transpose()
@@ -5,10 +5,13 @@
 """This module provides utilities to detect some artifacts and measure the
     quality of audio."""
 
+import collections
 import logging
 import math
 import numpy
 
+from numpy.lib import stride_tricks
+
 # Normal autotest environment.
 try:
     import common
@@ -171,9 +174,9 @@ def hilbert(x):
         h[1:(N + 1) // 2] = 2
 
     if len(x.shape) > 1:
-        ind = [newaxis] * x.ndim
+        ind = [numpy.newaxis] * x.ndim
         ind[axis] = slice(None)
-        h = h[ind]
+        h = h[tuple(ind)]
     x = numpy.fft.ifft(Xf * h, axis=axis)
     return x
 
@@ -912,3 +915,585 @@ def quality_measurement(
             'volume_changes': volume_changes,
             'equivalent_noise_level': noise
            }
+
+
+# The number of seconds of signal analyzed at a time by
+# quality_measurement_streaming.
+DEFAULT_STREAMING_CHUNK_SECS = 10
+
+
+def quality_measurement_streaming(
+        signal, rate,
+        dominant_frequency=None,
+        block_size_secs=DEFAULT_BLOCK_SIZE_SECS,
+        frequency_error_threshold=DEFAULT_FREQUENCY_ERROR,
+        delay_amplitude_threshold=DEFAULT_DELAY_AMPLITUDE_THRESHOLD,
+        noise_amplitude_threshold=DEFAULT_NOISE_AMPLITUDE_THRESHOLD,
+        burst_amplitude_threshold=DEFAULT_BURST_AMPLITUDE_THRESHOLD,
+        volume_changing_amplitude_threshold=DEFAULT_VOLUME_CHANGE_AMPLITUDE,
+        chunk_secs=DEFAULT_STREAMING_CHUNK_SECS):
+    """Detects several artifacts and estimates the noise level of a long signal.
+
+    This detects the same artifacts as quality_measurement, but only keeps
+    one chunk of the signal and of its amplitude and frequency in memory at a
+    time, so that recordings longer than the memory of the host can be
+    measured. Each chunk is extended on both sides by the samples its block
+    averages depend on.
+
+    The signal is read twice. The first pass finds the sine wave and its
+    average amplitude, the second one detects artifacts and estimates the
+    noise level.
+
+    @param signal: A 1-D array-like object for one-channel PCM data which
+                   returns a numpy array when sliced, e.g., a numpy.memmap or
+                   an audio_analysis.NormalizedSignal. The data should be
+                   normalized to [-1,1].
+    @param rate: Sampling rate
+    @param dominant_frequency: Dominant frequency of signal. Set None to
+                               recalculate the frequency in this function by
+                               audio_analysis.streaming_spectral_analysis.
+    @param block_size_secs: Refer to quality_measurement.
+    @param frequency_error_threshold: Refer to quality_measurement.
+    @param delay_amplitude_threshold: Refer to quality_measurement.
+    @param noise_amplitude_threshold: Refer to quality_measurement.
+    @param burst_amplitude_threshold: Refer to quality_measurement.
+    @param volume_changing_amplitude_threshold: Refer to quality_measurement.
+    @param chunk_secs: The number of seconds of signal analyzed at a time.
+
+    @returns: Same as quality_measurement.
+
+    @raises SineWaveNotFound: if there is no sine wave in the signal.
+
+    """
+    # Calculates the block size, from seconds to samples.
+    block_size = int(block_size_secs * rate)
+
+    # Finds the dominant frequency.
+    if not dominant_frequency:
+        dominant_frequency = audio_analysis.streaming_spectral_analysis(
+                signal, rate)[0][0]
+
+    padded_signal = _PaddedSignal(signal, rate, block_size, dominant_frequency)
+    length = padded_signal.length
+    chunk_size = max(1, int(chunk_secs * rate))
+    chunks = [(first, min(length, first + chunk_size))
+              for first in xrange(0, length, chunk_size)]
+
+    # Finds start and end index of sine wave as find_start_end_index does.
+    # The frequency is one sample shorter than the signal, see
+    # hilbert_analysis.
+    start_index, end_index = length - 2, 0
+    chunk_amplitude_sums = []
+    for first, last in chunks:
+        features = padded_signal.get_features(first, last)
+        chunk_amplitude_sums.append(numpy.sum(features.amplitude))
+        frequency_error = features.block_frequency_delta / dominant_frequency
+        matched = numpy.flatnonzero(
+                frequency_error < frequency_error_threshold) + first
+        if len(matched):
+            start_index = min(start_index,
+                              max(0, matched[0] - block_size / 2))
+            end_index = max(end_index,
+                            min(length - 2, matched[-1] + block_size / 2) + 1)
+
+    if start_index > end_index:
+        raise SineWaveNotFound('No sine wave found in signal')
+
+    logging.debug('Found sine wave: start: %s, end: %s',
+                  float(start_index) / rate - APPEND_ZEROS_SECS,
+                  float(end_index) / rate - APPEND_ZEROS_SECS)
+
+    # Finds average amplitude of sine wave. The amplitude of the chunks at the
+    # start and the end of the sine wave is computed again.
+    sum_of_amplitude = 0.0
+    for (first, last), chunk_sum in zip(chunks, chunk_amplitude_sums):
+        left, right = max(first, start_index), min(last, end_index)
+        if (left, right) == (first, last):
+            sum_of_amplitude += chunk_sum
+        elif left < right:
+            sum_of_amplitude += numpy.sum(
+                    padded_signal.get_amplitude(left, right))
+    average_amplitude = sum_of_amplitude / (end_index - start_index)
+
+    noise_events = _EventMerger(rate)
+    delay_events = _EventMerger(rate)
+    burst_events = _EventMerger(rate)
+    rising_events = _EventMerger(rate)
+    falling_events = _EventMerger(rate)
+    sum_of_teager_value = 0.0
+    for first, last in chunks:
+        features = padded_signal.get_features(first, last)
+        indices = numpy.arange(first, last)
+        noise_events.add(indices[_noise_candidates(
+                indices, features.block_amplitude, start_index, end_index,
+                length, average_amplitude, rate, noise_amplitude_threshold)])
+
+        # Other artifacts are only detected within the sine wave.
+        left, right = max(first, start_index), min(last, end_index)
+        if left < right:
+            in_wave = slice(left - first, right - first)
+            wave_features = _ChunkFeatures(*[array[in_wave]
+                                             for array in features])
+            indices = indices[in_wave]
+            delay_events.add(indices[_delay_candidates(
+                    indices, wave_features, start_index, end_index,
+                    average_amplitude, dominant_frequency, rate,
+                    delay_amplitude_threshold, frequency_error_threshold)])
+            burst_events.add(indices[_burst_candidates(
+                    indices, wave_features, start_index, end_index,
+                    average_amplitude, dominant_frequency, rate,
+                    burst_amplitude_threshold, frequency_error_threshold)])
+            rising, falling = _volume_changing_candidates(
+                    indices, wave_features, start_index, end_index,
+                    average_amplitude, rate,
+                    volume_changing_amplitude_threshold)
+            rising_events.add(indices[rising])
+            falling_events.add(indices[falling])
+
+        # Sums the teager value of the sine wave as average_teager_value does.
+        left, right = max(first, start_index + 1), min(last, end_index - 1)
+        if left < right:
+            wave = padded_signal.read(left - 1, right + 1)
+            sum_of_teager_value += numpy.sum(
+                    numpy.abs(wave[1:-1] * wave[1:-1] - wave[:-2] * wave[2:]) *
+                    numpy.maximum(1, numpy.abs(wave[1:-1])))
+
+    def index_to_secs(index):
+        """Converts an index of the padded signal into seconds."""
+        return float(index) / rate - APPEND_ZEROS_SECS
+
+    noise_before_playing, noise_after_playing = [], []
+    for first_index, last_index in noise_events.events:
+        noise = (index_to_secs(first_index),
+                 index_to_secs(last_index + 1) - index_to_secs(first_index))
+        if noise[0] < index_to_secs(start_index):
+            noise_before_playing.append(noise)
+        else:
+            noise_after_playing.append(noise)
+
+    delays = [(index_to_secs(first_index),
+               index_to_secs(last_index + 1) - index_to_secs(first_index))
+              for first_index, last_index in delay_events.events]
+
+    burst_time_points = [index_to_secs(first_index)
+                         for first_index, _ in burst_events.events]
+
+    # Combines consecutive increasing/decreasing event as
+    # changing_volume_detection does.
+    changing_events = sorted(
+            [(first_index, +1) for first_index, _ in rising_events.events] +
+            [(first_index, -1) for first_index, _ in falling_events.events])
+    volume_changes, prev = [], 0
+    for first_index, event in changing_events:
+        if event == prev:
+            continue
+        volume_changes.append((index_to_secs(first_index), event))
+        prev = event
+
+    teager_value = ((sum_of_teager_value / (end_index - start_index)) /
+                    (average_amplitude ** 2))
+
+    # Finds out the noise level.
+    noise = noise_level(average_amplitude, dominant_frequency,
+                        rate,
+                        teager_value)
+
+    return {'artifacts':
+            {'noise_before_playback': noise_before_playing,
+             'noise_after_playback': noise_after_playing,
+             'delay_during_playback': delays,
+             'burst_during_playback': burst_time_points
+            },
+            'volume_changes': volume_changes,
+            'equivalent_noise_level': noise
+           }
+
+
+# The amplitude of each sample of a chunk and the block averages used to
+# detect artifacts. See quality_measurement.
+_ChunkFeatures = collections.namedtuple(
+        '_ChunkFeatures',
+        ['amplitude', 'left_block_amplitude', 'right_block_amplitude',
+         'block_amplitude', 'block_frequency_delta'])
+
+
+class _PaddedSignal(object):
+    """Computes the features of a signal padded with zeros chunk by chunk.
+
+    The signal is padded with APPEND_ZEROS_SECS of zeros on both sides as in
+    quality_measurement, and indices are those of the padded signal.
+
+    """
+    def __init__(self, signal, rate, block_size, dominant_frequency):
+        """Initializes a _PaddedSignal.
+
+        @param signal: Refer to quality_measurement_streaming.
+        @param rate: Sampling rate.
+        @param block_size: Block size in samples.
+        @param dominant_frequency: Dominant frequency of signal.
+
+        """
+        self._signal = signal
+        self._rate = rate
+        self._block_size = block_size
+        self._dominant_frequency = dominant_frequency
+        self._padding = int(rate * APPEND_ZEROS_SECS)
+        self.length = len(signal) + 2 * self._padding
+
+        # find_block_average_value leaves the first value of an array out of
+        # the sum of each block, so the first amplitude and frequency delta
+        # are needed to compute the same block averages.
+        first_samples = self._get_analytic_signal(0, min(self.length, 2))
+        self._first_amplitude = numpy.abs(first_samples[0])
+        self._first_frequency_delta = abs(
+                self._get_frequency(first_samples)[0] - dominant_frequency)
+
+
+    def read(self, first, last):
+        """Reads samples of the padded signal.
+
+        @param first: The index of the first sample.
+        @param last: The index after the last sample.
+
+        @returns: A numpy array containing samples in [first, last).
+
+        """
+        samples = numpy.zeros(last - first)
+        left = max(first, self._padding)
+        right = min(last, self.length - self._padding)
+        if left < right:
+            samples[left - first:right - first] = self._signal[
+                    left - self._padding:right - self._padding]
+        return samples
+
+
+    def get_amplitude(self, first, last):
+        """Computes the amplitude of samples as hilbert_analysis does.
+
+        @param first: The index of the first sample.
+        @param last: The index after the last sample.
+
+        @returns: A numpy array containing amplitude of samples in
+                  [first, last).
+
+        """
+        hilbert_block = self._block_size // 2
+        aligned_first = first // hilbert_block * hilbert_block
+        analytic = self._get_analytic_signal(aligned_first, last)
+        return numpy.abs(analytic[first - aligned_first:])
+
+
+    def get_features(self, first, last):
+        """Computes the features of samples as quality_measurement does.
+
+        @param first: The index of the first sample.
+        @param last: The index after the last sample.
+
+        @returns: A _ChunkFeatures of samples in [first, last). As the
+                  frequency is one sample shorter than the signal, the last
+                  block_frequency_delta is missing in the last chunk.
+
+        """
+        side_block_size = self._block_size * 2
+        hilbert_block = self._block_size // 2
+        frequency_length = self.length - 1
+
+        # Block averages of a sample depend on amplitude and frequency up to
+        # side_block_size samples away, and frequency depends on the next
+        # sample.
+        context_first = (max(0, first - side_block_size) //
+                         hilbert_block * hilbert_block)
+        context_last = min(self.length, last + side_block_size)
+        analytic = self._get_analytic_signal(
+                context_first, min(self.length, context_last + 1))
+        amplitude = numpy.abs(analytic[:context_last - context_first])
+        frequency_delta = abs(self._get_frequency(analytic) -
+                              self._dominant_frequency)
+
+        left_block_amplitude, right_block_amplitude = _side_block_averages(
+                amplitude, context_first, self.length, first, last,
+                side_block_size)
+        block_amplitude = _block_averages(
+                amplitude, context_first, self.length, first, last,
+                self._block_size, self._first_amplitude)
+        block_frequency_delta = _block_averages(
+                frequency_delta, context_first, frequency_length, first,
+                min(last, frequency_length), self._block_size,
+                self._first_frequency_delta)
+        return _ChunkFeatures(
+                amplitude[first - context_first:last - context_first],
+                left_block_amplitude, right_block_amplitude, block_amplitude,
+                block_frequency_delta)
+
+
+    def _get_frequency(self, analytic):
+        """Computes the frequency of samples as hilbert_analysis does.
+
+        @param analytic: Analytic signal of consecutive samples.
+
+        @returns: A numpy array containing the frequency of each sample but
+                  the last one.
+
+        """
+        phase = numpy.unwrap(numpy.angle(analytic))
+        return numpy.diff(phase) / (2.0 * numpy.pi) * self._rate
+
+
+    def _get_analytic_signal(self, first, last):
+        """Applies Hilbert transform segment by segment as hilbert_analysis.
+
+        The segments which are not cut by the borders of the padded signal
+        have the same size, and are transformed at once.
+
+        @param first: The index of the first sample. It must be a multiple of
+                      half of the block size.
+        @param last: The index after the last sample.
+
+        @returns: A numpy array containing the analytic signal of samples in
+                  [first, last).
+
+        """
+        hilbert_block = self._block_size // 2
+        half_hilbert_block = hilbert_block // 2
+        segment_size = hilbert_block + 2 * half_hilbert_block
+        left_borders = numpy.arange(first, last, hilbert_block)
+        data_first = max(0, first - half_hilbert_block)
+        data_last = min(self.length,
+                        left_borders[-1] + hilbert_block + half_hilbert_block)
+        data = self.read(data_first, data_last)
+        result = numpy.empty(
+                min(self.length, left_borders[-1] + hilbert_block) - first,
+                dtype=complex)
+
+        uncut = ((left_borders >= half_hilbert_block) &
+                 (left_borders + hilbert_block + half_hilbert_block <=
+                  self.length))
+        uncut_borders = left_borders[uncut]
+        if len(uncut_borders):
+            offset = uncut_borders[0] - half_hilbert_block - data_first
+            segments = stride_tricks.as_strided(
+                    data[offset:], shape=(len(uncut_borders), segment_size),
+                    strides=(data.strides[0] * hilbert_block, data.strides[0]))
+            taken = hilbert(segments)[
+                    :, half_hilbert_block:half_hilbert_block + hilbert_block]
+            offset = uncut_borders[0] - first
+            result[offset:offset + taken.size] = taken.ravel()
+
+        for left_border in left_borders[~uncut]:
+            right_border = min(self.length, left_border + hilbert_block)
+            temp_left_border = max(0, left_border - half_hilbert_block)
+            temp_right_border = min(self.length,
+                                    right_border + half_hilbert_block)
+            temp = hilbert(data[temp_left_border - data_first:
+                                temp_right_border - data_first])
+            result[left_border - first:right_border - first] = temp[
+                    left_border - temp_left_border:
+                    right_border - temp_left_border]
+        return result[:last - first]
+
+
+def _side_block_averages(arr, offset, length, first, last, side_block_size):
+    """Computes left and right block averages as find_block_average_value.
+
+    @param arr: A numpy array containing the values from index offset.
+    @param offset: The index of the first value in arr.
+    @param length: The length of the whole array.
+    @param first: The index of the first average to compute.
+    @param last: The index after the last average to compute.
+    @param side_block_size: the size of the left_block and right_block.
+
+    @returns: A tuple of numpy arrays: (left_block_average_array,
+                                        right_block_average_array)
+
+    """
+    cumulative_sum = numpy.concatenate(([0.0], numpy.cumsum(arr)))
+    indices = numpy.arange(first, last)
+    left_borders = numpy.maximum(0, indices - side_block_size)
+    right_borders = numpy.minimum(length, indices + side_block_size)
+    left_sums = (cumulative_sum[indices + 1 - offset] -
+                 cumulative_sum[left_borders - offset])
+    right_sums = (cumulative_sum[right_borders - offset] -
+                  cumulative_sum[indices - offset])
+    return (left_sums / (indices - left_borders + 1),
+            right_sums / (right_borders - indices))
+
+
+def _block_averages(arr, offset, length, first, last, block_size,
+                    first_value):
+    """Computes block averages as find_block_average_value.
+
+    @param arr: A numpy array containing the values from index offset.
+    @param offset: The index of the first value in arr.
+    @param length: The length of the whole array.
+    @param first: The index of the first average to compute.
+    @param last: The index after the last average to compute.
+    @param block_size: the size of the block.
+    @param first_value: The value at index 0 of the whole array, which
+                        find_block_average_value leaves out of the block sums.
+
+    @returns: A numpy array of block averages.
+
+    """
+    cumulative_sum = numpy.concatenate(([0.0], numpy.cumsum(arr)))
+    indices = numpy.arange(first, last)
+    left_borders = numpy.maximum(0, indices - block_size / 2)
+    right_borders = numpy.maximum(1, numpy.minimum(length,
+                                                   indices + block_size / 2))
+    sums = (cumulative_sum[right_borders - offset] -
+            cumulative_sum[left_borders - offset] - first_value)
+    return sums / (right_borders - left_borders)
+
+
+def _noise_candidates(indices, block_amplitude, start_index, end_index,
+                      length, average_amplitude, rate,
+                      noise_amplitude_threshold):
+    """Finds samples considered as noise by noise_detection.
+
+    @param indices: A numpy array of the indices of samples.
+    @param block_amplitude: The block amplitude of the samples.
+    @param length: The length of the padded signal.
+    Refer to noise_detection for the other parameters.
+
+    @returns: A boolean numpy array, True for samples considered as noise.
+
+    """
+    near_sine = ((start_index - rate * NEAR_SINE_START_OR_END_SECS <= indices) &
+                 (indices < end_index + rate * NEAR_SINE_START_OR_END_SECS))
+    near_data = ((indices.astype(float) / rate <=
+                  NEAR_DATA_START_OR_END_SECS + APPEND_ZEROS_SECS) |
+                 ((length - indices).astype(float) / rate <=
+                  NEAR_DATA_START_OR_END_SECS + APPEND_ZEROS_SECS))
+    return (~near_sine & ~near_data &
+            (block_amplitude > average_amplitude * noise_amplitude_threshold))
+
+
+def _delay_candidates(indices, features, start_index, end_index,
+                      average_amplitude, dominant_frequency, rate,
+                      delay_amplitude_threshold, frequency_error_threshold):
+    """Finds samples considered as delay by delay_detection.
+
+    @param indices: A numpy array of the indices of samples in the sine wave.
+    @param features: A _ChunkFeatures of the samples.
+    Refer to delay_detection for the other parameters.
+
+    @returns: A boolean numpy array, True for samples considered as delay.
+
+    """
+    block_amplitude = features.block_amplitude
+    now_time = indices.astype(float) / rate - APPEND_ZEROS_SECS
+    start_time = float(start_index) / rate - APPEND_ZEROS_SECS
+    end_time = float(end_index) / rate - APPEND_ZEROS_SECS
+    near_start_or_end = (
+            (numpy.abs(now_time - start_time) < NEAR_START_OR_END_SECS) |
+            (numpy.abs(now_time - end_time) < NEAR_START_OR_END_SECS))
+    amp_threshold = numpy.minimum(
+            average_amplitude * delay_amplitude_threshold,
+            numpy.minimum(
+                    delay_amplitude_threshold * features.left_block_amplitude,
+                    delay_amplitude_threshold *
+                    features.right_block_amplitude))
+    frequency_error = features.block_frequency_delta / dominant_frequency
+    return ((block_amplitude <= average_amplitude * delay_amplitude_threshold) &
+            ~near_start_or_end &
+            ((block_amplitude < amp_threshold) |
+             (frequency_error > frequency_error_threshold)))
+
+
+def _burst_candidates(indices, features, start_index, end_index,
+                      average_amplitude, dominant_frequency, rate,
+                      burst_amplitude_threshold, frequency_error_threshold):
+    """Finds samples considered as burst by burst_detection.
+
+    @param indices: A numpy array of the indices of samples in the sine wave.
+    @param features: A _ChunkFeatures of the samples.
+    Refer to burst_detection for the other parameters.
+
+    @returns: A boolean numpy array, True for samples considered as burst.
+
+    """
+    block_amplitude = features.block_amplitude
+    near_start_or_end = (
+            (numpy.abs(indices - start_index) <
+             rate * NEAR_START_OR_END_SECS) |
+            (numpy.abs(indices - end_index) < rate * NEAR_START_OR_END_SECS))
+    amp_threshold = numpy.maximum(
+            average_amplitude * DEFAULT_BURST_TOO_SMALL,
+            numpy.maximum(
+                    burst_amplitude_threshold * features.left_block_amplitude,
+                    burst_amplitude_threshold *
+                    features.right_block_amplitude))
+    frequency_error = features.block_frequency_delta / dominant_frequency
+    return ((block_amplitude > average_amplitude * DEFAULT_BURST_TOO_SMALL) &
+            ~near_start_or_end &
+            ((block_amplitude > amp_threshold) |
+             (frequency_error > frequency_error_threshold)))
+
+
+def _volume_changing_candidates(indices, features, start_index, end_index,
+                                average_amplitude, rate,
+                                volume_changing_amplitude_threshold):
+    """Finds samples considered as volume changes by changing_volume_detection.
+
+    @param indices: A numpy array of the indices of samples in the sine wave.
+    @param features: A _ChunkFeatures of the samples.
+    Refer to changing_volume_detection for the other parameters.
+
+    @returns: A tuple of boolean numpy arrays (rising, falling), True for
+              samples considered as increasing and decreasing volume
+              respectively.
+
+    """
+    left = features.left_block_amplitude
+    right = features.right_block_amplitude
+    amplitude_threshold = average_amplitude * DEFAULT_VOLUME_CHANGE_TOO_SMALL
+    checked = ((left >= amplitude_threshold) &
+               (right >= amplitude_threshold) &
+               (numpy.abs(start_index - indices).astype(float) / rate >=
+                NEAR_START_OR_END_SECS) &
+               (numpy.abs(end_index - indices).astype(float) / rate >=
+                NEAR_START_OR_END_SECS))
+    delta_margin = numpy.where(left > 0,
+                               volume_changing_amplitude_threshold * left,
+                               volume_changing_amplitude_threshold)
+    return (checked & (right > left + delta_margin),
+            checked & (right < left - delta_margin))
+
+
+class _EventMerger(object):
+    """Merges the indices of samples where an artifact is detected into events.
+
+    As in the detection functions, an index less than DEFAULT_SAME_EVENT_SECS
+    after the previous one belongs to the same event.
+
+    """
+    def __init__(self, rate):
+        """Initializes an _EventMerger.
+
+        @param rate: Sampling rate.
+
+        """
+        self._same_event_samples = rate * DEFAULT_SAME_EVENT_SECS
+        self._previous_index = None
+        # A list of [first_index, last_index] of each event.
+        self.events = []
+
+
+    def add(self, indices):
+        """Adds indices after those of the previous calls.
+
+        @param indices: A sorted numpy array of indices.
+
+        """
+        if not len(indices):
+            return
+        new_events = numpy.flatnonzero(
+                numpy.diff(indices) >= self._same_event_samples) + 1
+        firsts = indices[numpy.concatenate(([0], new_events))].tolist()
+        lasts = indices[numpy.concatenate((new_events - 1,
+                                           [len(indices) - 1]))].tolist()
+        if (self._previous_index is not None and
+            firsts[0] - self._previous_index < self._same_event_samples):
+            self.events[-1][1] = lasts.pop(0)
+            firsts.pop(0)
+        self.events.extend([first, last] for first, last in zip(firsts, lasts))
+        self._previous_index = lasts[-1] if lasts else self.events[-1][1]
@@ -262,5 +262,42 @@ class QualityMeasurementTest(unittest.TestCase):
             self.assertTrue(self.volume_changing[i] ==
                             result['volume_changes'][i][1])
 
+    def testStreamingSameAsWholeSignal(self):
+        """Streaming measurement gives the results of the whole signal one."""
+        self.add_noise()
+        self.generate_artifacts_before_playback()
+        self.generate_artifacts_after_playback()
+        self.generate_delay()
+        self.generate_burst_during_playback()
+        # noise_level adds random noise to its reference sine wave.
+        numpy.random.seed(0)
+        expected = audio_quality_measurement.quality_measurement(
+                self.y, self.rate, dominant_frequency=self.freq)
+        for chunk_secs in [0.037, 0.25, 10]:
+            numpy.random.seed(0)
+            result = audio_quality_measurement.quality_measurement_streaming(
+                    numpy.array(self.y), self.rate,
+                    dominant_frequency=self.freq, chunk_secs=chunk_secs)
+            self.assertEqual(result['artifacts'], expected['artifacts'])
+            self.assertEqual(result['volume_changes'],
+                             expected['volume_changes'])
+            self.assertAlmostEqual(result['equivalent_noise_level'],
+                                   expected['equivalent_noise_level'])
+
+
+    def testStreamingVolumeChanging(self):
+        """Streaming measurement finds the dominant frequency by itself."""
+        self.generate_volume_changing()
+        result = audio_quality_measurement.quality_measurement_streaming(
+                numpy.array(self.y), self.rate, chunk_secs=0.5)
+        self.assertEqual(len(result['volume_changes']),
+                         len(self.volume_changing))
+        for i in xrange(len(self.volume_changing)):
+            self.assertTrue(abs(self.volume_changing_time[i] -
+                                result['volume_changes'][i][0]) < 0.01)
+            self.assertTrue(self.volume_changing[i] ==
+                            result['volume_changes'][i][1])
+
+
 if __name__ == '__main__':
     unittest.main()
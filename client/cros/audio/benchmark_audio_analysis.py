@@ -0,0 +1,196 @@
+#!/usr/bin/python
+
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Benchmarks the audio analysis of long captures.
+
+It generates a noisy sine wave capture with a few artifacts, and times the
+spectral analysis, the peak detection on its spectrum and the anomaly
+detection. With --compare, the peak detection and the anomaly detection are
+also run with the per-point and per-offset loops they used to be, and the
+results are checked to be identical.
+
+Usage:   benchmark_audio_analysis.py [--secs SECS] [--rate RATE] [--compare]
+
+Example:
+    Benchmark a 3 minute 48kHz capture against the loops:
+    $ ./benchmark_audio_analysis.py --secs 180 --compare
+"""
+
+import argparse
+import logging
+import numpy
+import sys
+import time
+
+# Normal autotest environment.
+try:
+    import common
+    from autotest_lib.client.cros.audio import audio_analysis
+# Standalone execution without autotest environment.
+except ImportError:
+    import audio_analysis
+
+
+def _time(msg, func, *args):
+    """Prints the time taken by func(*args), and returns its result."""
+    start = time.time()
+    result = func(*args)
+    print '  %-36s %8.3f s' % (msg, time.time() - start)
+    return result
+
+
+def generate_capture(secs, rate, freq):
+    """Generates a noisy sine wave with artifacts.
+
+    @param secs: The length of the capture in seconds.
+    @param rate: The sampling rate.
+    @param freq: The frequency of the sine wave.
+
+    @returns: A 1-D numpy array.
+
+    """
+    numpy.random.seed(0)
+    length = int(secs * rate)
+    signal = numpy.sin(2 * numpy.pi * freq * numpy.arange(length) /
+                       float(rate))
+    signal += numpy.random.standard_normal(length) * 0.3
+    # One dropout and one constant artifact every 10 seconds.
+    for start in xrange(rate, length, 10 * rate):
+        signal[start:start + 300] = 0
+        signal[start + rate / 2:start + rate / 2 + 100] = 0.7
+    return signal
+
+
+def loop_peak_detection(array, window_size):
+    """Detects peaks like audio_analysis.peak_detection, one point at a time.
+
+    @param array: A 1-D numpy array.
+    @param window_size: The window to detect peaks.
+
+    @returns: Same as audio_analysis.peak_detection.
+
+    """
+    half_window_size = window_size / 2
+    length = len(array)
+    results = []
+    mid = 0
+    while mid < length:
+        # Only consider value greater than 0.
+        if array[mid] == 0:
+            mid += 1
+            continue
+        left = max(0, mid - half_window_size)
+        right = min(length - 1, mid + half_window_size)
+        is_peak = all(array[index] < array[mid] for index in xrange(left, mid))
+        if mid == right:
+            next_mid = right + 1
+        else:
+            # Favor the larger index for the next candidate.
+            next_mid = max(xrange(right, mid, -1), key=lambda i: array[i])
+            if array[next_mid] >= array[mid]:
+                is_peak = False
+        if is_peak:
+            results.append((mid, array[mid]))
+            next_mid = right + 1
+        mid = next_mid
+    return sorted(results, key=lambda x: x[1], reverse=True)
+
+
+def loop_anomaly_detection(signal, rate, freq):
+    """Detects anomalies like audio_analysis.anomaly_detection, correlating
+    each block with the golden pattern at each offset.
+
+    @param signal: A 1-D numpy array.
+    @param rate: The sampling rate.
+    @param freq: The expected frequency of signal.
+
+    @returns: Same as audio_analysis.anomaly_detection.
+
+    """
+    block_size = audio_analysis.ANOMALY_DETECTION_BLOCK_SIZE
+    golden_y = audio_analysis._generate_golden_pattern(rate, freq, block_size)
+    results = []
+    for start in xrange(0, len(signal), block_size / 2):
+        test_signal = signal[start:start + block_size]
+        if (numpy.linalg.norm(test_signal) <=
+            audio_analysis._MINIMUM_SIGNAL_NORM):
+            results.append(start)
+            continue
+        max_corr = max(
+                audio_analysis._get_correlation_index(
+                        golden_y[offset:offset + len(test_signal)],
+                        test_signal)
+                for offset in xrange(len(golden_y) - len(test_signal) + 1))
+        if max_corr < audio_analysis.PATTERN_MATCHING_THRESHOLD:
+            results.append(start)
+    return [float(x) / rate for x in results]
+
+
+def benchmark(secs, rate, freq, compare):
+    """Benchmarks the analysis of a synthetic capture.
+
+    @param secs: The length of the capture in seconds.
+    @param rate: The sampling rate.
+    @param freq: The frequency of the sine wave.
+    @param compare: True to also run the loops and compare the results.
+
+    @returns: True if the results of the loops are identical, or not
+              compared.
+
+    """
+    signal = generate_capture(secs, rate, freq)
+    print '%d seconds at %d Hz (%d samples):' % (secs, rate, len(signal))
+
+    _time('spectral_analysis', audio_analysis.spectral_analysis, signal, rate)
+
+    length = len(signal)
+    x_f = audio_analysis._rfft_freq(length, rate)
+    abs_y_f = numpy.abs(2.0 / length *
+                        numpy.fft.rfft(signal * numpy.hanning(length)))
+    abs_y_f[abs_y_f < abs_y_f.max() * audio_analysis.DEFAULT_MIN_PEAK_RATIO] = 0
+    window_size = int(audio_analysis.PEAK_WINDOW_SIZE_HZ / x_f[1])
+    peaks = _time('peak_detection', audio_analysis.peak_detection, abs_y_f,
+                  window_size)
+    anomalies = _time('anomaly_detection', audio_analysis.anomaly_detection,
+                      signal, rate, freq)
+    print '  %d peaks, %d anomalies' % (len(peaks), len(anomalies))
+    if not compare:
+        return True
+
+    same = True
+    if peaks != _time('peak detection loop', loop_peak_detection, abs_y_f,
+                      window_size):
+        print '  Error: peak detection results differ.'
+        same = False
+    if anomalies != _time('anomaly detection loop', loop_anomaly_detection,
+                          signal, rate, freq):
+        print '  Error: anomaly detection results differ.'
+        same = False
+    return same
+
+
+def parse_args():
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(
+            description='Benchmark the audio analysis of long captures.')
+    parser.add_argument('--secs', type=float, default=180,
+                        help='Length of the capture in seconds '
+                             '(default: 180)')
+    parser.add_argument('--rate', type=int, default=48000,
+                        help='Sampling rate (default: 48000)')
+    parser.add_argument('--freq', type=float, default=1000,
+                        help='Frequency of the sine wave (default: 1000)')
+    parser.add_argument('--compare', action='store_true', default=False,
+                        help='Also run the per-point and per-offset loops, '
+                             'which take minutes, and compare the results.')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    if not benchmark(args.secs, args.rate, args.freq, args.compare):
+        sys.exit(1)
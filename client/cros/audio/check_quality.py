@@ -40,6 +40,13 @@ QualityParams = collections.namedtuple('QualityParams',
        'burst_amplitude_threshold'])
 
 
+# The number of seconds of samples read at a time in streaming mode.
+STREAMING_CHUNK_SECS = 10
+
+# The size of the chunk ID and chunk size fields starting a wave file.
+_RIFF_CHUNK_HEADER_SIZE = 8
+
+
 def add_args(parser):
     """Adds command line arguments."""
     parser.add_argument('filename', metavar='FILE', type=str,
@@ -51,6 +58,11 @@ def add_args(parser):
                         help='Show debug message.')
     parser.add_argument('--spectral-only', action='store_true', default=False,
                         help='Only do spectral analysis on each channel.')
+    parser.add_argument('--streaming', action='store_true', default=False,
+                        help='Map the file into memory and analyze it chunk '
+                             'by chunk instead of reading it at once. '
+                             'Use this for recordings which do not fit in '
+                             'memory.')
     parser.add_argument('--freqs', metavar='FREQ', type=float,
                         nargs='*',
                         help='Expected frequencies in the channels. '
@@ -145,15 +157,20 @@ class WaveFile(object):
         rate: sampling rate.
 
     """
-    def __init__(self, filename):
+    def __init__(self, filename, streaming=False):
         """Inits a wave file.
 
         @param filename: file name of the wave file.
+        @param streaming: True to map the samples in the file into memory
+                          instead of reading them.
 
         """
         self.raw_data = None
         self.rate = None
 
+        self._filename = None
+        self._streaming = streaming
+
         self._wave_reader = None
         self._n_channels = None
         self._sample_width_bits = None
@@ -206,6 +223,7 @@ class WaveFile(object):
 
         """
         try:
+            self._filename = filename
             self._wave_reader = wave.open(filename, 'r')
             self._read_wave_header()
             self._read_wave_binary()
@@ -244,8 +262,23 @@ class WaveFile(object):
 
     def _read_wave_binary(self):
         """Reads in samples in wave file."""
-        self._binary = self._wave_reader.readframes(self._n_frames)
         format_str = 'S%d_LE' % self._sample_width_bits
+        if self._streaming:
+            self.raw_data = audio_data.AudioRawData(
+                    binary=None,
+                    channel=self._n_channels,
+                    sample_format=format_str)
+            # The wave module does not expose where the samples start in the
+            # file, but its data chunk knows its offset in the RIFF chunk,
+            # which follows the RIFF chunk header.
+            self.raw_data.read_file(
+                    self._filename,
+                    offset=(_RIFF_CHUNK_HEADER_SIZE +
+                            self._wave_reader._data_chunk.offset),
+                    n_frames=self._n_frames)
+            return
+
+        self._binary = self._wave_reader.readframes(self._n_frames)
         self.raw_data = audio_data.AudioRawData(
                 binary=self._binary,
                 channel=self._n_channels,
@@ -269,15 +302,19 @@ class QualityFailure(QualityCheckerError):
 
 class QualityChecker(object):
     """Quality checker controls the flow of checking quality of raw data."""
-    def __init__(self, raw_data, rate):
+    def __init__(self, raw_data, rate, streaming=False):
         """Inits a quality checker.
 
         @param raw_data: An audio_data.AudioRawData object.
         @param rate: Sampling rate.
+        @param streaming: True to analyze the signal chunk by chunk instead of
+                          normalizing and analyzing it at once. Use this when
+                          the channel data of raw_data is memory-mapped.
 
         """
         self._raw_data = raw_data
         self._rate = rate
+        self._streaming = streaming
         self._spectrals = []
         self._quality_result = []
 
@@ -294,7 +331,7 @@ class QualityChecker(object):
         self.has_data()
         for channel_idx in xrange(self._raw_data.channel):
             signal = self._raw_data.channel_data[channel_idx]
-            max_abs = max(numpy.abs(signal))
+            max_abs = self._get_max_abs(signal)
             logging.debug('Channel %d max abs signal: %f', channel_idx, max_abs)
             if max_abs == 0:
                 logging.info('No data on channel %d, skip this channel',
@@ -303,12 +340,19 @@ class QualityChecker(object):
 
             saturate_value = audio_data.get_maximum_value_from_sample_format(
                     self._raw_data.sample_format)
-            normalized_signal = audio_analysis.normalize_signal(
-                    signal, saturate_value)
             logging.debug('saturate_value: %f', saturate_value)
-            logging.debug('max signal after normalized: %f', max(normalized_signal))
-            spectral = audio_analysis.spectral_analysis(
-                    normalized_signal, self._rate)
+            if self._streaming:
+                normalized_signal = audio_analysis.NormalizedSignal(
+                        signal, saturate_value)
+                spectral = audio_analysis.streaming_spectral_analysis(
+                        normalized_signal, self._rate)
+            else:
+                normalized_signal = audio_analysis.normalize_signal(
+                        signal, saturate_value)
+                logging.debug('max signal after normalized: %f',
+                              max(normalized_signal))
+                spectral = audio_analysis.spectral_analysis(
+                        normalized_signal, self._rate)
 
             logging.debug('Channel %d spectral:\n%s', channel_idx,
                           pprint.pformat(spectral))
@@ -321,7 +365,12 @@ class QualityChecker(object):
                           pprint.pformat(spectral))
 
             if check_quality:
-                quality = audio_quality_measurement.quality_measurement(
+                if self._streaming:
+                    measure = (audio_quality_measurement.
+                               quality_measurement_streaming)
+                else:
+                    measure = audio_quality_measurement.quality_measurement
+                quality = measure(
                         signal=normalized_signal,
                         rate=self._rate,
                         dominant_frequency=spectral[0][0],
@@ -338,6 +387,27 @@ class QualityChecker(object):
             self._spectrals.append(spectral)
 
 
+    def _get_max_abs(self, signal):
+        """Gets the maximum absolute value of a signal.
+
+        @param signal: A 1-D array-like object for one-channel PCM data.
+
+        @returns: The maximum absolute value in signal.
+
+        """
+        if not self._streaming:
+            return max(numpy.abs(signal))
+        chunk_size = self._rate * STREAMING_CHUNK_SECS
+        max_abs = 0
+        for start in xrange(0, len(signal), chunk_size):
+            # Casts to int64 first so that abs of the minimum value of the
+            # sample format does not overflow.
+            chunk = numpy.asarray(signal[start:start + chunk_size],
+                                  dtype=numpy.int64)
+            max_abs = max(max_abs, numpy.max(numpy.abs(chunk)))
+        return max_abs
+
+
     def has_data(self):
         """Checks if data has been set.
 
@@ -431,18 +501,21 @@ def read_audio_file(args):
 
     """
     if args.filename.endswith('.wav'):
-        wavefile = WaveFile(args.filename)
+        wavefile = WaveFile(args.filename, streaming=args.streaming)
         raw_data = wavefile.raw_data
         rate = wavefile.rate
     elif args.filename.endswith('.raw'):
         binary = None
-        with open(args.filename, 'r') as f:
-            binary = f.read()
+        if not args.streaming:
+            with open(args.filename, 'r') as f:
+                binary = f.read()
 
         raw_data = audio_data.AudioRawData(
                 binary=binary,
                 channel=args.channel,
                 sample_format='S%d_LE' % args.bit_width)
+        if args.streaming:
+            raw_data.read_file(args.filename)
         rate = args.rate
     else:
         raise CheckQualityError(
@@ -482,7 +555,7 @@ if __name__ == "__main__":
 
     raw_data, rate = read_audio_file(args)
 
-    checker = QualityChecker(raw_data, rate)
+    checker = QualityChecker(raw_data, rate, streaming=args.streaming)
 
     quality_params = get_quality_params(args)
 
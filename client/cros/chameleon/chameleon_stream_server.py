@@ -32,16 +32,30 @@ Sampe Code for dump realtime audio page:
     (page_count, data) = audio_page
     f.write(data)
 
+Sampe Code for iterating realtime video frames without copying them:
+  stream.dump_realtime_video_frame(False, RealtimeMode.BestEffort)
+  for video_frame in stream.iter_realtime_video_frames():
+    (frame_number, width, height, channel, data) = video_frame
+    # data is a numpy array of shape (height, width, 3), which is overwritten
+    # by later frames.
+    image = Image.fromarray(data)
+    image.save('%d.bmp' % frame_number)
+
 """
 
 import logging
 import socket
-from struct import calcsize, pack, unpack
+from struct import calcsize, pack, unpack, unpack_from
+
+import numpy
 
 
 CHAMELEON_STREAN_SERVER_PORT = 9994
 SUPPORT_MAJOR_VERSION = 1
 SUPPORT_MINOR_VERSION = 0
+# Number of frames received by the video frame iterators before the buffer
+# of a frame is reused.
+DEFAULT_FRAME_RING_SIZE = 4
 
 
 class StreamServerVersionError(Exception):
@@ -74,6 +88,35 @@ class RealtimeMode(object):
     LogStrings = ['None', 'Stop when overflow', 'Best effort']
 
 
+class _FrameBufferRing(object):
+    """A ring of buffers reused to receive video frames."""
+
+    def __init__(self, size):
+        """Constructs a _FrameBufferRing.
+
+        @param size: Number of buffers in the ring.
+
+        """
+        self._buffers = [bytearray() for _ in xrange(size)]
+        self._index = 0
+
+    def get(self, length):
+        """Get the next buffer of the ring.
+
+        @param length: Minimum size of the buffer in bytes. The buffer is
+                       reallocated if it is smaller.
+
+        @return: A bytearray of at least length bytes.
+
+        """
+        buffer = self._buffers[self._index]
+        if len(buffer) < length:
+            buffer = bytearray(length)
+            self._buffers[self._index] = buffer
+        self._index = (self._index + 1) % len(self._buffers)
+        return buffer
+
+
 class ChameleonStreamServer(object):
     """
     This class provides easy-to-use APIs to access the stream server.
@@ -146,36 +189,73 @@ class ChameleonStreamServer(object):
         """Check if the message type is data type."""
         return (self._DATA_TYPE << 8) & message
 
+    def _receive_into(self, sock, buffer, length):
+        """Receive exactly length bytes into the beginning of buffer.
+
+        The bytes are received in place, without intermediate strings.
+
+        @param sock: Which socket to be used.
+        @param buffer: A bytearray of at least length bytes.
+        @param length: Number of bytes to receive.
+
+        @return: True if all the bytes are received, False if the connection
+        is closed before.
+
+        """
+        view = memoryview(buffer)
+        received = 0
+        while received < length:
+            count = sock.recv_into(view[received:length])
+            if not count:
+                return False
+            received += count
+        return True
+
+    def _receive_packet_head(self, sock):
+        """Receive the head of one packet.
+
+        @param sock: Which socket to be used.
+
+        @return: A tuple with 3 elements contains message_type, error code and
+        length. None if the connection is closed.
+
+        """
+        head = bytearray(self._PACKET_HEAD_SIZE)
+        if not self._receive_into(sock, head, self._PACKET_HEAD_SIZE):
+            return None
+        return unpack_from(self.packet_head_struct, head)
+
+    def _receive_content(self, sock, length):
+        """Receive the content of one packet.
+
+        @param sock: Which socket to be used.
+        @param length: The length in the packet head.
+
+        @return: The content string. None if the connection is closed.
+
+        """
+        content = bytearray(length)
+        if not self._receive_into(sock, content, length):
+            return None
+        return str(content)
+
     def _receive_whole_packet(self, sock):
         """Receive one whole packet, contains packet head and content.
 
         @param sock: Which socket to be used.
 
         @return: A tuple with 4 elements contains message_type, error code,
-        length and content.
+        length and content. None if the connection is closed.
 
         """
-        # receive packet header
-        data = sock.recv(self._PACKET_HEAD_SIZE)
-        if not data:
+        head = self._receive_packet_head(sock)
+        if head is None:
             return None
+        message_type, error_code, length = head
 
-        while len(data) != self._PACKET_HEAD_SIZE:
-            remain_length = self._PACKET_HEAD_SIZE - len(data)
-            recv_content = sock.recv(remain_length)
-            data += recv_content
-
-        message_type, error_code, length = unpack(self.packet_head_struct, data)
-
-        # receive content
-        content = ''
-        remain_length = length
-        while remain_length:
-            recv_content = sock.recv(remain_length)
-            if not recv_content:
-                return None
-            remain_length -= len(recv_content)
-            content += recv_content
+        content = self._receive_content(sock, length)
+        if content is None:
+            return None
 
         if error_code != ErrorCode.OK:
             logging.warn('Receive error code %d, %r', error_code, content)
@@ -295,34 +375,65 @@ class ChameleonStreamServer(object):
                                           len(content))
         return head + content
 
-    def _receive_video_frame(self):
+    def _receive_video_frame(self, frame_ring=None):
         """Receive one video frame from server.
 
         This function will assume it only can receive video frame data packet
         from server. Unless the error code is not OK.
 
+        The frame data are received directly into their buffer, after the
+        video frame head.
+
+        @param frame_ring: A _FrameBufferRing to receive the frame data into.
+                           None to receive them into a new string.
+
         @return A tuple with error code on first element.
                 if error code is OK. A decoded values will be stored in a tuple.
                 (error_code, frame number, width, height, channel, data)
+                where data is a string if frame_ring is None, otherwise a
+                numpy uint8 array of shape (height, width, bytes per pixel)
+                viewing a buffer of frame_ring.
                 if error code is not OK. It will return a tuple with
                 (error code, content). The content is the error message from
-                server.
+                server. The error code is None if the connection is closed.
 
         @raise ValueError if packet is not data packet.
 
         """
-        (message, error_code, _, content) = self._receive_whole_packet(
-            self._video_sock)
-        if error_code != ErrorCode.OK:
-            return (error_code, content)
-
-        if not self._is_data_type(message):
+        sock = self._video_sock
+        head = self._receive_packet_head(sock)
+        if head is None:
+            return (None, 'Connection closed')
+        (message, error_code, length) = head
+
+        if error_code != ErrorCode.OK or not self._is_data_type(message):
+            content = self._receive_content(sock, length)
+            if content is None:
+                return (None, 'Connection closed')
+            if error_code != ErrorCode.OK:
+                logging.warn('Receive error code %d, %r', error_code, content)
+                return (error_code, content)
             raise ValueError('Message is not data')
 
         video_frame_head_size = calcsize(self.video_frame_data_struct)
-        frame_number, width, height, channel, _, _, _ = unpack(
-            self.video_frame_data_struct, content[:video_frame_head_size])
-        data = content[video_frame_head_size:]
+        frame_head = bytearray(video_frame_head_size)
+        data_length = length - video_frame_head_size
+        if frame_ring is None:
+            buffer = bytearray(data_length)
+        else:
+            buffer = frame_ring.get(data_length)
+        if not (self._receive_into(sock, frame_head, video_frame_head_size) and
+                self._receive_into(sock, buffer, data_length)):
+            return (None, 'Connection closed')
+
+        frame_number, width, height, channel, _, _, _ = unpack_from(
+            self.video_frame_data_struct, frame_head)
+        if frame_ring is None:
+            data = str(buffer)
+        else:
+            data = numpy.frombuffer(buffer, dtype=numpy.uint8,
+                                    count=data_length).reshape(height, width,
+                                                               -1)
         return (error_code, frame_number, width, height, channel, data)
 
     def _get_version(self):
@@ -520,6 +631,63 @@ class ChameleonStreamServer(object):
 
         return frame_info[1:]
 
+    def iter_video_frames(self, ring_size=DEFAULT_FRAME_RING_SIZE):
+        """Iterate over video frames from server after calling
+        dump_video_frame().
+
+        Unlike receive_video_frame(), frames are received into a ring of
+        reused buffers instead of new strings, and are handed out as numpy
+        arrays viewing those buffers without copying them. The data of a frame
+        are overwritten once ring_size more frames are received; copy them to
+        keep them longer.
+
+        @param ring_size: Number of frame buffers in the ring.
+
+        @yield A tuple with video frame information.
+               (frame number, width, height, channel, data) where data is a
+               numpy uint8 array of shape (height, width, bytes per pixel).
+
+        @raise ValueError if packet is not data packet.
+
+        """
+        frame_ring = _FrameBufferRing(ring_size)
+        while self._remain_frame_count:
+            self._remain_frame_count -= 1
+            frame_info = self._receive_video_frame(frame_ring)
+            if frame_info[0] != ErrorCode.OK:
+                self._remain_frame_count = 0
+                return
+            yield frame_info[1:]
+
+    def iter_realtime_video_frames(self, ring_size=DEFAULT_FRAME_RING_SIZE):
+        """Iterate over video frames from server after calling
+        dump_realtime_video_frame(). The video frame may be dropped if we use
+        BestEffort mode. We can detect it by the frame number.
+
+        Frames are handed out as in iter_video_frames(), so the data of a frame
+        are overwritten once ring_size more frames are received.
+
+        @param ring_size: Number of frame buffers in the ring.
+
+        @yield A tuple with video frame information.
+               (frame number, width, height, channel, data) where data is a
+               numpy uint8 array of shape (height, width, bytes per pixel).
+               The iteration stops if error happens or no more frames.
+
+        @raise ValueError if packet is not data packet.
+
+        """
+        frame_ring = _FrameBufferRing(ring_size)
+        while self._is_realtime_video:
+            frame_info = self._receive_video_frame(frame_ring)
+            # We can still receive video frame for drop case.
+            while frame_info[0] == ErrorCode.VideoMemoryOverflowDrop:
+                frame_info = self._receive_video_frame(frame_ring)
+
+            if frame_info[0] != ErrorCode.OK:
+                return
+            yield frame_info[1:]
+
     def stop_dump_realtime_video_frame(self):
         """Ask server to stop dump realtime video frame."""
         if not self._is_realtime_video:
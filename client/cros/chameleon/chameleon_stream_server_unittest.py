@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Unit tests for the video frame receiving of chameleon_stream_server."""
+
+import struct
+import unittest
+
+import numpy
+
+import common
+from autotest_lib.client.cros.chameleon import chameleon_stream_server
+from autotest_lib.client.cros.chameleon.chameleon_stream_server import (
+        ChameleonStreamServer, ErrorCode)
+
+
+class FakeSocket(object):
+    """A socket receiving given bytes in chunks of at most chunk_size."""
+
+    def __init__(self, data, chunk_size):
+        """Constructs a FakeSocket.
+
+        @param data: The string to receive. The connection is closed after.
+        @param chunk_size: Maximum number of bytes of one recv_into() call.
+
+        """
+        self._data = data
+        self._chunk_size = chunk_size
+        self.recv_sizes = []
+
+    def recv_into(self, buffer):
+        size = min(len(buffer), self._chunk_size, len(self._data))
+        buffer[:size] = self._data[:size]
+        self._data = self._data[size:]
+        self.recv_sizes.append(size)
+        return size
+
+
+def _frame_packet(frame_number, width, height, fill):
+    """Builds a realtime video frame data packet.
+
+    @param frame_number: The frame number.
+    @param width: The frame width.
+    @param height: The frame height.
+    @param fill: The value of every byte of the RGB frame data.
+
+    @return: The packet string.
+
+    """
+    head = struct.pack(ChameleonStreamServer.video_frame_data_struct,
+                       frame_number, width, height, 1, 0, 0, 0)
+    content = head + chr(fill) * (width * height * 3)
+    message = ((ChameleonStreamServer._DATA_TYPE << 8) |
+               ChameleonStreamServer._DumpRealtimeVideoFrame)
+    return struct.pack(ChameleonStreamServer.packet_head_struct, message,
+                       ErrorCode.OK, len(content)) + content
+
+
+def _error_packet(error_code, content):
+    """Builds a response packet with an error code.
+
+    @param error_code: A value of ErrorCode.
+    @param content: The error message.
+
+    @return: The packet string.
+
+    """
+    message = ((ChameleonStreamServer._RESPONSE_TYPE << 8) |
+               ChameleonStreamServer._DumpRealtimeVideoFrame)
+    return struct.pack(ChameleonStreamServer.packet_head_struct, message,
+                       error_code, len(content)) + content
+
+
+class ChameleonStreamServerTest(unittest.TestCase):
+    """Tests receiving video frames from a fake socket."""
+
+    def _make_server(self, data, chunk_size=5):
+        """Makes a server whose video socket receives data.
+
+        @param data: The string received by the video socket.
+        @param chunk_size: Maximum number of bytes of one recv_into() call.
+
+        """
+        server = ChameleonStreamServer('localhost')
+        server._video_sock = FakeSocket(data, chunk_size)
+        return server
+
+    def test_receive_into_partial_chunks(self):
+        server = self._make_server('0123456789abc', chunk_size=4)
+        buffer = bytearray(12)
+        self.assertTrue(server._receive_into(server._video_sock, buffer, 10))
+        self.assertEqual(buffer[:10], '0123456789')
+        self.assertEqual(server._video_sock.recv_sizes, [4, 4, 2])
+        self.assertFalse(server._receive_into(server._video_sock, buffer, 4))
+
+    def test_iter_video_frames(self):
+        server = self._make_server(
+                ''.join(_frame_packet(number, 4, 2, number)
+                        for number in xrange(5)))
+        server._remain_frame_count = 5
+        frames = list(server.iter_video_frames(ring_size=2))
+
+        self.assertEqual([frame[:4] for frame in frames],
+                         [(number, 4, 2, 1) for number in xrange(5)])
+        for frame in frames:
+            self.assertEqual(frame[4].shape, (2, 4, 3))
+            self.assertEqual(frame[4].dtype, numpy.uint8)
+        # Frames share the buffers of the ring, the latest frames are intact.
+        self.assertTrue(numpy.may_share_memory(frames[0][4], frames[2][4]))
+        self.assertTrue(numpy.may_share_memory(frames[2][4], frames[4][4]))
+        self.assertFalse(numpy.may_share_memory(frames[3][4], frames[4][4]))
+        self.assertTrue((frames[0][4] == 4).all())
+        self.assertTrue((frames[3][4] == 3).all())
+        self.assertEqual(server._remain_frame_count, 0)
+
+    def test_ring_grows_for_larger_frames(self):
+        ring = chameleon_stream_server._FrameBufferRing(2)
+        small = ring.get(10)
+        self.assertEqual(len(small), 10)
+        self.assertIsNot(ring.get(10), small)
+        self.assertIs(ring.get(5), small)
+        large = ring.get(20)
+        self.assertEqual(len(large), 20)
+        self.assertIsNot(ring.get(20), small)
+        self.assertIs(ring.get(20), large)
+
+    def test_iter_realtime_video_frames_skips_drops(self):
+        server = self._make_server(
+                _frame_packet(1, 2, 2, 1) +
+                _error_packet(ErrorCode.VideoMemoryOverflowDrop, 'drop') +
+                _frame_packet(3, 2, 2, 3) +
+                _error_packet(ErrorCode.VideoMemoryOverflowStop, 'stop') +
+                _frame_packet(4, 2, 2, 4))
+        server._is_realtime_video = True
+        frames = [frame[0] for frame in server.iter_realtime_video_frames()]
+        self.assertEqual(frames, [1, 3])
+
+    def test_connection_closed_mid_packet(self):
+        first = _frame_packet(1, 4, 2, 1)
+        second = _frame_packet(2, 4, 2, 2)
+        # In the packet head, the frame head and the frame data.
+        for cut in (4, 12, len(second) - 1):
+            data = first + second[:cut]
+            server = self._make_server(data)
+            server._is_realtime_video = True
+            frames = [frame[0]
+                      for frame in server.iter_realtime_video_frames()]
+            self.assertEqual(frames, [1])
+
+            server = self._make_server(data)
+            server._remain_frame_count = 2
+            self.assertEqual(server.receive_video_frame()[0], 1)
+            self.assertIsNone(server.receive_video_frame())
+            self.assertEqual(server._remain_frame_count, 0)
+
+    def test_closed_in_error_packet(self):
+        packet = _error_packet(ErrorCode.VideoMemoryOverflowDrop, 'dropped')
+        server = self._make_server(packet[:-2])
+        self.assertEqual(server._receive_video_frame(),
+                         (None, 'Connection closed'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,9 @@
 
 import ConfigParser
 
+from autotest_lib.client.cros.image_comparison import numpy_image_comparer
 from autotest_lib.client.cros.image_comparison import pdiff_image_comparer
 from autotest_lib.client.cros.image_comparison import publisher
-from autotest_lib.client.cros.image_comparison import rgb_image_comparer
 from autotest_lib.client.cros.image_comparison import verifier
 from autotest_lib.client.cros.video import method_logger
 
@@ -44,10 +44,11 @@ class ImageComparisonFactory(object):
     @method_logger.log
     def make_rgb_comparer(self):
         """
-        @returns an RGBImageComparer object initialized with config. values.
+        @returns a NumpyImageComparer object initialized with config. values.
+                 It counts the same pixels as the RGBImageComparer, faster.
 
         """
-        return rgb_image_comparer.RGBImageComparer(self.pixel_thres)
+        return numpy_image_comparer.NumpyImageComparer(self.pixel_thres)
 
 
     @method_logger.log
@@ -63,8 +64,8 @@ class ImageComparisonFactory(object):
     def make_image_verifier(self, image_comparer, stop_on_first_failure=False):
         """
         @param image_comparer: any object that implements compare(). Currently,
-                               it could RGBImageComparer or
-                               UploadOnFailComparer.
+                               it could RGBImageComparer,
+                               NumpyImageComparer or UploadOnFailComparer.
 
         @param stop_on_first_failure: bool, True if we should stop the test when
                                       we encounter the first failed comparison.
@@ -0,0 +1,188 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import logging
+import os
+from multiprocessing import pool
+
+import numpy
+from PIL import Image
+
+from autotest_lib.client.cros.image_comparison import comparison_result
+from autotest_lib.client.cros.video import method_logger
+
+
+# Number of pixel rows compared at a time. A tile of a 4K frame is about 3MB.
+DEFAULT_TILE_ROWS = 256
+
+# Number of threads comparing the tiles of a frame.
+DEFAULT_MAX_THREADS = 4
+
+
+def load_rgb_array(img_path, box=None):
+    """
+    Decodes an image into an array of RGB pixels.
+
+    @param img_path: path, complete path to an image.
+    @param box: int tuple, left, upper, right, lower pixel coordinates
+                defining a box region to crop the image to.
+
+    @return: numpy array of uint8, of shape (height, width, 3).
+
+    """
+    image = Image.open(img_path)
+    if image.mode != 'RGB':
+        logging.debug('Image %s was not RGB. Converting to RGB.', img_path)
+        image = image.convert('RGB')
+    if box is not None:
+        image = image.crop(box)
+    return numpy.asarray(image, dtype=numpy.uint8)
+
+
+def count_diff_pixels(golden, test, pixel_threshold,
+                      tile_rows=DEFAULT_TILE_ROWS, thread_pool=None):
+    """
+    Counts the pixels that differ between two RGB images.
+
+    A pixel differs if the difference of any of its channels is above
+    pixel_threshold, like in RGBImageComparer. The images are compared
+    tile_rows rows at a time, which bounds the memory used by temporary
+    arrays.
+
+    @param golden: numpy array of uint8, of shape (height, width, 3).
+    @param test: numpy array of uint8, of shape (height, width, 3).
+    @param pixel_threshold: int, maximum difference of a channel for the
+                            pixel to be considered the same.
+    @param tile_rows: int, number of rows compared at a time.
+    @param thread_pool: ThreadPool to compare tiles in parallel, or None to
+                        compare them sequentially. numpy releases the GIL
+                        while comparing a tile.
+
+    @return: int, number of pixels that are different.
+
+    """
+    # ImageChops.difference only compares the area common to both images.
+    height = min(golden.shape[0], test.shape[0])
+    width = min(golden.shape[1], test.shape[1])
+
+    def count_tile(top):
+        """Counts the different pixels of the rows starting at top."""
+        bottom = min(height, top + tile_rows)
+        golden_tile = golden[top:bottom, :width]
+        test_tile = test[top:bottom, :width]
+        # Subtracting the minimum from the maximum does not wrap around.
+        diff = (numpy.maximum(golden_tile, test_tile) -
+                numpy.minimum(golden_tile, test_tile))
+        return int(numpy.count_nonzero(diff.max(axis=2) > pixel_threshold))
+
+    tops = xrange(0, height, tile_rows)
+    if thread_pool is None or len(tops) <= 1:
+        return sum(map(count_tile, tops))
+    return sum(thread_pool.map(count_tile, tops))
+
+
+class NumpyImageComparer(object):
+    """
+    Compares RGB images pixel by pixel with numpy.
+
+    Counts the same pixels as RGBImageComparer, but compares channels in
+    vectorized form instead of going through every distinct color of the
+    difference image, and compares large frames tile by tile in parallel.
+
+    The last golden image decoded is kept, so that comparing many frames
+    against the same golden image decodes it only once. It is decoded again
+    if the file is modified.
+
+    The comparer starts its threads the first time it needs them, and stops
+    them when it is used as a context manager and exits.
+
+    """
+
+
+    def __init__(self, rgb_pixel_threshold, tile_rows=DEFAULT_TILE_ROWS,
+                 max_threads=DEFAULT_MAX_THREADS):
+        """
+        @param rgb_pixel_threshold: int, maximum difference of a channel for
+                                    the pixel to be considered the same.
+        @param tile_rows: int, number of rows compared at a time.
+        @param max_threads: int, number of threads comparing tiles. 1
+                            compares sequentially.
+
+        """
+        self.pixel_threshold = rgb_pixel_threshold
+        self.tile_rows = tile_rows
+        self.max_threads = max_threads
+        # ((golden_img_path, mtime, size, box), array) of the last golden
+        # image decoded.
+        self._golden = None
+        self._thread_pool = None
+
+
+    @method_logger.log
+    def compare(self, golden_img_path, test_img_path, box=None):
+        """
+        Compares a test image against a known golden image.
+
+        @param golden_img_path: path, complete path to a golden image.
+        @param test_img_path: path, complete path to a test image.
+        @param box: int tuple, left, upper, right, lower pixel coordinates
+                    defining a box region within which the comparison is made.
+
+        @return: ComparisonResult, with the number of pixels that are
+                 different.
+
+        """
+        golden = self._get_golden(golden_img_path, box)
+        test = load_rgb_array(test_img_path, box)
+        diff_pixels = count_diff_pixels(golden, test, self.pixel_threshold,
+                                        self.tile_rows, self._get_pool())
+        logging.debug('%d pixels differ between %s and %s.', diff_pixels,
+                      golden_img_path, test_img_path)
+        return comparison_result.ComparisonResult(diff_pixels, '')
+
+
+    def _get_golden(self, golden_img_path, box):
+        """
+        Returns the decoded golden image, decoding it only if it changed.
+
+        @param golden_img_path: path, complete path to a golden image.
+        @param box: int tuple, the box to crop the golden image to.
+
+        @return: numpy array of uint8, of shape (height, width, 3).
+
+        """
+        stat = os.stat(golden_img_path)
+        key = (golden_img_path, stat.st_mtime, stat.st_size, box)
+        if self._golden is None or self._golden[0] != key:
+            self._golden = (key, load_rgb_array(golden_img_path, box))
+        return self._golden[1]
+
+
+    def _get_pool(self):
+        """
+        Returns the ThreadPool of the comparer, starting it if needed.
+
+        @return: ThreadPool of max_threads threads, or None if max_threads
+                 is 1.
+
+        """
+        if self._thread_pool is None and self.max_threads > 1:
+            self._thread_pool = pool.ThreadPool(self.max_threads)
+        return self._thread_pool
+
+
+    def close(self):
+        """Stops the threads of the comparer."""
+        if self._thread_pool is not None:
+            self._thread_pool.close()
+            self._thread_pool.join()
+            self._thread_pool = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,107 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+import common
+from autotest_lib.client.cros.image_comparison import numpy_image_comparer
+from autotest_lib.client.cros.image_comparison import rgb_image_comparer
+
+
+# Reference images of glbench, several slightly different renderings of the
+# same scenes.
+_IMAGES_DIR = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), '..', '..', 'deps',
+        'glbench-images', 'glbench_reference_images')
+
+
+def _fixture_images(prefix, count=3):
+    """Returns the paths of the first reference images of a glbench test."""
+    return sorted(glob.glob(os.path.join(_IMAGES_DIR, prefix + '.*.png')))[
+            :count]
+
+
+class NumpyImageComparerTest(unittest.TestCase):
+    """Unittest for NumpyImageComparer."""
+
+    def setUp(self):
+        self._images = (_fixture_images('fill_tex_trilinear_linear_01') +
+                        _fixture_images('varyings_shader_1'))
+        self.assertEqual(len(self._images), 6)
+
+
+    def _check_same_as_rgb_comparer(self, pixel_threshold, box=None,
+                                    **dargs):
+        """Checks that both comparers count the same pixels."""
+        rgb_comparer = rgb_image_comparer.RGBImageComparer(pixel_threshold)
+        with numpy_image_comparer.NumpyImageComparer(pixel_threshold,
+                                                     **dargs) as comparer:
+            for golden in self._images[:2] + self._images[3:4]:
+                expected = [rgb_comparer.compare(golden, test, box)
+                            for test in self._images]
+                results = [comparer.compare(golden, test, box)
+                           for test in self._images]
+                self.assertEqual(
+                        [r.diff_pixel_count for r in results],
+                        [r.diff_pixel_count for r in expected])
+                self.assertTrue(any(r.diff_pixel_count for r in expected))
+
+
+    def test_same_as_rgb_comparer(self):
+        """The pixels counted are the same as RGBImageComparer's."""
+        self._check_same_as_rgb_comparer(0)
+        self._check_same_as_rgb_comparer(10)
+
+
+    def test_same_as_rgb_comparer_in_box(self):
+        """The same pixels are counted in a box."""
+        self._check_same_as_rgb_comparer(0, box=(13, 50, 400, 301))
+
+
+    def test_same_as_rgb_comparer_tiled(self):
+        """Tiles compared in parallel or not count the same pixels."""
+        self._check_same_as_rgb_comparer(5, tile_rows=37)
+        self._check_same_as_rgb_comparer(5, tile_rows=37, max_threads=1)
+
+
+    def test_modified_golden_image(self):
+        """A golden image is decoded again when its file changes."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            golden = os.path.join(tmpdir, 'golden.png')
+            shutil.copy(self._images[0], golden)
+            with numpy_image_comparer.NumpyImageComparer(0) as comparer:
+                self.assertEqual(comparer.compare(
+                        golden, self._images[0]).diff_pixel_count, 0)
+                shutil.copy(self._images[3], golden)
+                os.utime(golden, (0, 0))
+                self.assertEqual(
+                        comparer.compare(golden, self._images[0]),
+                        rgb_image_comparer.RGBImageComparer(0).compare(
+                                self._images[3], self._images[0]))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+    def test_exit_stops_threads(self):
+        """The threads are stopped when the comparer exits."""
+        comparer = numpy_image_comparer.NumpyImageComparer(0, tile_rows=16)
+        with comparer:
+            comparer.compare(self._images[0], self._images[1])
+            thread_pool = comparer._thread_pool
+            self.assertIsNotNone(thread_pool)
+            comparer.compare(self._images[0], self._images[2])
+            self.assertIs(comparer._thread_pool, thread_pool)
+        self.assertIsNone(comparer._thread_pool)
+        self.assertFalse(any(worker.is_alive()
+                             for worker in thread_pool._pool))
+
+
+if __name__ == '__main__':
+    unittest.main()
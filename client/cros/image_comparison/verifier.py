@@ -70,9 +70,11 @@ class Verifier(object):
 
         test_run_comp_url = ''
 
-        for g_image, t_image in zip(golden_image_paths, test_image_paths):
+        # The comparer is entered once, so that the resources it holds, such
+        # as threads, are shared by all the comparisons.
+        with self.image_comparer:
+            for g_image, t_image in zip(golden_image_paths, test_image_paths):
 
-            with self.image_comparer:
                 comp_res = self.image_comparer.compare(g_image,
                                                        t_image,
                                                        self.box)
@@ -90,17 +92,17 @@ class Verifier(object):
                 if test_run_comp_url == '' and comp_res.comparison_url != '':
                     test_run_comp_url = os.path.dirname(comp_res.comparison_url)
 
-            if diff_pixels > self.threshold:
-                failure_count += 1
+                if diff_pixels > self.threshold:
+                    failure_count += 1
 
-                log_msg = ("Image: %s. Pixel diff: %d." %
-                           (os.path.basename(g_image), diff_pixels))
+                    log_msg = ("Image: %s. Pixel diff: %d." %
+                               (os.path.basename(g_image), diff_pixels))
 
-                logging.debug(log_msg)
-                log_msgs.append(log_msg)
+                    logging.debug(log_msg)
+                    log_msgs.append(log_msg)
 
-                if self.stop_on_first_failure:
-                    raise error.TestError("%s. Bailing out." % log_msg)
+                    if self.stop_on_first_failure:
+                        raise error.TestError("%s. Bailing out." % log_msg)
 
         if failure_count > 0:
             cnt = len(golden_image_paths)
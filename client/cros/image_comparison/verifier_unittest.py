@@ -0,0 +1,53 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import unittest
+
+import common
+from autotest_lib.client.common_lib import error
+from autotest_lib.client.cros.image_comparison import numpy_image_comparer
+from autotest_lib.client.cros.image_comparison import numpy_image_comparer_unittest
+from autotest_lib.client.cros.image_comparison import verifier
+
+
+class VerifierTest(unittest.TestCase):
+    """Unittest for Verifier."""
+
+    def setUp(self):
+        self._images = numpy_image_comparer_unittest._fixture_images(
+                'fill_tex_trilinear_linear_01')
+        self.assertEqual(len(self._images), 3)
+
+
+    def test_threads_shared_by_comparisons(self):
+        """The comparer starts its threads once for all the comparisons."""
+        comparer = numpy_image_comparer.NumpyImageComparer(0, tile_rows=16)
+        thread_pools = []
+        compare = comparer.compare
+        def record_pool_and_compare(*args):
+            result = compare(*args)
+            thread_pools.append(comparer._thread_pool)
+            return result
+        comparer.compare = record_pool_and_compare
+
+        verifier.Verifier(comparer, False, threshold=1e9).verify(
+                [self._images[0]] * 3, self._images)
+        self.assertEqual(len(thread_pools), 3)
+        self.assertIsNotNone(thread_pools[0])
+        self.assertTrue(all(pool is thread_pools[0] for pool in thread_pools))
+        self.assertIsNone(comparer._thread_pool)
+
+
+    def test_threads_stopped_on_failure(self):
+        """The threads are stopped when the verification bails out."""
+        comparer = numpy_image_comparer.NumpyImageComparer(0, tile_rows=16)
+        self.assertRaises(error.TestError,
+                          verifier.Verifier(comparer, True).verify,
+                          self._images[0], self._images[1])
+        self.assertIsNone(comparer._thread_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
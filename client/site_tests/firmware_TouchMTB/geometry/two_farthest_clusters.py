@@ -9,12 +9,22 @@
   - get_radii_of_two_minimal_enclosing_circles(): Get the radii of the
         two minimal enclosing circles
 
+  The *_in_array() variants take the points in a numpy array of shape
+  (number of points, 2) and compute the distances with numpy.
+
 """
 
 
+import numpy as np
+
 from .minicircle import minicircle
 
 
+# The max number of distances computed at a time by
+# get_two_farthest_points_in_array(). This bounds the memory used.
+MAX_DISTANCES_PER_BLOCK = 1 << 20
+
+
 def get_two_farthest_points(points):
     """Calculate two farthest points from the list of given points.
 
@@ -71,3 +81,62 @@ def get_radii_of_two_minimal_enclosing_circles(points):
     """
     return [minicircle(cluster).radius
             for cluster in get_two_farthest_clusters(points) if cluster]
+
+
+def get_two_farthest_points_in_array(points):
+    """Calculate two farthest points from an array of points.
+
+    This returns the same two points as get_two_farthest_points(). The
+    squared distances from a block of points to the points after them are
+    computed at a time.
+
+    @param points: a numpy array of shape (number of points, 2)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    num_points = len(points)
+    if num_points <= 1:
+        return points
+
+    max_dist = -1
+    block_size = max(1, MAX_DISTANCES_PER_BLOCK // num_points)
+    for begin in xrange(0, num_points, block_size):
+        # The first farthest pair in the scan order of
+        # get_two_farthest_points() has its first point before its second
+        # one, so that the points before the block can be skipped.
+        block = points[begin:begin + block_size]
+        diff = points[np.newaxis, begin:] - block[:, np.newaxis]
+        dist = np.square(diff).sum(axis=2)
+        index = dist.argmax()
+        if dist.flat[index] > max_dist:
+            max_dist = dist.flat[index]
+            i, j = np.unravel_index(index, dist.shape)
+            two_farthest_indexes = [begin + i, begin + j]
+
+    return points[two_farthest_indexes]
+
+
+def get_two_farthest_clusters_in_array(points):
+    """Classify an array of points into two farthest clusters.
+
+    @param points: a numpy array of shape (number of points, 2)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) <= 1:
+        return (points, points[:0])
+
+    fp1, fp2 = get_two_farthest_points_in_array(points)
+    dist_fp1 = np.sqrt(np.square(points - fp1).sum(axis=1))
+    dist_fp2 = np.sqrt(np.square(points - fp2).sum(axis=1))
+    nearer_fp1 = dist_fp1 <= dist_fp2
+    return (points[nearer_fp1], points[~nearer_fp1])
+
+
+def get_radii_of_two_minimal_enclosing_circles_in_array(points):
+    """Get the radii of the two minimal enclosing circles from an array of
+    points.
+
+    @param points: a numpy array of shape (number of points, 2)
+    """
+    return [minicircle(cluster).radius
+            for cluster in get_two_farthest_clusters_in_array(points)
+            if len(cluster)]
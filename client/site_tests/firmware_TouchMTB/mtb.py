@@ -13,11 +13,15 @@ import sys
 
 from collections import defaultdict, namedtuple, OrderedDict
 
+import numpy as np
+
 from firmware_constants import AXIS, GV, MTB, UNIT, VAL
 from geometry.elements import Point
 from geometry.two_farthest_clusters import (
         get_radii_of_two_minimal_enclosing_circles as get_two_min_radii,
-        get_two_farthest_points
+        get_radii_of_two_minimal_enclosing_circles_in_array,
+        get_two_farthest_points,
+        get_two_farthest_points_in_array
 )
 sys.path.append('../../bin/input')
 from linux_input import *
@@ -40,6 +44,26 @@ class FingerPath(namedtuple('FingerPath', ['slot', 'tid_packets'])):
         return [getattr(tid_packet, attr) for tid_packet in self.tid_packets]
 
 
+# The event type of SYN_REPORT events in MtbEventArrays. It differs from
+# EV_SYN so that SYN_REPORT events are not taken for ordinary events.
+SYN_REPORT_TYPE = -1
+
+# The tracking ID of the data reported in a slot before any tracking ID.
+NO_TID = -1
+
+# The tracking ID given to a slot reporting data without any tracking ID.
+MYSTERY_TID = 999999
+
+
+# Define MtbEventArrays class to keep the events of packets in numpy arrays.
+class MtbEventArrays(namedtuple('MtbEventArrays', ['time', 'type', 'code',
+                                                   'value', 'packet_end'])):
+    """This keeps the time, type, code, and value of a sequence of events in
+    numpy arrays. packet_end is True for the last event of every packet.
+    """
+    __slots__ = ()
+
+
 def get_mtb_packets_from_file(event_file):
     """ A helper function to get mtb packets by parsing the event file.
 
@@ -48,6 +72,34 @@ def get_mtb_packets_from_file(event_file):
     return Mtb(packets=MtbParser().parse_file(event_file))
 
 
+def get_event_arrays(packets):
+    """Convert a list of packets of event dictionaries to MtbEventArrays.
+
+    @param packets: a list of packets as returned by MtbParser.parse()
+    """
+    events = []
+    for packet in packets:
+        for event in packet:
+            if event.get(MTB.SYN_REPORT):
+                events.append((event[MTB.EV_TIME], SYN_REPORT_TYPE, 0, 0, False))
+            else:
+                events.append((event[MTB.EV_TIME], event[MTB.EV_TYPE],
+                               event[MTB.EV_CODE], event[MTB.EV_VALUE], False))
+        if packet:
+            events[-1] = events[-1][:-1] + (True,)
+    return _make_event_arrays(events)
+
+
+def _make_event_arrays(events):
+    """Make MtbEventArrays from a list of (time, type, code, value,
+    packet_end) tuples.
+    """
+    columns = zip(*events) if events else [()] * len(MtbEventArrays._fields)
+    dtypes = (np.float64, np.int64, np.int64, np.int64, np.bool_)
+    return MtbEventArrays(*[np.array(column, dtype=dtype)
+                            for column, dtype in zip(columns, dtypes)])
+
+
 def make_pretty_packet(packet):
     """Convert the event list in a packet to a pretty format."""
     pretty_packet = []
@@ -459,7 +511,7 @@ class MtbStateMachine:
             # by using a default value for these mystery fingers
             if (not self.slot in self.slot_to_tid and
                 MtbEvent.is_finger_data(event)):
-                self._add_new_tracking_id(999999)
+                self._add_new_tracking_id(MYSTERY_TID)
 
             # Update x value.
             if MtbEvent.is_ABS_MT_POSITION_X(event):
@@ -521,6 +573,156 @@ class MtbStateMachine:
         return sorted(current_tid_data)
 
 
+class MtbFingerArrays:
+    """The finger paths of MTB packets in numpy arrays.
+
+    Every tid packet of Mtb.get_ordered_finger_paths() is a row of the
+    following arrays, in the order of the packets:
+        syn_time: the SYN_REPORT time of the packet
+        slot: the slot of the finger
+        tid: the tracking ID of the finger, or NO_TID
+        x, y: the point of the finger
+        pressure: the pressure of the finger
+        finger: the ith finger contact, i.e., the index of the finger path
+                in the ordered finger paths
+    finger_slots[i] is the slot of the ith finger path.
+
+    Analyzing large gesture recordings with the arrays is much faster than
+    with the lists of TidPacket's, which hold a Point object per packet.
+    """
+    ATTRS = ('syn_time', 'slot', 'tid', 'x', 'y', 'pressure')
+
+    def __init__(self, syn_time, slot, tid, x, y, pressure, finger,
+                 finger_slots):
+        self.syn_time = syn_time
+        self.slot = slot
+        self.tid = tid
+        self.x = x
+        self.y = y
+        self.pressure = pressure
+        self.finger = finger
+        self.finger_slots = finger_slots
+        # The rows of the ith finger are _order[_bounds[i]:_bounds[i + 1]].
+        self._order = np.argsort(finger, kind='mergesort')
+        self._bounds = np.searchsorted(finger[self._order],
+                                       np.arange(len(finger_slots) + 1))
+
+    @classmethod
+    def from_packets(cls, packets):
+        """Construct the finger arrays from a list of packets.
+
+        @param packets: a list of packets as returned by MtbParser.parse()
+        """
+        return cls.from_events(get_event_arrays(packets))
+
+    @classmethod
+    def from_events(cls, events):
+        """Construct the finger arrays from MtbEventArrays.
+
+        This tracks the slots and tracking IDs as MtbStateMachine does, with
+        request_data_ready set to True, but keeps the state in plain
+        dictionaries of numbers.
+
+        @param events: an MtbEventArrays
+        """
+        slot = 0
+        slot_to_tid = {slot: NO_TID}
+        xs = {NO_TID: None}
+        ys = {NO_TID: None}
+        pressures = {NO_TID: None}
+        syn_time = None
+        leaving_slots = []
+        finger_of_tid = {}
+        finger_slots = []
+        rows = []
+        finger_data_codes = (ABS_MT_POSITION_X, ABS_MT_POSITION_Y,
+                             ABS_MT_PRESSURE)
+
+        for ev_time, ev_type, ev_code, ev_value, packet_end in zip(
+                events.time.tolist(), events.type.tolist(),
+                events.code.tolist(), events.value.tolist(),
+                events.packet_end.tolist()):
+            if ev_type == EV_ABS:
+                if ev_code == ABS_MT_SLOT:
+                    slot = ev_value
+                elif ev_code == ABS_MT_TRACKING_ID:
+                    if ev_value == -1:
+                        leaving_slots.append(slot)
+                    else:
+                        slot_to_tid[slot] = ev_value
+                        xs[ev_value] = ys[ev_value] = None
+                        pressures[ev_value] = None
+                elif ev_code in finger_data_codes:
+                    if slot not in slot_to_tid:
+                        slot_to_tid[slot] = MYSTERY_TID
+                        xs[MYSTERY_TID] = ys[MYSTERY_TID] = None
+                        pressures[MYSTERY_TID] = None
+                    tid = slot_to_tid[slot]
+                    if ev_code == ABS_MT_POSITION_X:
+                        xs[tid] = float(ev_value)
+                    elif ev_code == ABS_MT_POSITION_Y:
+                        ys[tid] = float(ev_value)
+                    else:
+                        pressures[tid] = ev_value
+            elif ev_type == SYN_REPORT_TYPE:
+                syn_time = ev_time
+
+            if not packet_end:
+                continue
+
+            for tid, tid_slot in sorted((tid, tid_slot) for tid_slot, tid in
+                                        slot_to_tid.items()):
+                finger = finger_of_tid.get(tid)
+                if finger is None:
+                    finger = finger_of_tid[tid] = len(finger_slots)
+                    finger_slots.append(tid_slot)
+                x, y, pressure = xs[tid], ys[tid], pressures[tid]
+                if (x is not None and y is not None and pressure is not None
+                    and syn_time is not None):
+                    rows.append((syn_time, tid_slot, tid, x, y, pressure,
+                                 finger))
+            for leaving_slot in leaving_slots:
+                del slot_to_tid[leaving_slot]
+            leaving_slots = []
+
+        columns = zip(*rows) if rows else [()] * (len(cls.ATTRS) + 1)
+        dtypes = (np.float64, np.int64, np.int64, np.float64, np.float64,
+                  np.int64, np.int64)
+        arrays = [np.array(column, dtype=dtype)
+                  for column, dtype in zip(columns, dtypes)]
+        return cls(*arrays, finger_slots=finger_slots)
+
+    def get_number_fingers(self):
+        """Get the number of finger paths."""
+        return len(self.finger_slots)
+
+    def get(self, finger, attr):
+        """Get the array of the specified attribute of the ith finger contact.
+
+        @param finger: the ith finger contact
+        @param attr: an attribute in ATTRS
+        """
+        values = getattr(self, attr)
+        if 0 <= finger < len(self.finger_slots):
+            begin, end = self._bounds[finger], self._bounds[finger + 1]
+            return values[self._order[begin:end]]
+        return values[:0]
+
+    def get_points(self, finger):
+        """Get the points of the ith finger contact in an array of shape
+        (number of points, 2).
+
+        @param finger: the ith finger contact
+        """
+        return np.column_stack((self.get(finger, 'x'), self.get(finger, 'y')))
+
+    def get_slot_finger(self, slot):
+        """Get the first finger contact in the specified slot, or None."""
+        if slot in self.finger_slots:
+            return self.finger_slots.index(slot)
+        return None
+
+
 class Mtb:
     """An MTB class providing MTB format related utility methods."""
     LEN_MOVING_AVERAGE = 2
@@ -531,6 +733,8 @@ class Mtb:
     def __init__(self, device=None, packets=None):
         self.device = device
         self.packets = packets
+        # The MtbFingerArrays of the packets, constructed on first use.
+        self._finger_arrays = None
         self._define_check_event_func_list()
 
     def _define_check_event_func_list(self):
@@ -711,6 +915,18 @@ class Mtb:
 
         return ordered_finger_paths_dict
 
+    def get_finger_arrays(self):
+        """Construct the ordered finger paths in numpy arrays.
+
+        The rows of the ith finger contact of the MtbFingerArrays are the
+        tid_packets of the ith finger path of get_ordered_finger_paths().
+        The arrays are constructed once and shared by the callers, which
+        should not modify them.
+        """
+        if self._finger_arrays is None:
+            self._finger_arrays = MtbFingerArrays.from_packets(self.packets)
+        return self._finger_arrays
+
     def get_ordered_finger_path(self, finger, attr):
         """Extract the specified attribute from the packets of the ith finger
         contact.
@@ -750,11 +966,13 @@ class Mtb:
         Note: rocs denotes the radii of circles
         """
         list_rocs = []
-        for finger_path in self.get_ordered_finger_paths().values():
+        finger_arrays = self.get_finger_arrays()
+        for finger in range(finger_arrays.get_number_fingers()):
             # Convert the point coordinates in pixels to in mms.
-            points_in_mm = [Point(*self.device.pixel_to_mm(p.value()))
-                            for p in finger_path.get('point')]
-            list_rocs += get_two_min_radii(points_in_mm)
+            points_in_mm = self.device.pixel_to_mm_array(
+                    finger_arrays.get_points(finger))
+            list_rocs += get_radii_of_two_minimal_enclosing_circles_in_array(
+                    points_in_mm)
         return list_rocs
 
     def get_x_y_multiple_slots(self, target_slots):
@@ -889,8 +1107,14 @@ class Mtb:
 
     def get_max_distance(self, slot, unit):
         """Get the max distance between any two points of the specified slot."""
-        points = self.get_slot_data(slot, 'point')
-        return self.get_max_distance_from_points(points, unit)
+        finger_arrays = self.get_finger_arrays()
+        finger = finger_arrays.get_slot_finger(slot)
+        if finger is None:
+            return 0
+        two_farthest_points = get_two_farthest_points_in_array(
+                finger_arrays.get_points(finger))
+        return self.get_max_distance_from_points(
+                [Point(*p) for p in two_farthest_points], unit)
 
     def get_max_distance_from_points(self, points, unit):
         """Get the max distance between any two points."""
@@ -1086,9 +1310,10 @@ class Mtb:
             @param boundary_distance: the min distance between boundary_coord
                     and list_coord[0]
             """
-            for i, c in enumerate(list_coord):
-                if abs(c - list_coord[0]) > boundary_distance:
-                    return i
+            beyond = np.flatnonzero(
+                    np.abs(np.asarray(list_coord) - list_coord[0]) >
+                    boundary_distance)
+            return int(beyond[0]) if len(beyond) else None
 
         end_to_end_distance = abs(list_coord[-1] - list_coord[0])
         first_idx_mid_seg = _find_boundary_index(
@@ -1138,7 +1363,7 @@ class Mtb:
                 with the value between 0.0 and 1.0
         """
         MIN_STRAIGHT_LINE_DIST = 20
-        if (max(list_coord) - min(list_coord)) > MIN_STRAIGHT_LINE_DIST:
+        if np.ptp(list_coord) > MIN_STRAIGHT_LINE_DIST:
             return self.get_segments_by_distance(list_t, list_coord,
                                                  segment_flag, ratio)
         else:
@@ -1505,6 +1730,57 @@ class MtbParser:
                 packets = self.parse(f)
         return packets
 
+    def parse_arrays(self, raw_event):
+        """Parse the raw event string into MtbEventArrays.
+
+        The events and packets are the same as those of parse(), without
+        constructing an event dictionary per event. The validators analyze
+        the packets of parse(); this is used by tools/benchmark_mtb.py.
+        """
+        events = []
+        # The number of events in the complete packets.
+        num_events = 0
+        start_flag = False
+        finger_off = False
+        for line in raw_event:
+            result = self.event_re_patt.search(line)
+            if result is not None:
+                ev_time = float(result.group(1))
+                ev_type, ev_code, ev_value = map(int, result.group(2, 3, 4))
+                if ev_type == EV_ABS and ev_code == ABS_MT_TRACKING_ID:
+                    # Split the packet when a finger-off event is followed
+                    # by a finger-on event as parse() does.
+                    if ev_value == -1:
+                        finger_off = True
+                    elif finger_off:
+                        events.append((events[-1][0], SYN_REPORT_TYPE, 0, 0,
+                                       True))
+                        num_events = len(events)
+                events.append((ev_time, ev_type, ev_code, ev_value, False))
+            else:
+                result = self.event_re_patt_SYN_REPORT.search(line)
+                if result is None:
+                    if start_flag:
+                        logging.warning('  Warn: format problem in event:\n'
+                                        '  %s' % line)
+                    continue
+                events.append((float(result.group(1)), SYN_REPORT_TYPE, 0, 0,
+                               True))
+                num_events = len(events)
+                finger_off = False
+            start_flag = True
+        return _make_event_arrays(events[:num_events])
+
+    def parse_file_arrays(self, file_name):
+        """Parse raw device events in the given file name into
+        MtbEventArrays.
+        """
+        events = None
+        if os.path.isfile(file_name):
+            with open(file_name) as f:
+                events = self.parse_arrays(f)
+        return events
+
 
 if __name__ == '__main__':
     # Read a device file, and convert it to pretty packet format.
@@ -15,6 +15,7 @@ from sets import Set
 
 from geometry.elements import Circle, Point
 from geometry.minicircle import minicircle
+from geometry import two_farthest_clusters
 from geometry.two_farthest_clusters import get_two_farthest_clusters
 
 
@@ -120,6 +121,29 @@ class MinicircleTest(unittest.TestCase):
             self.assertTrue(Set([expected_set1, expected_set2]) ==
                             Set([actual_set1, actual_set2]))
 
+    def test_get_two_farthest_points_in_array(self):
+        """The array variant should find the same two points as the list
+        variant, also when the distances are computed in many blocks.
+        """
+        random.seed(1234)
+        max_distances_per_block = two_farthest_clusters.MAX_DISTANCES_PER_BLOCK
+        for num_points in (0, 1, 2, 17, 300):
+            # Integer coordinates give many pairs at the same distance.
+            xy = [(random.randint(0, 30), random.randint(0, 30))
+                  for _ in range(num_points)]
+            expected_points = two_farthest_clusters.get_two_farthest_points(
+                    [Point(*p) for p in xy])
+            for block_size in (1, 7, 1 << 20):
+                two_farthest_clusters.MAX_DISTANCES_PER_BLOCK = block_size
+                try:
+                    actual_points = (two_farthest_clusters.
+                                     get_two_farthest_points_in_array(xy))
+                finally:
+                    two_farthest_clusters.MAX_DISTANCES_PER_BLOCK = (
+                            max_distances_per_block)
+                self.assertEqual([p.value() for p in expected_points],
+                                 [tuple(p) for p in actual_points])
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -418,6 +418,53 @@ class MtbTest(unittest.TestCase):
             self.assertEqual(expected_packet.pressure, actual_packet.pressure)
 
 
+    def test_get_finger_arrays(self):
+        """The finger arrays should hold the same data as the ordered finger
+        paths, including the paths with no data ready and the paths of
+        slots without any tracking ID.
+        """
+        filenames = ['two_finger_tracking.diagonal.slow.dat',
+                     'drumroll_lumpy.dat',
+                     'non_ready_events_in_final_state_packet.dat',
+                     'one_finger_swipe_late_tid.dat',
+                     'stationary_finger_shift_with_2nd_finger_tap.dat']
+        for filename in filenames:
+            mtb_packets = get_mtb_packets(self._get_filepath(filename))
+            finger_paths = mtb_packets.get_ordered_finger_paths()
+            finger_arrays = mtb_packets.get_finger_arrays()
+            self.assertEqual(finger_arrays.get_number_fingers(),
+                             len(finger_paths))
+            for finger, (tid, finger_path) in enumerate(finger_paths.items()):
+                self.assertEqual(finger_arrays.finger_slots[finger],
+                                 finger_path.slot)
+                expected_tid = mtb.NO_TID if tid is None else tid
+                self.assertTrue(
+                        (finger_arrays.get(finger, 'tid') == expected_tid).all())
+                self.assertEqual(
+                        finger_arrays.get_points(finger).tolist(),
+                        [list(p.value()) for p in finger_path.get('point')])
+                for attr in ('syn_time', 'pressure'):
+                    self.assertEqual(finger_arrays.get(finger, attr).tolist(),
+                                     finger_path.get(attr))
+            self.assertEqual(
+                    len(finger_arrays.get(len(finger_paths), 'syn_time')), 0)
+            self.assertIs(mtb_packets.get_finger_arrays(), finger_arrays)
+
+    def test_parse_arrays(self):
+        """Parsing a file into arrays should give the same events as parsing
+        it into packets, including the packets split by the parser.
+        """
+        filenames = ['drumroll_no_points.dat',
+                     'two_close_fingers_tracking.dat']
+        parser = mtb.MtbParser()
+        for filename in filenames:
+            filepath = self._get_filepath(filename)
+            expected_events = mtb.get_event_arrays(parser.parse_file(filepath))
+            actual_events = parser.parse_file_arrays(filepath)
+            for expected, actual in zip(expected_events, actual_events):
+                self.assertEqual(expected.dtype, actual.dtype)
+                self.assertEqual(expected.tolist(), actual.tolist())
+
     def test_get_slot_data(self):
         """Test if it can get the data from the correct slot.
 
@@ -0,0 +1,131 @@
+# Copyright (c) 2013 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A simple script to benchmark the analysis of large gesture recordings.
+
+It times parsing the raw data files, constructing the finger paths, and
+checking the linearity, stationary finger, and drumroll validators. The
+packet lists and the numpy arrays are timed side by side where both exist.
+
+Usage:   python tools/benchmark_mtb.py [-r repeat] [-D device_file] file ...
+
+Example:
+    Analyze a drumroll recording repeated 20 times:
+    $ python tools/benchmark_mtb.py -r 20 tests/data/drumroll_lumpy.dat
+"""
+
+import argparse
+import os
+import time
+
+import common
+import test_conf
+import mtb
+
+from common_util import print_and_exit
+from firmware_constants import GV, UNIT
+from geometry.elements import Point
+from geometry.two_farthest_clusters import (
+        get_radii_of_two_minimal_enclosing_circles as get_two_min_radii)
+from touch_device import TouchDevice
+from validators import (DrumrollValidator,
+                        LinearityValidator,
+                        StationaryFingerValidator,
+)
+
+
+DEFAULT_DEVICE_FILE = 'tests/device/lumpy.touchpad'
+
+
+def _time(msg, func, *args):
+    """Print the time taken by func(*args), and return its result."""
+    start = time.time()
+    result = func(*args)
+    print '  %-36s %8.3f s' % (msg, time.time() - start)
+    return result
+
+
+def _get_rocs_with_packets(mtb_packets, device):
+    """Get the drumroll radii from the lists of TidPacket's."""
+    list_rocs = []
+    for finger_path in mtb_packets.get_ordered_finger_paths().values():
+        points_in_mm = [Point(*device.pixel_to_mm(p.value()))
+                        for p in finger_path.get('point')]
+        list_rocs += get_two_min_radii(points_in_mm)
+    return list_rocs
+
+
+def _get_max_distance_with_packets(mtb_packets, slot):
+    """Get the max distance of a slot from the lists of TidPacket's."""
+    return mtb_packets.get_max_distance_from_points(
+            mtb_packets.get_slot_data(slot, 'point'), UNIT.MM)
+
+
+def benchmark(filename, repeat, device):
+    """Benchmark the analysis of a raw data file.
+
+    @param filename: a raw data file in mtplot format
+    @param repeat: the number of times the raw data is repeated to make a
+            large recording
+    @param device: the TouchDevice of the raw data
+    """
+    # Repeat the events only, without the device description of the header.
+    with open(filename) as f:
+        lines = [line for line in f if line.startswith('Event:')] * repeat
+    print '%s (%d lines):' % (filename, len(lines))
+
+    parser = mtb.MtbParser()
+    packets = _time('parse packets', parser.parse, lines)
+    events = _time('parse arrays', parser.parse_arrays, lines)
+
+    mtb_packets = mtb.Mtb(device=device, packets=packets)
+    _time('finger paths with packets', mtb_packets.get_ordered_finger_paths)
+    _time('finger paths with arrays', mtb.MtbFingerArrays.from_events, events)
+
+    _time('drumroll radii with packets', _get_rocs_with_packets, mtb_packets,
+          device)
+    _time('drumroll radii with arrays',
+          mtb_packets.get_list_of_rocs_of_all_tracking_ids)
+    _time('max distance with packets', _get_max_distance_with_packets,
+          mtb_packets, 0)
+    _time('max distance with arrays', mtb_packets.get_max_distance, 0,
+          UNIT.MM)
+
+    validators = [
+        LinearityValidator(test_conf.linearity_criteria, device=device),
+        StationaryFingerValidator(test_conf.stationary_finger_criteria,
+                                  device=device),
+        DrumrollValidator(test_conf.drumroll_criteria, device=device),
+    ]
+    for validator in validators:
+        _time('%s.check' % validator.__class__.__name__, validator.check,
+              packets, (GV.BLTR,))
+
+
+def _parse():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(
+            description='Benchmark the analysis of raw data files.')
+    parser.add_argument('filenames', nargs='+', metavar='filename',
+                        help='a raw data file in mtplot format')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                        help='the number of times the raw data of a file is '
+                             'repeated to make a large recording (default: 1)')
+    parser.add_argument('-D', '--device_file', default=DEFAULT_DEVICE_FILE,
+                        help='the device description file of the raw data '
+                             '(default: %s)' % DEFAULT_DEVICE_FILE)
+    args = parser.parse_args()
+
+    for filename in [args.device_file] + args.filenames:
+        if not os.path.isfile(filename):
+            print_and_exit('Error: The file "%s" does not exist.' % filename)
+    return args
+
+
+if __name__ == '__main__':
+    args = _parse()
+    device = TouchDevice(device_node='/dev/null',
+                         device_description_file=args.device_file)
+    for filename in args.filenames:
+        benchmark(filename, args.repeat, device)
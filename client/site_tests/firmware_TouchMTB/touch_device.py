@@ -173,6 +173,16 @@ class TouchDevice:
         mm_y = float(pixel_y - self.axis_y.min) / self.axis_y.resolution
         return (mm_x, mm_y)
 
+    def pixel_to_mm_array(self, points):
+        """Convert a numpy array of point coordinates from pixel to mm.
+
+        @param points: a numpy array of shape (number of points, 2)
+        """
+        mins = (self.axis_x.min, self.axis_y.min)
+        resolutions = (float(self.axis_x.resolution),
+                       float(self.axis_y.resolution))
+        return (points - mins) / resolutions
+
     def pixel_to_mm_single_axis(self, value_pixel, axis):
         """Convert the coordinate from pixel to mm."""
         value_mm = float(value_pixel - axis.min) / axis.resolution
@@ -266,11 +266,9 @@ class BaseValidator(object):
 
         @param finger: the finger contact
         """
-        points = self.packets.get_ordered_finger_path(self.finger, 'point')
-        list_x = [p.x for p in points]
-        list_y = [p.y for p in points]
-        list_t = self.packets.get_ordered_finger_path(self.finger, 'syn_time')
-        return (list_x, list_y, list_t)
+        finger_arrays = self.packets.get_finger_arrays()
+        return tuple(finger_arrays.get(finger, attr)
+                     for attr in ('x', 'y', 'syn_time'))
 
 
 class DragLatencyValidator(BaseValidator):
@@ -530,7 +528,7 @@ class LinearityValidator(BaseValidator):
         @param list_t: a list of time instants
         @param list_y: a list of x/y coordinates
 
-        This method returns the list of residuals, where
+        This method returns the array of residuals, where
             residual[i] = line[t_i] - y_i
         where t_i is an element in list_t and
               y_i is a corresponding element in list_y.
@@ -539,7 +537,8 @@ class LinearityValidator(BaseValidator):
         horizontal axis, list_t, always represent the time instants, and the
         vertical axis, list_y, could be either the coordinates in x or y axis.
         """
-        return [float(line(t) - y) for t, y in zip(list_t, list_y)]
+        return (line(np.asarray(list_t, dtype=np.float64)) -
+                np.asarray(list_y, dtype=np.float64))
 
     def _do_simple_linear_regression(self, list_t, list_y):
         """Calculate the simple linear regression line and returns the
@@ -559,14 +558,14 @@ class LinearityValidator(BaseValidator):
         """
         # At least 2 points to determine a line.
         if len(list_t) < 2 or len(list_y) < 2:
-            return []
+            return np.array([])
 
         mid_segment_t, mid_segment_y = self.packets.get_segments(
                 list_t, list_y, VAL.MIDDLE, END_PERCENTAGE)
 
         # Check to make sure there are enough samples to continue
         if len(mid_segment_t) <= 2 or len(mid_segment_y) <= 2:
-            return []
+            return np.array([])
 
         # Calculate the simple linear regression line.
         degree = 1
@@ -581,7 +580,7 @@ class LinearityValidator(BaseValidator):
                     list_t, list_y, VAL.END, END_PERCENTAGE)
             begin_error = self._calc_residuals(regress_line, *begin_segments)
             end_error = self._calc_residuals(regress_line, *end_segments)
-            return begin_error + end_error
+            return np.concatenate((begin_error, end_error))
         else:
             target_segments = self.packets.get_segments(
                     list_t, list_y, self._segments, END_PERCENTAGE)
@@ -595,15 +594,14 @@ class LinearityValidator(BaseValidator):
         """
         # It is fine if axis-time is a horizontal line.
         errors_px = self._do_simple_linear_regression(list_t, list_y)
-        if not errors_px:
+        if not len(errors_px):
             return (0, 0)
 
         # Calculate the max errors
-        max_err_px = max(map(abs, errors_px))
+        max_err_px = float(np.abs(errors_px).max())
 
         # Calculate the root mean square errors
-        e2 = [e * e for e in errors_px]
-        rms_err_px = (float(sum(e2)) / len(e2)) ** 0.5
+        rms_err_px = float(np.square(errors_px).mean()) ** 0.5
 
         return (max_err_px, rms_err_px)
 
@@ -0,0 +1,187 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Cached per-host summaries for the get_hosts RPC.
+
+Listing every host needs the labels, platform, ACLs and attributes of each
+one, which cost three relationship pivots per call. Those rarely change, so
+they are kept per host in memory and invalidated through Django signals when
+a host, label, ACL group or attribute changes in this process. Other
+processes, e.g. other frontend workers, only invalidate their own copy, so
+entries also expire after a configurable time. Summaries that are cached
+are always read from the primary database, even in RPCs whose reads go to
+the replica, so that a lagging replica cannot extend their staleness.
+
+The current job and special task of hosts change all the time, mostly from
+the scheduler which does not go through Django, so they are never cached;
+get_current_jobs looks them up for all hosts with two queries instead.
+"""
+
+import threading
+import time
+
+from django.db.models import signals
+
+import common
+from autotest_lib.client.common_lib import global_config
+from autotest_lib.frontend import db_router
+from autotest_lib.frontend.afe import models
+from autotest_lib.frontend.afe import rpc_utils
+
+
+# Seconds a cached host summary may be served. 0 disables the cache.
+_CACHE_TTL_SECS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'host_summary_cache_ttl_secs', type=int, default=0)
+
+
+def _compute_summaries(hosts):
+    """Returns a dict of host id -> summary of the given hosts.
+
+    @param hosts: A list of models.Host.
+    """
+    models.Host.objects.populate_relationships(hosts, models.Label,
+                                               'label_list')
+    models.Host.objects.populate_relationships(hosts, models.AclGroup,
+                                               'acl_list')
+    models.Host.objects.populate_relationships(hosts, models.HostAttribute,
+                                               'attribute_list')
+    summaries = {}
+    for host in hosts:
+        summaries[host.id] = {
+                'labels': [label.name for label in host.label_list],
+                'platform': rpc_utils.find_platform(host),
+                'acls': [acl.name for acl in host.acl_list],
+                'attributes': dict((attribute.attribute, attribute.value)
+                                   for attribute in host.attribute_list),
+        }
+    return summaries
+
+
+class HostSummaryCache(object):
+    """Per-host summaries of labels, platform, ACLs and attributes."""
+
+    def __init__(self, ttl_secs, time_func=time.time):
+        """
+        @param ttl_secs: Seconds a summary may be served. 0 disables caching.
+        @param time_func: Function returning the current time, for testing.
+        """
+        self._ttl_secs = ttl_secs
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        # host id -> (summary, time it was computed)
+        self._summaries = {}
+        # Incremented on every invalidation, so that summaries computed
+        # concurrently with an invalidation are not stored.
+        self._generation = 0
+
+
+    def get_summaries(self, hosts):
+        """Returns a dict of host id -> summary of the given hosts.
+
+        A summary is a dict with the keys labels, platform, acls and
+        attributes, as returned by get_hosts. Callers must not modify it.
+
+        @param hosts: A list of models.Host.
+        """
+        if self._ttl_secs <= 0:
+            return _compute_summaries(hosts)
+        oldest = self._time_func() - self._ttl_secs
+        summaries = {}
+        missing = []
+        with self._lock:
+            generation = self._generation
+            for host in hosts:
+                cached = self._summaries.get(host.id)
+                if cached and cached[1] > oldest:
+                    summaries[host.id] = cached[0]
+                else:
+                    missing.append(host)
+        if missing:
+            now = self._time_func()
+            with db_router.primary_reads():
+                computed = _compute_summaries(missing)
+            summaries.update(computed)
+            with self._lock:
+                if generation == self._generation:
+                    for host_id, summary in computed.iteritems():
+                        self._summaries[host_id] = (summary, now)
+        return summaries
+
+
+    def invalidate(self, host_ids=None):
+        """Drops the summaries of |host_ids|, or all of them if None.
+
+        @param host_ids: An iterable of host ids, or None.
+        """
+        with self._lock:
+            self._generation += 1
+            if host_ids is None:
+                self._summaries.clear()
+            else:
+                for host_id in host_ids:
+                    self._summaries.pop(host_id, None)
+
+
+def get_current_jobs(host_ids):
+    """Returns the current job and special task of each host.
+
+    @param host_ids: A list of host ids.
+
+    @returns A dict of host id -> (job id or None, special task string or
+            None), where the special task string is '<id>-<task>'.
+    """
+    current_jobs = {}
+    entries = models.HostQueueEntry.objects.filter(
+            host_id__in=host_ids, active=True, complete=False).order_by('id')
+    for host_id, job_id in entries.values_list('host_id', 'job_id'):
+        current_jobs.setdefault(host_id, job_id)
+    current_tasks = {}
+    tasks = models.SpecialTask.objects.filter(
+            host__id__in=host_ids, is_active=True,
+            is_complete=False).order_by('id')
+    for host_id, task_id, task in tasks.values_list('host_id', 'id', 'task'):
+        current_tasks.setdefault(host_id, '%d-%s' % (task_id, task.lower()))
+    return dict((host_id, (current_jobs.get(host_id),
+                           current_tasks.get(host_id)))
+                for host_id in host_ids)
+
+
+cache = HostSummaryCache(_CACHE_TTL_SECS)
+
+
+def _invalidate_all(sender, **kwargs):
+    cache.invalidate()
+
+
+def _invalidate_host(sender, instance, **kwargs):
+    cache.invalidate([instance.id])
+
+
+def _invalidate_attribute_host(sender, instance, **kwargs):
+    cache.invalidate([instance.host_id])
+
+
+def _invalidate_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if isinstance(instance, models.Host):
+        cache.invalidate([instance.id])
+    elif pk_set is None:
+        # A clear from the label or ACL side; we do not know which hosts.
+        cache.invalidate()
+    else:
+        cache.invalidate(pk_set)
+
+
+for _model in (models.Label, models.AclGroup):
+    signals.post_save.connect(_invalidate_all, sender=_model)
+    signals.post_delete.connect(_invalidate_all, sender=_model)
+signals.post_save.connect(_invalidate_host, sender=models.Host)
+signals.post_delete.connect(_invalidate_host, sender=models.Host)
+signals.post_save.connect(_invalidate_attribute_host,
+                          sender=models.HostAttribute)
+signals.post_delete.connect(_invalidate_attribute_host,
+                            sender=models.HostAttribute)
+for _through in (models.Host.labels.through, models.AclGroup.hosts.through):
+    signals.m2m_changed.connect(_invalidate_m2m, sender=_through)
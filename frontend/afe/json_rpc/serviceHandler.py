@@ -35,6 +35,9 @@ except django_exceptions.ImproperlyConfigured:
 
 json_decoder = decoder.JSONDecoder()
 
+# Approximate size in bytes of the chunks yielded by translateResultChunks.
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 def customConvertJson(value):
     """\
@@ -175,3 +178,41 @@ class ServiceHandler(object):
                                         "error":err})
 
         return data
+
+
+    @staticmethod
+    def translateResultChunks(result_dict, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Like translateResult, but yields the translated json result in chunks
+        of about chunk_size bytes instead of building it in memory.
+
+        Only the json encoding is incremental: the result itself is already
+        fully built in memory.
+
+        A result that cannot be encoded is only detected once part of it has
+        been yielded, so the TypeError propagates instead of being turned
+        into an error response.
+
+        @param result_dict: a dictionary containing the result, error,
+                            traceback and id.
+        @param chunk_size: approximate size of the yielded strings.
+        @returns a generator of json strings to be concatenated.
+        """
+        if result_dict['err'] is not None:
+            yield ServiceHandler.translateResult(result_dict)
+            return
+
+        json_dict = {'result': result_dict['result'],
+                     'id': result_dict['id'],
+                     'error': None}
+        pieces = []
+        size = 0
+        for piece in json_encoder.iterencode(json_dict):
+            pieces.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield ''.join(pieces)
+                pieces = []
+                size = 0
+        if pieces:
+            yield ''.join(pieces)
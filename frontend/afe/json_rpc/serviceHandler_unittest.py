@@ -62,6 +62,17 @@ class TestServiceHandler(unittest.TestCase):
         self.assertEquals(response, expected_response2)
 
 
+    def test_translateResultChunks(self):
+        result = {'id': 1, 'err': None, 'err_traceback': None,
+                  'result': [{'name': 'entry %d' % i} for i in xrange(100)]}
+        chunks = list(serviceHandler.ServiceHandler.translateResultChunks(
+                dict(result), chunk_size=200))
+        self.assertTrue(len(chunks) > 1)
+        self.assertEquals(
+                ''.join(chunks),
+                serviceHandler.ServiceHandler.translateResult(dict(result)))
+
+
     def test_handleRequest3(self):
         response = self.serviceHandler.handleRequest(json_request3)
         response_obj = eval(response.replace('null', 'None'))
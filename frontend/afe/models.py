@@ -1406,8 +1406,9 @@ class Job(dbmodels.Model, model_logic.ModelExtensions):
         job.dependency_labels = options['dependencies']
 
         if options.get('keyvals'):
-            for key, value in options['keyvals'].iteritems():
-                JobKeyval.objects.create(job=job, key=key, value=value)
+            JobKeyval.objects.bulk_create(
+                    [JobKeyval(job=job, key=key, value=value)
+                     for key, value in options['keyvals'].iteritems()])
 
         return job
 
@@ -12,6 +12,7 @@ import traceback
 import urllib
 
 from autotest_lib.client.common_lib import error
+from autotest_lib.client.common_lib import global_config
 from autotest_lib.frontend.afe import models, rpc_utils
 from autotest_lib.frontend.afe import rpcserver_logging
 from autotest_lib.frontend.afe.json_rpc import serviceHandler
@@ -28,6 +29,14 @@ COMPILED_REGEXP = re.compile(FULL_REGEXP)
 SHARD_RPC_INTERFACE = 'shard_rpc_interface'
 COMMON_RPC_INTERFACE = 'common_rpc_interface'
 
+# List results with at least this many items are encoded and sent in chunks
+# instead of being encoded in memory all at once. 0 disables streaming.
+# This only bounds the memory of the encoded response: the RPC still builds
+# its whole result list first. Clients reading large lists should page through
+# them instead, see server/frontend.py RpcClient.run_paged.
+STREAM_MIN_ITEMS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'rpc_stream_min_items', type=int, default=1000)
+
 def should_log_message(name):
     """Detect whether to log message.
 
@@ -231,6 +240,12 @@ class RpcHandler(object):
 
         decoded_request['remote_ip'] = remote_ip
         decoded_result = self.dispatch_request(decoded_request)
+        if self._should_stream(decoded_result):
+            if rpcserver_logging.LOGGING_ENABLED:
+                self.log_request(user, decoded_request, decoded_result,
+                                 remote_ip)
+            return rpc_utils.streaming_http_response(
+                    self._dispatcher.translateResultChunks(decoded_result))
         result = self.encode_result(decoded_result)
         if rpcserver_logging.LOGGING_ENABLED:
             self.log_request(user, decoded_request, decoded_result,
@@ -238,6 +253,17 @@ class RpcHandler(object):
         return rpc_utils.raw_http_response(result)
 
 
+    @staticmethod
+    def _should_stream(decoded_result):
+        """Whether a result is large enough to be sent in chunks.
+
+        @param decoded_result: the result of dispatch_request.
+        """
+        result = decoded_result['result']
+        return (STREAM_MIN_ITEMS > 0 and decoded_result['err'] is None and
+                isinstance(result, list) and len(result) >= STREAM_MIN_ITEMS)
+
+
     def handle_jsonp_rpc_request(self, request):
         """Handle the json rpc request and return raw response.
 
@@ -34,12 +34,17 @@ __author__ = 'showard@google.com (Steve Howard)'
 import ast
 import datetime
 import logging
+import operator
 import os
 import sys
+import threading
+import time
+import traceback
 
 from django.db import connection as db_connection
 from django.db import transaction
 from django.db.models import Count
+from django.db.models import Q
 from django.db.utils import DatabaseError
 
 import common
@@ -50,10 +55,12 @@ from autotest_lib.client.common_lib import priorities
 from autotest_lib.client.common_lib import time_utils
 from autotest_lib.client.common_lib.cros import dev_server
 from autotest_lib.frontend.afe import control_file as control_file_lib
+from autotest_lib.frontend.afe import host_summary_cache
 from autotest_lib.frontend.afe import model_attributes
 from autotest_lib.frontend.afe import model_logic
 from autotest_lib.frontend.afe import models
 from autotest_lib.frontend.afe import rpc_utils
+from autotest_lib.frontend.afe import static_data_cache
 from autotest_lib.frontend.tko import models as tko_models
 from autotest_lib.frontend.tko import rpc_interface as tko_rpc_interface
 from autotest_lib.server import frontend
@@ -72,6 +79,25 @@ from autotest_lib.site_utils import stable_version_utils
 
 _CONFIG = global_config.global_config
 
+# Longest time wait_for_finished_jobs waits for one of its jobs to finish.
+# 0 makes it return right away.
+_JOB_WAIT_MAX_SECS = _CONFIG.get_config_value(
+        'AUTOTEST_WEB', 'job_wait_max_secs', type=int, default=0)
+# Seconds between the first two checks of wait_for_finished_jobs for finished
+# jobs. The interval doubles after every check.
+_JOB_WAIT_POLL_INTERVAL_SECS = _CONFIG.get_config_value(
+        'AUTOTEST_WEB', 'job_wait_poll_interval_secs', type=int, default=5)
+# Most wait_for_finished_jobs calls that may wait at the same time in this
+# process. Further calls check once and return right away.
+_JOB_WAIT_MAX_WAITERS = _CONFIG.get_config_value(
+        'AUTOTEST_WEB', 'job_wait_max_waiters', type=int, default=10)
+_job_waiters = threading.Semaphore(_JOB_WAIT_MAX_WAITERS)
+# Fields of the test statuses returned by wait_for_finished_jobs, as read by
+# frontend.TKO.get_job_test_statuses_from_db.
+_JOB_TEST_STATUS_FIELDS = ('status', 'test_name', 'subdir', 'reason',
+                           'test_started_time', 'test_finished_time',
+                           'afe_job_id', 'job_owner', 'hostname', 'job_tag')
+
 # Relevant CrosDynamicSuiteExceptions are defined in client/common_lib/error.py.
 
 # labels
@@ -503,6 +529,7 @@ def delete_host(id):
     models.Host.smart_get(id).delete()
 
 
+@rpc_utils.read_from_replica
 def get_hosts(multiple_labels=(), exclude_only_if_needed_labels=False,
               valid_only=True, include_current_job=False, **filter_data):
     """Get a list of dictionaries which contains the information of hosts.
@@ -518,38 +545,26 @@ def get_hosts(multiple_labels=(), exclude_only_if_needed_labels=False,
                                      exclude_only_if_needed_labels,
                                      valid_only, filter_data)
     hosts = list(hosts)
-    models.Host.objects.populate_relationships(hosts, models.Label,
-                                               'label_list')
-    models.Host.objects.populate_relationships(hosts, models.AclGroup,
-                                               'acl_list')
-    models.Host.objects.populate_relationships(hosts, models.HostAttribute,
-                                               'attribute_list')
+    summaries = host_summary_cache.cache.get_summaries(hosts)
+    if include_current_job:
+        current_jobs = host_summary_cache.get_current_jobs(
+                [host_obj.id for host_obj in hosts])
     host_dicts = []
     for host_obj in hosts:
         host_dict = host_obj.get_object_dict()
-        host_dict['labels'] = [label.name for label in host_obj.label_list]
-        host_dict['platform'] = rpc_utils.find_platform(host_obj)
-        host_dict['acls'] = [acl.name for acl in host_obj.acl_list]
-        host_dict['attributes'] = dict((attribute.attribute, attribute.value)
-                                       for attribute in host_obj.attribute_list)
+        summary = summaries[host_obj.id]
+        host_dict['labels'] = list(summary['labels'])
+        host_dict['platform'] = summary['platform']
+        host_dict['acls'] = list(summary['acls'])
+        host_dict['attributes'] = dict(summary['attributes'])
         if include_current_job:
-            host_dict['current_job'] = None
-            host_dict['current_special_task'] = None
-            entries = models.HostQueueEntry.objects.filter(
-                    host_id=host_dict['id'], active=True, complete=False)
-            if entries:
-                host_dict['current_job'] = (
-                        entries[0].get_object_dict()['job'])
-            tasks = models.SpecialTask.objects.filter(
-                    host_id=host_dict['id'], is_active=True, is_complete=False)
-            if tasks:
-                host_dict['current_special_task'] = (
-                        '%d-%s' % (tasks[0].get_object_dict()['id'],
-                                   tasks[0].get_object_dict()['task'].lower()))
+            (host_dict['current_job'],
+             host_dict['current_special_task']) = current_jobs[host_obj.id]
         host_dicts.append(host_dict)
     return rpc_utils.prepare_for_serialization(host_dicts)
 
 
+@rpc_utils.read_from_replica
 def get_num_hosts(multiple_labels=(), exclude_only_if_needed_labels=False,
                   valid_only=True, **filter_data):
     """
@@ -796,6 +811,26 @@ def create_job_page_handler(name, priority, control_file, control_type,
                       hostless=hostless, **kwargs)
 
 
+def _apply_args_and_image(control_file, dependencies, args, image):
+    """\
+    Apply the args and image arguments of create_job() to a job.
+
+    @param control_file String contents of the control file.
+    @param dependencies List of label names on which the job depends.
+    @param args A list of args to be injected into the control file.
+    @param image OS image to install before running the job, or None.
+
+    @returns A (control_file, dependencies) tuple: the control file with the
+            args injected, and the dependencies with the label of the image.
+    """
+    if args:
+        control_file = tools.inject_vars({'args': args}, control_file)
+    if image:
+        dependencies = (tuple(dependencies) +
+                        (provision.image_version_to_label(image),))
+    return control_file, dependencies
+
+
 @rpc_utils.route_rpc_to_master
 def create_job(
         name,
@@ -871,10 +906,8 @@ def create_job(
 
     @returns The created Job id number.
     """
-    if args:
-        control_file = tools.inject_vars({'args': args}, control_file)
-    if image:
-        dependencies += (provision.image_version_to_label(image),)
+    control_file, dependencies = _apply_args_and_image(
+            control_file, dependencies, args, image)
     return rpc_utils.create_job_common(
             name=name,
             priority=priority,
@@ -903,6 +936,47 @@ def create_job(
             require_ssp=require_ssp)
 
 
+@rpc_utils.route_rpc_to_master
+def create_jobs_bulk(jobs):
+    """\
+    Create and enqueue several jobs in one transaction.
+
+    Labels and dependencies the jobs have in common are validated once. A
+    job that fails validation does not prevent the other jobs from being
+    created; its error is returned instead of its id.
+
+    @param jobs: A list of dicts of create_job() keyword arguments.
+
+    @returns A list with one dict per job, either {'id': id of the created
+            job} or {'error': {'name': ..., 'message': ..., 'traceback': ...}}
+            describing why it was not created, like the error of a failed
+            RPC.
+    """
+    validation_cache = {}
+    results = []
+    with transaction.commit_on_success():
+        for job_args in jobs:
+            job_args = dict(job_args)
+            job_args['control_file'], job_args['dependencies'] = (
+                    _apply_args_and_image(job_args['control_file'],
+                                          job_args.get('dependencies', ()),
+                                          job_args.pop('args', ()),
+                                          job_args.pop('image', None)))
+            job_args.setdefault('run_verify', False)
+            try:
+                job_id = rpc_utils.create_job_common(
+                        validation_cache=validation_cache, **job_args)
+            except (model_logic.ValidationError,
+                    error.NoEligibleHostException) as e:
+                results.append({'error': {
+                        'name': type(e).__name__,
+                        'message': str(e),
+                        'traceback': traceback.format_exc()}})
+            else:
+                results.append({'id': job_id})
+    return results
+
+
 def abort_host_queue_entries(**filter_data):
     """\
     Abort a set of host queue entries.
@@ -1024,6 +1098,7 @@ def repair_hosts(**filter_data):
             models.SpecialTask.Task.REPAIR, 'repair_hosts', **filter_data)
 
 
+@rpc_utils.read_from_replica
 def get_jobs(not_yet_run=False, running=False, finished=False,
              suite=False, sub=False, standalone=False, **filter_data):
     """\
@@ -1062,6 +1137,7 @@ def get_jobs(not_yet_run=False, running=False, finished=False,
     return rpc_utils.prepare_for_serialization(job_dicts)
 
 
+@rpc_utils.read_from_replica
 def get_num_jobs(not_yet_run=False, running=False, finished=False,
                  suite=False, sub=False, standalone=False,
                  **filter_data):
@@ -1078,6 +1154,7 @@ def get_num_jobs(not_yet_run=False, running=False, finished=False,
     return models.Job.query_count(filter_data)
 
 
+@rpc_utils.read_from_replica
 def get_jobs_summary(**filter_data):
     """\
     Like get_jobs(), but adds 'status_counts' and 'result_counts' field.
@@ -1091,15 +1168,95 @@ def get_jobs_summary(**filter_data):
     jobs = get_jobs(**filter_data)
     ids = [job['id'] for job in jobs]
     all_status_counts = models.Job.objects.get_status_counts(ids)
+    all_result_counts = tko_rpc_interface._get_status_counts_by_job(ids)
     for job in jobs:
         job['status_counts'] = all_status_counts[job['id']]
-        job['result_counts'] = tko_rpc_interface.get_status_counts(
-                ['afe_job_id', 'afe_job_id'],
-                header_groups=[['afe_job_id'], ['afe_job_id']],
-                **{'afe_job_id': job['id']})
+        job['result_counts'] = all_result_counts[job['id']]
     return rpc_utils.prepare_for_serialization(jobs)
 
 
+def _get_finished_job_ids(job_ids):
+    """Returns the ids of |job_ids| all of whose HQEs are complete.
+
+    Ids of jobs without HQEs, and of jobs that do not exist, are included.
+
+    @param job_ids: A list of job ids.
+    """
+    # End the current read transaction so that every check sees the latest
+    # committed HQE statuses.
+    transaction.rollback_unless_managed(using=models.HostQueueEntry.objects.db)
+    unfinished = models.HostQueueEntry.objects.filter(
+            job__in=job_ids, complete=False).values_list('job_id', flat=True)
+    return set(job_ids) - set(unfinished)
+
+
+def _get_job_test_statuses(job_ids):
+    """Returns the TKO test statuses of the jobs |job_ids|.
+
+    @param job_ids: A list of job ids.
+
+    @returns A dict of job id -> list of dicts with the fields of
+            _JOB_TEST_STATUS_FIELDS.
+    """
+    transaction.rollback_unless_managed(using=tko_models.TestView.objects.db)
+    statuses = dict((job_id, []) for job_id in job_ids)
+    if not job_ids:
+        return statuses
+    # Like TKO.get_job_test_statuses_from_db, find the tests by job tag,
+    # which is '<job id>-<owner>/...'.
+    query = reduce(operator.or_, (Q(job_tag__startswith='%d-' % job_id)
+                                  for job_id in job_ids))
+    views = tko_models.TestView.objects.filter(query)
+    for view in views.values(*_JOB_TEST_STATUS_FIELDS):
+        statuses[int(view['job_tag'].split('-', 1)[0])].append(view)
+    return statuses
+
+
+def wait_for_finished_jobs(job_ids, timeout_secs=0):
+    """\
+    Waits for some of the given jobs to finish and returns their results.
+
+    Returns as soon as at least one of the jobs is finished, i.e. all its
+    HQEs are complete, or after |timeout_secs|. Waiting in one RPC replaces
+    polling get_jobs(id__in=..., finished=True) and looking up the HQEs and
+    test statuses of every finished job.
+
+    The jobs are checked with exponential backoff, starting with the
+    job_wait_poll_interval_secs config value. When job_wait_max_waiters calls
+    are already waiting, the jobs are checked only once.
+
+    @param job_ids: A list of job ids.
+    @param timeout_secs: Longest time to wait, capped by the job_wait_max_secs
+            config value.
+
+    @returns A list with one dict per finished job, with the keys
+            'job': the job as returned by get_jobs().
+            'test_statuses': A list of dicts of the job's TKO test views with
+                    the keys status, test_name, subdir, reason,
+                    test_started_time, test_finished_time, afe_job_id,
+                    job_owner, hostname and job_tag.
+    """
+    wait_secs = min(timeout_secs, _JOB_WAIT_MAX_SECS)
+    waiting = wait_secs > 0 and _job_waiters.acquire(False)
+    try:
+        deadline = time.time() + (wait_secs if waiting else 0)
+        interval = max(1, _JOB_WAIT_POLL_INTERVAL_SECS)
+        while True:
+            finished_ids = _get_finished_job_ids(job_ids)
+            jobs = get_jobs(id__in=list(finished_ids)) if finished_ids else []
+            if jobs or time.time() >= deadline:
+                break
+            time.sleep(min(interval, max(0, deadline - time.time())))
+            interval *= 2
+    finally:
+        if waiting:
+            _job_waiters.release()
+    statuses = _get_job_test_statuses([job['id'] for job in jobs])
+    return rpc_utils.prepare_for_serialization(
+            [{'job': job, 'test_statuses': statuses[job['id']]}
+             for job in jobs])
+
+
 def get_info_for_clone(id, preserve_metahosts, queue_entry_filter_data=None):
     """\
     Retrieves all the information needed to clone a job.
@@ -1225,6 +1382,7 @@ def get_host_queue_entries_by_insert_time(
             ('host', 'job'))
 
 
+@rpc_utils.read_from_replica
 def get_host_queue_entries(start_time=None, end_time=None, **filter_data):
     """\
     @returns A sequence of nested dictionaries of host and job information.
@@ -1239,6 +1397,7 @@ def get_host_queue_entries(start_time=None, end_time=None, **filter_data):
             ('host', 'job'))
 
 
+@rpc_utils.read_from_replica
 def get_num_host_queue_entries(start_time=None, end_time=None, **filter_data):
     """\
     Get the number of host queue entries associated with this job.
@@ -1504,7 +1663,37 @@ def get_motd():
     return rpc_utils.get_motd()
 
 
-def get_static_data():
+def _get_cached_static_data():
+    """Returns the database backed part of get_static_data.
+
+    The result is cached by static_data_cache and must not be modified.
+    """
+    default_drone_set_name = models.DroneSet.default_drone_set_name()
+    drone_sets = ([default_drone_set_name] +
+                  sorted(drone_set.name for drone_set in
+                         models.DroneSet.objects.exclude(
+                                 name=default_drone_set_name)))
+
+    result = {}
+    result['users'] = get_users(sort_by=['login'])
+
+    label_exclude_filters = [{'name__startswith': 'cros-version'},
+                             {'name__startswith': 'fw-version'},
+                             {'name__startswith': 'fwrw-version'},
+                             {'name__startswith': 'fwro-version'},
+                             {'name__startswith': 'ab-version'},
+                             {'name__startswith': 'testbed-version'}]
+    result['labels'] = get_labels(
+        label_exclude_filters,
+        sort_by=['-platform', 'name'])
+
+    result['tests'] = get_tests(sort_by=['name'])
+    result['profilers'] = get_profilers(sort_by=['name'])
+    result['drone_sets'] = drone_sets
+    return result
+
+
+def get_static_data(known_etag=None):
     """\
     Returns a dictionary containing a bunch of data that shouldn't change
     often and is otherwise inaccessible.  This includes:
@@ -1527,32 +1716,20 @@ def get_static_data():
     motd: Server's message of the day.
     status_dictionary: A mapping from one word job status names to a more
             informative description.
-    """
+    etag: An identifier of this data; it changes whenever the data does.
+            Only present when the static data cache is enabled.
 
-    default_drone_set_name = models.DroneSet.default_drone_set_name()
-    drone_sets = ([default_drone_set_name] +
-                  sorted(drone_set.name for drone_set in
-                         models.DroneSet.objects.exclude(
-                                 name=default_drone_set_name)))
+    @param known_etag: The etag of static data the caller already has. If it
+            is still current, only {'etag': known_etag, 'unchanged': True} is
+            returned.
+    """
+    cached_result, cached_etag = static_data_cache.cache.get(
+            _get_cached_static_data)
 
     result = {}
     result['priorities'] = priorities.Priority.choices()
     result['default_priority'] = 'Default'
     result['max_schedulable_priority'] = priorities.Priority.DEFAULT
-    result['users'] = get_users(sort_by=['login'])
-
-    label_exclude_filters = [{'name__startswith': 'cros-version'},
-                             {'name__startswith': 'fw-version'},
-                             {'name__startswith': 'fwrw-version'},
-                             {'name__startswith': 'fwro-version'},
-                             {'name__startswith': 'ab-version'},
-                             {'name__startswith': 'testbed-version'}]
-    result['labels'] = get_labels(
-        label_exclude_filters,
-        sort_by=['-platform', 'name'])
-
-    result['tests'] = get_tests(sort_by=['name'])
-    result['profilers'] = get_profilers(sort_by=['name'])
     result['current_user'] = rpc_utils.prepare_for_serialization(
         models.User.current_user().get_object_dict())
     result['host_statuses'] = sorted(models.Host.Status.names)
@@ -1566,7 +1743,6 @@ def get_static_data():
     result['reboot_after_options'] = model_attributes.RebootAfter.names
     result['motd'] = rpc_utils.get_motd()
     result['drone_sets_enabled'] = models.DroneSet.drone_sets_enabled()
-    result['drone_sets'] = drone_sets
 
     result['status_dictionary'] = {"Aborted": "Aborted",
                                    "Verifying": "Verifying Host",
@@ -1587,6 +1763,15 @@ def get_static_data():
     result['wmatrix_url'] = rpc_utils.get_wmatrix_url()
     result['is_moblab'] = bool(utils.is_moblab())
 
+    if cached_etag is None:
+        result.update(cached_result)
+        return result
+    # Only the small uncached part is hashed on every call.
+    etag = static_data_cache.compute_etag([cached_etag, result])
+    if known_etag == etag:
+        return {'etag': etag, 'unchanged': True}
+    result.update(cached_result)
+    result['etag'] = etag
     return result
 
 
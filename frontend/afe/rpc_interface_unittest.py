@@ -3,6 +3,7 @@
 
 import datetime
 import mox
+import threading
 import unittest
 
 import common
@@ -12,18 +13,25 @@ from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import priorities
 from autotest_lib.client.common_lib.cros import dev_server
 from autotest_lib.client.common_lib.test_utils import mock
+from autotest_lib.frontend import db_router
 from autotest_lib.frontend import setup_django_environment
 from autotest_lib.frontend.afe import frontend_test_utils
+from autotest_lib.frontend.afe import host_summary_cache
 from autotest_lib.frontend.afe import model_logic
 from autotest_lib.frontend.afe import models
 from autotest_lib.frontend.afe import rpc_interface
 from autotest_lib.frontend.afe import rpc_utils
+from autotest_lib.frontend.afe import static_data_cache
+from autotest_lib.frontend.tko import models as tko_models
 from autotest_lib.server import frontend
 from autotest_lib.server import utils as server_utils
 from autotest_lib.server.cros import provision
 from autotest_lib.server.cros.dynamic_suite import constants
 from autotest_lib.server.cros.dynamic_suite import control_file_getter
 from autotest_lib.server.cros.dynamic_suite import frontend_wrappers
+from django.db import connections
+from django.db import models as dbmodels
+from django.db import transaction
 
 CLIENT = control_data.CONTROL_TYPE_NAMES.CLIENT
 SERVER = control_data.CONTROL_TYPE_NAMES.SERVER
@@ -90,6 +98,80 @@ class RpcInterfaceTest(unittest.TestCase,
         self.assertEquals(host['attributes'], {})
 
 
+    def test_get_hosts_include_current_job(self):
+        job = self._create_job(hosts=[1], active=True)
+        job.hostqueueentry_set.update(active=True)
+        task = models.SpecialTask.objects.create(
+                host=self.hosts[1], task=models.SpecialTask.Task.VERIFY,
+                is_active=True, requested_by=models.User.current_user())
+        hosts = dict((host['hostname'], host) for host in
+                     rpc_interface.get_hosts(include_current_job=True))
+        self.assertEquals(hosts['host1']['current_job'], job.id)
+        self.assertEquals(hosts['host1']['current_special_task'], None)
+        self.assertEquals(hosts['host2']['current_job'], None)
+        self.assertEquals(hosts['host2']['current_special_task'],
+                          '%d-verify' % task.id)
+
+
+    def test_get_hosts_summary_cache_invalidation(self):
+        self.god.stub_with(host_summary_cache, 'cache',
+                           host_summary_cache.HostSummaryCache(3600))
+        host = rpc_interface.get_hosts(hostname='host1')[0]
+        self.assertEquals(sorted(host['labels']), ['label1', 'myplatform'])
+
+        rpc_interface.host_add_labels(id='host1', labels=['label2'])
+        rpc_interface.set_host_attribute('foo', 'bar', hostname='host1')
+        self.label1.name = 'renamed'
+        self.label1.save()
+        host = rpc_interface.get_hosts(hostname='host1')[0]
+        self.assertEquals(sorted(host['labels']),
+                          ['label2', 'myplatform', 'renamed'])
+        self.assertEquals(host['attributes'], {'foo': 'bar'})
+
+
+    def test_host_summaries_are_cached_from_primary(self):
+        self.god.stub_with(host_summary_cache, 'cache',
+                           host_summary_cache.HostSummaryCache(3600))
+        self.god.stub_with(db_router.replica_monitor, 'is_fresh',
+                           lambda: True)
+        compute = host_summary_cache._compute_summaries
+        routes = []
+        def recording_compute(hosts):
+            routes.append(db_router.Router().db_for_read(models.Label))
+            return compute(hosts)
+        self.god.stub_with(host_summary_cache, '_compute_summaries',
+                           recording_compute)
+        hosts = list(models.Host.objects.filter(hostname='host1'))
+        with db_router.replica_reads():
+            summaries = host_summary_cache.cache.get_summaries(hosts)
+        self.assertEquals(routes, [None])
+        self.assertEquals(sorted(summaries[hosts[0].id]['labels']),
+                          ['label1', 'myplatform'])
+
+
+    def test_get_static_data_without_cache(self):
+        self.god.stub_with(static_data_cache, 'cache',
+                           static_data_cache.StaticDataCache(0))
+        data = rpc_interface.get_static_data(known_etag='stale')
+        self.assertNotIn('etag', data)
+        self.assertIn('label1', [label['name'] for label in data['labels']])
+
+
+    def test_get_static_data_cache_and_etag(self):
+        self.god.stub_with(static_data_cache, 'cache',
+                           static_data_cache.StaticDataCache(3600))
+        data = rpc_interface.get_static_data()
+        self.assertEquals(
+                rpc_interface.get_static_data(known_etag=data['etag']),
+                {'etag': data['etag'], 'unchanged': True})
+
+        models.Label.objects.create(name='newlabel')
+        new_data = rpc_interface.get_static_data(known_etag=data['etag'])
+        self.assertNotEquals(new_data['etag'], data['etag'])
+        self.assertIn('newlabel',
+                      [label['name'] for label in new_data['labels']])
+
+
     def test_get_hosts_multiple_labels(self):
         hosts = rpc_interface.get_hosts(
                 multiple_labels=['myplatform', 'label1'])
@@ -138,10 +220,10 @@ class RpcInterfaceTest(unittest.TestCase,
         entries[2].aborted = True
         entries[2].save()
 
-        # Mock up tko_rpc_interface.get_status_counts.
+        # Mock up tko_rpc_interface._get_status_counts_by_job.
         self.god.stub_function_to_return(rpc_interface.tko_rpc_interface,
-                                         'get_status_counts',
-                                         None)
+                                         '_get_status_counts_by_job',
+                                         {job.id: None})
 
         job_summaries = rpc_interface.get_jobs_summary(id=job.id)
         self.assertEquals(len(job_summaries), 1)
@@ -192,6 +274,118 @@ class RpcInterfaceTest(unittest.TestCase,
         self._check_job_ids(rpc_interface.get_jobs(finished=True), [complete])
 
 
+    def test_create_jobs_bulk(self):
+        job_args = dict(priority=priorities.Priority.DEFAULT,
+                        control_file='foo', control_type=CLIENT,
+                        meta_hosts=['label1'], keyvals={'k': 'v'})
+        results = rpc_interface.create_jobs_bulk(
+                [dict(job_args, name='one'),
+                 dict(job_args, name='bad', meta_hosts=['nonexistent']),
+                 dict(job_args, name='two')])
+        self.assertEquals(results[1]['error']['name'], 'ValidationError')
+        jobs = [models.Job.objects.get(id=results[i]['id']) for i in (0, 2)]
+        self.assertEquals([job.name for job in jobs], ['one', 'two'])
+        self.assertEquals([job.keyval_dict() for job in jobs],
+                          [{'k': 'v'}, {'k': 'v'}])
+        self.assertEquals(
+                [job.hostqueueentry_set.get().meta_host.name for job in jobs],
+                ['label1', 'label1'])
+
+
+    def test_wait_for_finished_jobs(self):
+        HqeStatus = models.HostQueueEntry.Status
+        running = self._create_job(hosts=[1, 2])
+        complete = self._create_job(hosts=[1, 2])
+        for job, statuses in ((running, (HqeStatus.RUNNING,
+                                         HqeStatus.COMPLETED)),
+                              (complete, (HqeStatus.COMPLETED,
+                                          HqeStatus.FAILED))):
+            for entry, status in zip(job.hostqueueentry_set.all(), statuses):
+                entry.update_object(status=status)
+        self.god.stub_function_to_return(rpc_interface,
+                                         '_get_job_test_statuses',
+                                         {complete.id: []})
+
+        results = rpc_interface.wait_for_finished_jobs(
+                [running.id, complete.id])
+        self.assertEquals([result['job']['id'] for result in results],
+                          [complete.id])
+        self.assertEquals(results[0]['test_statuses'], [])
+
+
+    def _insert_test_view(self, **values):
+        """Inserts a row in the TKO test view, which is read-only in Django.
+
+        @param values: Values of the row by column. Other columns get a
+                zero value.
+        """
+        for field in tko_models.TestView._meta.fields:
+            if not field.null:
+                values.setdefault(field.column,
+                                  '' if isinstance(field, dbmodels.CharField)
+                                  else 0)
+        using = tko_models.TestView.objects.db
+        connections[using].cursor().execute(
+                'INSERT INTO tko_test_view_2 (%s) VALUES (%s)'
+                % (', '.join(values), ', '.join(['%s'] * len(values))),
+                values.values())
+        transaction.commit_unless_managed(using=using)
+
+
+    def test_get_job_test_statuses(self):
+        for test_idx, job_tag, reason in ((1, '5-owner/host1', u'caf\xe9'),
+                                          (2, '55-owner/host1', ''),
+                                          (3, '6-owner/host2', ''),
+                                          (4, '5-owner/host2', '')):
+            self._insert_test_view(test_idx=test_idx, job_tag=job_tag,
+                                   reason=reason,
+                                   test_name='test%d' % test_idx)
+
+        statuses = rpc_interface._get_job_test_statuses([5, 6, 7])
+        self.assertEquals(sorted(statuses), [5, 6, 7])
+        self.assertEquals([view['test_name'] for view in statuses[5]],
+                          ['test1', 'test4'])
+        self.assertEquals(statuses[5][0]['reason'], u'caf\xe9')
+        self.assertEquals([view['job_tag'] for view in statuses[6]],
+                          ['6-owner/host2'])
+        self.assertEquals(statuses[7], [])
+        self.assertEquals(rpc_interface._get_job_test_statuses([]), {})
+
+
+    def _wait_for_unfinished_job(self, max_waiters):
+        """Waits 60 seconds on an unfinished job with a fake clock.
+
+        @param max_waiters: The job_wait_max_waiters value to use.
+
+        @returns The list of sleep durations.
+        """
+        job = self._create_job(hosts=[1])
+        now = [1000]
+        sleeps = []
+        def sleep(secs):
+            sleeps.append(secs)
+            now[0] += secs
+        self.god.stub_with(rpc_interface, '_JOB_WAIT_MAX_SECS', 60)
+        self.god.stub_with(rpc_interface, '_JOB_WAIT_POLL_INTERVAL_SECS', 5)
+        self.god.stub_with(rpc_interface, '_job_waiters',
+                           threading.Semaphore(max_waiters))
+        self.god.stub_with(rpc_interface.time, 'time', lambda: now[0])
+        self.god.stub_with(rpc_interface.time, 'sleep', sleep)
+        self.assertEquals(
+                rpc_interface.wait_for_finished_jobs([job.id],
+                                                     timeout_secs=60), [])
+        return sleeps
+
+
+    def test_wait_for_finished_jobs_backs_off(self):
+        self.assertEquals(self._wait_for_unfinished_job(1), [5, 10, 20, 25])
+        self.assertTrue(rpc_interface._job_waiters.acquire(False))
+
+
+    def test_wait_for_finished_jobs_caps_waiters(self):
+        self.assertEquals(self._wait_for_unfinished_job(0), [])
+
+
     def test_get_jobs_type_filters(self):
         self.assertRaises(AssertionError, rpc_interface.get_jobs,
                           suite=True, sub=True)
@@ -15,6 +15,7 @@ import sys
 import django.db.utils
 import django.http
 
+from autotest_lib.frontend import db_router
 from autotest_lib.frontend import thread_local
 from autotest_lib.frontend.afe import models, model_logic
 from autotest_lib.client.common_lib import control_data, error
@@ -103,6 +104,16 @@ def raw_http_response(response_data, content_type=None):
     return response
 
 
+def streaming_http_response(response_chunks, content_type=None):
+    """Returns a response sending |response_chunks| as they are generated.
+
+    @param response_chunks: An iterable of strings.
+    @param content_type: The content type of the response.
+    """
+    return django.http.StreamingHttpResponse(response_chunks,
+                                             content_type=content_type)
+
+
 def _gather_unique_dicts(dict_iterable):
     """\
     Pick out unique objects (by ID) from an iterable of object dicts.
@@ -327,21 +338,29 @@ def check_job_dependencies(host_objects, job_dependencies):
                        (', '.join(failing_hosts))})
 
 
-def check_job_metahost_dependencies(metahost_objects, job_dependencies):
+def check_job_metahost_dependencies(metahost_objects, job_dependencies,
+                                    validation_cache=None):
     """
     Check that at least one machine within the metahost spec satisfies the job's
     dependencies.
 
     @param metahost_objects A list of label objects representing the metahosts.
     @param job_dependencies A list of strings of the required label names.
+    @param validation_cache A dict shared by jobs created together, so that
+            each combination of metahost and dependencies is checked once.
     @raises NoEligibleHostException If a metahost cannot run the job.
     """
+    if validation_cache is None:
+        validation_cache = {}
     for metahost in metahost_objects:
-        hosts = models.Host.objects.filter(labels=metahost)
-        for label_name in job_dependencies:
-            if not provision.is_for_special_action(label_name):
-                hosts = hosts.filter(labels__name=label_name)
-        if not any(hosts):
+        key = ('metahost', metahost.id, frozenset(job_dependencies))
+        if key not in validation_cache:
+            hosts = models.Host.objects.filter(labels=metahost)
+            for label_name in job_dependencies:
+                if not provision.is_for_special_action(label_name):
+                    hosts = hosts.filter(labels__name=label_name)
+            validation_cache[key] = hosts.exists()
+        if not validation_cache[key]:
             raise error.NoEligibleHostException("No hosts within %s satisfy %s."
                     % (metahost.name, ', '.join(job_dependencies)))
 
@@ -481,7 +500,23 @@ def check_for_duplicate_hosts(host_objects):
                  % ', '.join(duplicate_hostnames)})
 
 
-def create_new_job(owner, options, host_objects, metahost_objects):
+def create_new_job(owner, options, host_objects, metahost_objects,
+                   validation_cache=None):
+    """Validate and create a job.
+
+    @param owner: Login of the owner of the job.
+    @param options: A dict of job options, see models.Job.create().
+    @param host_objects: A list of models.Host to run the job on.
+    @param metahost_objects: A list of models.Label to run the job on any
+            host of.
+    @param validation_cache: A dict shared by jobs created together, so that
+            the labels and dependencies they have in common are validated
+            once.
+
+    @returns The id of the created job.
+    """
+    if validation_cache is None:
+        validation_cache = {}
     all_host_objects = host_objects + metahost_objects
     dependencies = options.get('dependencies', [])
     synch_count = options.get('synch_count')
@@ -495,15 +530,18 @@ def create_new_job(owner, options, host_objects, metahost_objects):
     check_for_duplicate_hosts(host_objects)
 
     for label_name in dependencies:
-        if provision.is_for_special_action(label_name):
+        if (provision.is_for_special_action(label_name) and
+                ('label', label_name) not in validation_cache):
             # TODO: We could save a few queries
             # if we had a bulk ensure-label-exists function, which used
             # a bulk .get() call. The win is probably very small.
             _ensure_label_exists(label_name)
+            validation_cache['label', label_name] = True
 
     # This only checks targeted hosts, not hosts eligible due to the metahost
     check_job_dependencies(host_objects, dependencies)
-    check_job_metahost_dependencies(metahost_objects, dependencies)
+    check_job_metahost_dependencies(metahost_objects, dependencies,
+                                    validation_cache)
 
     options['dependencies'] = list(
             models.Label.objects.filter(name__in=dependencies))
@@ -756,10 +794,14 @@ def create_job_common(
         parent_job_id=None,
         test_retry=0,
         run_reset=True,
-        require_ssp=None):
+        require_ssp=None,
+        validation_cache=None):
     #pylint: disable-msg=C0111
     """
     Common code between creating "standard" jobs and creating parameterized jobs
+
+    @param validation_cache: A dict shared by jobs created together, see
+            create_new_job().
     """
     # input validation
     host_args_passed = any((hosts, meta_hosts, one_time_hosts))
@@ -819,7 +861,8 @@ def create_job_common(
     return create_new_job(owner=models.User.current_user().login,
                           options=options,
                           host_objects=host_objects,
-                          metahost_objects=metahost_objects)
+                          metahost_objects=metahost_objects,
+                          validation_cache=validation_cache)
 
 
 def _validate_host_job_sharding(host_objects):
@@ -1156,6 +1199,27 @@ def route_rpc_to_master(func):
     return replacement
 
 
+def read_from_replica(func):
+    """Serve the database reads of a read-only RPC from the replica.
+
+    Reads go to the readonly database while its replication lag is within
+    the configured bound, and to the primary database otherwise. On shards
+    only TKO tables are read from it, as it replicates the global database.
+
+    @param func: An RPC function to decorate
+
+    @returns: A function replacing the RPC func.
+    """
+    @wraps(func)
+    def replacement(*args, **kwargs):
+        """Run the RPC with reads routed to the replica."""
+        with db_router.replica_reads(
+                include_local_tables=not server_utils.is_shard()):
+            return func(*args, **kwargs)
+
+    return replacement
+
+
 def _convert_to_kwargs_only(func, args, kwargs):
     """Convert a function call's arguments to a kwargs dict.
 
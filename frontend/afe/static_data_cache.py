@@ -0,0 +1,109 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Cache of the database backed part of the get_static_data RPC.
+
+get_static_data lists all users, labels, tests, profilers and drone sets and
+is called on every web client load. Those tables rarely change, so the lists
+are kept in memory and invalidated through Django signals when one of their
+rows is saved or deleted in this process. Other processes, and bulk updates
+that do not send signals, only show up once the cached copy expires after a
+configurable time.
+
+Every cached payload also gets an ETag, a digest of its content computed
+once when the payload is built, so that clients which already hold the
+current payload can skip downloading it again. Without the cache there is
+no ETag, as hashing the payload on every call would cost more than it saves.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from django.db.models import signals
+
+import common
+from autotest_lib.client.common_lib import global_config
+from autotest_lib.frontend.afe import models
+
+
+# Seconds the cached static data may be served. 0 disables the cache.
+_CACHE_TTL_SECS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'static_data_cache_ttl_secs', type=int, default=0)
+
+
+def compute_etag(data):
+    """Returns a digest of the JSON serializable |data|.
+
+    Equal data give equal ETags in every process.
+
+    @param data: Data as returned by an RPC.
+    """
+    encoded = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.md5(encoded).hexdigest()
+
+
+class StaticDataCache(object):
+    """A single cached payload and its ETag."""
+
+    def __init__(self, ttl_secs, time_func=time.time):
+        """
+        @param ttl_secs: Seconds the payload may be served. 0 disables
+                caching.
+        @param time_func: Function returning the current time, for testing.
+        """
+        self._ttl_secs = ttl_secs
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        # (payload, etag, time it was built), or None.
+        self._cached = None
+        # Incremented on every invalidation, so that a payload built
+        # concurrently with an invalidation is not stored.
+        self._generation = 0
+
+
+    def get(self, build_func):
+        """Returns the payload and its ETag, building it if needed.
+
+        @param build_func: Function returning the payload. Callers must not
+                modify the payload it returns.
+
+        @returns A tuple (payload, etag). The etag is None if caching is
+                disabled.
+        """
+        if self._ttl_secs <= 0:
+            return build_func(), None
+        with self._lock:
+            cached = self._cached
+            generation = self._generation
+        if cached and cached[2] > self._time_func() - self._ttl_secs:
+            return cached[0], cached[1]
+        now = self._time_func()
+        payload = build_func()
+        etag = compute_etag(payload)
+        with self._lock:
+            if generation == self._generation:
+                self._cached = (payload, etag, now)
+        return payload, etag
+
+
+    def invalidate(self):
+        """Drops the cached payload."""
+        with self._lock:
+            self._generation += 1
+            self._cached = None
+
+
+cache = StaticDataCache(_CACHE_TTL_SECS)
+
+
+def _invalidate(sender, **kwargs):
+    cache.invalidate()
+
+
+for _model in (models.User, models.Label, models.Test, models.Profiler,
+               models.DroneSet):
+    signals.post_save.connect(_invalidate, sender=_model)
+    signals.post_delete.connect(_invalidate, sender=_model)
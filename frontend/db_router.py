@@ -30,8 +30,136 @@ Therefore this class will route all queries for tables starts with `server`
 prefix to server database, route all queries for tables that involve
 `tko_`-prefixed tables to the global database. For all others this router will
 not give a hint, which means the default database will be used.
+
+Read-only RPCs can additionally have their reads served by the readonly
+connection, which may point at a replica, see replica_reads(). This only
+happens while the replication lag of the replica is within
+AUTOTEST_WEB replica_max_lag_secs; otherwise reads fall back to the primary.
 """
 
+import contextlib
+import logging
+import threading
+import time
+
+import common
+from autotest_lib.client.common_lib import global_config
+
+
+# Reads of read-only RPCs go to the replica while it lags at most this many
+# seconds behind. 0 disables reading from the replica.
+_MAX_REPLICA_LAG_SECS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'replica_max_lag_secs', type=int, default=0)
+# Seconds between two checks of the replication lag.
+_REPLICA_LAG_CHECK_INTERVAL_SECS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'replica_lag_check_interval_secs', type=int,
+        default=10)
+_REPLICA_DB = 'readonly'
+
+_state = threading.local()
+
+
+def _get_replica_lag():
+    """Returns the replication lag of the replica in seconds.
+
+    Like site_utils/check_slave_db_delay.py, this reads Seconds_Behind_Master
+    from the slave status.
+
+    @returns The lag in seconds; 0 if the database is not a replica, or None
+             if replication is broken.
+    """
+    # Importing connections at module load time breaks most unit tests, see
+    # frontend/settings.py.
+    from django.db import connections
+    cursor = connections[_REPLICA_DB].cursor()
+    cursor.execute('SHOW SLAVE STATUS')
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, row)).get('Seconds_Behind_Master')
+
+
+class ReplicaLagMonitor(object):
+    """Tells whether the replica is recent enough, checking it periodically."""
+
+    def __init__(self, max_lag_secs, check_interval_secs,
+                 get_lag=_get_replica_lag, time_func=time.time):
+        """
+        @param max_lag_secs: Maximum tolerated lag. 0 means the replica is
+                never used.
+        @param check_interval_secs: Seconds a lag measurement is trusted.
+        @param get_lag: Function returning the current lag, see
+                _get_replica_lag.
+        @param time_func: Function returning the current time, for testing.
+        """
+        self._max_lag_secs = max_lag_secs
+        self._check_interval_secs = check_interval_secs
+        self._get_lag = get_lag
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        self._fresh = False
+        self._next_check = 0
+
+
+    def is_fresh(self):
+        """Returns True if reads may be served by the replica."""
+        if self._max_lag_secs <= 0:
+            return False
+        with self._lock:
+            now = self._time_func()
+            if now < self._next_check:
+                return self._fresh
+            self._next_check = now + self._check_interval_secs
+            try:
+                lag = self._get_lag()
+            except Exception:
+                logging.exception('Failed to get the replication lag; '
+                                  'reading from the primary database.')
+                lag = None
+            was_fresh = self._fresh
+            self._fresh = lag is not None and lag <= self._max_lag_secs
+            if was_fresh and not self._fresh:
+                logging.warning('Replica lags %s seconds behind, reading from '
+                                'the primary database.', lag)
+            return self._fresh
+
+
+replica_monitor = ReplicaLagMonitor(_MAX_REPLICA_LAG_SECS,
+                                    _REPLICA_LAG_CHECK_INTERVAL_SECS)
+
+
+@contextlib.contextmanager
+def replica_reads(include_local_tables=True):
+    """Context manager serving reads of this thread from the replica.
+
+    @param include_local_tables: Whether tables of the default database may
+            be read from the replica too. The replica mirrors the global
+            database, so this must be False on shards.
+    """
+    previous = getattr(_state, 'replica_reads', None)
+    _state.replica_reads = include_local_tables
+    try:
+        yield
+    finally:
+        _state.replica_reads = previous
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Context manager serving reads of this thread from the primary.
+
+    For reads within replica_reads() whose results outlive the RPC, e.g.
+    data that is cached, and so must not be older than the primary.
+    """
+    previous = getattr(_state, 'replica_reads', None)
+    _state.replica_reads = None
+    try:
+        yield
+    finally:
+        _state.replica_reads = previous
+
+
 class Router(object):
     """
     Decide if an object should be written to the default or to the global db.
@@ -66,16 +194,33 @@ class Router(object):
         @param model: Model to decide for.
         @param hints: Optional arguments to determine which database for read.
 
-        @returns: 'server' for all server models. 'global' for all tko models,
-                  None otherwise. None means the router doesn't have an opinion.
+        @returns: 'server' for all server models. 'readonly' for models read
+                  from the replica within replica_reads(). 'global' for all tko
+                  models, None otherwise. None means the router doesn't have
+                  an opinion.
         """
         if self._should_be_in_server_db(model):
             return 'server'
+        if self._should_read_from_replica(model):
+            return _REPLICA_DB
         if self._should_be_in_global(model):
             return 'global'
         return None
 
 
+    def _should_read_from_replica(self, model):
+        """Return True if reads of the model should go to the replica.
+
+        @param model: Model to decide for.
+        """
+        include_local_tables = getattr(_state, 'replica_reads', None)
+        if include_local_tables is None:
+            return False
+        if not include_local_tables and not self._should_be_in_global(model):
+            return False
+        return replica_monitor.is_fresh()
+
+
     def db_for_write(self, model, **hints):
         """Return the database for a writing access.
 
@@ -0,0 +1,124 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import unittest
+
+import common
+from autotest_lib.client.common_lib.test_utils import mock
+from autotest_lib.frontend import db_router
+
+
+def _make_model(db_table):
+    """Returns a fake model class stored in |db_table|."""
+    class Meta(object):
+        pass
+    Meta.db_table = db_table
+    return type(db_table, (object,), {'_meta': Meta})
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+
+    def __call__(self):
+        return self.now
+
+
+class ReplicaLagMonitorTest(unittest.TestCase):
+    """Tests for db_router.ReplicaLagMonitor."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.lags = []
+
+
+    def _get_lag(self):
+        lag = self.lags.pop(0)
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+
+    def test_lag_is_checked_periodically(self):
+        monitor = db_router.ReplicaLagMonitor(5, 10, get_lag=self._get_lag,
+                                              time_func=self.clock)
+        self.lags = [3, 20]
+        self.assertTrue(monitor.is_fresh())
+        self.clock.now = 9
+        self.assertTrue(monitor.is_fresh())
+        self.clock.now = 10
+        self.assertFalse(monitor.is_fresh())
+        self.assertEqual(self.lags, [])
+
+
+    def test_broken_replication_and_errors_fall_back(self):
+        monitor = db_router.ReplicaLagMonitor(5, 0, get_lag=self._get_lag,
+                                              time_func=self.clock)
+        self.lags = [None, Exception('no privileges'), 0]
+        self.assertFalse(monitor.is_fresh())
+        self.assertFalse(monitor.is_fresh())
+        self.assertTrue(monitor.is_fresh())
+
+
+    def test_disabled(self):
+        monitor = db_router.ReplicaLagMonitor(0, 10, get_lag=self._get_lag)
+        self.assertFalse(monitor.is_fresh())
+
+
+class RouterTest(unittest.TestCase):
+    """Tests for replica routing in db_router.Router."""
+
+    def setUp(self):
+        self.god = mock.mock_god()
+        self.fresh = True
+        self.god.stub_with(db_router.replica_monitor, 'is_fresh',
+                           lambda: self.fresh)
+        self.router = db_router.Router()
+        self.afe_model = _make_model('afe_jobs')
+        self.tko_model = _make_model('tko_tests')
+
+
+    def tearDown(self):
+        self.god.unstub_all()
+
+
+    def test_reads_outside_of_replica_reads(self):
+        self.assertEqual(self.router.db_for_read(self.afe_model), None)
+        self.assertEqual(self.router.db_for_read(self.tko_model), 'global')
+
+
+    def test_replica_reads(self):
+        with db_router.replica_reads():
+            self.assertEqual(self.router.db_for_read(self.afe_model),
+                             'readonly')
+            self.assertEqual(self.router.db_for_write(self.afe_model), None)
+            self.fresh = False
+            self.assertEqual(self.router.db_for_read(self.tko_model),
+                             'global')
+        self.fresh = True
+        self.assertEqual(self.router.db_for_read(self.afe_model), None)
+
+
+    def test_replica_reads_on_shard(self):
+        with db_router.replica_reads(include_local_tables=False):
+            self.assertEqual(self.router.db_for_read(self.afe_model), None)
+            self.assertEqual(self.router.db_for_read(self.tko_model),
+                             'readonly')
+
+
+    def test_primary_reads_within_replica_reads(self):
+        with db_router.replica_reads():
+            with db_router.primary_reads():
+                self.assertEqual(self.router.db_for_read(self.afe_model),
+                                 None)
+                self.assertEqual(self.router.db_for_read(self.tko_model),
+                                 'global')
+            self.assertEqual(self.router.db_for_read(self.afe_model),
+                             'readonly')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+UP_SQL = """
+CREATE TABLE tko_test_rollups (
+    id INT NOT NULL AUTO_INCREMENT,
+    job_idx INT(10) UNSIGNED NOT NULL,
+    afe_job_id INT DEFAULT NULL,
+    job_name VARCHAR(300) DEFAULT NULL,
+    job_owner VARCHAR(240) DEFAULT NULL,
+    build VARCHAR(255) DEFAULT NULL,
+    board VARCHAR(40) DEFAULT NULL,
+    suite VARCHAR(40) DEFAULT NULL,
+    test_name VARCHAR(300) DEFAULT NULL,
+    status VARCHAR(30) DEFAULT NULL,
+    invalid TINYINT(1) NOT NULL DEFAULT 0,
+    test_count INT NOT NULL,
+    latest_test_idx INT(10) UNSIGNED NOT NULL,
+    PRIMARY KEY (id),
+    INDEX tko_test_rollups_job_idx (job_idx),
+    INDEX tko_test_rollups_afe_job_id (afe_job_id),
+    INDEX tko_test_rollups_build_suite_board (build, suite, board),
+    INDEX tko_test_rollups_test_name_status (test_name, status),
+    FOREIGN KEY (job_idx) REFERENCES tko_jobs (job_idx) ON DELETE CASCADE
+) ENGINE=InnoDB;
+"""
+
+DOWN_SQL = """
+DROP TABLE tko_test_rollups;
+"""
@@ -1,8 +1,20 @@
 from django.db import models as dbmodels, connection
+from autotest_lib.client.common_lib import global_config
 from autotest_lib.frontend.afe import model_logic, readonly_connection
 
 _quote_name = connection.ops.quote_name
 
+# Whether grouped TestView queries may be answered from tko_test_rollups.
+_USE_TEST_ROLLUPS = global_config.global_config.get_config_value(
+        'AUTOTEST_WEB', 'use_tko_test_rollups', type=bool, default=False)
+# TestView fields that tko_test_rollups has too.
+_ROLLUP_FIELDS = frozenset(['afe_job_id', 'job_name', 'job_owner', 'build',
+                            'board', 'suite', 'test_name', 'status',
+                            'invalid'])
+# Special filter_data parameters that do not prevent using rollups.
+_ROLLUP_SPECIAL_PARAMS = frozenset(['sort_by', 'query_start', 'query_limit',
+                                    'no_distinct'])
+
 class TempManager(model_logic.ExtendedManager):
     """A Temp Manager."""
     _GROUP_COUNT_NAME = 'group_count'
@@ -637,6 +649,37 @@ class TestViewManager(TempManager):
         return query_set
 
 
+    def get_rollup_query(self, group_by, filter_data, fixed_headers=None):
+        """Plans a grouped query over TestRollup instead of TestView.
+
+        TestRollup holds one row per job, test name, status and validity, so
+        grouped queries that only group, filter and sort on those fields can
+        be answered from it without joining the tables behind TestView.
+        Counts must then be computed by summing TestRollup.test_count, see
+        TestRollupManager.get_count_sql.
+
+        @param group_by: The fields by which to group.
+        @param filter_data: Data by which to filter. It is not modified.
+        @param fixed_headers: Dict of header fields to fixed values, as
+                passed to get_group_counts.
+
+        @return A TestRollup QuerySet without presentation applied, or None
+                if the query needs TestView.
+        """
+        if not _USE_TEST_ROLLUPS:
+            return None
+        fields = list(group_by) + list(fixed_headers or ())
+        for key, value in filter_data.iteritems():
+            if key == 'sort_by':
+                fields.extend(field.lstrip('-') for field in value)
+            elif key not in _ROLLUP_SPECIAL_PARAMS:
+                fields.append(key.split('__')[0])
+        if not all(field in _ROLLUP_FIELDS for field in fields):
+            return None
+        filter_data = dict(filter_data, no_distinct=True)
+        return TestRollup.query_objects(filter_data, apply_presentation=False)
+
+
     def query_test_ids(self, filter_data, apply_presentation=True):
         """Queries for test IDs.
 
@@ -713,6 +756,9 @@ class TestView(dbmodels.Model, model_logic.ModelExtensions):
     job_started_time = dbmodels.DateTimeField(null=True, blank=True)
     job_finished_time = dbmodels.DateTimeField(null=True, blank=True)
     afe_job_id = dbmodels.IntegerField(null=True)
+    build = dbmodels.CharField(blank=True, null=True, max_length=255)
+    board = dbmodels.CharField(blank=True, null=True, max_length=40)
+    suite = dbmodels.CharField(blank=True, null=True, max_length=40)
     hostname = dbmodels.CharField(blank=True, max_length=300)
     platform = dbmodels.CharField(blank=True, max_length=240)
     machine_owner = dbmodels.CharField(blank=True, max_length=240)
@@ -745,3 +791,50 @@ class TestView(dbmodels.Model, model_logic.ModelExtensions):
     class Meta:
         """Metadata for class TestView."""
         db_table = 'tko_test_view_2'
+
+
+class TestRollupManager(TempManager):
+    """A Test Rollup Manager."""
+
+    def get_count_sql(self, query):
+        """Get SQL to select the number of tests in each group.
+
+        @param query: The query to use.
+
+        @return A tuple (field alias, field SQL).
+        """
+        return self._GROUP_COUNT_NAME, 'CAST(SUM(test_count) AS SIGNED)'
+
+
+class TestRollup(dbmodels.Model, model_logic.ModelExtensions):
+    """Models per job counts of tests with the same name and status.
+
+    Rows are recomputed by tko/parse.py whenever a job is parsed, see
+    tko.db.db_sql.update_test_rollups, and are read-only here.
+    """
+    job_idx = dbmodels.IntegerField('job index')
+    afe_job_id = dbmodels.IntegerField(null=True)
+    job_name = dbmodels.CharField(blank=True, max_length=300)
+    job_owner = dbmodels.CharField('owner', blank=True, max_length=240)
+    build = dbmodels.CharField(blank=True, null=True, max_length=255)
+    board = dbmodels.CharField(blank=True, null=True, max_length=40)
+    suite = dbmodels.CharField(blank=True, null=True, max_length=40)
+    test_name = dbmodels.CharField(blank=True, max_length=300)
+    status = dbmodels.CharField(blank=True, max_length=30)
+    invalid = dbmodels.BooleanField(default=False)
+    test_count = dbmodels.IntegerField()
+    latest_test_idx = dbmodels.IntegerField()
+
+    objects = TestRollupManager()
+
+    def save(self):
+        raise NotImplementedError('TestRollup is read-only')
+
+
+    def delete(self):
+        raise NotImplementedError('TestRollup is read-only')
+
+
+    class Meta:
+        """Metadata for class TestRollup."""
+        db_table = 'tko_test_rollups'
@@ -10,15 +10,18 @@ from autotest_lib.frontend.tko import preconfigs
 
 # table/spreadsheet view support
 
+@rpc_utils.read_from_replica
 def get_test_views(**filter_data):
     return rpc_utils.prepare_for_serialization(
         models.TestView.list_objects(filter_data))
 
 
+@rpc_utils.read_from_replica
 def get_num_test_views(**filter_data):
     return models.TestView.query_count(filter_data)
 
 
+@rpc_utils.read_from_replica
 def get_group_counts(group_by, header_groups=None, fixed_headers=None,
                      extra_select_fields=None, **filter_data):
     """
@@ -44,15 +47,25 @@ def get_group_counts(group_by, header_groups=None, fixed_headers=None,
       The keys for the extra_select_fields are determined by the "AS" alias of
       the field.
     """
-    query = models.TestView.objects.get_query_set_with_joins(filter_data)
-    # don't apply presentation yet, since we have extra selects to apply
-    query = models.TestView.query_objects(filter_data, initial_query=query,
-                                          apply_presentation=False)
-    count_alias, count_sql = models.TestView.objects.get_count_sql(query)
+    query = None
+    if extra_select_fields in (None, tko_rpc_utils.STATUS_FIELDS):
+        query = models.TestView.objects.get_rollup_query(group_by, filter_data,
+                                                         fixed_headers)
+    if query is not None:
+        model = models.TestRollup
+        if extra_select_fields:
+            extra_select_fields = tko_rpc_utils.ROLLUP_STATUS_FIELDS
+    else:
+        model = models.TestView
+        query = models.TestView.objects.get_query_set_with_joins(filter_data)
+        # don't apply presentation yet, since we have extra selects to apply
+        query = models.TestView.query_objects(filter_data, initial_query=query,
+                                              apply_presentation=False)
+    count_alias, count_sql = model.objects.get_count_sql(query)
     query = query.extra(select={count_alias: count_sql})
     if extra_select_fields:
         query = query.extra(select=extra_select_fields)
-    query = models.TestView.apply_presentation(query, filter_data)
+    query = model.apply_presentation(query, filter_data)
 
     group_processor = tko_rpc_utils.GroupDataProcessor(query, group_by,
                                                        header_groups or [],
@@ -61,6 +74,7 @@ def get_group_counts(group_by, header_groups=None, fixed_headers=None,
     return rpc_utils.prepare_for_serialization(group_processor.get_info_dict())
 
 
+@rpc_utils.read_from_replica
 def get_num_groups(group_by, **filter_data):
     """
     Gets the count of unique groups with the given grouping fields.
@@ -70,6 +84,7 @@ def get_num_groups(group_by, **filter_data):
     return models.TestView.objects.get_num_groups(query, group_by)
 
 
+@rpc_utils.read_from_replica
 def get_status_counts(group_by, header_groups=[], fixed_headers={},
                       **filter_data):
     """
@@ -83,6 +98,36 @@ def get_status_counts(group_by, header_groups=[], fixed_headers={},
                             **filter_data)
 
 
+def _get_status_counts_by_job(afe_job_ids):
+    """
+    Computes, for each job in afe_job_ids, the same result as
+        get_status_counts(['afe_job_id', 'afe_job_id'],
+                          header_groups=[['afe_job_id'], ['afe_job_id']],
+                          afe_job_id=afe_job_id)
+    but with a single grouped query for all of the jobs.
+
+    @param afe_job_ids: A list of AFE job ids.
+
+    @returns A dict mapping each AFE job id to its status counts.
+    """
+    counts_by_job = dict((afe_job_id, {'groups': [],
+                                       'header_values': [[], []]})
+                         for afe_job_id in afe_job_ids)
+    if not counts_by_job:
+        return counts_by_job
+    all_counts = get_status_counts(['afe_job_id', 'afe_job_id'],
+                                   afe_job_id__in=list(counts_by_job))
+    for group in all_counts['groups']:
+        afe_job_id = group.pop('afe_job_id')
+        # The header groups of the single job query hold just this job.
+        group['header_indices'] = [0, 0]
+        counts_by_job[afe_job_id] = {
+                'groups': [group],
+                'header_values': [[[afe_job_id]], [[afe_job_id]]]}
+    return counts_by_job
+
+
+@rpc_utils.read_from_replica
 def get_latest_tests(group_by, header_groups=[], fixed_headers={},
                      extra_info=[], **filter_data):
     """
@@ -95,16 +140,24 @@ def get_latest_tests(group_by, header_groups=[], fixed_headers={},
                       field of the return dictionary.
     """
     # find latest test per group
-    initial_query = models.TestView.objects.get_query_set_with_joins(
-            filter_data)
-    query = models.TestView.query_objects(filter_data,
-                                          initial_query=initial_query,
-                                          apply_presentation=False)
+    query = models.TestView.objects.get_rollup_query(group_by, filter_data,
+                                                     fixed_headers)
+    if query is not None:
+        model = models.TestRollup
+        latest_test_idx_sql = 'MAX(latest_test_idx)'
+        initial_query = models.TestView.objects.get_query_set()
+    else:
+        model = models.TestView
+        latest_test_idx_sql = ('MAX(%s)' % models.TestView.objects
+                               .get_key_on_this_table('test_idx'))
+        initial_query = models.TestView.objects.get_query_set_with_joins(
+                filter_data)
+        query = models.TestView.query_objects(filter_data,
+                                              initial_query=initial_query,
+                                              apply_presentation=False)
     query = query.exclude(status__in=tko_rpc_utils._INVALID_STATUSES)
-    query = query.extra(
-            select={'latest_test_idx' : 'MAX(%s)' %
-                    models.TestView.objects.get_key_on_this_table('test_idx')})
-    query = models.TestView.apply_presentation(query, filter_data)
+    query = query.extra(select={'latest_test_idx' : latest_test_idx_sql})
+    query = model.apply_presentation(query, filter_data)
 
     group_processor = tko_rpc_utils.GroupDataProcessor(query, group_by,
                                                        header_groups,
@@ -180,6 +233,7 @@ def _job_keyvals_to_dict(keyvals):
     return dict((keyval.key, keyval.value) for keyval in keyvals)
 
 
+@rpc_utils.read_from_replica
 def get_detailed_test_views(**filter_data):
     test_views = models.TestView.list_objects(filter_data)
 
@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# pylint: disable=missing-docstring
+
+import re
+import unittest
+
+import common
+from autotest_lib.frontend import setup_django_environment
+from autotest_lib.frontend import setup_test_environment
+from autotest_lib.client.common_lib.test_utils import mock
+from autotest_lib.frontend.afe import readonly_connection
+from autotest_lib.frontend.tko import models, rpc_interface
+from autotest_lib.tko import db as tko_db
+from django.db import connections
+
+# Columns added to tko_jobs by migration 103, which the Job model lacks.
+_ADD_JOB_COLUMNS = [
+        'ALTER TABLE tko_jobs ADD COLUMN build varchar(255) NULL',
+        'ALTER TABLE tko_jobs ADD COLUMN suite varchar(40) NULL',
+        'ALTER TABLE tko_jobs ADD COLUMN board varchar(40) NULL',
+]
+
+# The view of migration 103, without the columns TestView does not have.
+_CREATE_TEST_VIEW = """
+CREATE VIEW tko_test_view_2 AS
+SELECT  tko_tests.test_idx AS test_idx,
+        tko_tests.job_idx AS job_idx,
+        tko_tests.test AS test_name,
+        tko_tests.subdir AS subdir,
+        tko_tests.kernel_idx AS kernel_idx,
+        tko_tests.status AS status_idx,
+        tko_tests.reason AS reason,
+        tko_tests.machine_idx AS machine_idx,
+        tko_tests.invalid AS invalid,
+        tko_tests.invalidates_test_idx AS invalidates_test_idx,
+        tko_tests.started_time AS test_started_time,
+        tko_tests.finished_time AS test_finished_time,
+        tko_jobs.tag AS job_tag,
+        tko_jobs.label AS job_name,
+        tko_jobs.username AS job_owner,
+        tko_jobs.queued_time AS job_queued_time,
+        tko_jobs.started_time AS job_started_time,
+        tko_jobs.finished_time AS job_finished_time,
+        tko_jobs.afe_job_id AS afe_job_id,
+        tko_jobs.build AS build,
+        tko_jobs.suite AS suite,
+        tko_jobs.board AS board,
+        tko_machines.hostname AS hostname,
+        tko_machines.machine_group AS platform,
+        tko_machines.owner AS machine_owner,
+        tko_kernels.kernel_hash AS kernel_hash,
+        tko_kernels.base AS kernel_base,
+        tko_kernels.printable AS kernel,
+        tko_status.word AS status
+FROM tko_tests
+INNER JOIN tko_jobs ON tko_jobs.job_idx = tko_tests.job_idx
+INNER JOIN tko_machines ON tko_machines.machine_idx = tko_jobs.machine_idx
+INNER JOIN tko_kernels ON tko_kernels.kernel_idx = tko_tests.kernel_idx
+INNER JOIN tko_status ON tko_status.status_idx = tko_tests.status;
+"""
+
+# sqlite takes any columns that don't have aliases and names them
+# "table_name"."column_name".  we map these to just column_name.
+_SQLITE_AUTO_COLUMN_ALIAS_RE = re.compile(r'".+"\."(.+)"')
+
+
+def _get_column_names_for_sqlite3(cursor):
+    names = [column_info[0] for column_info in cursor.description]
+    return [_SQLITE_AUTO_COLUMN_ALIAS_RE.sub(r'\1', name) for name in names]
+
+
+def _sqlite_if(condition, true_result, false_result):
+    if condition:
+        return true_result
+    return false_result
+
+
+def _cursor():
+    """Returns a cursor on the database of the TKO tables."""
+    return connections[models.TestView.objects.db].cursor()
+
+
+class RpcInterfaceTest(unittest.TestCase):
+    """Tests of the TKO RPCs, over the real tko_test_view_2 view."""
+
+    def setUp(self):
+        self.god = mock.mock_god()
+        setup_test_environment.set_up()
+        # Group queries run on the readonly connection.
+        self.god.stub_with(readonly_connection, '_DISABLED', True)
+        self.god.stub_with(models.TempManager, '_get_column_names',
+                           staticmethod(_get_column_names_for_sqlite3))
+        self.god.stub_with(models, '_USE_TEST_ROLLUPS', True)
+
+        cursor = _cursor()
+        connections[models.TestView.objects.db].connection.create_function(
+                'if', 3, _sqlite_if)
+        for sql in _ADD_JOB_COLUMNS:
+            cursor.execute(sql)
+        cursor.execute('DROP TABLE tko_test_view_2')
+        cursor.execute(_CREATE_TEST_VIEW)
+        self._create_initial_data()
+
+
+    def tearDown(self):
+        setup_test_environment.tear_down()
+        self.god.unstub_all()
+
+
+    def _create_job(self, afe_job_id, build, suite, board, tests):
+        """Creates a TKO job and its tests.
+
+        @param afe_job_id: AFE id of the job.
+        @param build, suite, board: Values of the job columns.
+        @param tests: List of (test name, status word, invalid) tuples.
+        """
+        job = models.Job.objects.create(
+                tag='%d-user/host1' % afe_job_id, label='job%d' % afe_job_id,
+                username='user', machine=self.machine, afe_job_id=afe_job_id)
+        _cursor().execute(
+                'UPDATE tko_jobs SET build=%s, suite=%s, board=%s '
+                'WHERE job_idx=%s', [build, suite, board, job.job_idx])
+        for name, word, invalid in tests:
+            models.Test.objects.create(job=job, test=name, kernel=self.kernel,
+                                       status=self.statuses[word],
+                                       machine=self.machine, invalid=invalid)
+
+
+    def _create_initial_data(self):
+        self.machine = models.Machine.objects.create(hostname='host1')
+        self.kernel = models.Kernel.objects.create(
+                kernel_hash='kernel', base='kernel', printable='kernel')
+        self.statuses = dict(
+                (word, models.Status.objects.create(word=word))
+                for word in ('GOOD', 'FAIL', 'RUNNING', 'TEST_NA'))
+        self._create_job(1, 'lumpy-release/R1', 'bvt', 'lumpy',
+                         [('test1', 'FAIL', True), ('test1', 'GOOD', False),
+                          ('test2', 'FAIL', False), ('test3', 'RUNNING', False),
+                          ('test4', 'TEST_NA', False)])
+        self._create_job(2, 'lumpy-release/R2', 'bvt', 'lumpy',
+                         [('test1', 'GOOD', False), ('test2', 'GOOD', False),
+                          ('test2', 'GOOD', False)])
+        self._create_job(3, 'link-release/R2', 'smoke', 'link',
+                         [('test1', 'FAIL', False), ('test2', 'GOOD', False)])
+        self._update_rollups()
+
+
+    def _update_rollups(self):
+        """Fills tko_test_rollups like tko/db.py update_job_range_rollups."""
+        cursor = _cursor()
+        cursor.execute(tko_db._DELETE_JOB_RANGE_ROLLUPS_SQL, [0, 1000])
+        cursor.execute(tko_db._INSERT_JOB_RANGE_ROLLUPS_SQL, [0, 1000])
+
+
+    def _call_with_and_without_rollups(self, rpc, group_by, **dargs):
+        """Calls a TKO RPC using tko_test_rollups and using TestView.
+
+        Groups also hold the other columns of one of their rows, which
+        differ between TestView and TestRollup, so only the group fields,
+        the counts and the header data are returned.
+
+        @param rpc: The RPC function, called with group_by and dargs.
+        @param group_by: The fields by which to group.
+
+        @returns A (result with rollups, result without rollups) tuple.
+        """
+        keys = set(group_by) | set(['id', 'group_count', 'pass_count',
+                                    'complete_count', 'incomplete_count',
+                                    'header_indices', 'extra_info'])
+        results = []
+        for use_rollups in (True, False):
+            self.god.stub_with(models, '_USE_TEST_ROLLUPS', use_rollups)
+            result = rpc(group_by, **dargs)
+            groups = [dict((key, value) for key, value in group.iteritems()
+                           if key in keys)
+                      for group in result['groups']]
+            results.append({'header_values': result['header_values'],
+                            'groups': sorted(groups,
+                                             key=lambda group: group['id'])})
+        self.god.stub_with(models, '_USE_TEST_ROLLUPS', True)
+        return tuple(results)
+
+
+    def test_get_rollup_query(self):
+        manager = models.TestView.objects
+        query = manager.get_rollup_query(
+                ['build', 'test_name'], {'suite': 'bvt', 'sort_by': ['-build'],
+                                         'status__in': ['GOOD']},
+                fixed_headers={'board': ['lumpy']})
+        self.assertEquals(query.model, models.TestRollup)
+        self.assertEquals(sorted(query.values_list('test_name', 'test_count')),
+                          [('test1', 1), ('test1', 1), ('test2', 2)])
+
+        for group_by, filter_data, fixed_headers in (
+                (['hostname'], {}, None),
+                (['build'], {'reason__contains': 'timeout'}, None),
+                (['build'], {'sort_by': ['test_started_time']}, None),
+                (['build'], {'extra_where': 'status = "GOOD"'}, None),
+                (['build'], {}, {'platform': ['lumpy']})):
+            self.assertEquals(manager.get_rollup_query(group_by, filter_data,
+                                                       fixed_headers), None)
+
+        filter_data = {'suite': 'bvt'}
+        self.god.stub_with(models, '_USE_TEST_ROLLUPS', False)
+        self.assertEquals(manager.get_rollup_query(['build'], filter_data),
+                          None)
+        self.assertEquals(filter_data, {'suite': 'bvt'})
+
+
+    def test_rollup_counts_match_test_view(self):
+        for group_by, filter_data in (
+                (['build'], {}),
+                (['suite', 'board'], {}),
+                (['test_name', 'status'], {'suite': 'bvt'}),
+                (['afe_job_id'], {'afe_job_id__in': [1, 3]}),
+                (['job_name', 'invalid'], {'test_name__in': ['test1']})):
+            for rpc in (rpc_interface.get_group_counts,
+                        rpc_interface.get_status_counts):
+                with_rollups, without_rollups = (
+                        self._call_with_and_without_rollups(
+                                rpc, group_by, **filter_data))
+                self.assertEquals(with_rollups, without_rollups)
+                self.assertTrue(with_rollups['groups'])
+
+        counts = rpc_interface.get_status_counts(['build'],
+                                                 build='lumpy-release/R1')
+        [group] = counts['groups']
+        self.assertEquals((group['group_count'], group['pass_count'],
+                           group['complete_count'], group['incomplete_count']),
+                          (5, 1, 3, 1))
+
+
+    def test_rollup_header_groups_match_test_view(self):
+        with_rollups, without_rollups = self._call_with_and_without_rollups(
+                rpc_interface.get_status_counts, ['board', 'test_name'],
+                header_groups=[['board'], ['test_name']],
+                fixed_headers={'board': ['lumpy', 'daisy']})
+        self.assertEquals(with_rollups, without_rollups)
+        self.assertEquals(with_rollups['header_values'][0],
+                          [['daisy'], ['lumpy']])
+
+
+    def test_latest_tests_match_test_view(self):
+        with_rollups, without_rollups = self._call_with_and_without_rollups(
+                rpc_interface.get_latest_tests, ['build', 'test_name'],
+                extra_info=['test_idx', 'status'], suite='bvt')
+        self.assertEquals(with_rollups, without_rollups)
+        # The TEST_NA test4 is skipped, the valid test1 of job 1 is latest.
+        self.assertEquals(
+                sorted((group['build'], group['test_name'],
+                        group['extra_info']) for group
+                       in with_rollups['groups']),
+                [('lumpy-release/R1', 'test1', [2, 'GOOD']),
+                 ('lumpy-release/R1', 'test2', [3, 'FAIL']),
+                 ('lumpy-release/R1', 'test3', [4, 'RUNNING']),
+                 ('lumpy-release/R2', 'test1', [6, 'GOOD']),
+                 ('lumpy-release/R2', 'test2', [8, 'GOOD'])])
+
+
+    def test_rollup_routing(self):
+        _cursor().execute('DELETE FROM tko_test_rollups')
+        # Counts grouped by rollup fields come from the now empty rollups.
+        self.assertEquals(rpc_interface.get_group_counts(['build'])['groups'],
+                          [])
+        self.assertEquals(
+                rpc_interface.get_latest_tests(['build'])['groups'], [])
+        # Other queries still use tko_test_view_2.
+        for counts in (rpc_interface.get_group_counts(['hostname']),
+                       rpc_interface.get_group_counts(
+                               ['build'],
+                               extra_select_fields={'min_idx':
+                                                    'MIN(test_idx)'}),
+                       rpc_interface.get_latest_tests(['build'],
+                                                      hostname='host1')):
+            self.assertTrue(counts['groups'])
+
+        self.god.stub_with(models, '_USE_TEST_ROLLUPS', False)
+        [group] = rpc_interface.get_group_counts(['board'],
+                                                 board='link')['groups']
+        self.assertEquals(group['group_count'], 2)
+
+
+    def test_get_status_counts_by_job(self):
+        for use_rollups in (True, False):
+            self.god.stub_with(models, '_USE_TEST_ROLLUPS', use_rollups)
+            counts_by_job = rpc_interface._get_status_counts_by_job(
+                    [1, 3, 4])
+            self.assertEquals(sorted(counts_by_job), [1, 3, 4])
+            for afe_job_id, counts in counts_by_job.iteritems():
+                self.assertEquals(
+                        counts,
+                        rpc_interface.get_status_counts(
+                                ['afe_job_id', 'afe_job_id'],
+                                header_groups=[['afe_job_id'],
+                                               ['afe_job_id']],
+                                afe_job_id=afe_job_id))
+            [group] = counts_by_job[1]['groups']
+            self.assertEquals((group['id'], group['group_count'],
+                               group['pass_count'], group['complete_count'],
+                               group['incomplete_count']),
+                              ('[1]', 5, 1, 3, 1))
+            self.assertEquals(counts_by_job[4],
+                              {'groups': [], 'header_values': [[], []]})
+        self.assertEquals(rpc_interface._get_status_counts_by_job([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -57,6 +57,18 @@ _INCOMPLETE_COUNT_SQL = 'COUNT(IF(status="RUNNING", 1, NULL))'
 STATUS_FIELDS = {_PASS_COUNT_NAME : _PASS_COUNT_SQL,
                  _COMPLETE_COUNT_NAME : _COMPLETE_COUNT_SQL,
                  _INCOMPLETE_COUNT_NAME : _INCOMPLETE_COUNT_SQL}
+# The same counts computed over models.TestRollup, whose rows each stand for
+# test_count tests.
+_ROLLUP_PASS_COUNT_SQL = ('CAST(SUM(IF(status="GOOD", test_count, 0)) '
+                          'AS SIGNED)')
+_ROLLUP_COMPLETE_COUNT_SQL = ('CAST(SUM(IF(status NOT IN ("TEST_NA", '
+                              '"RUNNING", "NOSTATUS"), test_count, 0)) '
+                              'AS SIGNED)')
+_ROLLUP_INCOMPLETE_COUNT_SQL = ('CAST(SUM(IF(status="RUNNING", test_count, '
+                                '0)) AS SIGNED)')
+ROLLUP_STATUS_FIELDS = {_PASS_COUNT_NAME : _ROLLUP_PASS_COUNT_SQL,
+                        _COMPLETE_COUNT_NAME : _ROLLUP_COMPLETE_COUNT_SQL,
+                        _INCOMPLETE_COUNT_NAME : _ROLLUP_INCOMPLETE_COUNT_SQL}
 _INVALID_STATUSES = ('TEST_NA', 'NOSTATUS')
 
 
@@ -123,7 +135,8 @@ class GroupDataProcessor(object):
 
     def _fetch_data(self):
         self._restrict_header_values()
-        self._group_dicts = models.TestView.objects.execute_group_query(
+        # The query may be over TestView or TestRollup.
+        self._group_dicts = self._query.model.objects.execute_group_query(
             self._query, self._group_by)
 
 
@@ -7,6 +7,7 @@ import time
 
 import common
 from autotest_lib.scheduler import drone_utility, email_manager
+from autotest_lib.scheduler import tick_profiler
 from autotest_lib.client.bin import local_host
 from autotest_lib.client.common_lib import error, global_config
 
@@ -89,9 +90,14 @@ class SiteDrone(object):
             drone_utility_cmd = '%s --call_time %s' % (
                     drone_utility_cmd, time.time())
         logging.info("Running drone_utility on %s", self.hostname)
+        pickled_calls = cPickle.dumps(calls)
+        start = time.time()
         result = self._host.run('python %s' % drone_utility_cmd,
-                                stdin=cPickle.dumps(calls), stdout_tee=None,
+                                stdin=pickled_calls, stdout_tee=None,
                                 connect_timeout=300)
+        tick_profiler.profiler.record_drone_call(
+                self.hostname, len(calls), len(pickled_calls),
+                len(result.stdout), time.time() - start)
         try:
             return cPickle.loads(result.stdout)
         except Exception: # cPickle.loads can throw all kinds of exceptions
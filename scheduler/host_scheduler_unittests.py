@@ -15,6 +15,7 @@ from autotest_lib.frontend.afe import models
 from autotest_lib.server.cros.dynamic_suite import constants
 from autotest_lib.scheduler import host_scheduler
 from autotest_lib.scheduler import monitor_db
+from autotest_lib.scheduler import query_managers
 from autotest_lib.scheduler import rdb
 from autotest_lib.scheduler import rdb_lib
 from autotest_lib.scheduler import rdb_testing_utils
@@ -58,6 +59,51 @@ class QueryManagerTests(rdb_testing_utils.AbstractBaseRDBTester,
         self.assertEqual(jobs_with_hosts[0].id, job2.id)
 
 
+    def testPendingQueueEntryCache(self):
+        """Test incremental refreshes of the pending queue entry cache."""
+        now = [0]
+        cache = query_managers.PendingQueueEntryCache(
+                reconcile_interval_secs=60, time_func=lambda: now[0])
+        job1 = self.create_job(deps=set(['a']))
+        self.assertEqual([job1.id],
+                         [entry.job_id for entry in cache.get_entries()])
+
+        # New jobs are found above the high-water mark, in priority order.
+        job2 = self.create_job(deps=set(['a']), priority=10)
+        entries = cache.get_entries()
+        self.assertEqual([job2.id, job1.id],
+                         [entry.job_id for entry in entries])
+
+        # Activated entries drop out, and come back when requeued.
+        hqe = self.db_helper.get_hqes(job=job1.id)[0]
+        hqe.status = models.HostQueueEntry.Status.VERIFYING
+        hqe.active = True
+        hqe.save()
+        self.assertEqual([job2.id],
+                         [entry.job_id for entry in cache.get_entries()])
+        hqe.status = models.HostQueueEntry.Status.QUEUED
+        hqe.active = False
+        hqe.save()
+        self.assertEqual([job2.id, job1.id],
+                         [entry.job_id for entry in cache.get_entries()])
+
+        # Entries only show up above the highest id seen. An entry that
+        # becomes pending below it, like a late commit, waits for a reload.
+        job3 = self.create_job(deps=set(['a']))
+        hqe = self.db_helper.get_hqes(job=job3.id)[0]
+        hqe.status = models.HostQueueEntry.Status.COMPLETED
+        hqe.save()
+        cache.get_entries()
+        self.assertEqual(cache._max_seen_id, hqe.id)
+        hqe.status = models.HostQueueEntry.Status.QUEUED
+        hqe.save()
+        self.assertEqual([job2.id, job1.id],
+                         [entry.job_id for entry in cache.get_entries()])
+        now[0] = 60
+        self.assertEqual([job2.id, job1.id, job3.id],
+                         [entry.job_id for entry in cache.get_entries()])
+
+
     def testHostQueries(self):
         """Verify that the host query manager maintains its data structures."""
         # Create a job and use the host_query_managers internal datastructures
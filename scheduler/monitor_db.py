@@ -6,6 +6,7 @@
 Autotest scheduler
 """
 
+import contextlib
 import datetime
 import functools
 import gc
@@ -33,6 +34,7 @@ from autotest_lib.scheduler import query_managers
 from autotest_lib.scheduler import scheduler_lib
 from autotest_lib.scheduler import scheduler_models
 from autotest_lib.scheduler import scheduler_config
+from autotest_lib.scheduler import tick_profiler
 from autotest_lib.server import autoserv_utils
 from autotest_lib.server import system_utils
 from autotest_lib.server import utils as server_utils
@@ -218,6 +220,10 @@ def initialize():
                                                      role='scheduler')
 
     os.environ['PATH'] = AUTOTEST_SERVER_DIR + ':' + os.environ['PATH']
+    # Must happen before the connection is opened, see
+    # tick_profiler.instrument_django_connection.
+    tick_profiler.instrument_django_connection(django.db.connection,
+                                               tick_profiler.profiler)
     global _db_manager
     _db_manager = scheduler_lib.ConnectionManager()
     global _db
@@ -225,6 +231,7 @@ def initialize():
     logging.info("Setting signal handler")
     signal.signal(signal.SIGINT, handle_signal)
     signal.signal(signal.SIGTERM, handle_signal)
+    tick_profiler.install_dump_signal_handler(tick_profiler.profiler)
 
     initialize_globals()
     scheduler_models.initialize()
@@ -335,25 +342,34 @@ class Dispatcher(object):
         major step begins so we can try to figure out where we are using most
         of the tick time.
         """
+        tick_profiler.profiler.start_tick(self._tick_count)
+        try:
+            self._profiled_tick()
+        finally:
+            tick_profiler.profiler.end_tick()
+
+
+    def _profiled_tick(self):
         with metrics.RuntimeBreakdownTimer(
             'chromeos/autotest/scheduler/tick_times') as breakdown_timer:
             self._log_tick_msg('New tick')
             system_utils.DroneCache.refresh()
 
-            with breakdown_timer.Step('garbage_collection'):
+            with self._tick_step(breakdown_timer, 'garbage_collection'):
                 self._garbage_collection()
-            with breakdown_timer.Step('trigger_refresh'):
+            with self._tick_step(breakdown_timer, 'trigger_refresh'):
                 self._log_tick_msg('Starting _drone_manager.trigger_refresh')
                 _drone_manager.trigger_refresh()
-            with breakdown_timer.Step('schedule_running_host_queue_entries'):
+            with self._tick_step(breakdown_timer,
+                                 'schedule_running_host_queue_entries'):
                 self._schedule_running_host_queue_entries()
-            with breakdown_timer.Step('schedule_special_tasks'):
+            with self._tick_step(breakdown_timer, 'schedule_special_tasks'):
                 self._schedule_special_tasks()
-            with breakdown_timer.Step('schedule_new_jobs'):
+            with self._tick_step(breakdown_timer, 'schedule_new_jobs'):
                 self._schedule_new_jobs()
-            with breakdown_timer.Step('gather_tick_metrics'):
+            with self._tick_step(breakdown_timer, 'gather_tick_metrics'):
                 self._gather_tick_metrics()
-            with breakdown_timer.Step('sync_refresh'):
+            with self._tick_step(breakdown_timer, 'sync_refresh'):
                 self._log_tick_msg('Starting _drone_manager.sync_refresh')
                 _drone_manager.sync_refresh()
             # _run_cleanup must be called between drone_manager.sync_refresh,
@@ -362,25 +378,27 @@ class Dispatcher(object):
             # drone.queue_call to add calls to the drone._calls, should be after
             # drone refresh is completed and before
             # drone_manager.execute_actions at the end of the tick.
-            with breakdown_timer.Step('run_cleanup'):
+            with self._tick_step(breakdown_timer, 'run_cleanup'):
                 self._run_cleanup()
-            with breakdown_timer.Step('find_aborting'):
+            with self._tick_step(breakdown_timer, 'find_aborting'):
                 self._find_aborting()
-            with breakdown_timer.Step('find_aborted_special_tasks'):
+            with self._tick_step(breakdown_timer,
+                                 'find_aborted_special_tasks'):
                 self._find_aborted_special_tasks()
-            with breakdown_timer.Step('handle_agents'):
+            with self._tick_step(breakdown_timer, 'handle_agents'):
                 self._handle_agents()
-            with breakdown_timer.Step('host_scheduler_tick'):
+            with self._tick_step(breakdown_timer, 'host_scheduler_tick'):
                 self._log_tick_msg('Starting _host_scheduler.tick')
                 self._host_scheduler.tick()
-            with breakdown_timer.Step('drones_execute_actions'):
+            with self._tick_step(breakdown_timer,
+                                 'drones_execute_actions'):
                 self._log_tick_msg('Starting _drone_manager.execute_actions')
                 _drone_manager.execute_actions()
-            with breakdown_timer.Step('send_queued_emails'):
+            with self._tick_step(breakdown_timer, 'send_queued_emails'):
                 self._log_tick_msg(
                     'Starting email_manager.manager.send_queued_emails')
                 email_manager.manager.send_queued_emails()
-            with breakdown_timer.Step('db_reset_queries'):
+            with self._tick_step(breakdown_timer, 'db_reset_queries'):
                 self._log_tick_msg('Starting django.db.reset_queries')
                 django.db.reset_queries()
 
@@ -388,6 +406,18 @@ class Dispatcher(object):
             metrics.Counter('chromeos/autotest/scheduler/tick').increment()
 
 
+    @contextlib.contextmanager
+    def _tick_step(self, breakdown_timer, name):
+        """Times a tick phase for both the metrics and the tick profiler.
+
+        @param breakdown_timer: The metrics.RuntimeBreakdownTimer of the tick.
+        @param name: The name of the phase.
+        """
+        with breakdown_timer.Step(name):
+            with tick_profiler.profiler.phase(name):
+                yield
+
+
     @_calls_log_tick_msg
     def _run_cleanup(self):
         self._periodic_cleanup.run_cleanup_maybe()
@@ -415,6 +445,7 @@ class Dispatcher(object):
         metrics.Gauge(
             'chromeos/autotest/scheduler/agent_count'
         ).set(len(self._agents))
+        tick_profiler.profiler.set_counter('agents', len(self._agents))
 
 
     def _register_agent_for_ids(self, agent_dict, object_ids, agent):
@@ -1076,6 +1107,12 @@ class Dispatcher(object):
         ).set(num_agent_processes)
         logging.info('%d running processes. %d added this tick.',
                      num_agent_processes, num_started_this_tick)
+        tick_profiler.profiler.set_counter('agent_processes',
+                                           num_agent_processes)
+        tick_profiler.profiler.set_counter('agent_processes_started',
+                                           num_started_this_tick)
+        tick_profiler.profiler.set_counter('agent_processes_finished',
+                                           num_finished_this_tick)
 
 
     def _log_tick_msg(self, msg):
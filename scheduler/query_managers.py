@@ -9,14 +9,17 @@
 
 import collections
 import logging
+import time
 
 import common
 
 from autotest_lib.frontend import setup_django_environment
 
+from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import utils
 from autotest_lib.frontend.afe import models
 from autotest_lib.server.cros.dynamic_suite import constants
+from autotest_lib.scheduler import scheduler_config
 from autotest_lib.scheduler import scheduler_models
 from autotest_lib.scheduler import scheduler_lib
 
@@ -27,6 +30,152 @@ except ImportError:
 
 
 _job_timer_name = 'chromeos/autotest/scheduler/job_query_durations/%s'
+
+# Seconds between full reloads of the pending queue entries. Between reloads
+# only new and previously seen entries are read, see PendingQueueEntryCache.
+# 0 disables the cache and runs the full query every tick.
+_PENDING_QUEUE_RECONCILE_SECS = global_config.global_config.get_config_value(
+        scheduler_config.CONFIG_SECTION,
+        'pending_queue_reconcile_interval_secs', type=int, default=0)
+
+# Don't execute jobs that should be executed by a shard in the global
+# scheduler.
+# This won't prevent the shard scheduler to run this, as the shard db
+# doesn't have an an entry in afe_shards_labels.
+_PENDING_QUERY = ('NOT complete AND NOT active AND status="Queued"'
+                  'AND NOT aborted AND afe_shards_labels.id IS NULL')
+_PENDING_JOINS = ('INNER JOIN afe_jobs ON (job_id=afe_jobs.id) '
+                  'LEFT JOIN afe_shards_labels ON ('
+                  'meta_host=afe_shards_labels.label_id)')
+_PENDING_SORT_ORDER = ('afe_jobs.priority DESC, '
+                       'ISNULL(host_id), '
+                       'ISNULL(meta_host), '
+                       'parent_job_id, '
+                       'job_id')
+
+
+def _pending_sort_key(queue_entry):
+    """Sort key equivalent to _PENDING_SORT_ORDER.
+
+    @param queue_entry: A scheduler_models.HostQueueEntry.
+    """
+    return (-queue_entry.job.priority,
+            queue_entry.host_id is None,
+            queue_entry.meta_host is None,
+            queue_entry.job.parent_job_id,
+            queue_entry.job_id)
+
+
+class PendingQueueEntryCache(object):
+    """In-memory model of the pending host queue entries.
+
+    Finding the pending entries with a single query means scanning every
+    Queued row of afe_host_queue_entries, most of which belong to shards, and
+    rebuilding a HostQueueEntry for each pending one. Instead, the pending
+    set is loaded once and then refreshed every tick from:
+    1. Entries above the highest HQE id seen so far: new jobs.
+    2. Entries already known to be pending, to drop the ones that were
+        activated, aborted or otherwise changed.
+    3. Incomplete entries that left the pending set, which may be requeued
+        by a failed pre-job task.
+    All three are primary key lookups. HostQueueEntry objects are only
+    rebuilt for rows that changed. Changes the above can miss, like job
+    priority updates or entries committed after an entry with a higher id,
+    are picked up by a full reload every |reconcile_interval_secs|.
+    """
+
+    def __init__(self, reconcile_interval_secs, time_func=time.time):
+        """
+        @param reconcile_interval_secs: Seconds between full reloads.
+        @param time_func: Function returning the current time, for testing.
+        """
+        self._reconcile_interval_secs = reconcile_interval_secs
+        self._time_func = time_func
+        self._db = scheduler_lib.ConnectionManager().get_connection()
+        # Pending entries by id.
+        self._entries = {}
+        # Ids of incomplete entries that are not pending right now.
+        self._watched_ids = set()
+        self._max_seen_id = None
+        self._next_reconcile = 0
+
+
+    def get_entries(self):
+        """Returns the pending HQEs, sorted by _PENDING_SORT_ORDER."""
+        if (self._max_seen_id is None
+                or self._time_func() >= self._next_reconcile):
+            self._reconcile()
+        else:
+            self._refresh()
+        return sorted(self._entries.itervalues(), key=_pending_sort_key)
+
+
+    def _max_id(self):
+        rows = self._db.execute('SELECT MAX(id) FROM afe_host_queue_entries')
+        return rows[0][0] or 0
+
+
+    def _fetch_pending_rows(self, where):
+        return scheduler_models.HostQueueEntry.fetch_rows(
+                joins=_PENDING_JOINS,
+                where='%s AND (%s)' % (_PENDING_QUERY, where))
+
+
+    @metrics.SecondsTimerDecorator(
+            _job_timer_name % 'pending_queue_reconcile')
+    def _reconcile(self):
+        """Reload every pending entry."""
+        max_seen_id = self._max_id()
+        rows = scheduler_models.HostQueueEntry.fetch_rows(
+                joins=_PENDING_JOINS, where=_PENDING_QUERY)
+        self._update(rows)
+        watched_rows = self._db.execute(
+                'SELECT id FROM afe_host_queue_entries '
+                'WHERE NOT complete AND (active OR status != "Queued")')
+        self._watched_ids = set(row[0] for row in watched_rows)
+        self._watched_ids.difference_update(self._entries)
+        self._max_seen_id = max_seen_id
+        self._next_reconcile = (self._time_func() +
+                                self._reconcile_interval_secs)
+
+
+    def _refresh(self):
+        """Read the pending entries that may have changed since last time."""
+        max_seen_id = self._max_id()
+        rows = list(self._fetch_pending_rows(
+                'afe_host_queue_entries.id > %d' % self._max_seen_id))
+        known_ids = set(self._entries) | self._watched_ids
+        if known_ids:
+            seen_ids = set(row[0] for row in rows)
+            rows.extend(row for row in self._fetch_pending_rows(
+                            'afe_host_queue_entries.id IN (%s)' %
+                            ','.join(str(i) for i in sorted(known_ids)))
+                        if row[0] not in seen_ids)
+        self._update(rows)
+        self._max_seen_id = max_seen_id
+
+
+    def _update(self, rows):
+        """Make |rows| the pending set, reusing unchanged entries.
+
+        @param rows: All currently pending afe_host_queue_entries rows.
+        """
+        entries = {}
+        changed_rows = []
+        for row in rows:
+            entry = self._entries.get(row[0])
+            if entry is not None and not entry._compare_fields_in_row(row):
+                entries[entry.id] = entry
+            else:
+                changed_rows.append(row)
+        for entry in scheduler_models.HostQueueEntry.from_rows(changed_rows):
+            entries[entry.id] = entry
+        departed_ids = set(self._entries).difference(entries)
+        self._watched_ids.update(departed_ids)
+        self._watched_ids.difference_update(entries)
+        self._entries = entries
+
+
 class AFEJobQueryManager(object):
     """Query manager for AFE Jobs."""
 
@@ -34,6 +183,13 @@ class AFEJobQueryManager(object):
     hostless_query = 'host_id IS NULL AND meta_host IS NULL'
 
 
+    def __init__(self):
+        self._pending_cache = None
+        if _PENDING_QUEUE_RECONCILE_SECS > 0:
+            self._pending_cache = PendingQueueEntryCache(
+                    _PENDING_QUEUE_RECONCILE_SECS)
+
+
     @metrics.SecondsTimerDecorator(
             _job_timer_name % 'get_pending_queue_entries')
     def get_pending_queue_entries(self, only_hostless=False):
@@ -75,20 +231,20 @@ class AFEJobQueryManager(object):
         The current ordering was chosed because it is more likely that we will
         run out of machines in pool:suites than processes on the drone.
 
-        @returns A list of HQEs ordered according to sort_order.
-        """
-        sort_order = ('afe_jobs.priority DESC, '
-                      'ISNULL(host_id), '
-                      'ISNULL(meta_host), '
-                      'parent_job_id, '
-                      'job_id')
-        # Don't execute jobs that should be executed by a shard in the global
-        # scheduler.
-        # This won't prevent the shard scheduler to run this, as the shard db
-        # doesn't have an an entry in afe_shards_labels.
-        query=('NOT complete AND NOT active AND status="Queued"'
-               'AND NOT aborted AND afe_shards_labels.id IS NULL')
+        If the pending queue cache is enabled, the entries come from a
+        PendingQueueEntryCache instead of a full query every tick.
 
+        @returns A list of HQEs ordered according to _PENDING_SORT_ORDER.
+        """
+        if self._pending_cache:
+            entries = self._pending_cache.get_entries()
+            if only_hostless:
+                entries = [entry for entry in entries
+                           if entry.host_id is None
+                           and entry.meta_host is None]
+            return entries
+
+        query = _PENDING_QUERY
         # TODO(jakobjuelich, beeps): Optimize this query. Details:
         # Compressed output of EXPLAIN <query>:
         # +------------------------+--------+-------------------------+-------+
@@ -109,10 +265,7 @@ class AFEJobQueryManager(object):
         if only_hostless:
             query = '%s AND (%s)' % (query, self.hostless_query)
         return list(scheduler_models.HostQueueEntry.fetch(
-            joins=('INNER JOIN afe_jobs ON (job_id=afe_jobs.id) '
-                   'LEFT JOIN afe_shards_labels ON ('
-                   'meta_host=afe_shards_labels.label_id)'),
-            where=query, order_by=sort_order))
+            joins=_PENDING_JOINS, where=query, order_by=_PENDING_SORT_ORDER))
 
 
     @metrics.SecondsTimerDecorator(
@@ -526,6 +526,18 @@ class HostQueueEntry(DBObject):
         # in order to prevent each HQE making separate DB queries.
         rows = cls.fetch_rows(where=where, params=params, joins=joins,
                               order_by=order_by)
+        return cls.from_rows(rows)
+
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Construct instances of our class from rows returned by fetch_rows.
+
+        @param rows: A sequence of afe_host_queue_entries rows.
+
+        @returns A list of HostQueueEntry instances, one for each row.
+        """
         if len(rows) <= 1:
             return [cls(id=row[0], row=row) for row in rows]
 
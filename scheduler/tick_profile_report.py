@@ -0,0 +1,142 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Summarizes scheduler tick profiles dumped by tick_profiler.
+
+Send SIGUSR1 to the scheduler to dump its recent ticks, then e.g.:
+
+    tick_profile_report.py /tmp/scheduler_tick_profile.1234.json
+    tick_profile_report.py --slowest 5 --min-duration 30 dump.json
+"""
+
+import argparse
+import json
+import sys
+
+import common
+from autotest_lib.scheduler import tick_profiler
+
+
+def _percentile(values, fraction):
+    """Returns the value at |fraction| of the sorted |values|."""
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _format_stats(values):
+    return 'mean %7.2f  p50 %7.2f  p95 %7.2f  max %7.2f' % (
+            sum(values) / len(values), _percentile(values, 0.5),
+            _percentile(values, 0.95), max(values))
+
+
+def load_ticks(paths):
+    """Returns the tick records of all dump files, ordered by start time.
+
+    @param paths: Paths of files written by TickProfiler.dump.
+    """
+    ticks = []
+    for path in paths:
+        with open(path) as f:
+            ticks.extend(json.load(f))
+    return sorted(ticks, key=lambda tick: tick['start'])
+
+
+def report(ticks, top_queries=20, slowest=0, out=sys.stdout):
+    """Writes a summary of |ticks| to |out|.
+
+    @param ticks: A list of tick records, see tick_profiler.TickProfiler.
+    @param top_queries: Number of query fingerprints to list.
+    @param slowest: Number of slowest ticks to print in full.
+    @param out: File to write to.
+    """
+    if not ticks:
+        out.write('No ticks recorded.\n')
+        return
+    out.write('%d ticks, durations (s): %s\n\n' % (
+            len(ticks), _format_stats([tick['duration'] for tick in ticks])))
+
+    phase_times = {}
+    phase_queries = {}
+    phase_order = []
+    queries = {}
+    drones = {}
+    for tick in ticks:
+        for name, secs, count, _ in tick['phases']:
+            if name not in phase_times:
+                phase_order.append(name)
+            phase_times.setdefault(name, []).append(secs)
+            phase_queries.setdefault(name, []).append(count)
+        for sql, (count, secs) in tick['queries'].iteritems():
+            stats = queries.setdefault(sql, [0, 0, 0])
+            stats[0] += count
+            stats[1] += secs
+            stats[2] = max(stats[2], secs)
+        for hostname, stats in tick['drone_calls'].iteritems():
+            totals = drones.setdefault(hostname, [0] * len(stats))
+            for i, value in enumerate(stats):
+                totals[i] += value
+
+    out.write('Phases (s):\n')
+    for name in phase_order:
+        out.write('  %-40s %s  queries/tick %6.1f\n' % (
+                name, _format_stats(phase_times[name]),
+                float(sum(phase_queries[name])) / len(ticks)))
+
+    out.write('\nTop queries by total time:\n')
+    by_time = sorted(queries.iteritems(), key=lambda item: item[1][1],
+                     reverse=True)
+    for sql, (count, secs, max_secs) in by_time[:top_queries]:
+        out.write('  %8.2fs total  %7.1f/tick  %6.3fs mean  %7.2fs worst '
+                  'tick\n      %s\n' % (secs, float(count) / len(ticks),
+                                       secs / count, max_secs, sql))
+
+    if drones:
+        out.write('\nDrones (per tick):\n')
+        for hostname, (executions, calls, sent, received, secs) in sorted(
+                drones.iteritems()):
+            out.write('  %-30s executions %5.1f  calls %7.1f  sent %9d B  '
+                      'received %9d B  %6.2fs\n' % (
+                              hostname, float(executions) / len(ticks),
+                              float(calls) / len(ticks), sent / len(ticks),
+                              received / len(ticks), secs / len(ticks)))
+
+    if slowest:
+        out.write('\nSlowest ticks:\n')
+        for tick in sorted(ticks, key=lambda tick: tick['duration'],
+                           reverse=True)[:slowest]:
+            out.write('  %s\n' % tick_profiler.format_tick(tick))
+
+
+def parse_args(argv):
+    """Parses the command line.
+
+    @param argv: The arguments, without the program name.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dumps', nargs='+', metavar='DUMP',
+                        help='Tick profile dump files.')
+    parser.add_argument('--top-queries', type=int, default=20,
+                        help='Number of query fingerprints to list.')
+    parser.add_argument('--slowest', type=int, default=0,
+                        help='Print the breakdown of the N slowest ticks.')
+    parser.add_argument('--min-duration', type=float, default=0,
+                        help='Only include ticks taking at least this many '
+                             'seconds.')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """Entry point."""
+    options = parse_args(argv)
+    ticks = [tick for tick in load_ticks(options.dumps)
+             if tick['duration'] >= options.min_duration]
+    report(ticks, top_queries=options.top_queries, slowest=options.slowest)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,331 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Always-on profiler for scheduler ticks.
+
+The profiler keeps a record of the most recent ticks in a ring buffer: wall
+time of every tick phase, database queries grouped by fingerprint, drone
+calls and a few counters such as the number of agents. The buffer can be
+dumped to a JSON file by sending SIGUSR1 to the scheduler, and read back with
+tick_profile_report.py. Ticks slower than a threshold are logged as they
+happen.
+"""
+
+import collections
+import contextlib
+import json
+import logging
+import os
+import re
+import signal
+import threading
+import time
+
+import common
+from autotest_lib.client.common_lib import global_config
+from autotest_lib.scheduler import scheduler_config
+
+
+_BUFFER_SIZE = global_config.global_config.get_config_value(
+        scheduler_config.CONFIG_SECTION, 'tick_profile_buffer_size',
+        type=int, default=500)
+_SLOW_TICK_SECS = global_config.global_config.get_config_value(
+        scheduler_config.CONFIG_SECTION, 'tick_profile_slow_tick_secs',
+        type=float, default=0)
+_DUMP_DIR = global_config.global_config.get_config_value(
+        scheduler_config.CONFIG_SECTION, 'tick_profile_dump_dir',
+        default='/tmp')
+
+# Query fingerprints are cached by raw sql; the cache is dropped when it
+# grows past this size, which only happens if queries embed literals.
+_MAX_FINGERPRINT_CACHE_SIZE = 10000
+# Number of query fingerprints logged for a slow tick.
+_SLOW_TICK_TOP_QUERIES = 5
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Returns |sql| with its literal values replaced by placeholders.
+
+    Queries that only differ in their parameters, including the length of IN
+    lists, share a fingerprint.
+
+    @param sql: A SQL statement.
+    """
+    sql = sql.replace('%s', '?')
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(?+)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class TickProfiler(object):
+    """Records per-tick profiles into a ring buffer.
+
+    Each tick record is a JSON-friendly dict:
+        tick: The tick number.
+        start: Start time of the tick, seconds since the epoch.
+        duration: Wall time of the tick in seconds.
+        phases: A list of [name, seconds, query count, query seconds].
+        queries: A dict of fingerprint -> [count, seconds].
+        drone_calls: A dict of drone hostname -> [executions, calls,
+                bytes sent, bytes received, seconds].
+        counters: A dict of counter name -> value.
+
+    Queries and drone calls may be recorded from any thread; everything else
+    must be called from the thread running the tick.
+    """
+
+    def __init__(self, buffer_size=_BUFFER_SIZE,
+                 slow_tick_secs=_SLOW_TICK_SECS, time_func=time.time):
+        """
+        @param buffer_size: Number of ticks to keep.
+        @param slow_tick_secs: Ticks taking longer than this are logged.
+                0 disables logging.
+        @param time_func: Function returning the current time, for testing.
+        """
+        self._ticks = collections.deque(maxlen=buffer_size)
+        self._slow_tick_secs = slow_tick_secs
+        self._time_func = time_func
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._current = None
+        self._current_phase = None
+        self._dump_path = None
+
+
+    @property
+    def ticks(self):
+        """Returns the recorded ticks, oldest first."""
+        return list(self._ticks)
+
+
+    def start_tick(self, tick_number):
+        """Starts recording a new tick.
+
+        @param tick_number: The number of the tick.
+        """
+        self._current = {'tick': tick_number,
+                         'start': self._time_func(),
+                         'duration': 0,
+                         'phases': [],
+                         'queries': {},
+                         'drone_calls': {},
+                         'counters': {}}
+
+
+    def end_tick(self):
+        """Finishes the current tick and adds it to the ring buffer."""
+        tick = self._current
+        if tick is None:
+            return
+        with self._lock:
+            self._current = None
+        tick['duration'] = self._time_func() - tick['start']
+        self._ticks.append(tick)
+        if self._slow_tick_secs and tick['duration'] > self._slow_tick_secs:
+            logging.warning('Slow tick: %s', format_tick(tick))
+        if self._dump_path:
+            path, self._dump_path = self._dump_path, None
+            self.dump(path)
+
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager recording the wall time of a tick phase.
+
+        @param name: The name of the phase.
+        """
+        if self._current is None:
+            yield
+            return
+        phase = [name, 0, 0, 0]
+        self._current_phase = phase
+        start = self._time_func()
+        try:
+            yield
+        finally:
+            phase[1] = self._time_func() - start
+            self._current_phase = None
+            if self._current is not None:
+                self._current['phases'].append(phase)
+
+
+    def record_query(self, sql, seconds):
+        """Records a database query of the current tick.
+
+        @param sql: The query, preferably before parameter substitution.
+        @param seconds: How long the query took.
+        """
+        key = self._fingerprints.get(sql)
+        if key is None:
+            if len(self._fingerprints) >= _MAX_FINGERPRINT_CACHE_SIZE:
+                self._fingerprints = {}
+            key = self._fingerprints[sql] = fingerprint(sql)
+        with self._lock:
+            if self._current is None:
+                return
+            stats = self._current['queries'].setdefault(key, [0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            phase = self._current_phase
+            if phase is not None:
+                phase[2] += 1
+                phase[3] += seconds
+
+
+    def record_drone_call(self, hostname, num_calls, bytes_sent,
+                          bytes_received, seconds):
+        """Records one execution of queued calls on a drone.
+
+        @param hostname: The drone hostname.
+        @param num_calls: Number of calls executed.
+        @param bytes_sent: Size of the pickled calls.
+        @param bytes_received: Size of the pickled results.
+        @param seconds: How long the execution took.
+        """
+        with self._lock:
+            if self._current is None:
+                return
+            stats = self._current['drone_calls'].setdefault(
+                    hostname, [0, 0, 0, 0, 0])
+            stats[0] += 1
+            stats[1] += num_calls
+            stats[2] += bytes_sent
+            stats[3] += bytes_received
+            stats[4] += seconds
+
+
+    def set_counter(self, name, value):
+        """Sets a counter of the current tick, e.g. the number of agents.
+
+        @param name: The counter name.
+        @param value: The value.
+        """
+        if self._current is not None:
+            self._current['counters'][name] = value
+
+
+    def request_dump(self, path):
+        """Dumps the ring buffer to |path| at the end of the current tick.
+
+        Safe to call from a signal handler.
+
+        @param path: The file to write.
+        """
+        self._dump_path = path
+
+
+    def dump(self, path):
+        """Writes the recorded ticks to |path| as JSON.
+
+        @param path: The file to write.
+        """
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.ticks, f)
+        except (IOError, OSError) as e:
+            logging.error('Failed to dump tick profile to %s: %s', path, e)
+        else:
+            logging.info('Dumped %d tick profiles to %s',
+                         len(self._ticks), path)
+
+
+def format_tick(tick, top_queries=_SLOW_TICK_TOP_QUERIES):
+    """Returns a one line summary of a tick record.
+
+    @param tick: A tick record, see TickProfiler.
+    @param top_queries: Number of slowest query fingerprints to include.
+    """
+    phases = ', '.join('%s=%.2fs/%dq' % (name, secs, count)
+                       for name, secs, count, _ in tick['phases'])
+    queries = sorted(tick['queries'].iteritems(),
+                     key=lambda item: item[1][1], reverse=True)
+    queries = '; '.join('%dx %.2fs %s' % (count, secs, sql)
+                        for sql, (count, secs) in queries[:top_queries])
+    return ('tick %d took %.2fs: %s; counters: %s; top queries: %s' %
+            (tick['tick'], tick['duration'], phases, tick['counters'],
+             queries))
+
+
+class _ProfilingCursor(object):
+    """Django cursor wrapper reporting every query to a TickProfiler."""
+
+    def __init__(self, cursor, db, profiler):
+        self.cursor = cursor
+        self.db = db
+        self._profiler = profiler
+
+
+    def _set_dirty(self):
+        if self.db.is_managed():
+            self.db.set_dirty()
+
+
+    def execute(self, sql, params=()):
+        self._set_dirty()
+        start = time.time()
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            self._profiler.record_query(sql, time.time() - start)
+
+
+    def executemany(self, sql, param_list):
+        self._set_dirty()
+        start = time.time()
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            self._profiler.record_query(sql, time.time() - start)
+
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+
+def instrument_django_connection(connection, profiler):
+    """Makes |connection| report its queries to |profiler|.
+
+    Only cursors created after this call are instrumented, so it must run
+    before the scheduler opens its database connection.
+
+    @param connection: A django database connection, e.g. django.db.connection.
+    @param profiler: A TickProfiler.
+    """
+    connection.make_debug_cursor = (
+            lambda cursor: _ProfilingCursor(cursor, connection, profiler))
+    connection.use_debug_cursor = True
+
+
+def dump_path(pid=None):
+    """Returns the path the ring buffer of process |pid| is dumped to.
+
+    @param pid: The process id, defaults to the current process.
+    """
+    return os.path.join(_DUMP_DIR, 'scheduler_tick_profile.%d.json' %
+                        (pid or os.getpid()))
+
+
+def install_dump_signal_handler(profiler, signum=signal.SIGUSR1):
+    """Dumps |profiler| to dump_path() at the end of the tick on |signum|.
+
+    @param profiler: A TickProfiler.
+    @param signum: The signal to handle.
+    """
+    def handler(signum, frame):
+        profiler.request_dump(dump_path())
+    signal.signal(signum, handler)
+
+
+# The profiler of the scheduler process.
+profiler = TickProfiler()
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cStringIO import StringIO
+
+import common
+from autotest_lib.scheduler import tick_profile_report
+from autotest_lib.scheduler import tick_profiler
+
+
+class FakeTime(object):
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+
+    def __call__(self):
+        return self.now
+
+
+class FingerprintTest(unittest.TestCase):
+    """Tests for tick_profiler.fingerprint."""
+
+    def test_literals_are_replaced(self):
+        self.assertEqual(
+                tick_profiler.fingerprint(
+                        'SELECT * FROM afe_jobs\n  WHERE id = 12 AND '
+                        'name = "a job" AND owner = \'me\''),
+                'SELECT * FROM afe_jobs WHERE id = ? AND name = ? AND '
+                'owner = ?')
+
+
+    def test_in_lists_share_a_fingerprint(self):
+        self.assertEqual(
+                tick_profiler.fingerprint('SELECT id FROM t2 WHERE id IN (1)'),
+                tick_profiler.fingerprint(
+                        'SELECT id FROM t2 WHERE id IN (%s, %s,%s)'))
+
+
+class TickProfilerTest(unittest.TestCase):
+    """Tests for tick_profiler.TickProfiler."""
+
+    def setUp(self):
+        self.time = FakeTime()
+        self.profiler = tick_profiler.TickProfiler(
+                buffer_size=2, time_func=self.time)
+        self.tempdir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+
+    def _run_tick(self, number, query_secs=0.5):
+        self.profiler.start_tick(number)
+        with self.profiler.phase('schedule'):
+            self.profiler.record_query('SELECT * FROM t WHERE id=%s',
+                                       query_secs)
+            self.profiler.record_query('SELECT * FROM t WHERE id=%s',
+                                       query_secs)
+            self.time.now += 2
+        with self.profiler.phase('drones'):
+            self.profiler.record_drone_call('drone1', 3, 100, 200, 1)
+            self.time.now += 1
+        self.profiler.record_query('SELECT 1', 0.1)
+        self.profiler.set_counter('agents', 7)
+        self.profiler.end_tick()
+
+
+    def test_tick_record(self):
+        self._run_tick(0)
+        tick, = self.profiler.ticks
+        self.assertEqual(tick['tick'], 0)
+        self.assertEqual(tick['duration'], 3)
+        self.assertEqual(tick['phases'],
+                         [['schedule', 2, 2, 1.0], ['drones', 1, 0, 0]])
+        self.assertEqual(tick['queries'],
+                         {'SELECT * FROM t WHERE id=?': [2, 1.0],
+                          'SELECT ?': [1, 0.1]})
+        self.assertEqual(tick['drone_calls'], {'drone1': [1, 3, 100, 200, 1]})
+        self.assertEqual(tick['counters'], {'agents': 7})
+
+
+    def test_ring_buffer_and_idle_recording(self):
+        # Queries outside of a tick are not recorded.
+        self.profiler.record_query('SELECT 1', 1)
+        for i in xrange(3):
+            self._run_tick(i)
+        self.assertEqual([tick['tick'] for tick in self.profiler.ticks],
+                         [1, 2])
+
+
+    def test_requested_dump_happens_at_end_of_tick(self):
+        path = os.path.join(self.tempdir, 'dump.json')
+        self._run_tick(0)
+        self.profiler.start_tick(1)
+        self.profiler.request_dump(path)
+        self.assertFalse(os.path.exists(path))
+        self.profiler.end_tick()
+        with open(path) as f:
+            self.assertEqual([tick['tick'] for tick in json.load(f)], [0, 1])
+
+
+    def test_report(self):
+        path = os.path.join(self.tempdir, 'dump.json')
+        self._run_tick(0)
+        self._run_tick(1, query_secs=5)
+        self.profiler.dump(path)
+        out = StringIO()
+        tick_profile_report.report(tick_profile_report.load_ticks([path]),
+                                   slowest=1, out=out)
+        report = out.getvalue()
+        self.assertIn('2 ticks', report)
+        self.assertIn('SELECT * FROM t WHERE id=?', report)
+        self.assertIn('drone1', report)
+        self.assertIn('took 3.00s', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
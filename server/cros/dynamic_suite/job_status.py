@@ -153,22 +153,35 @@ class _JobResultWaiter(object):
         @yields an iterator of Statuses, one per test.
         """
         while self._job_ids:
-            for job in self._get_finished_jobs():
-                for result in _yield_job_results(self._afe, self._tko, job):
+            start_time = time.time()
+            finished_jobs = self._get_finished_jobs()
+            waited_secs = time.time() - start_time
+            for job, statuses in finished_jobs:
+                for result in _yield_job_results(self._afe, self._tko, job,
+                                                 statuses):
                     yield result
                 self._job_ids.remove(job.id)
-            self._sleep()
+            self._sleep(waited_secs)
 
     def _get_finished_jobs(self):
-        # This is an RPC call which serializes to JSON, so we can't pass
-        # in sets.
-        return self._afe.get_jobs(id__in=list(self._job_ids), finished=True)
-
-    def _sleep(self):
-        time.sleep(_DEFAULT_POLL_INTERVAL_SECONDS * (random.random() + 0.5))
+        # The server holds the call until one of the jobs finishes, for at
+        # most one poll interval, and returns the test statuses of the
+        # finished jobs along with them. This is an RPC call which serializes
+        # to JSON, so we can't pass in sets.
+        return self._afe.wait_for_finished_jobs(
+                list(self._job_ids),
+                timeout_secs=int(_DEFAULT_POLL_INTERVAL_SECONDS))
+
+    def _sleep(self, waited_secs):
+        """Sleeps for the rest of a poll interval.
+
+        @param waited_secs: Seconds already spent waiting in the server.
+        """
+        time.sleep(max(0, _DEFAULT_POLL_INTERVAL_SECONDS *
+                          (random.random() + 0.5) - waited_secs))
 
 
-def _yield_job_results(afe, tko, job):
+def _yield_job_results(afe, tko, job, statuses=None):
     """
     Yields the results of an individual job.
 
@@ -178,10 +191,11 @@ def _yield_job_results(afe, tko, job):
     @param tko: an instance of TKO as defined in server/frontend.py.
     @param job: Job object to get results from, as defined in
                 server/frontend.py
+    @param statuses: The TestStatus objects of the job, as returned by
+                     TKO.get_job_test_statuses_from_db, or None to look
+                     them up.
     @yields an iterator of Statuses, one per test.
     """
-    entries = afe.run('get_host_queue_entries', job=job.id)
-
     # This query uses the job id to search through the tko_test_view_2
     # table, for results of a test with a similar job_tag. The job_tag
     # is used to store results, and takes the form job_id-owner/host.
@@ -191,7 +205,8 @@ def _yield_job_results(afe, tko, job):
     # job_tag, this query will return no results. When statuses is not
     # empty it will contain frontend.TestStatus' with fields populated
     # using the results of the db query.
-    statuses = tko.get_job_test_statuses_from_db(job.id)
+    if statuses is None:
+        statuses = tko.get_job_test_statuses_from_db(job.id)
     if not statuses:
         yield Status('ABORT', job.name)
 
@@ -217,8 +232,7 @@ def _yield_job_results(afe, tko, job):
         else:
             if s.status != 'GOOD' and not contains_test_failure:
                 yield Status(s.status,
-                             '%s_%s' % (entries[0]['job']['name'],
-                                        s.test_name),
+                             '%s_%s' % (job.name, s.test_name),
                              s.reason, s.test_started_time,
                              s.test_finished_time, job.id,
                              job.owner, s.hostname, job.name,
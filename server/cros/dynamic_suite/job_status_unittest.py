@@ -44,13 +44,11 @@ class StatusTest(mox.MoxTestBase):
         shutil.rmtree(self.tmpdir, ignore_errors=True)
 
 
-    def expect_yield_job_entries(self, job):
-        entries = [s.entry for s in job.statuses]
-        self.afe.run('get_host_queue_entries',
-                     job=job.id).AndReturn(entries)
-        if True not in map(lambda e: 'aborted' in e and e['aborted'], entries):
-            self.tko.get_job_test_statuses_from_db(job.id).AndReturn(
-                    job.statuses)
+    def expect_wait_for_finished_jobs(self, job_ids, finished_jobs):
+        self.afe.wait_for_finished_jobs(
+                list(job_ids),
+                timeout_secs=int(job_status._DEFAULT_POLL_INTERVAL_SECONDS)
+                ).AndReturn([(job, job.statuses) for job in finished_jobs])
 
 
     def testWaitForResults(self):
@@ -72,8 +70,7 @@ class StatusTest(mox.MoxTestBase):
                 # FakeJob(5, [FakeStatus('ERROR', 'T0', 'gah', True)]),
                 # The next job shouldn't be recorded in the results.
                 # FakeJob(6, [FakeStatus('GOOD', 'SERVER_JOB', '')])]
-        for status in jobs[4].statuses:
-            status.entry['job'] = {'name': 'broken_infra_job'}
+        jobs[4].name = 'broken_infra_job'
 
         job_id_set = set([job.id for job in jobs])
         yield_values = [
@@ -83,10 +80,8 @@ class StatusTest(mox.MoxTestBase):
             ]
         self.mox.StubOutWithMock(time, 'sleep')
         for yield_this in yield_values:
-            self.afe.get_jobs(id__in=list(job_id_set),
-                              finished=True).AndReturn(yield_this)
+            self.expect_wait_for_finished_jobs(job_id_set, yield_this)
             for job in yield_this:
-                self.expect_yield_job_entries(job)
                 job_id_set.remove(job.id)
             time.sleep(mox.IgnoreArg())
         self.mox.ReplayAll()
@@ -126,8 +121,7 @@ class StatusTest(mox.MoxTestBase):
                 # The next job shouldn't be recorded in the results.
                 #FakeJob(6, [FakeStatus('GOOD', 'SERVER_JOB', '')],
                 #        parent_job_id=12345)]
-        for status in jobs[4].statuses:
-            status.entry['job'] = {'name': 'broken_infra_job'}
+        jobs[4].name = 'broken_infra_job'
 
         # Expect one call to get a list of all child jobs.
         self.afe.get_jobs(parent_job_id=parent_job_id).AndReturn(jobs[:6])
@@ -140,10 +134,8 @@ class StatusTest(mox.MoxTestBase):
             ]
         self.mox.StubOutWithMock(time, 'sleep')
         for yield_this in yield_values:
-            self.afe.get_jobs(id__in=list(job_id_set),
-                              finished=True).AndReturn(yield_this)
+            self.expect_wait_for_finished_jobs(job_id_set, yield_this)
             for job in yield_this:
-                self.expect_yield_job_entries(job)
                 job_id_set.remove(job.id)
             time.sleep(mox.IgnoreArg())
         self.mox.ReplayAll()
@@ -166,9 +158,8 @@ class StatusTest(mox.MoxTestBase):
                           FakeStatus('GOOD', 'T0', '',
                                      subdir='T0.subdir', job_tag=job_tag)],
                       parent_job_id=54321)
-        for status in job.statuses:
-            status.entry['job'] = {'name': job_name}
-        self.expect_yield_job_entries(job)
+        job.name = job_name
+        self.tko.get_job_test_statuses_from_db(job.id).AndReturn(job.statuses)
         self.mox.ReplayAll()
         results = list(job_status._yield_job_results(self.afe, self.tko, job))
         for i in range(len(results)):
@@ -7,6 +7,7 @@ import datetime
 import difflib
 import functools
 import hashlib
+import itertools
 import logging
 import operator
 import os
@@ -50,6 +51,9 @@ _AUTOTEST_DIR = global_config.global_config.get_config_value(
         'SCHEDULER', 'drone_installation_directory')
 ENABLE_CONTROLS_IN_BATCH = global_config.global_config.get_config_value(
         'CROS', 'enable_getting_controls_in_batch', type=bool, default=False)
+# Number of child jobs created by one create_jobs_bulk RPC. Each call creates
+# its jobs in one transaction.
+_BULK_CREATE_CHUNK_SIZE = 200
 
 class RetryHandler(object):
     """Maintain retry information.
@@ -334,6 +338,43 @@ class _SuiteChildJobCreator(object):
                   name of the job.
         """
         test_obj = self._afe.create_job(
+                **self._create_job_args(test, retry_for))
+        test_obj.test_name = test.name
+        return test_obj
+
+
+    def create_jobs(self, tests):
+        """
+        Create jobs for several tests with frontend.AFE.create_jobs_bulk().
+
+        This is a generator: the jobs of a chunk of tests are created only
+        when the results of the previous chunk have been consumed, so that
+        the caller can keep track of the jobs already created if the RPC for
+        a later chunk fails.
+
+        @param tests: A list of ControlData objects for tests to run.
+        @yields: One item per test: either a frontend.Job object with an
+                 added test_name member, as returned by create_job(), or
+                 the exception that prevented the job from being created.
+        """
+        for start in xrange(0, len(tests), _BULK_CREATE_CHUNK_SIZE):
+            chunk = tests[start:start + _BULK_CREATE_CHUNK_SIZE]
+            jobs = self._afe.create_jobs_bulk(
+                    [self._create_job_args(test) for test in chunk])
+            for test, job in zip(chunk, jobs):
+                if not isinstance(job, Exception):
+                    job.test_name = test.name
+                yield job
+
+
+    def _create_job_args(self, test, retry_for=None):
+        """Create the arguments of the create_job RPC for a test job.
+
+        @param test: ControlData object for a test to run.
+        @param retry_for: See create_job().
+        @returns: A dict of keyword arguments.
+        """
+        return dict(
             control_file=test.text,
             name=tools.create_job_name(
                     self._test_source_build or self.cros_build,
@@ -351,9 +392,6 @@ class _SuiteChildJobCreator(object):
             synch_count=test.sync_count,
             require_ssp=test.require_ssp)
 
-        test_obj.test_name = test.name
-        return test_obj
-
 
     def _create_job_deps(self, test):
         """Create job deps list for a test job.
@@ -1090,17 +1128,8 @@ class _BaseSuite(object):
         try:
             job = self._job_creator.create_job(test, retry_for=retry_for)
         except (error.NoEligibleHostException, proxy.ValidationError) as e:
-            if (isinstance(e, error.NoEligibleHostException)
-                or (isinstance(e, proxy.ValidationError)
-                    and _is_nonexistent_board_error(e))):
-                # Treat a dependency on a non-existent board label the same as
-                # a dependency on a board that exists, but for which there's no
-                # hardware.
-                logging.debug('%s not applicable for this board/pool. '
-                              'Emitting TEST_NA.', test.name)
-                Status('TEST_NA', test.name,
-                       'Skipping:  test not supported on this board/pool.',
-                       begin_time_str=begin_time_str).record_all(record)
+            if _is_test_not_applicable_error(e):
+                self._record_test_not_applicable(record, test, begin_time_str)
                 return None
             else:
                 raise e
@@ -1110,21 +1139,82 @@ class _BaseSuite(object):
                 self._retry_handler.set_attempted(job_id=retry_for)
             raise
         else:
-            self._jobs.append(job)
-            self._jobs_to_tests[job.id] = test
-            if retry_for:
-                # A retry job was just created, record it.
-                self._retry_handler.add_retry(
-                        old_job_id=retry_for, new_job_id=job.id)
-                retry_count = (test.job_retries -
-                               self._retry_handler.get_retry_max(job.id))
-                logging.debug('Job %d created to retry job %d. '
-                              'Have retried for %d time(s)',
-                              job.id, retry_for, retry_count)
-            self._remember_job_keyval(job)
+            self._track_scheduled_job(test, job, retry_for=retry_for)
             return job
 
 
+    def _schedule_tests(self, record, tests):
+        """Schedule several tests with bulk job creation.
+
+        Like _schedule_test(), but creates the jobs with as few RPCs as
+        possible. Tests that fail to schedule due to NoEligibleHostException
+        or a non-existent board label get a TEST_NA status log entry. If a
+        test fails to schedule for another reason, or the RPC creating a
+        chunk of jobs fails, the jobs that were created are still tracked
+        before the error is raised.
+
+        @param record: A callable to use for logging.
+                       prototype: record(base_job.status_log_entry)
+        @param tests: A list of ControlData for tests to run.
+
+        @returns: A list of the ControlData of the scheduled tests.
+        """
+        logging.debug('Scheduling %d tests.', len(tests))
+        begin_time_str = datetime.datetime.now().strftime(time_utils.TIME_FMT)
+        scheduled_tests = []
+        failure = None
+        for test, job in itertools.izip(tests,
+                                        self._job_creator.create_jobs(tests)):
+            if not isinstance(job, Exception):
+                self._track_scheduled_job(test, job)
+                scheduled_tests.append(test)
+            elif _is_test_not_applicable_error(job):
+                self._record_test_not_applicable(record, test, begin_time_str)
+            elif failure is None:
+                failure = job
+        if failure is not None:
+            raise failure
+        return scheduled_tests
+
+
+    def _record_test_not_applicable(self, record, test, begin_time_str):
+        """Emit a TEST_NA status log entry for a test that can't be scheduled.
+
+        @param record: A callable to use for logging.
+        @param test: ControlData of the test.
+        @param begin_time_str: When scheduling of the test began.
+        """
+        # Treat a dependency on a non-existent board label the same as a
+        # dependency on a board that exists, but for which there's no
+        # hardware.
+        logging.debug('%s not applicable for this board/pool. '
+                      'Emitting TEST_NA.', test.name)
+        Status('TEST_NA', test.name,
+               'Skipping:  test not supported on this board/pool.',
+               begin_time_str=begin_time_str).record_all(record)
+
+
+    def _track_scheduled_job(self, test, job, retry_for=None):
+        """Update the data structures keeping track of all running jobs.
+
+        @param test: ControlData of the scheduled test.
+        @param job: The frontend.Job created for it.
+        @param retry_for: The afe_job_id of the job |job| retries, if any.
+        """
+        self._jobs.append(job)
+        self._jobs_to_tests[job.id] = test
+        if retry_for:
+            # A retry job was just created, record it.
+            self._retry_handler.add_retry(
+                    old_job_id=retry_for, new_job_id=job.id)
+            retry_count = (test.job_retries -
+                           self._retry_handler.get_retry_max(job.id))
+            logging.debug('Job %d created to retry job %d. '
+                          'Have retried for %d time(s)',
+                          job.id, retry_for, retry_count)
+        self._remember_job_keyval(job)
+
+
     def schedule(self, record):
         #pylint: disable-msg=C0111
         """
@@ -1151,10 +1241,8 @@ class _BaseSuite(object):
             # as part of a suite. Remove this hack once provision is separated
             # out in its own suite.
             self._bump_up_test_retries(self.tests)
-            for test in self.tests:
-                scheduled_job = self._schedule_test(record, test)
-                if scheduled_job is not None:
-                    scheduled_test_names.append(test.name)
+            for test in self._schedule_tests(record, self.tests):
+                scheduled_test_names.append(test.name)
 
             # Write the num of scheduled tests and name of them to keyval file.
             logging.debug('Scheduled %d tests, writing the total to keyval.',
@@ -1766,6 +1854,16 @@ class _ComposedPredicate(object):
         return all(f(control_data_) for f in self._predicates)
 
 
+def _is_test_not_applicable_error(e):
+    """Return True if a test failed to schedule because it can't run here.
+
+    @param e: The exception raised when creating the test job.
+    """
+    return (isinstance(e, error.NoEligibleHostException)
+            or (isinstance(e, proxy.ValidationError)
+                and _is_nonexistent_board_error(e)))
+
+
 def _is_nonexistent_board_error(e):
     """Return True if error is caused by nonexistent board label.
 
@@ -296,6 +296,8 @@ class SuiteTest(mox.MoxTestBase):
             log_in_subdir=False)
         tests = self.files.values()
         n = 1
+        expected_jobs = []
+        created_jobs = []
         for test in tests:
             if test.name in tests_to_skip:
                 continue
@@ -313,7 +315,7 @@ class SuiteTest(mox.MoxTestBase):
                 'experimental':test.experimental,
             }
             keyvals.update(extra_keyvals)
-            job_mock = self.afe.create_job(
+            expected_jobs.append(dict(
                 control_file=test.text,
                 name=mox.And(mox.StrContains(build),
                              mox.StrContains(test.name)),
@@ -328,24 +330,23 @@ class SuiteTest(mox.MoxTestBase):
                 priority=priorities.Priority.DEFAULT,
                 synch_count=test.sync_count,
                 require_ssp=test.require_ssp
-                )
+                ))
             if raises:
-                job_mock.AndRaise(error.NoEligibleHostException())
-                recorder.record_entry(
-                        StatusContains.CreateFromStrings('START', test.name),
-                        log_in_subdir=False)
-                recorder.record_entry(
-                        StatusContains.CreateFromStrings('TEST_NA', test.name),
-                        log_in_subdir=False)
-                recorder.record_entry(
-                        StatusContains.CreateFromStrings('END', test.name),
-                        log_in_subdir=False)
+                created_jobs.append((test, error.NoEligibleHostException()))
             else:
-                fake_job = FakeJob(id=n)
-                job_mock.AndReturn(fake_job)
-                if record_job_id:
-                    suite._remember_job_keyval(fake_job)
+                created_jobs.append((test, FakeJob(id=n)))
                 n += 1
+        self.afe.create_jobs_bulk(expected_jobs).AndReturn(
+                [job for _, job in created_jobs])
+        for test, job in created_jobs:
+            if raises:
+                for status in ('START', 'TEST_NA', 'END'):
+                    recorder.record_entry(
+                            StatusContains.CreateFromStrings(status,
+                                                             test.name),
+                            log_in_subdir=False)
+            elif record_job_id:
+                suite._remember_job_keyval(job)
 
 
     def testScheduleTestsAndRecord(self):
@@ -693,9 +694,8 @@ class SuiteTest(mox.MoxTestBase):
             StatusContains.CreateFromStrings('FAIL', self._TAG, 'scheduling'),
             log_in_subdir=False)
 
-        self.mox.StubOutWithMock(suite._job_creator, 'create_job')
-        suite._job_creator.create_job(
-            mox.IgnoreArg(), retry_for=mox.IgnoreArg()).AndRaise(
+        self.mox.StubOutWithMock(suite._job_creator, 'create_jobs')
+        suite._job_creator.create_jobs(mox.IgnoreArg()).AndRaise(
             Exception('Expected during test.'))
         self.mox.ReplayAll()
 
@@ -703,6 +703,27 @@ class SuiteTest(mox.MoxTestBase):
         suite.wait(recorder.record_entry, dict())
 
 
+    def testScheduleTestsChunkFailure(self):
+        """Jobs created before a failed bulk RPC should be tracked."""
+        suite = self._createSuiteWithMockedTestsAndControlFiles()
+        tests = suite.tests[:3]
+        self.mox.StubOutWithMock(SuiteBase, '_BULK_CREATE_CHUNK_SIZE')
+        SuiteBase._BULK_CREATE_CHUNK_SIZE = 2
+        self.mox.StubOutWithMock(suite, '_remember_job_keyval')
+        jobs = [FakeJob(id=1), FakeJob(id=2)]
+        self.afe.create_jobs_bulk(mox.IgnoreArg()).AndReturn(jobs)
+        for job in jobs:
+            suite._remember_job_keyval(job)
+        self.afe.create_jobs_bulk(mox.IgnoreArg()).AndRaise(
+                error.RPCException('Expected during test.'))
+        self.mox.ReplayAll()
+
+        self.assertRaises(error.RPCException, suite._schedule_tests,
+                          None, tests)
+        self.assertEqual(suite._jobs, jobs)
+        self.assertEqual(suite._jobs_to_tests, {1: tests[0], 2: tests[1]})
+
+
     def testGetTestsSortedByTime(self):
         """Should find all tests and sorted by TIME setting."""
         self.expect_control_file_parsing()
@@ -31,6 +31,7 @@ import re
 import shutil
 import stat
 import tempfile
+import time
 import urlparse
 
 from autotest_lib.client.bin import utils as client_utils
@@ -70,6 +71,9 @@ _TRADEFED_CACHE_CONTAINER_LOCK = '/usr/local/autotest/results/shared/lock'
 # 10GB of disk space, as no more than 10 tests should run in parallel.
 # TODO(ihf): Investigate tighter cache size.
 _TRADEFED_CACHE_MAX_SIZE = (10 * 1024 * 1024 * 1024)
+# Install directories older than this were left behind by tests that did not
+# clean up, and are removed when the cache is trimmed.
+_TRADEFED_INSTALL_MAX_AGE_SECONDS = 2 * 24 * 60 * 60
 
 
 class _ChromeLogin(object):
@@ -340,13 +344,18 @@ class TradefedTest(test.test):
         # The content of the install location does not survive across jobs and
         # is isolated (by using a unique path)_against other autotest instances.
         # This is not needed for the lab, but if somebody wants to run multiple
-        # TradedefTest instance.
-        self._tradefed_install = tempfile.mkdtemp(prefix=_TRADEFED_PREFIX)
+        # TradedefTest instance. It is next to the cache, on the same file
+        # system, so that cached files can be hard linked into it.
+        self._tradefed_install_root = os.path.join(cache_root, 'install')
+        self._safe_makedirs(self._tradefed_install_root)
+        self._tradefed_install = tempfile.mkdtemp(
+                prefix=_TRADEFED_PREFIX, dir=self._tradefed_install_root)
         # Under lxc the cache is shared between multiple autotest/tradefed
-        # instances. We need to synchronize access to it. All binaries are
-        # installed through the (shared) cache into the local (unshared)
-        # lxc/autotest instance storage.
-        # If clearing the cache it must happen before all downloads.
+        # instances. We need to synchronize access to it: each cache entry has
+        # its own lock, so that unrelated downloads do not wait for each other.
+        # All binaries are installed through the (shared) cache into the
+        # per-instance install location.
+        # If trimming the cache it must happen before all downloads.
         self._clear_download_cache_if_needed()
         # Set permissions (rwxr-xr-x) to the executable binaries.
         permission = (stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH
@@ -514,6 +523,8 @@ class TradefedTest(test.test):
         E.g., _unzip('foo/bar/baz.zip') will create directory at
         'foo/bar/baz', and then will inflate zip's content under the directory.
         If here is already a directory at the stem, that directory will be used.
+        The content is inflated next to the destination first, so that an
+        interrupted unzip does not leave a partial directory behind.
 
         @param filename: Path to the zip archive.
         @return Path to the inflated directory.
@@ -521,8 +532,12 @@ class TradefedTest(test.test):
         destination = os.path.splitext(filename)[0]
         if os.path.isdir(destination):
             return destination
-        self._safe_makedirs(destination)
-        utils.run('unzip', args=('-d', destination, filename))
+        partial = destination + '.partial'
+        if os.path.exists(partial):
+            shutil.rmtree(partial)
+        self._safe_makedirs(partial)
+        utils.run('unzip', args=('-d', partial, filename))
+        os.rename(partial, destination)
         return destination
 
     def _dir_size(self, directory):
@@ -534,20 +549,58 @@ class TradefedTest(test.test):
         return size
 
     def _clear_download_cache_if_needed(self):
-        """Invalidates cache to prevent it from growing too large."""
-        # If the cache is large enough to hold a working set, we can simply
-        # delete everything without thrashing.
-        # TODO(ihf): Investigate strategies like LRU.
+        """Evicts the least recently used cache entries to prevent the cache
+        from growing too large.
+
+        Also removes install directories left behind by earlier instances.
+        """
         with lock(self._tradefed_cache_lock):
-            size = self._dir_size(self._tradefed_cache)
-            if size > _TRADEFED_CACHE_MAX_SIZE:
-                logging.info('Current cache size=%d got too large. Clearing %s.'
-                        , size, self._tradefed_cache)
-                shutil.rmtree(self._tradefed_cache)
-                self._safe_makedirs(self._tradefed_cache)
-            else:
-                logging.info('Current cache size=%d of %s.', size,
-                        self._tradefed_cache)
+            self._clear_stale_installs()
+            self._safe_makedirs(self._tradefed_cache)
+            entries = []
+            for name in os.listdir(self._tradefed_cache):
+                path = os.path.join(self._tradefed_cache, name)
+                if os.path.isdir(path):
+                    entries.append((os.path.getmtime(path),
+                                    self._dir_size(path), path))
+            size = sum(entry_size for _, entry_size, _ in entries)
+            logging.info('Current cache size=%d of %s.', size,
+                    self._tradefed_cache)
+            for _, entry_size, path in sorted(entries):
+                if size <= _TRADEFED_CACHE_MAX_SIZE:
+                    break
+                # Wait for instances installing from the entry.
+                with lock(path):
+                    logging.info('Evicting %s of size=%d from the cache.',
+                            path, entry_size)
+                    shutil.rmtree(path)
+                size -= entry_size
+
+    def _clear_stale_installs(self):
+        """Removes install directories of instances that did not clean up.
+
+        Their files may be hard links to evicted cache entries, which would
+        otherwise keep using disk space.
+        """
+        cutoff = time.time() - _TRADEFED_INSTALL_MAX_AGE_SECONDS
+        for name in os.listdir(self._tradefed_install_root):
+            path = os.path.join(self._tradefed_install_root, name)
+            if (name.startswith(_TRADEFED_PREFIX) and
+                    os.path.getmtime(path) < cutoff):
+                logging.info('Removing stale install directory %s.', path)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _cache_entry(self, uri):
+        """Returns the cache directory of the uri.
+
+        We are hashing the uri instead of the binary. This is acceptable, as
+        the uris are supposed to contain version information and an object is
+        not supposed to be changed once created.
+
+        @param uri: The Google Storage or dl.google.com uri.
+        @return Path to the cache directory, named by the MD5 of the uri.
+        """
+        return os.path.join(self._tradefed_cache, hashlib.md5(uri).hexdigest())
 
     def _download_to_cache(self, uri):
         """Downloads the uri from the storage server.
@@ -555,31 +608,65 @@ class TradefedTest(test.test):
         It always checks the cache for available binaries first and skips
         download if binaries are already in cache.
 
-        The caller of this function is responsible for holding the cache lock.
+        The caller of this function is responsible for holding the lock of the
+        cache entry of the uri.
 
         @param uri: The Google Storage or dl.google.com uri.
         @return Path to the downloaded object, name.
         """
-        # Split uri into 3 pieces for use by gsutil and also by wget.
-        parsed = urlparse.urlparse(uri)
-        filename = os.path.basename(parsed.path)
-        # We are hashing the uri instead of the binary. This is acceptable, as
-        # the uris are supposed to contain version information and an object is
-        # not supposed to be changed once created.
-        output_dir = os.path.join(self._tradefed_cache,
-                                  hashlib.md5(uri).hexdigest())
-        output = os.path.join(output_dir, filename)
+        output_dir = self._cache_entry(uri)
+        output = os.path.join(output_dir,
+                              os.path.basename(urlparse.urlparse(uri).path))
         # Check for existence of file.
         if os.path.exists(output):
             logging.info('Skipping download of %s, reusing %s.', uri, output)
             return output
         self._safe_makedirs(output_dir)
+        # Download under a temporary name, so that an interrupted download is
+        # not mistaken for a cached file.
+        partial = output + '.partial'
+        self._download(uri, partial)
+        os.rename(partial, output)
+        return output
+
+    def _extract_to_cache(self, uri):
+        """Downloads and inflates the zip file at uri into the cache.
+
+        It always checks the cache for an inflated directory first. The zip
+        file itself is removed from the cache once inflated.
+
+        The caller of this function is responsible for holding the lock of the
+        cache entry of the uri.
 
+        @param uri: The Google Storage or dl.google.com uri of a zip file.
+        @return Path to the inflated directory.
+        """
+        filename = os.path.basename(urlparse.urlparse(uri).path)
+        destination = os.path.join(self._cache_entry(uri),
+                                   os.path.splitext(filename)[0])
+        if os.path.isdir(destination):
+            logging.info('Skipping download of %s, reusing %s.', uri,
+                    destination)
+            return destination
+        cache_path = self._download_to_cache(uri)
+        destination = self._unzip(cache_path)
+        os.remove(cache_path)
+        return destination
+
+    def _download(self, uri, output):
+        """Downloads the uri from the storage server to output.
+
+        @param uri: The Google Storage or dl.google.com uri.
+        @param output: Path of the file to write.
+        """
+        # Split uri into 3 pieces for use by gsutil and also by wget.
+        parsed = urlparse.urlparse(uri)
+        filename = os.path.basename(parsed.path)
         if parsed.scheme not in ['gs', 'http', 'https']:
             raise error.TestFail('Error: Unknown download scheme %s' %
                                  parsed.scheme)
         if parsed.scheme in ['http', 'https']:
-            logging.info('Using wget to download %s to %s.', uri, output_dir)
+            logging.info('Using wget to download %s to %s.', uri, output)
             # We are downloading 1 file at a time, hence using -O over -P.
             utils.run(
                 'wget',
@@ -589,7 +676,7 @@ class TradefedTest(test.test):
                     output,
                     uri),
                 verbose=True)
-            return output
+            return
 
         if not client_utils.is_moblab():
             # If the machine can access to the storage server directly,
@@ -598,7 +685,7 @@ class TradefedTest(test.test):
                     self._host.hostname, uri, output)
             # b/17445576: gsutil rsync of individual files is not implemented.
             utils.run('gsutil', args=('cp', uri, output), verbose=True)
-            return output
+            return
 
         # We are in the moblab. Because the machine cannot access the storage
         # server directly, use dev server to proxy.
@@ -630,11 +717,21 @@ class TradefedTest(test.test):
                         output,
                         ds_src),
                 verbose=True)
-        return output
 
-    def _instance_copy(self, cache_path):
-        """Makes a copy of a file from the (shared) cache to a wholy owned
-        local instance. Also copies one level of cache directoy (MD5 named).
+    def _instance_copy(self, cache_path, hard_link=True):
+        """Makes a copy of a file or directory from the (shared) cache to a
+        wholy owned local instance. Also copies one level of cache directoy
+        (MD5 named).
+
+        Files are hard linked into the instance, or reflinked where hard links
+        are not possible, instead of being copied. Hard linked files share
+        their content and attributes with the cache, so they must be replaced
+        (see _copy_to_instance) rather than modified in place.
+
+        @param cache_path: Path of the file or directory in the cache.
+        @param hard_link: False to reflink or copy the files even on the file
+                          system of the cache, for files that are modified in
+                          place.
         """
         filename = os.path.basename(cache_path)
         dirname = os.path.basename(os.path.dirname(cache_path))
@@ -642,19 +739,39 @@ class TradefedTest(test.test):
         # Make sure destination directory is named the same.
         self._safe_makedirs(instance_dir)
         instance_path = os.path.join(instance_dir, filename)
-        shutil.copyfile(cache_path, instance_path)
+        if os.path.exists(instance_path):
+            return instance_path
+        link = hard_link and (os.stat(cache_path).st_dev ==
+                              os.stat(instance_dir).st_dev)
+        utils.run('cp', args=('-a', '-l' if link else '--reflink=auto',
+                              cache_path, instance_path))
+        # Mark the cache entry as recently used.
+        os.utime(os.path.dirname(cache_path), None)
         return instance_path
 
+    def _copy_to_instance(self, source, instance_dir):
+        """Copies a file into a directory of the local instance.
+
+        A file of the same name in the instance may be hard linked to the
+        cache, so it is removed instead of being overwritten.
+
+        @param source: Path of the file to copy.
+        @param instance_dir: Directory of the instance to copy it to.
+        """
+        destination = os.path.join(instance_dir, os.path.basename(source))
+        if os.path.lexists(destination):
+            os.remove(destination)
+        shutil.copy(source, destination)
+
     def _install_bundle(self, gs_uri):
         """Downloads a zip file, installs it and returns the local path."""
         if not gs_uri.endswith('.zip'):
             raise error.TestFail('Error: Not a .zip file %s.', gs_uri)
-        # Atomic write through of file.
-        with lock(self._tradefed_cache_lock):
-            cache_path = self._download_to_cache(gs_uri)
-            local = self._instance_copy(cache_path)
+        # Atomic write through of the inflated directory.
+        with lock(self._cache_entry(gs_uri)):
+            cache_path = self._extract_to_cache(gs_uri)
+            unzipped = self._instance_copy(cache_path)
 
-        unzipped = self._unzip(local)
         self._abi = 'x86' if 'x86-x86' in unzipped else 'arm'
         return unzipped
 
@@ -663,9 +780,10 @@ class TradefedTest(test.test):
         for filename in files:
             gs_uri = os.path.join(gs_dir, filename)
             # Atomic write through of file.
-            with lock(self._tradefed_cache_lock):
+            with lock(self._cache_entry(gs_uri)):
                 cache_path = self._download_to_cache(gs_uri)
-                local = self._instance_copy(cache_path)
+                # The permissions of the copy are changed below.
+                local = self._instance_copy(cache_path, hard_link=False)
             os.chmod(local, permission)
             # Keep track of PATH.
             self._install_paths.append(os.path.dirname(local))
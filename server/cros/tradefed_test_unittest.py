@@ -1,7 +1,11 @@
 # Copyright 2017 The Chromium OS Authors. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
+import mock
 import os
+import shutil
+import stat
+import tempfile
 import unittest
 
 import tradefed_test
@@ -87,5 +91,63 @@ class TradefedTestTest(unittest.TestCase):
                 _load_data('CtsPrintTestCases.txt'),
                 waivers=waivers))
 
+class InstanceCopyTest(unittest.TestCase):
+    """Unittest for the copies of cache entries used by a test instance."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._test = tradefed_test.TradefedTest.__new__(
+                tradefed_test.TradefedTest)
+        self._test._tradefed_install = os.path.join(self._tmpdir, 'install')
+        self._test._install_paths = []
+        self._cache_dir = os.path.join(self._tmpdir, 'cache', 'entry')
+        os.makedirs(self._cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def _write(self, path, content):
+        """Creates the file at path, and its directory."""
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_copy_to_instance_keeps_cache(self):
+        """A file copied over a cached file does not modify the cache."""
+        cached_plan = os.path.join(self._cache_dir, 'android-cts', 'plans',
+                                   'CTS.xml')
+        self._write(cached_plan, 'cached plan')
+        new_plan = os.path.join(self._tmpdir, 'plans', 'CTS.xml')
+        self._write(new_plan, 'new plan')
+
+        instance = self._test._instance_copy(os.path.dirname(
+                os.path.dirname(cached_plan)))
+        plans_dir = os.path.join(instance, 'plans')
+        self._test._copy_to_instance(new_plan, plans_dir)
+
+        with open(os.path.join(plans_dir, 'CTS.xml')) as f:
+            self.assertEqual(f.read(), 'new plan')
+        with open(cached_plan) as f:
+            self.assertEqual(f.read(), 'cached plan')
+
+    def test_install_files_keeps_cache(self):
+        """Installed tools are made executable without changing the cache."""
+        cached_adb = os.path.join(self._cache_dir, 'adb')
+        self._write(cached_adb, 'adb')
+        os.chmod(cached_adb, 0o644)
+
+        with mock.patch.object(tradefed_test, 'lock'), \
+             mock.patch.object(self._test, '_cache_entry'), \
+             mock.patch.object(self._test, '_download_to_cache',
+                               return_value=cached_adb):
+            self._test._install_files('gs://bucket/tools', ['adb'], 0o755)
+
+        local = os.path.join(self._test._tradefed_install, 'entry', 'adb')
+        self.assertEqual(stat.S_IMODE(os.stat(local).st_mode), 0o755)
+        self.assertEqual(stat.S_IMODE(os.stat(cached_adb).st_mode), 0o644)
+        self.assertEqual(self._test._install_paths, [os.path.dirname(local)])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -22,6 +22,7 @@ import re
 import common
 
 from autotest_lib.frontend.afe import rpc_client_lib
+from autotest_lib.frontend.afe.json_rpc import proxy
 from autotest_lib.client.common_lib import control_data
 from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import priorities
@@ -112,6 +113,40 @@ class RpcClient(object):
             raise
 
 
+    def run_paged(self, call, key='id', page_size=1000, **dargs):
+        """
+        Iterate over the results of a list returning RPC, a page at a time.
+
+        Pages are fetched lazily with keyset pagination: every page is sorted
+        by |key| and starts after the last key of the previous page, so deep
+        pages are as cheap as the first one and rows added in the meantime
+        neither shift nor repeat results.
+
+        This is the way to read large result sets: the server builds each
+        RPC result in memory, so only the page size bounds its memory use.
+
+        @param call: Name of the RPC, e.g. 'get_host_queue_entries'.
+        @param key: Unique, sortable field of the results, e.g. 'id', or
+                    'test_idx' for TKO test views.
+        @param page_size: Number of results fetched per RPC.
+        @param dargs: Filter data passed to every call. It must not contain
+                      sort_by, query_start or query_limit.
+
+        @returns A generator of results.
+        """
+        last_key = None
+        while True:
+            page_dargs = dict(dargs, sort_by=[key], query_limit=page_size)
+            if last_key is not None:
+                page_dargs[key + '__gt'] = last_key
+            page = self.run(call, **page_dargs)
+            for result in page:
+                yield result
+            if len(page) < page_size:
+                return
+            last_key = page[-1][key]
+
+
     def log(self, message):
         if self.print_log:
             print message
@@ -605,6 +640,41 @@ class AFE(RpcClient):
         return jobs
 
 
+    def wait_for_finished_jobs(self, job_ids, timeout_secs=0):
+        """Waits for some of the given jobs to finish.
+
+        @param job_ids: A list of job ids.
+        @param timeout_secs: Longest time the server waits for one of the jobs
+                to finish before returning an empty list.
+
+        @returns A list of (Job, list of TestStatus) tuples, one per finished
+                job. The TestStatus objects have the same fields as those
+                returned by TKO.get_job_test_statuses_from_db.
+        """
+        results = self.run('wait_for_finished_jobs', job_ids=job_ids,
+                           timeout_secs=timeout_secs)
+        finished = []
+        for result in results:
+            job = Job(self, result['job'])
+            job.testname = re.sub('\s.*', '', job.name)
+            job.platform_results = {}
+            job.platform_reasons = {}
+            statuses = []
+            for entry in result['test_statuses']:
+                # All callers expect values to be a str object. Reasons may
+                # contain non-ASCII characters.
+                status_dict = dict(
+                        (key, value.encode('utf-8')
+                              if isinstance(value, unicode) else str(value))
+                        for key, value in entry.iteritems())
+                status_dict['id'] = [status_dict['reason'],
+                                     status_dict['hostname'],
+                                     status_dict['test_name']]
+                statuses.append(TestStatus(self, status_dict))
+            finished.append((job, statuses))
+        return finished
+
+
     def get_host_queue_entries(self, **kwargs):
         """Find JobStatus objects matching some constraints.
 
@@ -678,6 +748,27 @@ class AFE(RpcClient):
         return self.get_jobs(id=id)[0]
 
 
+    def create_jobs_bulk(self, jobs):
+        """Create several jobs with one RPC.
+
+        @param jobs: A list of dicts of create_job() keyword arguments, which
+                must all include control_file, name, priority and
+                control_type.
+
+        @returns A list with one item per job: the created Job, or the
+                exception the server raised for a job that failed
+                validation.
+        """
+        results = self.run('create_jobs_bulk', jobs=jobs)
+        ids = [result['id'] for result in results if 'error' not in result]
+        jobs_by_id = {}
+        if ids:
+            jobs_by_id = dict((job.id, job)
+                              for job in self.get_jobs(id__in=ids))
+        return [proxy.BuildException(result['error']) if 'error' in result
+                else jobs_by_id[result['id']] for result in results]
+
+
     def abort_jobs(self, jobs):
         """Abort a list of jobs.
 
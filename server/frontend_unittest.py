@@ -9,6 +9,7 @@
 
 import os, unittest
 import common
+from autotest_lib.client.common_lib import error
 from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import utils
 from autotest_lib.client.common_lib.test_utils import mock
@@ -45,5 +46,71 @@ class RpcClientTest(BaseRpcClientTest):
         self.god.check_playback()
 
 
+    def test_run_paged(self):
+        rpc_client_lib.get_proxy.expect_any_call()
+        client = frontend.RpcClient('/path', 'user', 'test-host', None, None,
+                                    None)
+        rows = [{'id': i} for i in xrange(1, 6)]
+        calls = []
+        def run(call, **dargs):
+            calls.append(dargs)
+            after = dargs.get('id__gt', 0)
+            return [row for row in rows
+                    if row['id'] > after][:dargs['query_limit']]
+        client.run = run
+
+        self.assertEquals(list(client.run_paged('get_things', page_size=2,
+                                                owner='me')),
+                          rows)
+        self.assertEquals([call.get('id__gt') for call in calls],
+                          [None, 2, 4])
+        self.assertTrue(all(call['sort_by'] == ['id'] and
+                            call['owner'] == 'me' for call in calls))
+
+
+class AFETest(BaseRpcClientTest):
+    def test_create_jobs_bulk(self):
+        rpc_client_lib.get_proxy.expect_any_call()
+        afe = frontend.AFE(user='user', server='test-host')
+        calls = []
+        def run(call, **dargs):
+            calls.append((call, dargs))
+            if call == 'create_jobs_bulk':
+                return [{'id': 1},
+                        {'error': {'name': 'NoEligibleHostException',
+                                   'message': 'no hosts',
+                                   'traceback': ''}},
+                        {'id': 2}]
+            return [{'id': job_id, 'name': 'job %d' % job_id}
+                    for job_id in dargs['id__in']]
+        afe.run = run
+
+        jobs = afe.create_jobs_bulk([{'name': 'a'}, {'name': 'b'},
+                                     {'name': 'c'}])
+        self.assertEquals([job.id for job in (jobs[0], jobs[2])], [1, 2])
+        self.assertTrue(isinstance(jobs[1], error.NoEligibleHostException))
+        self.assertEquals(calls[1], ('get_jobs', {'id__in': [1, 2]}))
+
+
+    def test_wait_for_finished_jobs_non_ascii_reason(self):
+        rpc_client_lib.get_proxy.expect_any_call()
+        afe = frontend.AFE(user='user', server='test-host')
+        def run(call, **dargs):
+            return [{'job': {'id': 1, 'name': 'dummy_Pass arg'},
+                     'test_statuses': [{'status': u'FAIL',
+                                        'test_name': u'dummy_Pass',
+                                        'reason': u'caf\xe9 failed',
+                                        'hostname': u'host1',
+                                        'afe_job_id': 1}]}]
+        afe.run = run
+
+        [(job, statuses)] = afe.wait_for_finished_jobs([1])
+        self.assertEquals(job.testname, 'dummy_Pass')
+        self.assertEquals(statuses[0].reason, 'caf\xc3\xa9 failed')
+        self.assertEquals(statuses[0].afe_job_id, '1')
+        self.assertEquals(statuses[0].id,
+                          ['caf\xc3\xa9 failed', 'host1', 'dummy_Pass'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,6 +9,7 @@ import logging
 
 import common
 
+from autotest_lib.client.common_lib import error
 from autotest_lib.server.cros.dynamic_suite import frontend_wrappers
 
 
@@ -56,10 +57,33 @@ class BaseLabel(object):
                           to tell LabelRetriever what list of label classes we
                           are generating and thus are able to have a
                           comprehensive list of the generated labels.
+    @property _PREFETCH_COMMANDS List of commands that this label's
+                                 detection logic always runs.  LabelRetriever
+                                 runs the commands of all labels in a single
+                                 host.run_batch() call, and host.run() calls
+                                 made by the label for exactly these commands
+                                 are answered from the prefetched results.
+                                 Commands that only run after an earlier check
+                                 passes do not belong here.
     """
 
     _NAME = None
     _LABEL_LIST = []
+    _PREFETCH_COMMANDS = []
+
+    def get_prefetch_commands(self, host):
+        """
+        Return the commands to prefetch for this label on the host.
+
+        Labels that skip their commands on some hosts, e.g. because the label
+        is already applied, override this to return no commands there.
+
+        @param host: The host the labels are retrieved for.
+
+        @returns a list of command line strings.
+        """
+        return self._PREFETCH_COMMANDS
+
 
     def generate_labels(self, host):
         """
@@ -185,6 +209,44 @@ class StringPrefixLabel(StringLabel):
         return prefix_labels, full_labels
 
 
+class _PrefetchedCommandHost(object):
+    """
+    Host wrapper answering run() calls from prefetched command results.
+
+    Every other attribute is looked up on the wrapped host.
+    """
+
+    def __init__(self, host, results):
+        """
+        @param host: The host to wrap.
+        @param results: dict mapping commands to their utils.CmdResult.
+        """
+        self._host = host
+        self._results = results
+
+
+    def __getattr__(self, name):
+        return getattr(self._host, name)
+
+
+    def run(self, command, *args, **dargs):
+        """
+        Return the prefetched result of command, or run it on the host.
+
+        @param command: The command line string.
+        @param *args: Extra arguments to host.run().
+        @param **dargs: Extra keyword arguments to host.run().
+        """
+        result = self._results.get(command)
+        if result is None:
+            return self._host.run(command, *args, **dargs)
+        ignore_status = dargs.get('ignore_status', args[1] if len(args) > 1
+                                  else False)
+        if result.exit_status and not ignore_status:
+            raise error.AutoservRunError('command execution error', result)
+        return result
+
+
 class LabelRetriever(object):
     """This class will assist in retrieving/updating the host labels."""
 
@@ -209,12 +271,37 @@ class LabelRetriever(object):
         self.label_prefix_names = set()
 
 
+    def _prefetch_commands(self, host):
+        """
+        Run the commands declared by the labels in a single batch.
+
+        @param host: The host to run the commands on.
+
+        @returns a host to pass to the labels; host itself if there is
+            nothing to prefetch or the batch failed.
+        """
+        commands = []
+        try:
+            for label in self._labels:
+                for command in label.get_prefetch_commands(host):
+                    if command not in commands:
+                        commands.append(command)
+            if not commands:
+                return host
+            results = host.run_batch(commands)
+        except Exception:
+            logging.exception('error prefetching label commands.')
+            return host
+        return _PrefetchedCommandHost(host, dict(zip(commands, results)))
+
+
     def get_labels(self, host):
         """
         Retrieve the labels for the host.
 
         @param host: The host to get the labels for.
         """
+        host = self._prefetch_commands(host)
         labels = []
         for label in self._labels:
             logging.info('checking label %s', label.__class__.__name__)
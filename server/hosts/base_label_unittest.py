@@ -8,6 +8,7 @@ import unittest
 
 import common
 
+from autotest_lib.client.common_lib import error
 from autotest_lib.server.cros.dynamic_suite import frontend_wrappers
 from autotest_lib.server import utils
 from autotest_lib.server.hosts import base_label
@@ -66,6 +67,29 @@ class TestLabelList(base_label.StringLabel):
         return labels
 
 
+class TestPrefetchLabel(base_label.BaseLabel):
+    """TestPrefetchLabel is used to validate prefetched label commands."""
+
+    _NAME = 'prefetch_label'
+    _PREFETCH_COMMANDS = ['true', 'false']
+
+    def exists(self, host):
+        return (host.run('true').exit_status == 0 and
+                host.run('false', ignore_status=True).exit_status == 1)
+
+
+class TestSkippedPrefetchLabel(TestPrefetchLabel):
+    """TestSkippedPrefetchLabel prefetches nothing once it is applied."""
+
+    _NAME = 'skipped_prefetch_label'
+    _PREFETCH_COMMANDS = ['true', 'echo skipped']
+
+    def get_prefetch_commands(self, host):
+        if self._NAME in host._afe_host.labels:
+            return []
+        return self._PREFETCH_COMMANDS
+
+
 class MockAFEHost(utils.EmptyAFEHost):
 
     def __init__(self, labels=[], attributes={}):
@@ -213,6 +237,63 @@ class LabelRetrieverUnittests(unittest.TestCase):
                                labels=expected_add_labels)
 
 
+    def test_get_labels_prefetches_commands(self):
+        """Check that declared commands are run in one batch."""
+        host = MockHost()
+        host.run_batch = mock.Mock(return_value=[
+                utils.CmdResult('true', exit_status=0),
+                utils.CmdResult('false', exit_status=1)])
+        host.run = mock.Mock()
+        retriever = base_label.LabelRetriever(
+                [TestPrefetchLabel(), TestBaseLabel()])
+
+        self.assertEqual(retriever.get_labels(host),
+                         [TestPrefetchLabel._NAME, TestBaseLabel._NAME])
+        host.run_batch.assert_called_once_with(['true', 'false'])
+        self.assertFalse(host.run.called)
+
+
+    def test_prefetch_skips_label_commands(self):
+        """Check that labels can leave their commands out of the batch."""
+        host = MockHost(afe_host=MockAFEHost(
+                labels=[TestSkippedPrefetchLabel._NAME]))
+        host.run_batch = mock.Mock(return_value=[
+                utils.CmdResult('true', exit_status=0),
+                utils.CmdResult('false', exit_status=1)])
+        retriever = base_label.LabelRetriever(
+                [TestPrefetchLabel(), TestSkippedPrefetchLabel()])
+
+        retriever.get_labels(host)
+        host.run_batch.assert_called_once_with(['true', 'false'])
+
+
+    def test_prefetched_failure_raises(self):
+        """Check that a failed prefetched command raises without ignore."""
+        host = MockHost()
+        host.run_batch = mock.Mock(return_value=[
+                utils.CmdResult('true', exit_status=1),
+                utils.CmdResult('false', exit_status=1)])
+        retriever = base_label.LabelRetriever([TestPrefetchLabel()])
+
+        # LabelRetriever logs and skips labels whose detection raises.
+        self.assertEqual(retriever.get_labels(host), [])
+
+
+    def test_prefetch_failure_falls_back(self):
+        """Check that labels run their commands if the batch fails."""
+        host = MockHost()
+        host.run_batch = mock.Mock(side_effect=error.AutoservRunError(
+                'batch failed', None))
+        host.run = mock.Mock(side_effect=[
+                utils.CmdResult('true', exit_status=0),
+                utils.CmdResult('false', exit_status=1)])
+        retriever = base_label.LabelRetriever([TestPrefetchLabel()])
+
+        self.assertEqual(retriever.get_labels(host),
+                         [TestPrefetchLabel._NAME])
+        self.assertEqual(host.run.call_count, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,234 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Persistent command channel to a remote host.
+
+A CommandChannel starts command_channel_server.py on the remote host once
+and then sends command executions, file reads and stat calls over its
+stdin/stdout, avoiding a new ssh client process and remote shell per command.
+
+The channel is serial: it runs one request at a time. A request made while
+another thread is using the channel raises CommandChannelBusyError right away
+instead of waiting, so that concurrent callers fall back to plain ssh rather
+than queueing behind a long command.
+"""
+
+import base64
+import errno
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+
+from autotest_lib.client.common_lib import error
+from autotest_lib.server import utils
+from autotest_lib.server.hosts import command_channel_server
+
+# Extra time granted to the remote side to report a command timeout before
+# the channel is declared broken.
+_TIMEOUT_SLACK = 30
+# Seconds to wait for the channel to exit after its stdin is closed.
+_CLOSE_TIMEOUT = 2
+
+
+class CommandChannelError(error.AutoservError):
+    """The channel is unusable; the caller should fall back to plain ssh.
+
+    |maybe_ran| is True when the request had already been sent, so the
+    remote host may have acted on it.
+    """
+
+    def __init__(self, message, maybe_ran=False):
+        super(CommandChannelError, self).__init__(message)
+        self.maybe_ran = maybe_ran
+
+
+class CommandChannelBusyError(CommandChannelError):
+    """Another thread is using the channel; the channel is still usable."""
+
+
+def _server_source():
+    path = os.path.splitext(command_channel_server.__file__)[0] + '.py'
+    with open(path) as f:
+        return f.read()
+
+
+def remote_launch_command(python='python'):
+    """Returns the remote shell command that starts the channel server.
+
+    @param python: The python interpreter to use on the remote host.
+    """
+    return '%s -u -c %s' % (python, utils.sh_quote_word(_server_source()))
+
+
+class CommandChannel(object):
+    """Client side of a persistent command channel."""
+
+    def __init__(self, launch_command, connect_timeout=30):
+        """
+        @param launch_command: Local shell command whose stdin/stdout are
+                connected to a running command_channel_server, e.g. an ssh
+                command running remote_launch_command().
+        @param connect_timeout: Seconds to wait for the server to answer its
+                first request.
+
+        @raises CommandChannelError: if the server could not be started.
+        """
+        self._lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._next_id = 0
+        with open(os.devnull, 'w') as devnull:
+            self._proc = subprocess.Popen(launch_command, shell=True,
+                                          executable='/bin/bash',
+                                          stdin=subprocess.PIPE,
+                                          stdout=subprocess.PIPE,
+                                          stderr=devnull, close_fds=True)
+        try:
+            self._call({'op': 'ping'}, connect_timeout)
+        except CommandChannelError:
+            self.close()
+            raise
+
+
+    def is_alive(self):
+        """Returns True if the channel process is still running."""
+        return self._proc is not None and self._proc.poll() is None
+
+
+    def close(self):
+        """Shuts the channel down.
+
+        Safe to call more than once and from any thread; a request in
+        progress on another thread fails with CommandChannelError.
+        """
+        with self._close_lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except IOError:
+            pass
+        # The server exits on EOF; only kill it if it does not.
+        end_time = time.time() + _CLOSE_TIMEOUT
+        while proc.poll() is None and time.time() < end_time:
+            time.sleep(0.01)
+        utils.nuke_subprocess(proc)
+        proc.stdout.close()
+
+
+    def _call(self, request, timeout):
+        """Sends |request| and waits for its response.
+
+        @param request: dict describing the request.
+        @param timeout: Seconds to wait for the response, or None.
+
+        @raises CommandChannelBusyError: if another request is in progress.
+        @raises CommandChannelError: if the channel broke; it is closed.
+        """
+        if not self._lock.acquire(False):
+            raise CommandChannelBusyError('Command channel is busy')
+        try:
+            # close() may be called from another thread at any time.
+            proc = self._proc
+            if proc is None or proc.poll() is not None:
+                raise CommandChannelError('Command channel is not running')
+            self._next_id += 1
+            request['id'] = self._next_id
+            sent = False
+            response = None
+            try:
+                command_channel_server.write_frame(proc.stdin, request)
+                sent = True
+                if timeout is not None:
+                    ready, _, _ = select.select([proc.stdout], [], [],
+                                                timeout)
+                    if not ready:
+                        self.close()
+                        raise CommandChannelError(
+                                'No response within %s seconds' % timeout,
+                                maybe_ran=True)
+                response = command_channel_server.read_frame(proc.stdout)
+            except (IOError, OSError, ValueError) as e:
+                logging.debug('Command channel I/O failed: %s', e)
+            if response is None or response.get('id') != request['id']:
+                self.close()
+                raise CommandChannelError('Command channel stream is broken',
+                                          maybe_ran=sent)
+        finally:
+            self._lock.release()
+        return response
+
+
+    def _checked_call(self, request, timeout=_TIMEOUT_SLACK):
+        response = self._call(request, timeout)
+        if 'errno' in response:
+            raise OSError(response['errno'], response['error'])
+        return response
+
+
+    def run(self, command, timeout=None, stdin=None):
+        """Runs |command| through bash on the remote host.
+
+        @param command: The command line string.
+        @param timeout: Seconds before the remote command is killed.
+        @param stdin: Optional string fed to the command's stdin.
+
+        @return a utils.CmdResult.
+
+        @raises error.CmdTimeoutError: the command timed out.
+        @raises CommandChannelError: the channel broke before the command
+                completed; the command may or may not have run.
+        """
+        request = {'op': 'run', 'command': command, 'timeout': timeout}
+        if stdin:
+            request['stdin'] = base64.b64encode(stdin)
+        start = time.time()
+        response = self._call(
+                request, timeout + _TIMEOUT_SLACK if timeout else None)
+        if 'errno' in response:
+            raise CommandChannelError(
+                    'Remote command failed to start: %s' % response['error'])
+        result = utils.CmdResult(
+                command=command,
+                stdout=base64.b64decode(response['stdout']),
+                stderr=base64.b64decode(response['stderr']),
+                exit_status=response['exit_status'],
+                duration=time.time() - start)
+        if response['timed_out']:
+            raise error.CmdTimeoutError(
+                    command, result,
+                    'Command did not complete within %d seconds' % timeout)
+        return result
+
+
+    def read_file(self, path):
+        """Returns the contents of |path| on the remote host.
+
+        @raises OSError: the file could not be read.
+        """
+        response = self._checked_call({'op': 'read', 'path': path})
+        return base64.b64decode(response['data'])
+
+
+    def stat(self, path):
+        """Returns (mode, size, mtime) of |path| on the remote host.
+
+        @raises OSError: the path could not be stat'ed.
+        """
+        response = self._checked_call({'op': 'stat', 'path': path})
+        return response['mode'], response['size'], response['mtime']
+
+
+    def path_exists(self, path):
+        """Returns True if |path| exists on the remote host."""
+        try:
+            self.stat(path)
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                return False
+            raise
+        return True
@@ -0,0 +1,147 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""DUT side of the persistent command channel.
+
+This script is not imported by autoserv. Its source is shipped to the DUT by
+command_channel.CommandChannel and run with `python -u -c`, once per host
+session, over the master ssh connection. It reads framed requests from stdin
+and writes framed responses to stdout until stdin is closed.
+
+Each frame is a 4 byte big-endian length followed by a JSON object. Binary
+payloads (command output, stdin and file contents) are base64 encoded. The
+script must only depend on the python standard library available on the DUT.
+"""
+
+import base64
+import errno
+import json
+import os
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+_HEADER = struct.Struct('!I')
+
+
+def _read_exactly(stream, size):
+    """Reads |size| bytes from |stream|, returning None on EOF."""
+    chunks = []
+    while size:
+        chunk = os.read(stream.fileno(), size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(stream):
+    """Reads one frame from |stream|, returning None on EOF."""
+    header = _read_exactly(stream, _HEADER.size)
+    if header is None:
+        return None
+    payload = _read_exactly(stream, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def write_frame(stream, message):
+    """Writes |message| as one frame to |stream|."""
+    payload = json.dumps(message).encode('utf-8')
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def _encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _restore_signals():
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    os.setsid()
+
+
+def _handle_run(request):
+    stdin = request.get('stdin')
+    proc = subprocess.Popen(['/bin/bash', '-c', request['command']],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, close_fds=True,
+                            preexec_fn=_restore_signals)
+    killed = []
+
+    def kill_group():
+        killed.append(True)
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    timer = None
+    if request.get('timeout'):
+        timer = threading.Timer(request['timeout'], kill_group)
+        timer.start()
+    start = time.time()
+    try:
+        stdout, stderr = proc.communicate(
+                base64.b64decode(stdin) if stdin else None)
+    finally:
+        if timer:
+            timer.cancel()
+    return {'exit_status': proc.returncode,
+            'stdout': _encode(stdout),
+            'stderr': _encode(stderr),
+            'duration': time.time() - start,
+            'timed_out': bool(killed)}
+
+
+def _handle_read(request):
+    with open(request['path'], 'rb') as f:
+        return {'data': _encode(f.read())}
+
+
+def _handle_stat(request):
+    st = os.stat(request['path'])
+    return {'mode': st.st_mode, 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _handle_ping(request):
+    return {'pid': os.getpid()}
+
+
+_HANDLERS = {
+    'run': _handle_run,
+    'read': _handle_read,
+    'stat': _handle_stat,
+    'ping': _handle_ping,
+}
+
+
+def serve(infile, outfile):
+    """Serves requests from |infile| until EOF."""
+    while True:
+        request = read_frame(infile)
+        if request is None:
+            return
+        response = {'id': request.get('id')}
+        try:
+            response.update(_HANDLERS[request['op']](request))
+        except (IOError, OSError) as e:
+            response['errno'] = e.errno or errno.EIO
+            response['error'] = str(e)
+        except Exception as e:
+            response['errno'] = errno.EINVAL
+            response['error'] = '%s: %s' % (type(e).__name__, e)
+        write_frame(outfile, response)
+
+
+if __name__ == '__main__':
+    # Keep stray output of child processes out of the framed stream.
+    _out = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    serve(sys.stdin, _out)
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import sys
+import threading
+import unittest
+
+import common
+from autotest_lib.client.common_lib import autotemp
+from autotest_lib.client.common_lib import error
+from autotest_lib.server import utils
+from autotest_lib.server.hosts import command_channel
+
+
+class CommandChannelTestCase(unittest.TestCase):
+    """Runs a command channel against a server on the local machine."""
+
+    def setUp(self):
+        self.channel = command_channel.CommandChannel(
+                command_channel.remote_launch_command(
+                        utils.sh_quote_word(sys.executable)),
+                connect_timeout=10)
+        self.addCleanup(self.channel.close)
+
+
+    def test_run(self):
+        """Output and exit status are returned for each command."""
+        result = self.channel.run('echo out; echo err >&2; exit 3')
+        self.assertEqual(result.stdout, 'out\n')
+        self.assertEqual(result.stderr, 'err\n')
+        self.assertEqual(result.exit_status, 3)
+        result = self.channel.run('cat', stdin='\x00\xffbinary')
+        self.assertEqual(result.stdout, '\x00\xffbinary')
+        self.assertEqual(result.exit_status, 0)
+
+
+    def test_run_timeout(self):
+        """A command exceeding its timeout is killed and reported."""
+        self.assertRaises(error.CmdTimeoutError,
+                          self.channel.run, 'sleep 30', timeout=1)
+        self.assertTrue(self.channel.is_alive())
+        self.assertEqual(self.channel.run('true').exit_status, 0)
+
+
+    def test_read_and_stat(self):
+        """Files can be read and stat'ed without running commands."""
+        tempdir = autotemp.tempdir(unique_id='command_channel_test')
+        self.addCleanup(tempdir.clean)
+        path = os.path.join(tempdir.name, 'file')
+        with open(path, 'w') as f:
+            f.write('contents')
+        self.assertEqual(self.channel.read_file(path), 'contents')
+        self.assertEqual(self.channel.stat(path)[1], len('contents'))
+        self.assertTrue(self.channel.path_exists(path))
+        self.assertFalse(self.channel.path_exists(path + '.missing'))
+        self.assertRaises(OSError, self.channel.read_file, path + '.missing')
+
+
+    def test_busy(self):
+        """A request made while another is in progress fails right away."""
+        thread = threading.Thread(target=self.channel.run,
+                                  args=('sleep 2',))
+        thread.start()
+        # Wait for the other thread to take the channel.
+        while not self.channel._lock.locked():
+            pass
+        self.assertRaises(command_channel.CommandChannelBusyError,
+                          self.channel.run, 'true')
+        thread.join()
+        self.assertTrue(self.channel.is_alive())
+        self.assertEqual(self.channel.run('true').exit_status, 0)
+
+
+    def test_broken_channel(self):
+        """Requests on a closed channel raise CommandChannelError."""
+        self.channel.close()
+        self.assertFalse(self.channel.is_alive())
+        self.assertRaises(command_channel.CommandChannelError,
+                          self.channel.run, 'true')
+
+
+    def test_failed_start(self):
+        """A launch command that does not start a server is reported."""
+        self.assertRaises(command_channel.CommandChannelError,
+                          command_channel.CommandChannel, 'exit 1',
+                          connect_timeout=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
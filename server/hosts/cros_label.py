@@ -22,10 +22,27 @@ from autotest_lib.site_utils import hwid_lib
 
 # pylint: disable=missing-docstring
 
+def _has_prefix_label(host, prefix):
+    """Return True if the host already has a |prefix|:value label in the AFE.
+
+    @param host: The host to check.
+    @param prefix: The label prefix, without the colon.
+    """
+    return any(label.startswith(prefix + ':')
+               for label in host._afe_host.labels)
+
+
 class BoardLabel(base_label.StringPrefixLabel):
     """Determine the correct board label for the device."""
 
     _NAME = ds_constants.BOARD_PREFIX.rstrip(':')
+    _PREFETCH_COMMANDS = ['cat /etc/lsb-release']
+
+    def get_prefetch_commands(self, host):
+        if _has_prefix_label(host, self._NAME):
+            return []
+        return self._PREFETCH_COMMANDS
+
 
     def generate_labels(self, host):
         # We only want to apply the board labels once, which is when they get
@@ -51,6 +68,14 @@ class ModelLabel(base_label.StringPrefixLabel):
     """Determine the correct model label for the device."""
 
     _NAME = ds_constants.MODEL_LABEL
+    _MODEL_CMD = 'mosys platform model'
+    _PREFETCH_COMMANDS = [_MODEL_CMD]
+
+    def get_prefetch_commands(self, host):
+        if _has_prefix_label(host, self._NAME):
+            return []
+        return self._PREFETCH_COMMANDS
+
 
     def generate_labels(self, host):
         # Return the existing label if set to defend against any bad image
@@ -59,7 +84,7 @@ class ModelLabel(base_label.StringPrefixLabel):
             if label.startswith(self._NAME + ':'):
                 return [label.split(':')[-1]]
 
-        cmd = "mosys platform model"
+        cmd = self._MODEL_CMD
         result = host.run(command=cmd, ignore_status=True)
         if result.exit_status == 0:
             return result.stddout
@@ -80,10 +105,12 @@ class LightSensorLabel(base_label.BaseLabel):
         "in_illuminance_raw",
         "illuminance0_input",
     ]
+    _SEARCH_CMD = "find -L %s -maxdepth 4 | egrep '%s'" % (
+        _LIGHTSENSOR_SEARCH_DIR, '|'.join(_LIGHTSENSOR_FILES))
+    _PREFETCH_COMMANDS = [_SEARCH_CMD]
 
     def exists(self, host):
-        search_cmd = "find -L %s -maxdepth 4 | egrep '%s'" % (
-            self._LIGHTSENSOR_SEARCH_DIR, '|'.join(self._LIGHTSENSOR_FILES))
+        search_cmd = self._SEARCH_CMD
         # Run the search cmd following the symlinks. Stderr_tee is set to
         # None as there can be a symlink loop, but the command will still
         # execute correctly with a few messages printed to stderr.
@@ -97,10 +124,11 @@ class BluetoothLabel(base_label.BaseLabel):
     """Label indicating if bluetooth is detected."""
 
     _NAME = 'bluetooth'
+    _BLUETOOTH_CMD = 'test -d /sys/class/bluetooth/hci0'
+    _PREFETCH_COMMANDS = [_BLUETOOTH_CMD]
 
     def exists(self, host):
-        result = host.run('test -d /sys/class/bluetooth/hci0',
-                          ignore_status=True)
+        result = host.run(self._BLUETOOTH_CMD, ignore_status=True)
 
         return result.exit_status == 0
 
@@ -109,9 +137,11 @@ class ECLabel(base_label.BaseLabel):
     """Label to determine the type of EC on this host."""
 
     _NAME = 'ec:cros'
+    _EC_INFO_CMD = 'mosys ec info'
+    _PREFETCH_COMMANDS = [_EC_INFO_CMD]
 
     def exists(self, host):
-        cmd = 'mosys ec info'
+        cmd = self._EC_INFO_CMD
         # The output should look like these, so that the last field should
         # match our EC version scheme:
         #
@@ -142,6 +172,8 @@ class AccelsLabel(base_label.BaseLabel):
     """Determine the type of accelerometers on this host."""
 
     _NAME = 'accel:cros-ec'
+    # The motionsense commands only run on hosts that have ectool.
+    _PREFETCH_COMMANDS = ['which ectool']
 
     def exists(self, host):
         # Check to make sure we have ectool
@@ -214,6 +246,7 @@ class AudioLoopbackDongleLabel(base_label.BaseLabel):
     """Return the label if an audio loopback dongle is plugged in."""
 
     _NAME = 'audio_loopback_dongle'
+    _PREFETCH_COMMANDS = [cras_utils.get_cras_nodes_cmd()]
 
     def exists(self, host):
         nodes_info = host.run(command=cras_utils.get_cras_nodes_cmd(),
@@ -237,13 +270,15 @@ class PowerSupplyLabel(base_label.StringPrefixLabel):
     """
 
     _NAME = 'power'
+    _PSU_CMD = 'mosys psu type'
+    _PREFETCH_COMMANDS = [_PSU_CMD]
 
     def __init__(self):
         self.psu_cmd_result = None
 
 
     def exists(self, host):
-        self.psu_cmd_result = host.run(command='mosys psu type',
+        self.psu_cmd_result = host.run(command=self._PSU_CMD,
                                        ignore_status=True)
         return self.psu_cmd_result.stdout.strip() != 'unknown'
 
@@ -273,17 +308,19 @@ class StorageLabel(base_label.StringPrefixLabel):
     """
 
     _NAME = 'storage'
+    # The output should be /dev/mmcblk* for SD/eMMC or /dev/sd* for scsi
+    _ROOTDEV_CMD = ' '.join(['. /usr/sbin/write_gpt.sh;',
+                             '. /usr/share/misc/chromeos-common.sh;',
+                             'load_base_vars;',
+                             'get_fixed_dst_drive'])
+    _PREFETCH_COMMANDS = [_ROOTDEV_CMD]
 
     def __init__(self):
         self.type_str = ''
 
 
     def exists(self, host):
-        # The output should be /dev/mmcblk* for SD/eMMC or /dev/sd* for scsi
-        rootdev_cmd = ' '.join(['. /usr/sbin/write_gpt.sh;',
-                                '. /usr/share/misc/chromeos-common.sh;',
-                                'load_base_vars;',
-                                'get_fixed_dst_drive'])
+        rootdev_cmd = self._ROOTDEV_CMD
         rootdev = host.run(command=rootdev_cmd, ignore_status=True)
         if rootdev.exit_status:
             logging.info("Fail to run %s", rootdev_cmd)
@@ -378,10 +415,11 @@ class VideoLabel(base_label.StringLabel):
         'hw_video_acc_enc_vp8',
         'webcam',
     ]
+    _DETECT_CMD = '/usr/local/bin/avtest_label_detect'
+    _PREFETCH_COMMANDS = [_DETECT_CMD]
 
     def generate_labels(self, host):
-        result = host.run('/usr/local/bin/avtest_label_detect',
-                          ignore_status=True).stdout
+        result = host.run(self._DETECT_CMD, ignore_status=True).stdout
         return re.findall('^Detected label: (\w+)$', result, re.M)
 
 
@@ -407,11 +445,18 @@ class ArcLabel(base_label.BaseLabel):
     """Label indicates if host has ARC support."""
 
     _NAME = 'arc'
+    _ARC_CMD = 'grep CHROMEOS_ARC_VERSION /etc/lsb-release'
+    _PREFETCH_COMMANDS = [_ARC_CMD]
+
+    def get_prefetch_commands(self, host):
+        if self._NAME in host.host_info_store.get().labels:
+            return []
+        return self._PREFETCH_COMMANDS
+
 
     @base_label.forever_exists_decorate
     def exists(self, host):
-        return 0 == host.run('grep CHROMEOS_ARC_VERSION /etc/lsb-release',
-                             ignore_status=True).exit_status
+        return 0 == host.run(self._ARC_CMD, ignore_status=True).exit_status
 
 
 class VideoGlitchLabel(base_label.BaseLabel):
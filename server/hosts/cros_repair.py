@@ -149,19 +149,24 @@ class EXT4fsErrorVerifier(hosts.Verifier):
     Confirm we have not seen critical file system kernel errors.
     """
     def verify(self, host):
-        # grep for stateful FS errors of the type "EXT4-fs error (device sda1):"
-        command = ("dmesg | grep -E \"EXT4-fs error \(device "
-                   "$(cut -d ' ' -f 5,9 /proc/$$/mountinfo | "
-                   "grep -e '^/mnt/stateful_partition ' | "
-                   "cut -d ' ' -f 2 | cut -d '/' -f 3)\):\"")
-        output = host.run(command=command, ignore_status=True).stdout
+        # Both checks are independent, so they share one round trip.
+        commands = [
+            # grep for stateful FS errors of the type
+            # "EXT4-fs error (device sda1):"
+            ("dmesg | grep -E \"EXT4-fs error \(device "
+             "$(cut -d ' ' -f 5,9 /proc/$$/mountinfo | "
+             "grep -e '^/mnt/stateful_partition ' | "
+             "cut -d ' ' -f 2 | cut -d '/' -f 3)\):\""),
+            # Check for other critical FS errors.
+            'dmesg | grep "This should not happen!!  Data will be lost"',
+        ]
+        ext4_result, lost_result = host.run_batch(commands)
+        output = ext4_result.stdout
         if output:
             sample = output.splitlines()[0]
             message = 'Saw file system error: %s' % sample
             raise hosts.AutoservVerifyError(message)
-        # Check for other critical FS errors.
-        command = 'dmesg | grep "This should not happen!!  Data will be lost"'
-        output = host.run(command=command, ignore_status=True).stdout
+        output = lost_result.stdout
         if output:
             message = 'Saw file system error: Data will be lost'
             raise hosts.AutoservVerifyError(message)
@@ -299,6 +304,9 @@ class DevModeVerifier(hosts.Verifier):
 class JetstreamServicesVerifier(hosts.Verifier):
     """Verify that Jetstream services are running."""
 
+    # retry.retry() times out with SIGALRM, which needs the main thread.
+    concurrent_verify = False
+
     # Retry for b/62576902
     @retry.retry(error.AutoservError, timeout_min=1, delay_sec=10)
     def verify(self, host):
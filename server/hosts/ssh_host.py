@@ -13,11 +13,16 @@ You should import the "hosts" package instead of importing each type of host.
 import inspect
 import logging
 import re
+import threading
+import time
+import uuid
 import warnings
 from autotest_lib.client.common_lib import error
+from autotest_lib.client.common_lib import global_config
 from autotest_lib.client.common_lib import pxssh
 from autotest_lib.server import utils
 from autotest_lib.server.hosts import abstract_ssh
+from autotest_lib.server.hosts import command_channel
 
 # In case cros_host is being ran via SSP on an older Moblab version with an
 # older chromite version.
@@ -26,6 +31,13 @@ try:
 except ImportError:
     metrics = utils.metrics_mock
 
+# Run commands through a persistent command channel on the DUT, falling back
+# to plain ssh when the channel cannot be used.
+ENABLE_COMMAND_CHANNEL = global_config.global_config.get_config_value(
+        'AUTOSERV', 'enable_command_channel', type=bool, default=False)
+# Seconds to wait before trying to restart a command channel that broke.
+_COMMAND_CHANNEL_RETRY_INTERVAL = 60
+
 
 class SSHHost(abstract_ssh.AbstractSSHHost):
     """
@@ -57,6 +69,9 @@ class SSHHost(abstract_ssh.AbstractSSHHost):
                 hostname: network hostname or address of remote machine
         """
         super(SSHHost, self)._initialize(hostname=hostname, *args, **dargs)
+        self._command_channel = None
+        self._command_channel_retry_time = 0
+        self._command_channel_lock = threading.Lock()
         self.setup_ssh()
 
 
@@ -261,6 +276,112 @@ class SSHHost(abstract_ssh.AbstractSSHHost):
         return result
 
 
+    def _get_command_channel(self, connect_timeout):
+        """Returns a running command channel, or None if there is none.
+
+        The channel is only used on top of a master ssh connection. When it
+        fails to start or breaks, it is not retried for
+        _COMMAND_CHANNEL_RETRY_INTERVAL seconds so that a down host does not
+        pay for a channel startup on every command.
+
+        The channel runs one command at a time (see command_channel). While
+        another thread is starting or shutting down the channel, None is
+        returned so that the caller uses plain ssh instead of waiting.
+
+        @param connect_timeout: ssh connection timeout (in seconds)
+        """
+        if not ENABLE_COMMAND_CHANNEL or not self._master_ssh.ssh_option:
+            return None
+        if not self._command_channel_lock.acquire(False):
+            return None
+        try:
+            channel = self._command_channel
+            if channel and channel.is_alive():
+                return channel
+            if channel:
+                channel.close()
+                self._command_channel = None
+            if time.time() < self._command_channel_retry_time:
+                return None
+            launch_cmd = '%s %s' % (
+                    self.ssh_command(connect_timeout),
+                    utils.sh_quote_word(
+                            command_channel.remote_launch_command()))
+            try:
+                self._command_channel = command_channel.CommandChannel(
+                        launch_cmd, connect_timeout=connect_timeout)
+            except command_channel.CommandChannelError as e:
+                logging.debug('Unable to start command channel to %s: %s',
+                              self.hostname, e)
+                self._command_channel_retry_time = (
+                        time.time() + _COMMAND_CHANNEL_RETRY_INTERVAL)
+                return None
+            return self._command_channel
+        finally:
+            self._command_channel_lock.release()
+
+
+    def _discard_command_channel(self, channel):
+        """Shuts down |channel| after it broke.
+
+        Only |channel| is closed: if another thread already replaced it with
+        a new channel, the new one is left alone.
+
+        @param channel: the CommandChannel that broke.
+        """
+        channel.close()
+        with self._command_channel_lock:
+            if self._command_channel is channel:
+                self._command_channel = None
+                self._command_channel_retry_time = (
+                        time.time() + _COMMAND_CHANNEL_RETRY_INTERVAL)
+
+
+    def close_command_channel(self):
+        """Shuts down the command channel, if any."""
+        with self._command_channel_lock:
+            if self._command_channel:
+                self._command_channel.close()
+                self._command_channel = None
+
+
+    def _run_over_channel(self, channel, command, timeout, ignore_status,
+                          stdout, stderr, env, stdin, args, ignore_timeout):
+        """Runs a command through the command channel.
+
+        Mirrors the result and error semantics of _run(). Output is written
+        to the tees once the command has completed.
+
+        @raises command_channel.CommandChannelError: the channel broke.
+        """
+        if env.strip():
+            command = 'export %s;%s' % (env, command)
+        for arg in args:
+            command += ' "%s"' % utils.sh_escape(arg)
+        try:
+            result = channel.run(command, timeout=timeout, stdin=stdin)
+        except error.CmdTimeoutError:
+            if ignore_timeout:
+                return None
+            raise
+        finally:
+            metrics.Counter('chromeos/autotest/ssh/channel_runs').increment()
+
+        stderr_level = utils.get_stderr_level(ignore_status)
+        for data, tee, level, prefix in (
+                (result.stdout, stdout, utils.DEFAULT_STDOUT_LEVEL,
+                 utils.STDOUT_PREFIX),
+                (result.stderr, stderr, stderr_level, utils.STDERR_PREFIX)):
+            tee_file = utils.get_stream_tee_file(tee, level, prefix=prefix)
+            if tee_file and data:
+                tee_file.write(data)
+                tee_file.flush()
+
+        if not ignore_status and result.exit_status > 0:
+            raise error.AutoservRunError("command execution error", result)
+        return result
+
+
     @metrics.SecondsTimerDecorator(
             'chromeos/autotest/ssh/master_ssh_time')
     def run_very_slowly(self, command, timeout=3600, ignore_status=False,
@@ -300,7 +421,32 @@ class SSHHost(abstract_ssh.AbstractSSHHost):
         self.start_master_ssh()
 
         env = " ".join("=".join(pair) for pair in self.env.iteritems())
+        channel = None
+        if not options and (stdin is None or isinstance(stdin, basestring)):
+            channel = self._get_command_channel(connect_timeout)
         try:
+            if channel:
+                try:
+                    return self._run_over_channel(
+                            channel, command, timeout, ignore_status,
+                            stdout_tee, stderr_tee, env, stdin, args,
+                            ignore_timeout)
+                except command_channel.CommandChannelBusyError:
+                    logging.debug('Command channel to %s is busy, using '
+                                  'ssh', self.hostname)
+                except command_channel.CommandChannelError as e:
+                    self._discard_command_channel(channel)
+                    if e.maybe_ran and not ssh_failure_retry_ok:
+                        # Report it the way a dropped ssh connection would
+                        # be reported rather than running the command twice.
+                        result = utils.CmdResult(command, stderr=str(e),
+                                                 exit_status=255)
+                        if ignore_status:
+                            return result
+                        raise error.AutoservRunError(
+                                'command channel broke', result)
+                    logging.debug('Command channel to %s failed, falling '
+                                  'back to ssh: %s', self.hostname, e)
             return self._run(command, timeout, ignore_status,
                              stdout_tee, stderr_tee, connect_timeout, env,
                              options, stdin, args, ignore_timeout,
@@ -316,6 +462,64 @@ class SSHHost(abstract_ssh.AbstractSSHHost):
         return self.run_very_slowly(*args, **kwargs)
 
 
+    def run_batch(self, commands, timeout=3600):
+        """Run several independent commands in a single remote invocation.
+
+        The commands are run one after the other by the remote login shell,
+        each with its own stdout, stderr and exit status, which are sent
+        back length-prefixed so arbitrary output can be split reliably.
+
+        @see common_lib.hosts.Host.run_batch()
+
+        @raises AutoservRunError: the batch itself could not be run or its
+                output could not be parsed.
+        """
+        commands = list(commands)
+        if not commands:
+            return []
+        marker = 'AUTOTEST_BATCH_%s' % uuid.uuid4().hex
+        script = ['t=$(mktemp -d) || exit 1', 'trap \'rm -rf "$t"\' EXIT']
+        for command in commands:
+            script.append(
+                    '"${SHELL:-/bin/sh}" -c %s </dev/null >"$t/o" 2>"$t/e"; '
+                    's=$?; echo "%s $s $(wc -c <"$t/o") $(wc -c <"$t/e")"; '
+                    'cat "$t/o" "$t/e"' % (utils.sh_quote_word(command),
+                                           marker))
+        logging.debug('Running (ssh batch) %s', commands)
+        result = self.run('\n'.join(script), timeout=timeout,
+                          ignore_status=True, stdout_tee=None,
+                          stderr_tee=None, verbose=False)
+        results = _parse_batch_output(result.stdout, marker, commands)
+        if results is None:
+            raise error.AutoservRunError(
+                    'malformed output from command batch', result)
+        return results
+
+
+    def path_exists(self, path):
+        """Determine if path exists on the remote machine.
+
+        Uses the command channel when it is running.
+
+        @param path: path to check
+
+        @return: bool(path exists)"""
+        channel = self._get_command_channel(connect_timeout=30)
+        if channel:
+            try:
+                return channel.path_exists(path)
+            except command_channel.CommandChannelBusyError:
+                pass
+            except (OSError, command_channel.CommandChannelError) as e:
+                logging.debug('Command channel stat of %s failed: %s', path, e)
+        return super(SSHHost, self).path_exists(path)
+
+
+    def close(self):
+        self.close_command_channel()
+        super(SSHHost, self).close()
+
+
     def run_background(self, command, verbose=True):
         """Start a command on the host in the background.
 
@@ -464,3 +668,34 @@ class SSHHost(abstract_ssh.AbstractSSHHost):
                 self.ssh_ping()
             except error.AutoservSshPingHostError:
                 self.setup_ssh_key()
+
+
+def _parse_batch_output(output, marker, commands):
+    """Splits the output of SSHHost.run_batch() into per-command results.
+
+    @param output: stdout of the batch script.
+    @param marker: The marker preceding each command's status line.
+    @param commands: The commands of the batch, in order.
+
+    @return a list of utils.CmdResult, or None if output is malformed.
+    """
+    results = []
+    pos = 0
+    for command in commands:
+        end = output.find('\n', pos)
+        fields = output[pos:end].split() if end >= 0 else []
+        if len(fields) != 4 or fields[0] != marker:
+            return None
+        try:
+            exit_status, out_len, err_len = [int(f) for f in fields[1:]]
+        except ValueError:
+            return None
+        start = end + 1
+        stdout = output[start:start + out_len]
+        stderr = output[start + out_len:start + out_len + err_len]
+        pos = start + out_len + err_len
+        if pos > len(output):
+            return None
+        results.append(utils.CmdResult(command=command, stdout=stdout,
+                                       stderr=stderr, exit_status=exit_status))
+    return results
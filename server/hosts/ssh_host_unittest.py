@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import mock
+import threading
+import unittest
+
+import common
+from autotest_lib.client.common_lib import error
+from autotest_lib.server import utils
+from autotest_lib.server.hosts import command_channel
+from autotest_lib.server.hosts import ssh_host
+
+
+class CommandChannelFallbackTest(unittest.TestCase):
+    """Tests that SSHHost falls back to plain ssh when the channel fails."""
+
+    def setUp(self):
+        patcher = mock.patch.object(ssh_host, 'ENABLE_COMMAND_CHANNEL', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(command_channel, 'CommandChannel')
+        self.channel_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.channel = self.channel_class.return_value
+        self.channel.is_alive.return_value = True
+
+        self.host = ssh_host.SSHHost('127.0.0.1')
+        self.host._master_ssh = mock.Mock(ssh_option='-o ControlPath=x')
+        self.host.start_master_ssh = mock.Mock()
+        self.ssh_result = utils.CmdResult('true', exit_status=0)
+        self.host._run = mock.Mock(return_value=self.ssh_result)
+
+
+    def _run(self, **dargs):
+        return self.host.run('true', verbose=False, stdout_tee=None,
+                             stderr_tee=None, **dargs)
+
+
+    def test_run_over_channel(self):
+        """Commands run through a working channel do not use ssh."""
+        result = utils.CmdResult('true', exit_status=0)
+        self.channel.run.return_value = result
+        self.assertIs(self._run(), result)
+        self.assertFalse(self.host._run.called)
+        self._run()
+        self.assertEqual(self.channel_class.call_count, 1)
+
+
+    def test_channel_launch_failure(self):
+        """A channel that fails to start is not retried for a while."""
+        self.channel_class.side_effect = command_channel.CommandChannelError(
+                'no python')
+        self.assertIs(self._run(), self.ssh_result)
+        self.assertIs(self._run(), self.ssh_result)
+        self.assertEqual(self.channel_class.call_count, 1)
+        self.assertEqual(self.host._run.call_count, 2)
+
+
+    def test_busy_channel(self):
+        """A channel busy with another command falls back to ssh."""
+        self.channel.run.side_effect = (
+                command_channel.CommandChannelBusyError('busy'))
+        self.assertIs(self._run(), self.ssh_result)
+        self.assertFalse(self.channel.close.called)
+        self.assertIs(self.host._command_channel, self.channel)
+
+
+    def test_channel_dies_before_sending(self):
+        """A command that never reached the host is retried over ssh."""
+        self.channel.run.side_effect = command_channel.CommandChannelError(
+                'not running', maybe_ran=False)
+        self.assertIs(self._run(), self.ssh_result)
+        self.channel.close.assert_called_once_with()
+        self.assertIsNone(self.host._command_channel)
+
+
+    def test_channel_dies_mid_command(self):
+        """A command that may have run is reported like an ssh failure."""
+        self.channel.run.side_effect = command_channel.CommandChannelError(
+                'stream is broken', maybe_ran=True)
+        with self.assertRaises(error.AutoservRunError) as cm:
+            self._run()
+        self.assertEqual(cm.exception.result_obj.exit_status, 255)
+        self.host._command_channel_retry_time = 0
+        self.assertEqual(self._run(ignore_status=True).exit_status, 255)
+        self.assertFalse(self.host._run.called)
+        self.channel.close.assert_called_with()
+        self.assertIsNone(self.host._command_channel)
+
+
+    def test_channel_dies_mid_command_retry_ok(self):
+        """An idempotent command is retried over ssh if the channel dies."""
+        self.channel.run.side_effect = command_channel.CommandChannelError(
+                'stream is broken', maybe_ran=True)
+        self.assertIs(self._run(ssh_failure_retry_ok=True), self.ssh_result)
+        self.assertEqual(self.host._run.call_count, 1)
+
+
+    def test_discard_keeps_newer_channel(self):
+        """A broken channel does not close its replacement."""
+        old_channel = mock.Mock()
+        self.host._command_channel = self.channel
+        self.host._discard_command_channel(old_channel)
+        old_channel.close.assert_called_once_with()
+        self.assertIs(self.host._command_channel, self.channel)
+        self.assertFalse(self.channel.close.called)
+
+
+    def test_concurrent_get_command_channel(self):
+        """Only one channel is started by concurrent callers."""
+        started = threading.Event()
+        release = threading.Event()
+        def slow_start(*args, **dargs):
+            started.set()
+            release.wait()
+            return self.channel
+        self.channel_class.side_effect = slow_start
+        results = []
+        thread = threading.Thread(
+                target=lambda: results.append(
+                        self.host._get_command_channel(30)))
+        thread.start()
+        started.wait()
+        # The channel is being started by the other thread: use ssh.
+        self.assertIsNone(self.host._get_command_channel(30))
+        release.set()
+        thread.join()
+        self.assertEqual(results, [self.channel])
+        self.assertIs(self.host._get_command_channel(30), self.channel)
+        self.assertEqual(self.channel_class.call_count, 1)
+
+
+    def test_path_exists_falls_back(self):
+        """path_exists uses ssh when the channel cannot answer."""
+        busy = command_channel.CommandChannelBusyError('busy')
+        self.channel.path_exists.side_effect = busy
+        self.channel.run.side_effect = busy
+        self.host._run.return_value = utils.CmdResult('test', exit_status=0)
+        self.assertTrue(self.host.path_exists('/tmp'))
+        self.assertTrue(self.host._run.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -49,6 +49,7 @@ from autotest_lib.server.hosts import afe_store
 from autotest_lib.server.hosts import factory as host_factory
 from autotest_lib.server.hosts import host_info
 from autotest_lib.server.hosts import ssh_multiplex
+from autotest_lib.tko import continuous_parser
 from autotest_lib.tko import db as tko_db
 from autotest_lib.tko import models as tko_models
 from autotest_lib.tko import status_lib
@@ -58,6 +59,13 @@ from autotest_lib.tko import utils as tko_utils
 
 INCREMENTAL_TKO_PARSING = global_config.global_config.get_config_value(
         'autoserv', 'incremental_tko_parsing', type=bool, default=False)
+# Bound on status lines waiting for the background TKO parser; logging a
+# status line blocks while the queue is full.
+TKO_PARSE_QUEUE_SIZE = global_config.global_config.get_config_value(
+        'autoserv', 'tko_parse_queue_size', type=int, default=10000)
+# Maximum number of tests inserted into TKO per transaction.
+TKO_PARSE_BATCH_SIZE = global_config.global_config.get_config_value(
+        'autoserv', 'tko_parse_batch_size', type=int, default=50)
 
 def _control_segment_path(name):
     """Get the pathname of the named control segment file."""
@@ -333,6 +341,7 @@ class server_job(base_job.base_job):
             self.autodir, run_function_dargs={'timeout':600})
         self.num_tests_run = 0
         self.num_tests_failed = 0
+        self._continuous_parser = None
 
         self._register_subcommand_hooks()
 
@@ -429,7 +438,8 @@ class server_job(base_job.base_job):
         """
         Start the continuous parsing of self.resultdir. This sets up
         the database connection and inserts the basic job object into
-        the database if necessary.
+        the database if necessary. Status lines are then parsed and
+        inserted by a background thread, see tko.continuous_parser.
         """
         if not self._using_parser:
             return
@@ -452,6 +462,23 @@ class server_job(base_job.base_job):
             machine_idx = self.results_db.lookup_machine(self.job_model.machine)
             self.job_model.index = job_idx
             self.job_model.machine_idx = machine_idx
+        # The parser thread gets its own connection so that its batched
+        # transactions do not interleave with statements from this thread.
+        self._continuous_parser = continuous_parser.ContinuousParser(
+                self.parser, tko_db.db(autocommit=False), self.job_model,
+                test_callback=self.__count_test,
+                max_queued_lines=TKO_PARSE_QUEUE_SIZE,
+                batch_size=TKO_PARSE_BATCH_SIZE)
+
+
+    def flush_parser(self):
+        """
+        Wait until every status line logged so far has been parsed and
+        its tests inserted into the results db, so that num_tests_run
+        and num_tests_failed are up to date.
+        """
+        if self._using_parser and self._continuous_parser:
+            self._continuous_parser.flush()
 
 
     def cleanup_parser(self):
@@ -462,9 +489,8 @@ class server_job(base_job.base_job):
         """
         if not self._using_parser:
             return
-        final_tests = self.parser.end()
-        for test in final_tests:
-            self.__insert_test(test)
+        self._continuous_parser.finish()
+        self._continuous_parser = None
         self._using_parser = False
 
     # TODO crbug.com/285395 add a kwargs parameter.
@@ -1428,27 +1454,16 @@ class server_job(base_job.base_job):
     def _parse_status(self, new_line):
         if not self._using_parser:
             return
-        new_tests = self.parser.process_lines([new_line])
-        for test in new_tests:
-            self.__insert_test(test)
+        self._continuous_parser.process_line(new_line)
 
 
-    def __insert_test(self, test):
+    def __count_test(self, test):
         """
-        An internal method to insert a new test result into the
-        database. This method will not raise an exception, even if an
-        error occurs during the insert, to avoid failing a test
-        simply because of unexpected database issues."""
+        Called by the continuous parser for every finished test, before
+        it is inserted into the database."""
         self.num_tests_run += 1
         if status_lib.is_worse_than_or_equal_to(test.status, 'FAIL'):
             self.num_tests_failed += 1
-        try:
-            self.results_db.insert_test(self.job_model, test)
-        except Exception:
-            msg = ("WARNING: An unexpected error occured while "
-                   "inserting test results into the database. "
-                   "Ignoring error.\n" + traceback.format_exc())
-            print >> sys.stderr, msg
 
 
     def preprocess_client_state(self):
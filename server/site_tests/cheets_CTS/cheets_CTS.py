@@ -88,7 +88,7 @@ class cheets_CTS(tradefed_test.TradefedTest):
         plans_dir = os.path.join(self._android_cts, 'android-cts',
                 'repository', 'plans')
         src_plan_file = os.path.join(self.bindir, 'plans', '%s.xml' % plan)
-        shutil.copy(src_plan_file, plans_dir)
+        self._copy_to_instance(src_plan_file, plans_dir)
 
     def _tradefed_run_command(self,
                               package=None,
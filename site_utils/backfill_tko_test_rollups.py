@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Utility to fill the tko_test_rollups table for jobs parsed before it.
+
+Migration 117 only creates the table; tko/parse.py maintains the rows of the
+jobs it parses from then on. This script computes the rows of older jobs in
+batches of consecutive job indexes, one short transaction per batch, so that
+the TKO database is never locked for long.
+
+Every batch replaces the rows of its jobs, so the script can be stopped and
+rerun at any time. To resume, pass the job index following the last batch
+it logged as --start_job_idx. Only set AUTOTEST_WEB use_tko_test_rollups
+once it has completed.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import common
+from autotest_lib.client.common_lib import logging_config
+from autotest_lib.tko import db as tko_db
+
+
+def parse_options():
+    """Parse command line inputs.
+
+    @return: Options to run the script.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-l', '--logfile', type=str,
+                        default=None,
+                        help='Path to the log file to save logs.')
+    parser.add_argument('--start_job_idx', type=int, default=None,
+                        help='First job index to backfill. Defaults to the '
+                             'oldest job.')
+    parser.add_argument('--end_job_idx', type=int, default=None,
+                        help='Last job index to backfill. Defaults to the '
+                             'newest job when the script starts.')
+    parser.add_argument('--batch_size', type=int, default=1000,
+                        help='Number of consecutive job indexes per '
+                             'transaction.')
+    parser.add_argument('--sleep_secs', type=float, default=0.5,
+                        help='Seconds to wait between two batches.')
+    return parser.parse_args()
+
+
+def main():
+    """Main script."""
+    options = parse_options()
+    log_config = logging_config.LoggingConfig()
+    if options.logfile:
+        log_config.add_file_handler(
+                file_path=os.path.abspath(options.logfile), level=logging.DEBUG)
+
+    db = tko_db.db()
+    db.cur.execute('SELECT MIN(job_idx), MAX(job_idx) FROM tko_jobs')
+    min_job_idx, max_job_idx = db.cur.fetchone()
+    if max_job_idx is None:
+        logging.info('No TKO jobs to backfill.')
+        return
+    start = (options.start_job_idx if options.start_job_idx is not None
+             else min_job_idx)
+    end = (options.end_job_idx if options.end_job_idx is not None
+           else max_job_idx)
+
+    logging.info('Backfilling tko_test_rollups for jobs %d to %d.', start, end)
+    start_time = time.time()
+    for first in xrange(start, end + 1, options.batch_size):
+        last = min(first + options.batch_size - 1, end)
+        db.update_job_range_rollups(first, last)
+        logging.info('Backfilled jobs %d to %d.', first, last)
+        if last < end:
+            time.sleep(options.sleep_secs)
+    logging.info('Backfill finished in %s seconds.', time.time() - start_time)
+
+
+if __name__ == '__main__':
+    main()
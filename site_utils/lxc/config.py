@@ -252,8 +252,7 @@ class DeployConfigManager(object):
             target = os.path.join(self.tmp_append,
                                   os.path.basename(deploy_config.target))
         else:
-            target = os.path.join(self.container.rootfs,
-                                  deploy_config.target[1:])
+            target = self.container.get_host_path(deploy_config.target)
         # Recursively copy files/folder to the target. `-L` to always follow
         # symbolic links in source.
         target_dir = os.path.dirname(target)
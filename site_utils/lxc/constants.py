@@ -20,6 +20,12 @@ CONTAINER_AUTOTEST_DIR = '/usr/local/autotest'
 # 1422862512: The tick when container is created.
 # 2424:       The PID of autoserv that starts the container.
 TEST_CONTAINER_NAME_FMT = 'test_%s_%d_%d'
+# Naming convention of pooled container, e.g.,
+# pool_3f2a9c01b7e4_1422862512_2424, where:
+# 3f2a9c01b7e4: Digest of the url of the server package installed in it.
+# 1422862512:   The tick when container is created.
+# 2424:         The PID of the process that starts the container.
+POOL_CONTAINER_NAME_FMT = 'pool_%s_%d_%d'
 # Naming convention of the result directory in test container.
 RESULT_DIR_FMT = os.path.join(CONTAINER_AUTOTEST_DIR, 'results',
                               '%s')
@@ -45,6 +51,24 @@ DEFAULT_CONTAINER_PATH = global_config.get_config_value('AUTOSERV',
 DEFAULT_SHARED_HOST_PATH = global_config.get_config_value(
         'AUTOSERV',
         'container_shared_host_path')
+# Directory of the drone-local cache of extracted server packages.
+SSP_CACHE_PATH = global_config.get_config_value(
+        'AUTOSERV', 'container_ssp_cache_path',
+        default=os.path.join(DEFAULT_CONTAINER_PATH, 'ssp_cache'))
+# Number of server packages to keep in the cache. 0 disables the cache.
+SSP_CACHE_SIZE = global_config.get_config_value(
+        'AUTOSERV', 'container_ssp_cache_size', type=int, default=0)
+# Number of set up containers to keep per server package. 0 disables the pool.
+CONTAINER_POOL_SIZE = global_config.get_config_value(
+        'AUTOSERV', 'container_pool_size', type=int, default=0)
+# Pooled containers of a server package not used by any test for this many
+# seconds are destroyed.
+CONTAINER_POOL_IDLE_SECS = global_config.get_config_value(
+        'AUTOSERV', 'container_pool_idle_secs', type=int, default=3600)
+# Pooled containers claimed by a test this many seconds ago are destroyed, as
+# no job runs for that long.
+CONTAINER_POOL_CLAIM_MAX_SECS = global_config.get_config_value(
+        'AUTOSERV', 'container_pool_claim_max_secs', type=int, default=172800)
 
 # Path to drone_temp folder in the container, which stores the control file for
 # test job to run.
@@ -70,6 +94,14 @@ else:
     CONTAINER_SITE_PACKAGES_PATH = os.path.join(CONTAINER_AUTOTEST_DIR,
                                                 'site-packages')
 
+# Directories mounted to every test container, as tuples of (source in host,
+# destination in container, readonly).
+SHARED_MOUNT_ENTRIES = [
+        (SITE_PACKAGES_PATH, CONTAINER_SITE_PACKAGES_PATH, True),
+        (os.path.join(common.autotest_dir, 'puppylab'),
+         os.path.join(CONTAINER_AUTOTEST_DIR, 'puppylab'),
+         True)]
+
 # TODO(dshi): If we are adding more logic in how lxc should interact with
 # different systems, we should consider code refactoring to use a setting-style
 # object to store following flags mapping to different systems.
@@ -12,6 +12,7 @@ from autotest_lib.client.bin import utils
 from autotest_lib.client.common_lib import error
 from autotest_lib.site_utils.lxc import constants
 from autotest_lib.site_utils.lxc import lxc
+from autotest_lib.site_utils.lxc import ssp_cache
 from autotest_lib.site_utils.lxc import utils as lxc_utils
 
 try:
@@ -281,6 +282,14 @@ class Container(object):
         utils.run(cmd)
 
 
+    def get_host_path(self, path):
+        """Returns the path in host of a path in the container.
+
+        @param path: Absolute path in the container.
+        """
+        return os.path.join(self.rootfs, path.lstrip(os.path.sep))
+
+
     def mount_dir(self, source, destination, readonly=False):
         """Mount a directory in host to a directory in the container.
 
@@ -383,6 +392,12 @@ class Container(object):
 
         @param ssp_url: The URL of the ssp to download and install.
         """
+        cache = ssp_cache.SSPCache()
+        if cache.enabled:
+            cache.install(ssp_url, self.get_host_path(
+                    constants.CONTAINER_AUTOTEST_DIR))
+            return
+
         usr_local_path = os.path.join(self.rootfs, 'usr', 'local')
         autotest_pkg_path = os.path.join(usr_local_path,
                                          'autotest_server_package.tar.bz2')
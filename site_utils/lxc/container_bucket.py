@@ -12,6 +12,7 @@ from autotest_lib.client.common_lib import error
 from autotest_lib.site_utils.lxc import Container
 from autotest_lib.site_utils.lxc import config as lxc_config
 from autotest_lib.site_utils.lxc import constants
+from autotest_lib.site_utils.lxc import container_pool
 from autotest_lib.site_utils.lxc import lxc
 from autotest_lib.site_utils.lxc import utils as lxc_utils
 from autotest_lib.site_utils.lxc.cleanup_if_fail import cleanup_if_fail
@@ -37,6 +38,8 @@ class ContainerBucket(object):
         """
         self.container_path = os.path.realpath(container_path)
         self.shared_host_path = os.path.realpath(shared_host_path)
+        self.pool = container_pool.ContainerPool(self.container_path,
+                                                 self.shared_host_path)
         # Try to create the base container.
         try:
             base_container = Container.createFromExistingDir(
@@ -56,8 +59,12 @@ class ContainerBucket(object):
         info_collection = lxc.get_container_info(self.container_path)
         containers = {}
         for info in info_collection:
-            container = Container.createFromExistingDir(self.container_path,
-                                                        **info)
+            if container_pool.is_pool_container(info['name']):
+                container = self.pool.get_container(info['name'])
+                container.state = info.get('state')
+            else:
+                container = Container.createFromExistingDir(
+                        self.container_path, **info)
             containers[container.name] = container
         return containers
 
@@ -65,12 +72,18 @@ class ContainerBucket(object):
     def get(self, name):
         """Get a container with matching name.
 
+        A test container taken out of the container pool is found by the name
+        it was set up with.
+
         @param name: Name of the container.
 
         @return: A container object with matching name. Returns None if no
                  container matches the given name.
         """
-        return self.get_all().get(name, None)
+        containers = self.get_all()
+        if name not in containers:
+            name = self.pool.find_claim(name) or name
+        return containers.get(name, None)
 
 
     def exist(self, name):
@@ -249,6 +262,10 @@ class ContainerBucket(object):
         3. Mount local site-packages.
         4. Mount test result directory.
 
+        If the container pool is enabled and has a container with the server
+        package, steps 1-3 were done in advance and that container is returned
+        instead of a new one. It can still be retrieved with get(name).
+
         TODO(dshi): Setup also needs to include test control file for autoserv
                     to run in container.
 
@@ -286,6 +303,18 @@ class ContainerBucket(object):
             control_file_name = os.path.basename(control)
             safe_control = os.path.join(result_path, control_file_name)
             utils.run('cp %s %s' % (control, safe_control))
+        else:
+            safe_control = None
+
+        if self.pool.enabled:
+            container = self.pool.claim(server_package_url, name)
+            self.pool.replenish_async(server_package_url)
+            if container:
+                self._setup_pooled_test(container, result_path, safe_control,
+                                        job_folder, dut_name)
+                logging.debug('Test container %s is set up with pooled '
+                              'container %s.', name, container.name)
+                return container
 
         # Create test container from the base container.
         container = self.create_from_base(name)
@@ -309,17 +338,10 @@ class ContainerBucket(object):
         if control:
             container.install_control_file(safe_control)
 
-        mount_entries = [(constants.SITE_PACKAGES_PATH,
-                          constants.CONTAINER_SITE_PACKAGES_PATH,
-                          True),
-                         (os.path.join(common.autotest_dir, 'puppylab'),
-                          os.path.join(constants.CONTAINER_AUTOTEST_DIR,
-                                       'puppylab'),
-                          True),
-                         (result_path,
-                          os.path.join(constants.RESULT_DIR_FMT % job_folder),
-                          False),
-                        ]
+        mount_entries = constants.SHARED_MOUNT_ENTRIES + [
+                (result_path,
+                 os.path.join(constants.RESULT_DIR_FMT % job_folder),
+                 False)]
 
         # Update container config to mount directories.
         for source, destination, readonly in mount_entries:
@@ -343,3 +365,23 @@ class ContainerBucket(object):
 
         logging.debug('Test container %s is set up.', name)
         return container
+
+
+    def _setup_pooled_test(self, container, result_path, control, job_folder,
+                           dut_name):
+        """Installs what is specific to a test in a pooled container.
+
+        @param container: A running Zygote taken out of the container pool.
+        @param result_path: Directory to be mounted to container to store test
+                            results.
+        @param control: Path to the control file to run the test job, or None.
+        @param job_folder: Folder name of the job, e.g., 123-debug_user.
+        @param dut_name: Name of the dut to run test, used as the hostname of
+                         the container, or None.
+        """
+        if dut_name:
+            container.set_hostname(dut_name.replace('.', '-'))
+        if control:
+            container.install_control_file(control)
+        container.mount_dir(result_path, constants.RESULT_DIR_FMT % job_folder)
+        container.verify_autotest_setup(job_folder)
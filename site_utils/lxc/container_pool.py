@@ -0,0 +1,500 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Pool of started test containers with a server package installed.
+
+Setting up a test container downloads and extracts the server-side package,
+deploys configs and starts the container, which takes about a minute before
+every test. The tests of a suite all use the same package, so the pool keeps
+a few containers of each recently used package set up in advance. A test
+takes one out of the pool and only installs its control file, result
+directory and hostname into it.
+
+Pooled containers are zygotes: their autotest directory is a directory in the
+shared host path, so the result directory of a test can be mounted into them
+after they are started.
+
+The pool is shared by all autoserv processes of the drone through files in
+the pool directory of the container path:
+    <container>.ready: The container is set up and can be used by a test.
+    <container>.claim: The container was taken out of the pool. The file
+            contains the name of the test container it is used as, the pid
+            of the autoserv process that claimed it and the claim time, one
+            per line.
+    <package>.url: The server package url. Its mtime is the last time a test
+            asked for a container of the package.
+    <package>.lock: Locked while the pool of the package is being filled.
+where <package> is a digest of the server package url.
+
+Containers are added by a detached process started with:
+    container_pool.py --container_path <path> --shared_host_path <path> <url>
+"""
+
+import argparse
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import common
+from autotest_lib.client.bin import utils
+from autotest_lib.client.common_lib import error
+from autotest_lib.site_utils.lxc import Container
+from autotest_lib.site_utils.lxc import config as lxc_config
+from autotest_lib.site_utils.lxc import constants
+from autotest_lib.site_utils.lxc import lxc
+from autotest_lib.site_utils.lxc import zygote
+
+
+# Name of the pool directory in the container path.
+_POOL_DIR = 'container_pool'
+_READY_SUFFIX = '.ready'
+_CLAIM_SUFFIX = '.claim'
+_URL_SUFFIX = '.url'
+_LOCK_SUFFIX = '.lock'
+# Name of the log file of the processes filling the pool.
+_LOG_FILE = 'replenish.log'
+
+
+def get_package_digest(ssp_url):
+    """Returns the digest used to name pooled containers of a server package.
+
+    @param ssp_url: Url of the server package.
+    """
+    return hashlib.md5(ssp_url).hexdigest()[:12]
+
+
+def get_package_prefix(digest):
+    """Returns the prefix of the pooled container names of a package.
+
+    @param digest: Digest of the server package url.
+    """
+    return constants.POOL_CONTAINER_NAME_FMT.split('%s')[0] + digest + '_'
+
+
+def is_pool_container(name):
+    """Returns whether a container name is the name of a pooled container.
+
+    @param name: Name of the container.
+    """
+    return name.startswith(constants.POOL_CONTAINER_NAME_FMT.split('%s')[0])
+
+
+class ContainerPool(object):
+    """Containers set up in advance for the server packages in use."""
+
+    def __init__(self, container_path, shared_host_path,
+                 size=constants.CONTAINER_POOL_SIZE,
+                 idle_secs=constants.CONTAINER_POOL_IDLE_SECS,
+                 claim_max_secs=constants.CONTAINER_POOL_CLAIM_MAX_SECS):
+        """
+        @param container_path: Directory that stores the containers.
+        @param shared_host_path: Directory of the host dirs of zygotes.
+        @param size: Number of set up containers to keep per server package.
+                     0 disables the pool.
+        @param idle_secs: Containers of a server package that was not asked
+                          for in this many seconds are destroyed.
+        @param claim_max_secs: Containers claimed this many seconds ago are
+                               destroyed, even if their autoserv process is
+                               still running.
+        """
+        self.container_path = container_path
+        self.shared_host_path = shared_host_path
+        self.size = size
+        self.idle_secs = idle_secs
+        self.claim_max_secs = claim_max_secs
+        self.pool_dir = os.path.join(container_path, _POOL_DIR)
+
+
+    @property
+    def enabled(self):
+        """Returns whether tests take containers out of the pool."""
+        return self.size > 0
+
+
+    def get_container(self, name):
+        """Returns a Zygote object for an existing pooled container.
+
+        @param name: Name of the pooled container.
+        """
+        return zygote.Zygote(self.container_path, name, {},
+                             host_path=os.path.join(self.shared_host_path,
+                                                    name))
+
+
+    def claim(self, ssp_url, name):
+        """Takes a container with the given server package out of the pool.
+
+        @param ssp_url: Url of the server package.
+        @param name: Name of the test container the pooled container is used
+                     as. ContainerBucket.get resolves that name to the pooled
+                     container.
+
+        @return: A running Zygote, or None if the pool has no container with
+                 the server package.
+        """
+        digest = get_package_digest(ssp_url)
+        self._touch_package(digest, ssp_url)
+        for pool_name in self.get_ready(digest):
+            if not self._try_claim(pool_name, name):
+                continue
+            container = self.get_container(pool_name)
+            try:
+                if container.is_running():
+                    logging.debug('Claimed pooled container %s for %s.',
+                                  pool_name, name)
+                    return container
+            except error.ContainerError:
+                pass
+            logging.warning('Pooled container %s is not running, destroying '
+                            'it.', pool_name)
+            self._destroy(container)
+        return None
+
+
+    def find_claim(self, name):
+        """Finds the pooled container used as a test container.
+
+        @param name: Name of the test container.
+
+        @return: Name of the pooled container, or None.
+        """
+        for pool_name in self._list(_CLAIM_SUFFIX):
+            claim = self._read_claim(pool_name)
+            if claim and claim[0] == name:
+                return pool_name
+        return None
+
+
+    def get_ready(self, digest):
+        """Returns the names of the unclaimed containers of a package.
+
+        @param digest: Digest of the server package url.
+
+        @return: A list of container names, oldest first.
+        """
+        prefix = get_package_prefix(digest)
+        claimed = set(self._list(_CLAIM_SUFFIX))
+        return sorted(name for name in self._list(_READY_SUFFIX)
+                      if name.startswith(prefix) and name not in claimed)
+
+
+    def needs_replenish(self, ssp_url):
+        """Returns whether the pool of a package has fewer containers than
+        its size.
+
+        @param ssp_url: Url of the server package.
+        """
+        return len(self.get_ready(get_package_digest(ssp_url))) < self.size
+
+
+    def replenish_async(self, ssp_url):
+        """Fills the pool of a package in a detached process.
+
+        @param ssp_url: Url of the server package.
+        """
+        if not self.needs_replenish(ssp_url):
+            return
+        script = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+        with open(os.devnull, 'r+') as devnull:
+            subprocess.Popen([sys.executable, script,
+                              '--container_path', self.container_path,
+                              '--shared_host_path', self.shared_host_path,
+                              ssp_url],
+                             stdin=devnull, stdout=devnull, stderr=devnull,
+                             close_fds=True, preexec_fn=os.setsid)
+
+
+    def replenish(self, ssp_url, base_container):
+        """Fills the pool of a package and destroys idle pooled containers.
+
+        Returns right away if another process is filling the pool of the
+        package.
+
+        @param ssp_url: Url of the server package.
+        @param base_container: The Container to clone pooled containers from.
+        """
+        digest = get_package_digest(ssp_url)
+        self._ensure_pool_dir()
+        with open(self._get_path(digest, _LOCK_SUFFIX), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                logging.debug('Pool of %s is being filled by another process.',
+                              ssp_url)
+                return
+            self.collect_garbage()
+            while self.needs_replenish(ssp_url):
+                self._add(ssp_url, base_container)
+
+
+    def collect_garbage(self):
+        """Destroys idle and orphaned pooled containers.
+
+        Containers of packages no test asked for in idle_secs are destroyed,
+        as are containers whose setup was interrupted, and claimed containers
+        whose autoserv process is gone or which were claimed more than
+        claim_max_secs ago. Pool files of containers that no longer exist are
+        removed.
+        """
+        existing = set(info['name'] for info in
+                       lxc.get_container_info(self.container_path))
+        claimed = set(self._list(_CLAIM_SUFFIX))
+        tracked = set(self._list(_READY_SUFFIX)) | claimed
+        for name in tracked - existing:
+            self._remove_files(name)
+
+        for name in existing:
+            if not is_pool_container(name) or name in tracked:
+                continue
+            pid = name.rsplit('_', 1)[-1]
+            if not utils.pid_is_alive(pid):
+                logging.info('Destroying pooled container %s, its setup was '
+                             'interrupted.', name)
+                self._destroy(self.get_container(name))
+
+        claim_cutoff = time.time() - self.claim_max_secs
+        for name in claimed & existing:
+            claim = self._read_claim(name)
+            if not claim:
+                continue
+            _, pid, claim_time = claim
+            if pid and not utils.pid_is_alive(pid):
+                logging.info('Destroying pooled container %s, the process %s '
+                             'that claimed it is gone.', name, pid)
+            elif claim_time < claim_cutoff:
+                logging.info('Destroying pooled container %s, it was claimed '
+                             'more than %d seconds ago.', name,
+                             self.claim_max_secs)
+            else:
+                continue
+            self._destroy(self.get_container(name))
+
+        cutoff = time.time() - self.idle_secs
+        for digest in self._list(_URL_SUFFIX):
+            url_path = self._get_path(digest, _URL_SUFFIX)
+            if os.path.getmtime(url_path) > cutoff:
+                continue
+            for name in self.get_ready(digest):
+                if self._try_claim(name, ''):
+                    logging.info('Destroying idle pooled container %s.', name)
+                    self._destroy(self.get_container(name))
+            os.remove(url_path)
+
+
+    def _add(self, ssp_url, base_container):
+        """Sets up a container with a server package and adds it to the pool.
+
+        @param ssp_url: Url of the server package.
+        @param base_container: The Container to clone the container from.
+        """
+        name = constants.POOL_CONTAINER_NAME_FMT % (
+                get_package_digest(ssp_url), time.time(), os.getpid())
+        logging.info('Setting up pooled container %s with %s.', name, ssp_url)
+        container = self._clone(base_container, name)
+        try:
+            # The hostname is set to the dut name when a test takes the
+            # container, but Moblab's DHCP server needs the test prefix from
+            # the start.
+            container.set_hostname(name.replace('_', '-'))
+            container.install_ssp(ssp_url)
+            deploy_config_manager = lxc_config.DeployConfigManager(container)
+            deploy_config_manager.deploy_pre_start()
+            for source, destination, readonly in constants.SHARED_MOUNT_ENTRIES:
+                container.mount_dir(source, destination, readonly)
+            # TODO(dshi): crbug.com/459344 Skip following action when test
+            # container can be unprivileged container.
+            autotest_path = container.get_host_path(
+                    constants.CONTAINER_AUTOTEST_DIR)
+            utils.run('sudo chown -R root "%s"' % autotest_path)
+            utils.run('sudo chgrp -R root "%s"' % autotest_path)
+            container.start()
+            deploy_config_manager.deploy_post_start()
+            container.modify_import_order()
+        except Exception:
+            logging.exception('Failed to set up pooled container %s.', name)
+            self._destroy(container)
+            raise
+        open(self._get_path(name, _READY_SUFFIX), 'w').close()
+        logging.info('Pooled container %s is set up.', name)
+
+
+    def _clone(self, base_container, name):
+        """Clones a zygote from the base container.
+
+        @param base_container: The Container to clone.
+        @param name: Name of the new container.
+        """
+        host_path = os.path.join(self.shared_host_path, name)
+        try:
+            return zygote.Zygote(self.container_path, name, {},
+                                 src=base_container,
+                                 snapshot=constants.SUPPORT_SNAPSHOT_CLONE,
+                                 host_path=host_path)
+        except error.CmdError:
+            if not constants.SUPPORT_SNAPSHOT_CLONE:
+                raise
+            logging.debug('Creating snapshot clone failed. Attempting without '
+                          'snapshot...')
+            return zygote.Zygote(self.container_path, name, {},
+                                 src=base_container, snapshot=False,
+                                 host_path=host_path)
+
+
+    def _destroy(self, container):
+        """Destroys a pooled container and removes its pool files.
+
+        @param container: The Zygote to destroy.
+        """
+        try:
+            container.destroy()
+        except error.CmdError as e:
+            logging.error('Failed to destroy pooled container %s: %s',
+                          container.name, e)
+        self._remove_files(container.name)
+
+
+    def _try_claim(self, pool_name, name):
+        """Atomically claims a pooled container.
+
+        @param pool_name: Name of the pooled container.
+        @param name: Name of the test container it is used as.
+
+        @return: True if the container was claimed, False if another process
+                 claimed it first.
+        """
+        try:
+            fd = os.open(self._get_path(pool_name, _CLAIM_SUFFIX),
+                         os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                return False
+            raise
+        with os.fdopen(fd, 'w') as f:
+            f.write('%s\n%d\n%f\n' % (name, os.getpid(), time.time()))
+        return True
+
+
+    def _read_claim(self, pool_name):
+        """Reads the claim file of a pooled container.
+
+        @param pool_name: Name of the pooled container.
+
+        @return: A (name, pid, claim_time) tuple, where name is the name of
+                 the test container the pooled container is used as, and pid
+                 is None if the claiming process has not written it yet. None
+                 if the container is not claimed.
+        """
+        path = self._get_path(pool_name, _CLAIM_SUFFIX)
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+            claim_time = os.path.getmtime(path)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        if len(lines) < 3:
+            # The claim file is being written.
+            return '', None, claim_time
+        return lines[0], lines[1], float(lines[2])
+
+
+    def _touch_package(self, digest, ssp_url):
+        """Records that a test asked for a container of a package.
+
+        @param digest: Digest of the server package url.
+        @param ssp_url: Url of the server package.
+        """
+        self._ensure_pool_dir()
+        with open(self._get_path(digest, _URL_SUFFIX), 'w') as f:
+            f.write(ssp_url)
+
+
+    def _remove_files(self, name):
+        """Removes the pool files of a container.
+
+        @param name: Name of the pooled container.
+        """
+        for suffix in (_READY_SUFFIX, _CLAIM_SUFFIX):
+            try:
+                os.remove(self._get_path(name, suffix))
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+
+    def _list(self, suffix):
+        """Returns the names of the pool files with the given suffix.
+
+        @param suffix: Suffix of the pool files, which is not included in the
+                       returned names.
+        """
+        if not os.path.isdir(self.pool_dir):
+            return []
+        return [filename[:-len(suffix)]
+                for filename in os.listdir(self.pool_dir)
+                if filename.endswith(suffix)]
+
+
+    def _get_path(self, name, suffix):
+        return os.path.join(self.pool_dir, name + suffix)
+
+
+    def _ensure_pool_dir(self):
+        try:
+            os.makedirs(self.pool_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+
+def parse_options():
+    """Parse command line inputs.
+
+    @return: Options to run the script.
+    """
+    parser = argparse.ArgumentParser(
+            description='Fill the container pool of a server package.')
+    parser.add_argument('--container_path',
+                        default=constants.DEFAULT_CONTAINER_PATH,
+                        help='Directory that stores the containers.')
+    parser.add_argument('--shared_host_path',
+                        default=constants.DEFAULT_SHARED_HOST_PATH,
+                        help='Directory of the host dirs of zygotes.')
+    parser.add_argument('ssp_url', help='Url of the server package.')
+    return parser.parse_args()
+
+
+def main(options):
+    """Main script.
+
+    @param options: Options to run the script.
+    """
+    pool = ContainerPool(options.container_path, options.shared_host_path)
+    pool._ensure_pool_dir()
+    logging.basicConfig(
+            filename=os.path.join(pool.pool_dir, _LOG_FILE),
+            level=logging.DEBUG,
+            format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    base_container = Container.createFromExistingDir(options.container_path,
+                                                     constants.BASE)
+    try:
+        pool.replenish(options.ssp_url, base_container)
+    except Exception:
+        logging.exception('Failed to fill the container pool of %s.',
+                          options.ssp_url)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_options()))
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+import common
+from autotest_lib.site_utils.lxc import container_pool
+from autotest_lib.site_utils.lxc import zygote
+
+
+_URL = 'http://devserver/static/build/autotest_server_package.tar.bz2'
+_OTHER_URL = 'http://devserver/static/other/autotest_server_package.tar.bz2'
+
+
+class ContainerPoolTests(unittest.TestCase):
+    """Unit tests for the bookkeeping of the ContainerPool class."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.pool = container_pool.ContainerPool(
+                self.tmpdir, os.path.join(self.tmpdir, 'host'), size=2,
+                idle_secs=60)
+        self.digest = container_pool.get_package_digest(_URL)
+        patcher = mock.patch.object(zygote.Zygote, 'is_running',
+                                    return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def _add_ready(self, digest, created):
+        """Marks a pooled container of a package as set up.
+
+        @param digest: Digest of the server package url.
+        @param created: Creation time used in the container name.
+
+        @return: Name of the container.
+        """
+        name = container_pool.get_package_prefix(digest) + '%d_1' % created
+        self.pool._ensure_pool_dir()
+        open(self.pool._get_path(name, '.ready'), 'w').close()
+        return name
+
+
+    def testClaimTakesOldestContainerOnce(self):
+        """Each ready container is claimed by a single test."""
+        old = self._add_ready(self.digest, 1000)
+        new = self._add_ready(self.digest, 2000)
+        self._add_ready(container_pool.get_package_digest(_OTHER_URL), 500)
+        self.assertFalse(self.pool.needs_replenish(_URL))
+
+        self.assertEqual(self.pool.claim(_URL, 'test_1_0_1').name, old)
+        self.assertTrue(self.pool.needs_replenish(_URL))
+        self.assertEqual(self.pool.claim(_URL, 'test_2_0_1').name, new)
+        self.assertIsNone(self.pool.claim(_URL, 'test_3_0_1'))
+        self.assertEqual(self.pool.get_ready(self.digest), [])
+
+
+    def testFindClaim(self):
+        """A claimed container is found by the test container name."""
+        name = self._add_ready(self.digest, 1000)
+        self.assertIsNone(self.pool.find_claim('test_1_0_1'))
+        self.pool.claim(_URL, 'test_1_0_1')
+        self.assertEqual(self.pool.find_claim('test_1_0_1'), name)
+        self.assertIsNone(self.pool.find_claim('test_2_0_1'))
+
+
+    def testNotRunningContainerIsDestroyed(self):
+        """A container that stopped is destroyed instead of being used."""
+        name = self._add_ready(self.digest, 1000)
+        zygote.Zygote.is_running.return_value = False
+        with mock.patch.object(zygote.Zygote, 'destroy') as destroy:
+            self.assertIsNone(self.pool.claim(_URL, 'test_1_0_1'))
+            destroy.assert_called_once_with()
+        self.assertFalse(os.path.exists(self.pool._get_path(name, '.ready')))
+
+
+    def testCollectGarbage(self):
+        """Idle packages and files of destroyed containers are cleaned up."""
+        other_digest = container_pool.get_package_digest(_OTHER_URL)
+        idle = self._add_ready(other_digest, 1000)
+        self.pool._touch_package(other_digest, _OTHER_URL)
+        url_path = self.pool._get_path(other_digest, '.url')
+        os.utime(url_path, (time.time() - 120, time.time() - 120))
+        active = self._add_ready(self.digest, 1000)
+        self.pool._touch_package(self.digest, _URL)
+        gone = self._add_ready(self.digest, 2000)
+
+        containers = [{'name': idle}, {'name': active}]
+        with mock.patch.object(container_pool.lxc, 'get_container_info',
+                               return_value=containers), \
+             mock.patch.object(zygote.Zygote, 'destroy') as destroy:
+            self.pool.collect_garbage()
+            destroy.assert_called_once_with()
+
+        self.assertEqual(self.pool.get_ready(self.digest), [active])
+        self.assertEqual(self.pool.get_ready(other_digest), [])
+        self.assertFalse(os.path.exists(url_path))
+        self.assertFalse(os.path.exists(self.pool._get_path(gone, '.ready')))
+
+
+    def testCollectGarbageStaleClaims(self):
+        """Claimed containers of dead or too old processes are destroyed."""
+        self.pool.claim_max_secs = 60
+        crashed = self._add_ready(self.digest, 1000)
+        old = self._add_ready(self.digest, 2000)
+        running = self._add_ready(self.digest, 3000)
+        for name in (crashed, old, running):
+            self.pool.claim(_URL, 'test_%s' % name)
+        self.assertEqual(self.pool._read_claim(running)[:2],
+                         ('test_%s' % running, str(os.getpid())))
+        with open(self.pool._get_path(crashed, '.claim'), 'w') as f:
+            f.write('test_crashed\n999999\n%f\n' % time.time())
+        old_claim_path = self.pool._get_path(old, '.claim')
+        with open(old_claim_path, 'w') as f:
+            f.write('test_old\n%d\n%f\n' % (os.getpid(), time.time() - 120))
+
+        def pid_is_alive(pid):
+            return pid != '999999'
+
+        containers = [{'name': crashed}, {'name': old}, {'name': running}]
+        with mock.patch.object(container_pool.lxc, 'get_container_info',
+                               return_value=containers), \
+             mock.patch.object(container_pool.utils, 'pid_is_alive',
+                               side_effect=pid_is_alive), \
+             mock.patch.object(zygote.Zygote, 'destroy') as destroy:
+            self.pool.collect_garbage()
+            self.assertEqual(destroy.call_count, 2)
+
+        self.assertIsNone(self.pool.find_claim('test_crashed'))
+        self.assertFalse(os.path.exists(old_claim_path))
+        self.assertEqual(self.pool.find_claim('test_%s' % running), running)
+
+
+if __name__ == '__main__':
+    unittest.main()
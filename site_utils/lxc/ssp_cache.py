@@ -0,0 +1,172 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Drone-local cache of extracted server-side packages.
+
+Every test container used to download and extract the server-side package of
+its build, although all tests of a suite on a drone use the same package. The
+cache downloads and extracts each package once, into a tree that is only read
+afterwards, and test containers copy the tree into their autotest directory.
+
+Containers get a copy rather than a bind or overlay mount of the tree because
+their setup modifies files of the autotest directory in place, e.g., appends
+to shadow_config.ini, and overlayfs is not available on all drones.
+
+The cache directory has, for each cached package:
+    <package>/: The extracted package, i.e., <package>/autotest.
+    <package>.lock: Locked exclusively while the package is being extracted
+            or removed, and shared while it is being copied. It is removed
+            with the package.
+where <package> is a digest of the package url. The mtime of <package>/ is
+the last time the package was used; the least recently used packages are
+removed once the cache holds more than its size.
+"""
+
+import contextlib
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import tempfile
+
+import common
+from autotest_lib.client.bin import utils
+from autotest_lib.site_utils.lxc import constants
+from autotest_lib.site_utils.lxc import lxc
+
+try:
+    from chromite.lib import metrics
+except ImportError:
+    metrics = utils.metrics_mock
+
+
+_LOCK_SUFFIX = '.lock'
+_PACKAGE_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class SSPCache(object):
+    """Extracted server-side packages shared by the containers of a drone."""
+
+    def __init__(self, cache_path=constants.SSP_CACHE_PATH,
+                 size=constants.SSP_CACHE_SIZE):
+        """
+        @param cache_path: Directory of the cache.
+        @param size: Number of packages to keep. 0 disables the cache.
+        """
+        self.cache_path = cache_path
+        self.size = size
+
+
+    @property
+    def enabled(self):
+        """Returns whether server packages are installed from the cache."""
+        return self.size > 0
+
+
+    def install(self, ssp_url, target):
+        """Installs the autotest directory of a server package.
+
+        The files are reflinked on file systems that support it.
+
+        @param ssp_url: Url of the server package.
+        @param target: Directory to copy the content of the autotest directory
+                       of the package to, e.g., /usr/local/autotest in the
+                       rootfs of a container. It is created if it does not
+                       exist.
+        """
+        with self._get(ssp_url) as package_path:
+            utils.run('sudo mkdir -p "%s"' % target)
+            utils.run('sudo cp -a --reflink=auto "%s/." "%s"' %
+                      (os.path.join(package_path, 'autotest'), target))
+
+
+    @contextlib.contextmanager
+    def _get(self, ssp_url):
+        """Context manager yielding the extracted tree of a package.
+
+        The package is downloaded and extracted if it is not cached, and can
+        not be removed from the cache until the context exits.
+
+        @param ssp_url: Url of the server package.
+        """
+        digest = hashlib.md5(ssp_url).hexdigest()
+        package_path = os.path.join(self.cache_path, digest)
+        _makedirs(self.cache_path)
+        with open(package_path + _LOCK_SUFFIX, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            hit = os.path.isdir(package_path)
+            if not hit:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not os.path.isdir(package_path):
+                    self._add(ssp_url, package_path)
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            metrics.Counter('%s/ssp_cache/%s' % (constants.STATS_KEY,
+                                                 'hit' if hit else 'miss')
+                            ).increment()
+            os.utime(package_path, None)
+            yield package_path
+        self._evict()
+
+
+    def _add(self, ssp_url, package_path):
+        """Downloads and extracts a package into the cache.
+
+        @param ssp_url: Url of the server package.
+        @param package_path: Directory to extract the package to.
+        """
+        logging.debug('Adding server package %s to the cache.', ssp_url)
+        tmpdir = tempfile.mkdtemp(dir=self.cache_path,
+                                  prefix='%s.' % os.path.basename(package_path),
+                                  suffix='.tmp')
+        os.chmod(tmpdir, 0755)
+        try:
+            tarball = os.path.join(tmpdir, 'autotest_server_package.tar.bz2')
+            lxc.download_extract(ssp_url, tarball, tmpdir)
+            utils.run('sudo rm "%s"' % tarball)
+            os.rename(tmpdir, package_path)
+        except OSError as e:
+            utils.run('sudo rm -rf "%s"' % tmpdir)
+            # Another process waiting on the lock file of an evicted package
+            # may have extracted the package at the same time.
+            if (e.errno not in (errno.EEXIST, errno.ENOTEMPTY) or
+                not os.path.isdir(package_path)):
+                raise
+        except:
+            utils.run('sudo rm -rf "%s"' % tmpdir)
+            raise
+
+
+    def _evict(self):
+        """Removes the least recently used packages beyond the cache size.
+
+        Packages being copied by other processes are skipped.
+        """
+        packages = [os.path.join(self.cache_path, name)
+                    for name in os.listdir(self.cache_path)
+                    if _PACKAGE_RE.match(name)]
+        packages.sort(key=os.path.getmtime, reverse=True)
+        for package_path in packages[self.size:]:
+            with open(package_path + _LOCK_SUFFIX, 'a') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError as e:
+                    if e.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+                    continue
+                if not os.path.isdir(package_path):
+                    continue
+                logging.debug('Removing %s from the server package cache.',
+                              package_path)
+                utils.run('sudo rm -rf "%s"' % package_path)
+                os.remove(package_path + _LOCK_SUFFIX)
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
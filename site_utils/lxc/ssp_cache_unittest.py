@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import common
+from autotest_lib.client.bin import utils
+from autotest_lib.site_utils.lxc import ssp_cache
+
+
+_run = utils.run
+
+
+def _fake_download_extract(url, target, extract_dir):
+    """Writes a tarball and an extracted autotest directory for |url|."""
+    open(target, 'w').close()
+    os.mkdir(os.path.join(extract_dir, 'autotest'))
+    with open(os.path.join(extract_dir, 'autotest', 'url'), 'w') as f:
+        f.write(url)
+
+
+def _run_without_sudo(command, **kwargs):
+    """Runs |command| as the current user."""
+    return _run(command.replace('sudo ', ''), **kwargs)
+
+
+class SSPCacheTests(unittest.TestCase):
+    """Unit tests for the SSPCache class."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ssp_cache.SSPCache(os.path.join(self.tmpdir, 'cache'),
+                                        size=2)
+        for patcher in (
+                mock.patch.object(ssp_cache.lxc, 'download_extract',
+                                  side_effect=_fake_download_extract),
+                mock.patch.object(ssp_cache.utils, 'run',
+                                  side_effect=_run_without_sudo)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def _install(self, url):
+        """Installs |url| into a new directory and returns its content."""
+        target = tempfile.mkdtemp(dir=self.tmpdir)
+        self.cache.install(url, target)
+        with open(os.path.join(target, 'url')) as f:
+            return f.read()
+
+
+    def _cached(self):
+        return [name for name in os.listdir(self.cache.cache_path)
+                if not name.endswith('.lock')]
+
+
+    def testPackageIsDownloadedOnce(self):
+        """A cached package is copied without downloading it again."""
+        self.assertEqual(self._install('url1'), 'url1')
+        self.assertEqual(self._install('url1'), 'url1')
+        self.assertEqual(ssp_cache.lxc.download_extract.call_count, 1)
+        self.assertEqual(len(self._cached()), 1)
+
+
+    def testLeastRecentlyUsedPackageIsEvicted(self):
+        """The cache keeps its size by removing the least used packages."""
+        self._install('url1')
+        self._install('url2')
+        url1_path = os.path.join(self.cache.cache_path,
+                                 hashlib.md5('url1').hexdigest())
+        os.utime(url1_path, (0, 0))
+        self._install('url3')
+        self.assertFalse(os.path.exists(url1_path))
+        self.assertFalse(os.path.exists(url1_path + '.lock'))
+        self.assertEqual(len(self._cached()), 2)
+        # url2 is now the least recently used package.
+        self._install('url1')
+        self._install('url3')
+        self.assertEqual(ssp_cache.lxc.download_extract.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
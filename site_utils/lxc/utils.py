@@ -5,6 +5,8 @@
 """This module provides some utilities used by LXC and its tools.
 """
 
+import os
+
 import common
 from autotest_lib.client.bin import utils
 from autotest_lib.client.common_lib import error
@@ -80,11 +82,39 @@ def clone(lxc_path, src_name, new_path, dst_name, snapshot):
     utils.run(cmd)
 
 
+def get_mount_points_under(path):
+    """Returns the mount points in the given directory, deepest first.
+
+    @param path: The directory to look for mount points in.
+
+    @return: A list of paths of mount points under |path|, not including
+             |path| itself.
+    """
+    prefix = os.path.realpath(path).rstrip(os.path.sep) + os.path.sep
+    mount_points = []
+    with open('/proc/self/mounts') as mounts:
+        for line in mounts:
+            # Special characters of the mount point, e.g. spaces, are escaped
+            # as octal sequences.
+            mount_point = line.split()[1].decode('string_escape')
+            if mount_point.startswith(prefix):
+                mount_points.append(mount_point)
+    return sorted(mount_points, reverse=True)
+
+
 def cleanup_host_mount(host_dir):
     """Unmounts and removes the given host dir.
 
+    Directories mounted in the host dir, e.g. the result directory of a test
+    running in a zygote, are unmounted first so their content is not removed.
+
     @param host_dir: The host dir to unmount and remove.
+
+    @raise error.CmdError: If a directory mounted in the host dir can not be
+                           unmounted.
     """
+    for mount_point in get_mount_points_under(host_dir):
+        utils.run('sudo umount "%s"' % mount_point)
     try:
         utils.run('sudo umount "%s"' % host_dir)
     except error.CmdError:
@@ -12,6 +12,7 @@ from autotest_lib.client.common_lib import error
 from autotest_lib.site_utils.lxc import Container
 from autotest_lib.site_utils.lxc import constants
 from autotest_lib.site_utils.lxc import lxc
+from autotest_lib.site_utils.lxc import ssp_cache
 from autotest_lib.site_utils.lxc import utils as lxc_utils
 
 
@@ -62,6 +63,52 @@ class Zygote(Container):
             self._cleanup_host_mount()
 
 
+    def get_host_path(self, path):
+        """Returns the path in host of a path in the container.
+
+        Paths in the autotest directory are in the host dir, which is mounted
+        over it.
+
+        @param path: Absolute path in the container.
+        """
+        relpath = os.path.relpath(path, constants.CONTAINER_AUTOTEST_DIR)
+        if relpath != os.pardir and not relpath.startswith(os.pardir + os.sep):
+            return os.path.normpath(os.path.join(self.host_path, relpath))
+        return super(Zygote, self).get_host_path(path)
+
+
+    def mount_dir(self, source, destination, readonly=False):
+        """Mount a directory in host to a directory in the container.
+
+        Directories can be mounted in the autotest directory of a running
+        container: they are bind mounted in the host dir, and the mount
+        propagates to the container through the shared host path.
+
+        @param source: Directory in host to be mounted.
+        @param destination: Directory in container to mount the source directory
+        @param readonly: Set to True to make a readonly mount, default is False.
+
+        @raise ContainerError: If the container is running and the destination
+                               is not in the autotest directory.
+        """
+        if not _is_in_autotest_dir(destination):
+            if self.is_running():
+                raise error.ContainerError(
+                        'Can not mount %s in running container %s.' %
+                        (destination, self.name))
+            super(Zygote, self).mount_dir(source, destination, readonly)
+            return
+
+        host_dir = self.get_host_path(destination)
+        utils.run('sudo mkdir -p "%s"' % host_dir)
+        if self.is_running():
+            utils.run('sudo mount --bind "%s" "%s"' % (source, host_dir))
+            if readonly:
+                utils.run('sudo mount -o remount,bind,ro "%s"' % host_dir)
+        else:
+            super(Zygote, self).mount_dir(source, destination, readonly)
+
+
     def set_hostname(self, hostname):
         """Sets the hostname within the container.
 
@@ -81,6 +128,11 @@ class Zygote(Container):
 
         @param ssp_url: The URL of the ssp to download and install.
         """
+        cache = ssp_cache.SSPCache()
+        if cache.enabled:
+            cache.install(ssp_url, self.host_path)
+            return
+
         # The host dir is mounted directly on /usr/local/autotest within the
         # container.  The SSP structure assumes it gets untarred into the
         # /usr/local directory of the container's rootfs.  In order to unpack
@@ -128,3 +180,12 @@ class Zygote(Container):
     def _cleanup_host_mount(self):
         """Unmount and remove the host dir for this container."""
         lxc_utils.cleanup_host_mount(self.host_path);
+
+
+def _is_in_autotest_dir(path):
+    """Returns whether |path| is under the autotest directory of a container.
+
+    @param path: Absolute path in the container.
+    """
+    return os.path.normpath(path).startswith(
+            constants.CONTAINER_AUTOTEST_DIR + os.path.sep)
@@ -0,0 +1,219 @@
+# Copyright 2017 The Chromium OS Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Background parsing of status lines into the TKO database.
+
+A ContinuousParser takes status log lines from a running job, and parses
+and inserts the resulting tests on a background thread, so that parsing
+and database latency stay out of the job's critical path. Finished tests
+are inserted in batches, one transaction per batch.
+
+Errors are reported and never stop the worker. Should the worker thread
+die anyway, the lines still queued are dropped and later lines are parsed
+inline by the caller, so that process_line() and flush() never block on a
+queue nobody serves.
+"""
+
+import Queue
+import os
+import sys
+import threading
+import traceback
+
+# Sentinel queued by finish() to stop the worker thread.
+_FINISH = object()
+
+
+class ContinuousParser(object):
+    """Parses status lines and inserts tests on a background thread."""
+
+    def __init__(self, parser, results_db, job_model, test_callback=None,
+                 max_queued_lines=10000, batch_size=50):
+        """
+        @param parser: A started tko parser instance, see parser_lib.
+        @param results_db: A tko db instance, created with autocommit=False,
+                used only by the worker thread from now on.
+        @param job_model: The job model tests are inserted for.
+        @param test_callback: Optional function called with each finished
+                test before it is inserted.
+        @param max_queued_lines: Bound on the number of queued lines; callers
+                of process_line() block while the queue is full.
+        @param batch_size: Maximum number of tests inserted per transaction.
+        """
+        self._parser = parser
+        self._results_db = results_db
+        self._job_model = job_model
+        self._test_callback = test_callback
+        self._batch_size = batch_size
+        self._queue = Queue.Queue(max_queued_lines)
+        # Set by the worker thread if it exits before finish().
+        self._dead = False
+        # Lines from forked children are handled synchronously, since the
+        # worker thread only exists in the process that started it.
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run,
+                                        name='continuous-parser')
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def process_line(self, line):
+        """Queue a rendered status log line for parsing.
+
+        @param line: The status line.
+        """
+        if os.getpid() != self._pid or self._dead:
+            self._insert_tests(self._parse([line]))
+            return
+        self._queue.put(line)
+        if self._dead:
+            # The worker died after the check above; it may have drained
+            # the queue before this line was added.
+            self._drain_queue()
+
+
+    def flush(self):
+        """Wait until every queued line has been parsed and inserted."""
+        if os.getpid() == self._pid:
+            self._queue.join()
+
+
+    def finish(self):
+        """Parse the remaining lines, end the parser and stop the worker.
+
+        Tests finalized by the parser's end() are inserted as well.
+        """
+        if os.getpid() != self._pid or self._dead:
+            self._insert_tests(self._end())
+            return
+        self._queue.put(_FINISH)
+        self._thread.join()
+        if self._dead:
+            self._drain_queue()
+            self._insert_tests(self._end())
+
+
+    def _run(self):
+        """Worker thread main loop."""
+        try:
+            self._serve()
+        except:
+            self._dead = True
+            self._drain_queue()
+            raise
+
+
+    def _serve(self):
+        """Parse and insert queued lines until finish() is called."""
+        while True:
+            lines = [self._queue.get()]
+            # Drain whatever else is queued so it is inserted in one batch.
+            while len(lines) < self._batch_size:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except Queue.Empty:
+                    break
+            finishing = lines[-1] is _FINISH
+            if finishing:
+                lines.pop()
+            try:
+                tests = []
+                if lines:
+                    tests.extend(self._parse(lines))
+                if finishing:
+                    tests.extend(self._end())
+                self._insert_tests(tests)
+            except Exception:
+                _warn('processing status lines')
+            finally:
+                for _ in xrange(len(lines) + int(finishing)):
+                    self._queue.task_done()
+            if finishing:
+                return
+
+
+    def _drain_queue(self):
+        """Drop every queued line once the worker has died."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Queue.Empty:
+                return
+            self._queue.task_done()
+
+
+    def _parse(self, lines):
+        try:
+            return self._parser.process_lines(lines)
+        except Exception:
+            _warn('parsing status lines')
+            return []
+
+
+    def _end(self):
+        try:
+            return self._parser.end()
+        except Exception:
+            _warn('ending the status log parser')
+            return []
+
+
+    def _insert_tests(self, tests):
+        """Insert tests in transactions of at most batch_size tests.
+
+        Like the inline insertion it replaces, this never raises: database
+        errors are reported and the tests are dropped.
+
+        @param tests: List of tko test models.
+        """
+        unique_tests = []
+        for test in tests:
+            if self._test_callback:
+                try:
+                    self._test_callback(test)
+                except Exception:
+                    _warn('running the test callback')
+            # The parser may return the same test object more than once;
+            # inserting it once per batch is enough.
+            if test not in unique_tests:
+                unique_tests.append(test)
+        for start in xrange(0, len(unique_tests), self._batch_size):
+            batch = unique_tests[start:start + self._batch_size]
+            try:
+                self._results_db.run_with_retry(self._insert_batch, batch)
+            except Exception:
+                _warn('inserting test results into the database')
+
+
+    def _insert_batch(self, tests):
+        """Insert tests in a single transaction.
+
+        Safe to retry: on failure the transaction is rolled back and test
+        indexes assigned during it are forgotten.
+
+        @param tests: List of tko test models.
+        """
+        new_tests = [test for test in tests if not hasattr(test, 'test_idx')]
+        try:
+            for test in tests:
+                self._results_db.insert_test(self._job_model, test,
+                                             commit=False)
+            self._results_db.update_test_rollups(self._job_model.index,
+                                                 commit=False)
+            self._results_db.commit()
+        except Exception:
+            for test in new_tests:
+                if hasattr(test, 'test_idx'):
+                    del test.test_idx
+            try:
+                self._results_db.rollback()
+            except Exception:
+                pass
+            raise
+
+
+def _warn(action):
+    msg = ("WARNING: An unexpected error occured while %s. "
+           "Ignoring error.\n%s" % (action, traceback.format_exc()))
+    print >> sys.stderr, msg
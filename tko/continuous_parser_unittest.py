@@ -0,0 +1,202 @@
+#!/usr/bin/python
+
+import sys
+import threading
+import unittest
+
+from cStringIO import StringIO
+
+import common
+from autotest_lib.tko import continuous_parser
+
+
+class _FakeTest(object):
+    def __init__(self, name):
+        self.testname = name
+
+
+class _FakeJob(object):
+    index = 7
+
+
+class _FakeParser(object):
+    """Turns every line into a test named after it."""
+
+    def __init__(self):
+        self.process_calls = []
+        self.ended = False
+
+
+    def process_lines(self, lines):
+        self.process_calls.append(list(lines))
+        return [_FakeTest(line) for line in lines]
+
+
+    def end(self):
+        self.ended = True
+        return [_FakeTest('final')]
+
+
+class _FakeDb(object):
+    """Records committed transactions; fails the first |failures| commits."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.pending = []
+        self.transactions = []
+        self.rollbacks = 0
+        self.updates = 0
+        self.rollup_updates = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.inserting = threading.Event()
+        self._next_idx = 0
+
+
+    def run_with_retry(self, function, *args):
+        while True:
+            try:
+                return function(*args)
+            except IOError:
+                pass
+
+
+    def insert_test(self, job, test, commit=None):
+        self.inserting.set()
+        self.gate.wait()
+        if hasattr(test, 'test_idx'):
+            self.updates += 1
+        else:
+            self._next_idx += 1
+            test.test_idx = self._next_idx
+        self.pending.append(test.testname)
+
+
+    def update_test_rollups(self, job_idx, commit=None):
+        self.rollup_updates.append(job_idx)
+
+
+    def commit(self):
+        if self.failures:
+            self.failures -= 1
+            raise IOError('commit failed')
+        self.transactions.append(self.pending)
+        self.pending = []
+
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+
+
+class ContinuousParserTest(unittest.TestCase):
+    """Tests for ContinuousParser."""
+
+    def _make(self, db, batch_size=50, callback=None, max_queued_lines=10000):
+        self.parser = _FakeParser()
+        return continuous_parser.ContinuousParser(
+                self.parser, db, _FakeJob(), test_callback=callback,
+                max_queued_lines=max_queued_lines, batch_size=batch_size)
+
+
+    def _capture_stderr(self):
+        old_stderr, sys.stderr = sys.stderr, StringIO()
+        self.addCleanup(setattr, sys, 'stderr', old_stderr)
+        return sys.stderr
+
+
+    def test_lines_are_inserted_and_counted(self):
+        db = _FakeDb()
+        counted = []
+        cp = self._make(db, callback=lambda test: counted.append(test))
+        for i in xrange(5):
+            cp.process_line('line%d' % i)
+        cp.flush()
+        self.assertEqual(5, len(counted))
+        cp.finish()
+        self.assertTrue(self.parser.ended)
+        self.assertEqual(['line%d' % i for i in xrange(5)] + ['final'],
+                         sum(db.transactions, []))
+        self.assertEqual(set([7]), set(db.rollup_updates))
+
+
+    def test_queued_lines_are_batched(self):
+        db = _FakeDb()
+        db.gate.clear()
+        cp = self._make(db, batch_size=3)
+        cp.process_line('first')
+        # Queue up more lines while the worker is blocked inserting 'first'.
+        db.inserting.wait()
+        for i in xrange(7):
+            cp.process_line('line%d' % i)
+        db.gate.set()
+        cp.flush()
+        self.assertEqual([['first'], ['line0', 'line1', 'line2'],
+                          ['line3', 'line4', 'line5'], ['line6']],
+                         db.transactions)
+        cp.finish()
+        self.assertTrue(all(len(call) <= 3
+                            for call in self.parser.process_calls))
+
+
+    def test_failed_transaction_is_retried_as_new_inserts(self):
+        db = _FakeDb(failures=1)
+        cp = self._make(db)
+        cp.process_line('line')
+        cp.finish()
+        self.assertEqual(1, db.rollbacks)
+        self.assertEqual(['line', 'final'], sum(db.transactions, []))
+        self.assertEqual(0, db.updates)
+
+
+    def test_database_errors_are_not_raised(self):
+        db = _FakeDb()
+        db.run_with_retry = lambda function, *args: function(*args)
+        db.failures = 10
+        old_stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            cp = self._make(db)
+            cp.process_line('line')
+            cp.finish()
+            self.assertIn('inserting test results', sys.stderr.getvalue())
+        finally:
+            sys.stderr = old_stderr
+        self.assertEqual([], db.transactions)
+
+
+    def test_callback_errors_are_not_raised(self):
+        db = _FakeDb()
+        stderr = self._capture_stderr()
+        def callback(test):
+            raise ValueError('bad test')
+        cp = self._make(db, callback=callback)
+        cp.process_line('line')
+        cp.flush()
+        cp.finish()
+        self.assertIn('running the test callback', stderr.getvalue())
+        self.assertEqual(['line', 'final'], sum(db.transactions, []))
+
+
+    def test_dead_worker_does_not_block(self):
+        db = _FakeDb()
+        self._capture_stderr()
+        cp = self._make(db, max_queued_lines=2)
+        def die(lines):
+            raise KeyboardInterrupt()
+        self.parser.process_lines = die
+        cp.process_line('fatal')
+        cp._thread.join(5)
+        self.assertFalse(cp._thread.is_alive())
+        # Later lines are parsed inline; the full queue is never waited on.
+        del self.parser.process_lines
+        for i in xrange(5):
+            cp.process_line('line%d' % i)
+        cp.flush()
+        cp.finish()
+        self.assertTrue(self.parser.ended)
+        self.assertEqual(['line%d' % i for i in xrange(5)] + ['final'],
+                         sum(db.transactions, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,6 +15,32 @@ from autotest_lib.frontend import database_settings_helper
 from autotest_lib.tko import utils
 
 
+# Recomputes the rows of tko_test_rollups for one job from tko_tests.
+_DELETE_TEST_ROLLUPS_SQL = 'DELETE FROM tko_test_rollups WHERE job_idx = %s'
+_INSERT_TEST_ROLLUPS_SQL_TEMPLATE = """
+INSERT INTO tko_test_rollups
+    (job_idx, afe_job_id, job_name, job_owner, build, board, suite,
+     test_name, status, invalid, test_count, latest_test_idx)
+SELECT tko_jobs.job_idx, tko_jobs.afe_job_id, tko_jobs.label,
+       tko_jobs.username, tko_jobs.build, tko_jobs.board, tko_jobs.suite,
+       tko_tests.test, tko_status.word, tko_tests.invalid, COUNT(1),
+       MAX(tko_tests.test_idx)
+FROM tko_tests
+INNER JOIN tko_jobs ON tko_jobs.job_idx = tko_tests.job_idx
+INNER JOIN tko_status ON tko_status.status_idx = tko_tests.status
+WHERE %s
+GROUP BY tko_tests.job_idx, tko_tests.test, tko_status.word,
+         tko_tests.invalid
+"""
+_INSERT_TEST_ROLLUPS_SQL = (_INSERT_TEST_ROLLUPS_SQL_TEMPLATE %
+                            'tko_tests.job_idx = %s')
+# The same, for all jobs in a range of job indexes.
+_DELETE_JOB_RANGE_ROLLUPS_SQL = ('DELETE FROM tko_test_rollups '
+                                 'WHERE job_idx BETWEEN %s AND %s')
+_INSERT_JOB_RANGE_ROLLUPS_SQL = (_INSERT_TEST_ROLLUPS_SQL_TEMPLATE %
+                                 'tko_tests.job_idx BETWEEN %s AND %s')
+
+
 def _log_error(msg):
     """Log an error message.
 
@@ -429,10 +455,57 @@ class db_sql(object):
             self.delete('tko_test_attributes', where)
             self.delete('tko_test_labels_tests', {'test_id': test_idx})
         where = {'job_idx' : job_idx}
+        self.delete('tko_test_rollups', where)
         self.delete('tko_tests', where)
         self.delete('tko_jobs', where)
 
 
+    def update_test_rollups(self, job_idx, commit=None):
+        """Recomputes the tko_test_rollups rows of a job.
+
+        Must be called after the tests of a job were inserted, updated or
+        deleted. The old rows are replaced in a single transaction, so
+        readers never see a job without rollups.
+
+        @param job_idx: The tko job index.
+        @param commit: If commit the transaction.
+        """
+        if commit is None:
+            commit = self.autocommit
+        self.dprint('%s %s' % (_INSERT_TEST_ROLLUPS_SQL, job_idx))
+
+        def _update():
+            self.cur.execute(_DELETE_TEST_ROLLUPS_SQL, [job_idx])
+            self.cur.execute(_INSERT_TEST_ROLLUPS_SQL, [job_idx])
+            if commit:
+                self.con.commit()
+
+        if self.autocommit:
+            self.run_with_retry(_update)
+        else:
+            _update()
+
+
+    def update_job_range_rollups(self, first_job_idx, last_job_idx):
+        """Recomputes the tko_test_rollups rows of a range of jobs.
+
+        Used to backfill the table; the range is replaced in a single
+        transaction, which is committed.
+
+        @param first_job_idx: The first tko job index of the range.
+        @param last_job_idx: The last tko job index of the range, included.
+        """
+        args = [first_job_idx, last_job_idx]
+        self.dprint('%s %s' % (_INSERT_JOB_RANGE_ROLLUPS_SQL, args))
+
+        def _update():
+            self.cur.execute(_DELETE_JOB_RANGE_ROLLUPS_SQL, args)
+            self.cur.execute(_INSERT_JOB_RANGE_ROLLUPS_SQL, args)
+            self.con.commit()
+
+        self.run_with_retry(_update)
+
+
     def insert_job(self, tag, job, parent_job_id=None, commit=None):
         """Insert a tko job.
 
@@ -1,10 +1,13 @@
 #!/usr/bin/python
 
+import sqlite3
 import sys
 import unittest
 
 from cStringIO import StringIO
 
+import mock
+
 import common
 from autotest_lib.tko import db
 
@@ -36,5 +39,142 @@ class FormatOperationalErrorTestCase(unittest.TestCase):
         self.assertIn('An operational error occurred', got)
 
 
+# The columns of tko_jobs, tko_tests and tko_test_view_2 used by the rollups.
+_CREATE_TABLES_SQL = """
+CREATE TABLE tko_status (status_idx INTEGER PRIMARY KEY, word VARCHAR(10));
+CREATE TABLE tko_jobs (
+    job_idx INTEGER PRIMARY KEY, tag VARCHAR(100), label VARCHAR(300),
+    username VARCHAR(240), afe_job_id INT, build VARCHAR(255),
+    board VARCHAR(40), suite VARCHAR(40));
+CREATE TABLE tko_tests (
+    test_idx INTEGER PRIMARY KEY, job_idx INT, test VARCHAR(300),
+    status INT, invalid TINYINT(1) DEFAULT 0);
+CREATE TABLE tko_test_rollups (
+    id INTEGER PRIMARY KEY, job_idx INT NOT NULL, afe_job_id INT,
+    job_name VARCHAR(300), job_owner VARCHAR(240), build VARCHAR(255),
+    board VARCHAR(40), suite VARCHAR(40), test_name VARCHAR(300),
+    status VARCHAR(30), invalid TINYINT(1) NOT NULL DEFAULT 0,
+    test_count INT NOT NULL, latest_test_idx INT NOT NULL);
+CREATE VIEW tko_test_view_2 AS
+SELECT tko_tests.test_idx, tko_tests.job_idx, tko_tests.test AS test_name,
+       tko_tests.invalid, tko_jobs.label AS job_name,
+       tko_jobs.username AS job_owner, tko_jobs.afe_job_id, tko_jobs.build,
+       tko_jobs.board, tko_jobs.suite, tko_status.word AS status
+FROM tko_tests
+INNER JOIN tko_jobs ON tko_jobs.job_idx = tko_tests.job_idx
+INNER JOIN tko_status ON tko_status.status_idx = tko_tests.status;
+INSERT INTO tko_status (status_idx, word)
+VALUES (1, 'GOOD'), (2, 'FAIL'), (3, 'RUNNING');
+"""
+
+_ROLLUP_COLUMNS = ('job_idx, afe_job_id, job_name, job_owner, build, board, '
+                   'suite, test_name, status, invalid')
+
+
+class _SqliteCursor(object):
+    """A sqlite3 cursor taking the %s parameters of MySQLdb."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+
+    def execute(self, sql, args=()):
+        return self._cursor.execute(sql.replace('%s', '?'), args)
+
+
+class TestRollupsTestCase(unittest.TestCase):
+    """Tests for update_test_rollups() and update_job_range_rollups()."""
+
+    def setUp(self):
+        # db_sql without connecting to MySQL.
+        self.db = db.db_sql.__new__(db.db_sql)
+        self.db.debug = False
+        self.db.autocommit = True
+        self.db.con = sqlite3.connect(':memory:')
+        self.db.con.executescript(_CREATE_TABLES_SQL)
+        self.db.cur = _SqliteCursor(self.db.con.cursor())
+        patcher = mock.patch.object(db, '_get_error_class',
+                                    return_value=sqlite3.OperationalError)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.db.con.close)
+
+        self._add_job(1, 'lumpy-release/R1', [('test1', 2), ('test1', 1),
+                                              ('test2', 1), ('test3', 3)])
+        self._add_job(2, 'lumpy-release/R2', [('test1', 1), ('test1', 1)])
+        self._add_job(3, 'link-release/R2', [('test1', 2)])
+
+
+    def _add_job(self, job_idx, build, tests):
+        """Inserts a job and its tests.
+
+        @param job_idx: The job index, also used as the AFE job id.
+        @param build: The build of the job.
+        @param tests: List of (test name, status index) tuples.
+        """
+        self.db.con.execute(
+                'INSERT INTO tko_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_idx, '%d-user/host' % job_idx, 'job%d' % job_idx, 'user',
+                 job_idx, build, build.split('-')[0], 'bvt'))
+        for test, status in tests:
+            self.db.con.execute(
+                    'INSERT INTO tko_tests (job_idx, test, status) '
+                    'VALUES (?, ?, ?)', (job_idx, test, status))
+
+
+    def _get_rollups(self):
+        """Returns the rows of tko_test_rollups."""
+        return self.db.con.execute(
+                'SELECT %s, test_count, latest_test_idx FROM tko_test_rollups '
+                'ORDER BY job_idx, test_name, status, invalid'
+                % _ROLLUP_COLUMNS).fetchall()
+
+
+    def _get_view_counts(self, job_idxs):
+        """Returns the rollups of some jobs computed over tko_test_view_2.
+
+        @param job_idxs: List of job indexes.
+        """
+        return self.db.con.execute(
+                'SELECT %s, COUNT(1), MAX(test_idx) FROM tko_test_view_2 '
+                'WHERE job_idx IN (%s) '
+                'GROUP BY job_idx, test_name, status, invalid '
+                'ORDER BY job_idx, test_name, status, invalid'
+                % (_ROLLUP_COLUMNS, ', '.join('?' * len(job_idxs))),
+                job_idxs).fetchall()
+
+
+    def test_update_test_rollups(self):
+        """Test update_test_rollups()."""
+        self.db.update_test_rollups(1)
+        self.assertEqual(self._get_rollups(), self._get_view_counts([1]))
+        self.assertEqual(
+                [(row[7], row[8], row[10]) for row in self._get_rollups()],
+                [(u'test1', u'FAIL', 1), (u'test1', u'GOOD', 1),
+                 (u'test2', u'GOOD', 1), (u'test3', u'RUNNING', 1)])
+
+        # A retry invalidates the failed test, the running test finishes.
+        self.db.con.execute('UPDATE tko_tests SET invalid = 1 '
+                            'WHERE job_idx = 1 AND status = 2')
+        self.db.con.execute('UPDATE tko_tests SET status = 1 '
+                            "WHERE job_idx = 1 AND test = 'test3'")
+        self._add_job(4, 'lumpy-release/R3', [('test1', 1)])
+        self.db.update_test_rollups(1)
+        self.db.update_test_rollups(4)
+        self.assertEqual(self._get_rollups(), self._get_view_counts([1, 4]))
+
+
+    def test_update_job_range_rollups(self):
+        """Test update_job_range_rollups()."""
+        # Rerunning the range replaces its rows.
+        for _ in range(2):
+            self.db.update_job_range_rollups(1, 2)
+            self.assertEqual(self._get_rollups(),
+                             self._get_view_counts([1, 2]))
+        self.assertEqual(
+                [row[10:] for row in self._get_rollups() if row[0] == 2],
+                [(2, 6)])
+
+
 if __name__ == "__main__":
     unittest.main()
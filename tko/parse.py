@@ -370,6 +370,7 @@ def parse_one(db, jobname, path, parse_options):
             job_data = db.insert_job(
                 jobname, job,
                 parent_job_id=job_keyval.get(constants.PARENT_JOB_ID, None))
+            db.update_test_rollups(job_data['job_idx'])
 
             # Verify the job data is written to the database.
             if job.tests:
@@ -403,6 +404,7 @@ def parse_one(db, jobname, path, parse_options):
                 orig_job_idx = tko_models.Job.objects.get(
                         afe_job_id=orig_afe_job_id).job_idx
                 _invalidate_original_tests(orig_job_idx, job.index)
+                db.update_test_rollups(orig_job_idx)
     except Exception as e:
         tko_utils.dprint("Hit exception while uploading to tko db:\n%s" %
                          traceback.format_exc())